@@ -14,6 +14,10 @@ import time
 import requests
 from googleapiclient.errors import HttpError
 
+from utils.date_index import (
+    DateIndex, DATE_INDEX_SHEET, DATE_INDEX_RANGE, DATE_INDEX_FORMULAS, parse_sheet_date
+)
+
 logger = logging.getLogger(__name__)
 
 class FacebookBaseCollector:
@@ -71,6 +75,9 @@ class FacebookBaseCollector:
             self.config_manager = None
             self.use_cloud_storage = False
             os.makedirs("configs", exist_ok=True)
+        
+        # Index des dates par spreadsheet (évite de relire la feuille cachée)
+        self._date_indexes = {}
     
     def get_header_corrections_mapping(self):
         """
@@ -449,7 +456,12 @@ class FacebookBaseCollector:
             ).execute()
             
             existing_headers = result.get('values', [[]])[0] if result.get('values') else []
-            
+
+            # Index des dates (lecture légère) - donne aussi le nombre de lignes existantes
+            date_index = self._date_indexes.get(spreadsheet_id) if existing_headers else None
+            if existing_headers and date_index is None:
+                date_index = self.get_date_index(spreadsheet_id)
+
             # 2. Préparer les données SANS les en-têtes (car on ajoute seulement les données)
             df_clean = df.fillna("")
             data_rows = []
@@ -495,6 +507,11 @@ class FacebookBaseCollector:
                 self._execute_with_retry(header_request, operation_name="ajout en-têtes")
                 logger.info(f"✅ En-têtes ajoutés: {len(headers)} colonnes")
                 start_row = 2  # Commencer à la ligne 2
+                date_index = DateIndex()
+            elif date_index is not None:
+                # 4. L'index connaît le nombre de lignes, pas besoin de relire la colonne A
+                start_row = date_index.rows + 2
+                logger.info(f"📍 Données existantes (index): {date_index.rows} lignes, ajout à partir de la ligne {start_row}")
             else:
                 # 4. Trouver la prochaine ligne vide
                 self._wait_for_quota()
@@ -536,7 +553,11 @@ class FacebookBaseCollector:
                     time.sleep(1)
             
             logger.info(f"✅ {len(data_rows)} nouvelles lignes ajoutées avec succès!")
-            
+
+            # 6. Mettre à jour l'index des dates
+            if date_index is not None:
+                self._record_dates_in_index(spreadsheet_id, date_index, df, len(data_rows))
+
         except Exception as e:
             logger.error(f"❌ Erreur lors de l'ajout des données: {e}")
             raise
@@ -584,6 +605,7 @@ class FacebookBaseCollector:
                 # Pour les petits datasets, essayer le mode batch
                 self._update_sheet_batch(spreadsheet_id, values)
                 logger.info("Données mises à jour avec succès en mode batch")
+                self._reset_date_index(spreadsheet_id, df)
                 return
             except Exception as e:
                 if "Broken pipe" in str(e) or "timed out" in str(e):
@@ -595,6 +617,7 @@ class FacebookBaseCollector:
         logger.info("Utilisation du mode normal (plus robuste pour gros volumes)")
         self._update_sheet_normal_chunked(spreadsheet_id, values)
         logger.info(f"Données mises à jour: {len(df)} lignes")
+        self._reset_date_index(spreadsheet_id, df)
 
     def _update_sheet_batch(self, spreadsheet_id, values):
         """Mode batch pour petits datasets - VERSION CORRIGÉE"""
@@ -858,33 +881,149 @@ class FacebookBaseCollector:
     
     def get_existing_dates(self, spreadsheet_id):
         """
-        Récupère la liste des dates déjà présentes dans le Google Sheet - VERSION CORRIGÉE
+        Récupère la liste des dates déjà présentes dans le Google Sheet
+        (via l'index des dates, sans relire toute la colonne A)
+        """
+        date_index = self.get_date_index(spreadsheet_id)
+        if date_index is None:
+            return set()
+
+        dates = {d.strftime("%Y-%m-%d") for d in date_index.dates()}
+        logger.info(f"Dates existantes récupérées : {len(dates)} dates")
+        return dates
+
+    def get_missing_date_ranges(self, spreadsheet_id, start_date, end_date):
+        """Retourne les plages de dates absentes du sheet entre start_date et end_date"""
+        date_index = self.get_date_index(spreadsheet_id) or DateIndex()
+        return date_index.missing_ranges(parse_sheet_date(start_date), parse_sheet_date(end_date))
+
+    def get_date_index(self, spreadsheet_id):
+        """
+        Charge l'index des dates depuis la feuille cachée en une seule petite lecture.
+        L'index est reconstruit automatiquement s'il est absent ou incohérent
+        avec le contenu réel de la feuille 'Metrics Data'.
         """
+        if spreadsheet_id in self._date_indexes:
+            return self._date_indexes[spreadsheet_id]
+
+        try:
+            self._wait_for_quota()
+            result = self.sheets_service.spreadsheets().values().get(
+                spreadsheetId=spreadsheet_id,
+                range=DATE_INDEX_RANGE,
+                valueRenderOption="UNFORMATTED_VALUE"
+            ).execute()
+            row = result.get('values', [[]])[0] if result.get('values') else []
+        except HttpError as e:
+            # Feuille d'index inexistante (ancien spreadsheet)
+            logger.info(f"Index des dates absent ({e.resp.status}), reconstruction...")
+            return self._rebuild_date_index(spreadsheet_id)
+        except Exception as e:
+            logger.warning(f"Impossible de lire l'index des dates : {e}")
+            return self._rebuild_date_index(spreadsheet_id)
+
+        date_index = DateIndex.from_json(row[0] if row else None)
+        if date_index is None:
+            logger.info("Index des dates absent ou illisible, reconstruction...")
+            return self._rebuild_date_index(spreadsheet_id)
+
+        # Vérifications de cohérence calculées côté Sheets (B1 = COUNTA, C1 = dernière valeur)
+        try:
+            live_rows = max(int(row[1]) - 1, 0) if len(row) > 1 else -1
+        except (TypeError, ValueError):
+            live_rows = -1
+        last_date = parse_sheet_date(row[2]) if len(row) > 2 else None
+
+        # Un index sans dates (export de posts) ne se contrôle que par le nombre de lignes
+        if live_rows != date_index.rows or (live_rows > 0 and date_index and last_date not in date_index):
+            logger.warning(f"Index des dates incohérent ({date_index.rows} lignes indexées, {live_rows} réelles), reconstruction...")
+            return self._rebuild_date_index(spreadsheet_id)
+
+        logger.info(f"Index des dates chargé : {len(date_index)} dates, {date_index.rows} lignes")
+        self._date_indexes[spreadsheet_id] = date_index
+        return date_index
+
+    def _rebuild_date_index(self, spreadsheet_id):
+        """Reconstruit l'index à partir de la colonne A (lecture complète, cas exceptionnel)"""
         try:
-            self._wait_for_quota()  # Respecter quotas
+            self._wait_for_quota()
             result = self.sheets_service.spreadsheets().values().get(
                 spreadsheetId=spreadsheet_id,
-                range="Metrics Data!A:A"  # Colonne A = 'Date'
+                range="Metrics Data!A:A",  # Colonne A = 'Date'
+                valueRenderOption="UNFORMATTED_VALUE"
             ).execute()
 
             values = result.get('values', [])
-            if len(values) <= 1:
-                # Soit vide, soit uniquement l'en-tête
-                return set()
-
-            dates = set()
-            for row in values[1:]:  # Skip header
-                if row and row[0]:
-                    try:
-                        parsed_date = pd.to_datetime(row[0]).strftime("%Y-%m-%d")
-                        dates.add(parsed_date)
-                    except:
-                        # Si la conversion échoue, on ignore cette cellule
-                        continue
-
-            logger.info(f"Dates existantes récupérées : {len(dates)} dates")
-            return dates
+            header = values[0][0] if values and values[0] else None
+            data_rows = values[1:]  # Skip header
+            date_index = DateIndex.from_dates(
+                self._index_dates(header, (row[0] for row in data_rows if row)),
+                rows=len(data_rows)
+            )
+
+            logger.info(f"Index des dates reconstruit : {len(date_index)} dates, {date_index.rows} lignes")
+            self._save_date_index(spreadsheet_id, date_index)
+            return date_index
 
         except Exception as e:
-            logger.warning(f"Impossible de récupérer les dates existantes : {e}")
-            return set()
\ No newline at end of file
+            logger.warning(f"Impossible de reconstruire l'index des dates : {e}")
+            return None
+
+    def _reset_date_index(self, spreadsheet_id, df):
+        """Réinitialise l'index après un remplacement complet des données"""
+        try:
+            date_index = DateIndex()
+            self._record_dates_in_index(spreadsheet_id, date_index, df, len(df))
+        except Exception as e:
+            logger.warning(f"Impossible de réinitialiser l'index des dates : {e}")
+
+    def _record_dates_in_index(self, spreadsheet_id, date_index, df, rows_added):
+        """Ajoute les dates d'un DataFrame écrit dans le sheet à l'index et le sauvegarde"""
+        if df.empty:
+            return
+
+        try:
+            date_index.add_dates(self._index_dates(df.columns[0], df.iloc[:, 0]), rows_added=rows_added)
+            self._save_date_index(spreadsheet_id, date_index)
+        except Exception as e:
+            # L'index sera reconstruit au prochain passage
+            self._date_indexes.pop(spreadsheet_id, None)
+            logger.warning(f"Impossible de mettre à jour l'index des dates : {e}")
+
+    @staticmethod
+    def _index_dates(header, values):
+        """
+        Dates à indexer pour une colonne A donnée. Seuls les exports de métriques
+        (en-tête exactement 'Date') sont indexés; les exports de posts ('Date de
+        publication') ne comptent que leurs lignes.
+        """
+        if str(header) != "Date":
+            return ()
+        return (parse_sheet_date(v) for v in values)
+
+    def _save_date_index(self, spreadsheet_id, date_index):
+        """Écrit l'index (et ses formules de contrôle) dans la feuille cachée"""
+        body = {'values': [[date_index.to_json()] + DATE_INDEX_FORMULAS]}
+        try:
+            self._write_date_index(spreadsheet_id, body)
+        except HttpError as e:
+            if e.resp.status != 400:
+                raise
+            # Feuille d'index inexistante: la créer (cachée) puis réessayer
+            add_sheet_request = self.sheets_service.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={'requests': [{'addSheet': {'properties': {'title': DATE_INDEX_SHEET, 'hidden': True}}}]}
+            )
+            self._execute_with_retry(add_sheet_request, operation_name="création feuille d'index")
+            self._write_date_index(spreadsheet_id, body)
+
+        self._date_indexes[spreadsheet_id] = date_index
+
+    def _write_date_index(self, spreadsheet_id, body):
+        update_request = self.sheets_service.spreadsheets().values().update(
+            spreadsheetId=spreadsheet_id,
+            range=DATE_INDEX_RANGE,
+            valueInputOption="USER_ENTERED",
+            body=body
+        )
+        self._execute_with_retry(update_request, operation_name="écriture index des dates")
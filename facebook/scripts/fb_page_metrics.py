@@ -647,65 +647,157 @@ def get_page_token(user_token, page_id):
         logger.error(f"Erreur lors de la récupération du token de page: {e}")
         raise
 
+# Fenêtre maximale acceptée par l'API Insights pour period=day
+INSIGHTS_WINDOW_DAYS = 93
+# Profondeur maximale de la recherche (~10 ans, comme l'ancienne recherche par années)
+MAX_HISTORY_WINDOWS = 40
+EARLIEST_DATES_CONFIG = "earliest_dates.json"
+# Tentatives par fenêtre avant d'abandonner la recherche (erreurs transitoires, limites de débit)
+PROBE_ATTEMPTS = 3
+
+
+class InsightsProbeError(Exception):
+    """Une fenêtre n'a pas pu être sondée: distinct d'une fenêtre vide"""
+
+
+def _load_cached_earliest_date(page_id):
+    """Lit la date la plus ancienne déjà trouvée pour cette page dans le config store"""
+    try:
+        from utils.config_manager import ConfigManager
+        earliest_config = ConfigManager().load_config(EARLIEST_DATES_CONFIG) or {}
+        cached = earliest_config.get("pages", {}).get(page_id, {}).get("earliest_date")
+        if cached:
+            return datetime.strptime(cached, '%Y-%m-%d')
+    except Exception as e:
+        logger.debug(f"Impossible de lire {EARLIEST_DATES_CONFIG}: {e}")
+    return None
+
+
+def _save_cached_earliest_date(page_id, earliest_date):
+    """Mémorise la date la plus ancienne trouvée pour ne plus jamais re-sonder cette page"""
+    try:
+        from utils.config_manager import ConfigManager
+        config_manager = ConfigManager()
+        earliest_config = config_manager.load_config(EARLIEST_DATES_CONFIG) or {"pages": {}}
+        earliest_config.setdefault("pages", {})[page_id] = {
+            "earliest_date": earliest_date.strftime('%Y-%m-%d'),
+            "probed_at": datetime.now().isoformat()
+        }
+        config_manager.save_config(EARLIEST_DATES_CONFIG, earliest_config)
+    except Exception as e:
+        logger.warning(f"Impossible de sauvegarder la date la plus ancienne pour {page_id}: {e}")
+
+
+def _probe_insights_window(access_token, page_id, window_index, today):
+    """
+    Interroge une fenêtre de 93 jours (window_index=0 : la plus récente).
+    Retourne le premier jour avec des données dans la fenêtre, ou None si elle est vide.
+    Lève InsightsProbeError si la fenêtre reste illisible après PROBE_ATTEMPTS tentatives.
+    """
+    window_end = today - timedelta(days=window_index * INSIGHTS_WINDOW_DAYS)
+    window_start = window_end - timedelta(days=INSIGHTS_WINDOW_DAYS - 1)
+
+    params = {
+        "metric": "page_impressions",
+        "period": "day",
+        "access_token": access_token,
+        "since": int(window_start.timestamp()),
+        "until": int(window_end.timestamp())
+    }
+
+    values = None
+    for attempt in range(PROBE_ATTEMPTS):
+        try:
+            response = requests.get(f"https://graph.facebook.com/v21.0/{page_id}/insights", params=params, timeout=10)
+            if response.status_code == 200:
+                data = response.json().get("data") or []
+                values = (data[0].get("values") or []) if data else []
+                break
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+        except Exception as e:
+            error = str(e)
+        finally:
+            time.sleep(0.5)  # Éviter de surcharger l'API
+        logger.debug(f"Erreur lors du test de la fenêtre {window_index} (tentative {attempt + 1}): {error}")
+        if attempt + 1 < PROBE_ATTEMPTS:
+            time.sleep(2 ** attempt)
+
+    if values is None:
+        raise InsightsProbeError(f"Fenêtre {window_index} illisible: {error}")
+
+    days = [value["end_time"].split("T")[0] for value in values if value.get("end_time")]
+    if not days:
+        return None
+
+    # Même ajustement que fetch_page_metrics: end_time correspond au lendemain du jour mesuré
+    return datetime.strptime(min(days), '%Y-%m-%d') - timedelta(days=1)
+
+
 def get_earliest_available_date(access_token, page_id):
     """
-    Trouve la date la plus ancienne où des données sont disponibles pour cette page
+    Trouve la date la plus ancienne où des données sont disponibles pour cette page.
+    Recherche exponentielle puis dichotomique sur les fenêtres de 93 jours (O(log jours) requêtes),
+    résultat mis en cache par page dans le config store. Si une sonde échoue (et non une fenêtre
+    vide), la recherche s'arrête sur la date de fallback, jamais mise en cache.
     """
+    cached_date = _load_cached_earliest_date(page_id)
+    if cached_date:
+        logger.info(f"📌 Date la plus ancienne en cache pour la page {page_id}: {cached_date.strftime('%Y-%m-%d')}")
+        return cached_date
+
     logger.info(f"🔍 Recherche de la date la plus ancienne disponible pour la page {page_id}...")
-    
+
     try:
-        # Chercher en remontant par tranches d'un an
-        current_year = datetime.now().year
-        earliest_found = None
-        
-        for year_offset in range(10):  # Chercher jusqu'à 10 ans en arrière
-            test_start_date = datetime(current_year - year_offset, 1, 1)
-            test_end_date = datetime(current_year - year_offset, 12, 31)
-            
-            if test_end_date > datetime.now():
-                test_end_date = datetime.now()
-            
-            logger.info(f"   - Test de l'année {current_year - year_offset}...")
-            
-            # Tester avec une métrique simple
-            test_url = f"https://graph.facebook.com/v21.0/{page_id}/insights"
-            test_params = {
-                "metric": "page_impressions",
-                "period": "day",
-                "access_token": access_token,
-                "since": int(test_start_date.timestamp()),
-                "until": int(test_end_date.timestamp()),
-                "limit": 10  # Récupérer quelques points pour trouver la vraie première date
-            }
-            
-            try:
-                test_response = requests.get(test_url, params=test_params, timeout=10)
-                if test_response.status_code == 200:
-                    test_data = test_response.json()
-                    if (test_data.get("data") and 
-                        len(test_data["data"]) > 0 and 
-                        test_data["data"][0].get("values") and
-                        len(test_data["data"][0]["values"]) > 0):
-                        
-                        # Des données existent pour cette année, noter comme candidat
-                        earliest_found = test_start_date
-                        logger.info(f"✓ Données trouvées pour l'année {current_year - year_offset}")
-                        # Continuer à chercher plus loin pour trouver le vrai début
-                        
-            except Exception as test_error:
-                logger.debug(f"Erreur lors du test de l'année {current_year - year_offset}: {test_error}")
-            
-            time.sleep(0.5)  # Éviter de surcharger l'API
-        
-        if earliest_found:
-            logger.info(f"✅ Date la plus ancienne trouvée: {earliest_found.strftime('%Y-%m-%d')}")
-            return earliest_found
-        else:
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        probes = {}
+
+        def probe(window_index):
+            if window_index not in probes:
+                probes[window_index] = _probe_insights_window(access_token, page_id, window_index, today)
+            return probes[window_index]
+
+        if probe(0) is None:
             # Si aucune donnée trouvée, utiliser une date par défaut raisonnable
             fallback_date = datetime.now() - timedelta(days=365)  # 1 an en arrière
             logger.info(f"🔄 Aucune donnée historique trouvée, utilisation de la date de fallback: {fallback_date.strftime('%Y-%m-%d')}")
             return fallback_date
-        
+
+        # 1. Recherche exponentielle: dernière fenêtre non vide / première fenêtre vide
+        last_found, first_empty = 0, None
+        step = 1
+        while first_empty is None:
+            window_index = min(step, MAX_HISTORY_WINDOWS)
+            if probe(window_index) is None:
+                first_empty = window_index
+            else:
+                last_found = window_index
+                if window_index == MAX_HISTORY_WINDOWS:
+                    break
+            step *= 2
+
+        # 2. Recherche dichotomique entre les deux bornes
+        if first_empty is not None:
+            low, high = last_found, first_empty
+            while high - low > 1:
+                middle = (low + high) // 2
+                if probe(middle) is None:
+                    high = middle
+                else:
+                    low = middle
+            last_found = low
+
+        earliest_found = probe(last_found)
+        logger.info(f"✅ Date la plus ancienne trouvée: {earliest_found.strftime('%Y-%m-%d')} ({len(probes)} requêtes)")
+        _save_cached_earliest_date(page_id, earliest_found)
+        return earliest_found
+
+    except InsightsProbeError as e:
+        # Une fenêtre illisible n'est pas une fenêtre vide: ne pas conclure, ne rien mettre en cache
+        logger.warning(f"⚠️ Recherche de la date la plus ancienne interrompue pour la page {page_id}: {e}")
+        fallback_date = datetime.now() - timedelta(days=365)
+        logger.info(f"Utilisation de la date de fallback (non mise en cache): {fallback_date.strftime('%Y-%m-%d')}")
+        return fallback_date
+
     except Exception as e:
         logger.warning(f"Erreur lors de la recherche de la date la plus ancienne: {e}")
         # Dernier recours: 1 an en arrière
@@ -721,6 +813,33 @@ def get_page_creation_date(access_token, page_id):
     logger.info(f"🔄 Utilisation de get_earliest_available_date pour la page {page_id}")
     return get_earliest_available_date(access_token, page_id)
 
+def fetch_missing_ranges(access_token, page_id, missing_ranges, end_date):
+    """
+    Récupère les métriques des seules plages de jours absentes du sheet
+    (plages [début, fin] inclusives, issues de l'index des dates)
+    """
+    frames = []
+    for range_start, range_end in missing_ranges:
+        range_start_dt = datetime.combine(range_start, datetime.min.time())
+        range_end_dt = min(datetime.combine(range_end + timedelta(days=1), datetime.min.time()), end_date)
+        logger.info(f"📅 Plage manquante: {range_start} → {range_end}")
+        chunk = fetch_page_metrics(access_token, METRICS, page_id, range_start_dt, range_end_dt)
+        if not chunk.empty:
+            frames.append(chunk)
+
+    if not frames:
+        return pd.DataFrame()
+
+    # Les bornes de l'API débordent d'un jour: on ne garde que les jours absents
+    wanted_dates = {
+        (range_start + timedelta(days=offset)).strftime('%Y-%m-%d')
+        for range_start, range_end in missing_ranges
+        for offset in range((range_end - range_start).days + 1)
+    }
+    df = pd.concat(frames, ignore_index=True).fillna(0)
+    df = df[df["date"].isin(wanted_dates)].drop_duplicates(subset="date")
+    return df.sort_values(by="date").reset_index(drop=True)
+
 def process_page_metrics(token, page_id, page_name):
     """
     Fonction principale pour traiter les métriques d'une page Facebook
@@ -752,33 +871,22 @@ def process_page_metrics(token, page_id, page_name):
         # Récupérer la date la plus ancienne disponible pour cette page
         earliest_available_date = get_earliest_available_date(page_access_token, page_id)
         
-        # Vérifier les dates existantes dans le spreadsheet
-        existing_dates = collector.get_existing_dates(spreadsheet_id)
-        logger.info(f"Dates existantes trouvées: {len(existing_dates)}")
+        # Vérifier les dates existantes dans le spreadsheet (index compact, une seule petite lecture)
+        date_index = collector.get_date_index(spreadsheet_id)
+        existing_dates_count = len(date_index) if date_index is not None else 0
+        logger.info(f"Dates existantes trouvées: {existing_dates_count}")
 
         # Analyser la situation des données existantes
         update_mode = "complete_overwrite"  # Par défaut, collecte complète
         start_date = earliest_available_date
         
-        if len(existing_dates) == 0:
+        if existing_dates_count == 0:
             # CAS 1: Aucune donnée - collecte complète
             logger.info(f"🆕 Aucune donnée existante - collecte complète depuis la date la plus ancienne disponible")
             update_mode = "complete_overwrite"
             
         else:
-            # Normaliser et parser les dates existantes
-            parsed_dates = []
-            for d in existing_dates:
-                try:
-                    date_str = str(d).strip()
-                    if date_str and date_str != '' and date_str.lower() != 'nan':
-                        parsed_date = pd.to_datetime(date_str).date()
-                        parsed_dates.append(parsed_date)
-                except Exception as e:
-                    logger.debug(f"Impossible de parser la date '{d}': {e}")
-                    continue
-            
-            if not parsed_dates:
+            if not date_index:
                 # CAS 2: Données corrompues - collecte complète
                 logger.warning("Données existantes corrompues - collecte complète depuis la date la plus ancienne disponible")
                 update_mode = "complete_overwrite"
@@ -786,8 +894,8 @@ def process_page_metrics(token, page_id, page_name):
                 
             else:
                 # Analyser les données existantes
-                earliest_existing_date = min(parsed_dates)
-                latest_existing_date = max(parsed_dates)
+                earliest_existing_date = date_index.min_date
+                latest_existing_date = date_index.max_date
                 
                 logger.info(f"📊 Analyse des données existantes:")
                 logger.info(f"   - Date la plus ancienne disponible (Facebook): {earliest_available_date.strftime('%Y-%m-%d')}")
@@ -795,8 +903,14 @@ def process_page_metrics(token, page_id, page_name):
                 logger.info(f"   - Date la plus récente en base: {latest_existing_date}")
                 
                 # CAS 3: Vérifier si on a l'historique complet depuis la date disponible
+                # Les plages absentes viennent de l'index des dates de la feuille
                 available_date_only = earliest_available_date.date()
-                days_missing_from_start = (earliest_existing_date - available_date_only).days
+                missing_ranges = collector.get_missing_date_ranges(spreadsheet_id, available_date_only, end_date.date())
+                days_missing_from_start = 0
+                if missing_ranges and earliest_existing_date > available_date_only:
+                    # Première plage = jours entre la date disponible et la première date en base
+                    leading_start, leading_end = missing_ranges.pop(0)
+                    days_missing_from_start = (leading_end - leading_start).days + 1
                 
                 if days_missing_from_start > 30:  # Tolérance de 30 jours
                     # Il manque trop de données historiques - collecte complète
@@ -804,32 +918,22 @@ def process_page_metrics(token, page_id, page_name):
                     logger.info(f"🔄 Remplacement complet des données pour avoir l'historique complet")
                     update_mode = "complete_overwrite"
                     
-                elif earliest_existing_date < available_date_only:
-                    # Les données existantes commencent avant la date disponible - c'est PRÉCIEUX !
-                    logger.info(f"✅ Données historiques précieuses détectées: nous avons des données depuis {earliest_existing_date} alors que l'API ne va que jusqu'à {available_date_only}")
-                    logger.info(f"🎯 Conservation de l'historique existant et mise à jour incrémentale")
-                    
-                    # Mise à jour incrémentale depuis la dernière date existante
-                    days_to_update = (datetime.now().date() - latest_existing_date).days
-                    
-                    if days_to_update <= 0:
-                        logger.info(f"✅ Les données sont déjà à jour pour {page_name}")
-                        return spreadsheet_id
-                    
-                    logger.info(f"🔄 Mise à jour incrémentale - ajout des {days_to_update} derniers jours")
-                    start_date = datetime.combine(latest_existing_date + timedelta(days=1), datetime.min.time())
-                    update_mode = "incremental"
-                    
                 else:
-                    # CAS 4: Historique semble correct - mise à jour incrémentale
-                    days_to_update = (datetime.now().date() - latest_existing_date).days
+                    if earliest_existing_date < available_date_only:
+                        # Les données existantes commencent avant la date disponible - c'est PRÉCIEUX !
+                        logger.info(f"✅ Données historiques précieuses détectées: nous avons des données depuis {earliest_existing_date} alors que l'API ne va que jusqu'à {available_date_only}")
+                        logger.info(f"🎯 Conservation de l'historique existant et mise à jour incrémentale")
+                    elif days_missing_from_start:
+                        logger.info(f"ℹ️ {days_missing_from_start} jours manquants en début d'historique (tolérés)")
                     
-                    if days_to_update <= 0:
+                    # CAS 4: Mise à jour incrémentale des seuls jours absents (trous et fin de période)
+                    if not missing_ranges:
                         logger.info(f"✅ Les données sont déjà à jour pour {page_name}")
                         return spreadsheet_id
                     
-                    logger.info(f"🔄 Mise à jour incrémentale - ajout des {days_to_update} derniers jours")
-                    start_date = datetime.combine(latest_existing_date + timedelta(days=1), datetime.min.time())
+                    days_to_update = sum((range_end - range_start).days + 1 for range_start, range_end in missing_ranges)
+                    logger.info(f"🔄 Mise à jour incrémentale - ajout de {days_to_update} jours manquants en {len(missing_ranges)} plage(s)")
+                    start_date = datetime.combine(missing_ranges[0][0], datetime.min.time())
                     update_mode = "incremental"
         
         # Log de la stratégie choisie
@@ -842,7 +946,10 @@ def process_page_metrics(token, page_id, page_name):
         logger.info(f"📊 Récupération des métriques du {start_date.strftime('%Y-%m-%d')} au {end_date.strftime('%Y-%m-%d')}")
         
         try:
-            raw_data = fetch_page_metrics(page_access_token, METRICS, page_id, start_date, end_date)
+            if update_mode == "complete_overwrite":
+                raw_data = fetch_page_metrics(page_access_token, METRICS, page_id, start_date, end_date)
+            else:
+                raw_data = fetch_missing_ranges(page_access_token, page_id, missing_ranges, end_date)
 
             if raw_data.empty:
                 logger.info(f"✅ Aucune nouvelle donnée à récupérer pour {page_name}")
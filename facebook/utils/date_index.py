@@ -0,0 +1,177 @@
+"""
+Index compact des dates présentes dans un Google Sheet d'export
+Stocké dans une feuille cachée du même spreadsheet (min/max + bitmap des jours)
+"""
+import base64
+import json
+import logging
+from datetime import date, datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Nom de la feuille cachée qui porte l'index
+DATE_INDEX_SHEET = "_date_index"
+
+# A1 = index JSON, B1 = nombre de lignes réel (formule), C1 = dernière valeur de la colonne A (formule)
+DATE_INDEX_RANGE = f"{DATE_INDEX_SHEET}!A1:C1"
+DATE_INDEX_FORMULAS = [
+    "=COUNTA('Metrics Data'!A:A)",
+    "=INDEX('Metrics Data'!A:A, COUNTA('Metrics Data'!A:A))",
+]
+
+
+def parse_sheet_date(value):
+    """Convertit une cellule de la colonne A en date (None si non interprétable)"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Valeur non formatée de Sheets: numéro de série (jours depuis le 30/12/1899)
+        return date(1899, 12, 30) + timedelta(days=int(value))
+
+    text = str(value).strip()
+    if not text or text.lower() == "nan":
+        return None
+
+    # Formats écrits par les collecteurs ('YYYY-MM-DD' ou 'YYYY-MM-DD HH:MM:SS')
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        pass
+
+    try:
+        import pandas as pd
+        return pd.to_datetime(text).date()
+    except Exception:
+        return None
+
+
+class DateIndex:
+    """
+    Ensemble de jours représenté par une date de début et un bitmap
+    (bit i = jour min_date + i), plus le nombre de lignes de données du sheet
+    """
+    VERSION = 1
+
+    def __init__(self, min_date=None, bitmap=None, rows=0):
+        self.min_date = min_date
+        self.bitmap = bytearray(bitmap or b"")
+        self.rows = rows
+
+    @classmethod
+    def from_dates(cls, dates, rows=0):
+        """Construit un index à partir d'un itérable de dates"""
+        days = sorted({d for d in dates if d is not None})
+        if not days:
+            return cls(rows=rows)
+
+        min_date = days[0]
+        span = (days[-1] - min_date).days + 1
+        bitmap = bytearray((span + 7) // 8)
+        for d in days:
+            offset = (d - min_date).days
+            bitmap[offset >> 3] |= 1 << (offset & 7)
+
+        return cls(min_date=min_date, bitmap=bitmap, rows=rows)
+
+    @classmethod
+    def from_json(cls, payload):
+        """Relit un index sérialisé, None si absent ou illisible"""
+        if not payload:
+            return None
+        try:
+            data = json.loads(payload)
+            if data.get("v") != cls.VERSION:
+                return None
+            min_date = date.fromisoformat(data["min"]) if data.get("min") else None
+            bitmap = base64.b64decode(data.get("bitmap", ""))
+            return cls(min_date=min_date, bitmap=bitmap, rows=int(data.get("rows", 0)))
+        except Exception as e:
+            logger.debug(f"Index de dates illisible: {e}")
+            return None
+
+    def to_json(self):
+        return json.dumps({
+            "v": self.VERSION,
+            "min": self.min_date.isoformat() if self.min_date else None,
+            "max": self.max_date.isoformat() if self.max_date else None,
+            "rows": self.rows,
+            "bitmap": base64.b64encode(bytes(self.bitmap)).decode("ascii"),
+        }, separators=(",", ":"))
+
+    @property
+    def max_date(self):
+        """Dernier jour présent dans l'index"""
+        if self.min_date is None:
+            return None
+        for byte_pos in range(len(self.bitmap) - 1, -1, -1):
+            byte = self.bitmap[byte_pos]
+            if byte:
+                return self.min_date + timedelta(days=byte_pos * 8 + byte.bit_length() - 1)
+        return None
+
+    def __contains__(self, day):
+        if self.min_date is None or day is None:
+            return False
+        offset = (day - self.min_date).days
+        if offset < 0 or offset >= len(self.bitmap) * 8:
+            return False
+        return bool(self.bitmap[offset >> 3] & (1 << (offset & 7)))
+
+    def __len__(self):
+        return sum(bin(byte).count("1") for byte in self.bitmap)
+
+    def __bool__(self):
+        return self.min_date is not None and any(self.bitmap)
+
+    def dates(self):
+        """Itère sur les jours présents, dans l'ordre chronologique"""
+        if self.min_date is None:
+            return
+        for byte_pos, byte in enumerate(self.bitmap):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield self.min_date + timedelta(days=byte_pos * 8 + bit)
+
+    def add_dates(self, dates, rows_added=0):
+        """Ajoute des jours à l'index (étend le bitmap si nécessaire)"""
+        new_days = [d for d in dates if d is not None]
+        self.rows += rows_added
+        if not new_days:
+            return
+
+        if self.min_date is not None and min(new_days) >= self.min_date:
+            # Cas courant (append chronologique): on étend le bitmap vers la droite
+            span = (max(new_days) - self.min_date).days + 1
+            needed = (span + 7) // 8
+            if needed > len(self.bitmap):
+                self.bitmap.extend(b"\x00" * (needed - len(self.bitmap)))
+            for d in new_days:
+                offset = (d - self.min_date).days
+                self.bitmap[offset >> 3] |= 1 << (offset & 7)
+            return
+
+        rebuilt = DateIndex.from_dates(list(self.dates()) + new_days, rows=self.rows)
+        self.min_date, self.bitmap = rebuilt.min_date, rebuilt.bitmap
+
+    def missing_ranges(self, start, end):
+        """Retourne les plages [début, fin] de jours absents entre start et end inclus"""
+        ranges = []
+        range_start = None
+        day = start
+        while day <= end:
+            if day in self:
+                if range_start is not None:
+                    ranges.append((range_start, day - timedelta(days=1)))
+                    range_start = None
+            elif range_start is None:
+                range_start = day
+            day += timedelta(days=1)
+        if range_start is not None:
+            ranges.append((range_start, end))
+        return ranges
@@ -3,8 +3,8 @@
 # Gère tous les scénarios : authentification, rate limits, erreurs API, tokens expirés
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request
-from fastapi.responses import JSONResponse
-from typing import Optional, List, Dict, Any, Union
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional, List, Dict, Any, Union, AsyncIterator, Tuple
 from datetime import datetime, timedelta, date
 from pydantic import BaseModel, Field, validator
 import logging
@@ -20,20 +20,17 @@ from functools import wraps
 
 # Imports locaux
 from ..auth.user_manager import user_manager
+from ..auth.token_cache import TokenCache
+from ..collectors.breakdown_store import breakdown_snapshots
 from ..database.connection import db_manager
 from ..database.models import User, FacebookAccount, LinkedinAccount, SocialAccessToken
 from ..utils.config import Config
-from ..utils.metrics import MetricsManager
-
-
-# Ajouter en haut du fichier
-from functools import lru_cache
-import hashlib
-
-# Cache simple pour les métriques (24h)
-@lru_cache(maxsize=1000)
-def cache_key(account_id: str, date_str: str, metrics_type: str) -> str:
-    return hashlib.md5(f"{account_id}_{date_str}_{metrics_type}".encode()).hexdigest()
+from ..utils.metrics import get_registry
+from ..utils.response_cache import looker_response_cache, stamp_served
+from ..utils.field_projection import FieldProjection
+from ..utils.platform_client import platform_runtime, PlatformAPIError
+from ..utils.rate_limiter import rate_limit
+from ..payments.entitlements import entitlement_store
 
 # Configuration logging
 logging.basicConfig(level=logging.INFO)
@@ -41,6 +38,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1", tags=["Looker Studio"])
 
+# Tokens par compte (expires_at stocké en heure locale, cf. refresh_linkedin_token)
+token_cache = TokenCache(now_func=datetime.now)
+
 # ========================================
 # ENUMS ET CONSTANTES
 # ========================================
@@ -57,6 +57,16 @@ class MetricsType(str, Enum):
     FOLLOWERS_BREAKDOWN = "followers_breakdown"
     VIDEO_DETAILED = "video_detailed"
 
+class StreamFormat(str, Enum):
+    NDJSON = "ndjson"
+    JSON = "json"
+
+# Colonnes descriptives des posts (demandées seules, elles ne nécessitent que la liste des posts)
+POST_DIMENSION_COLUMNS = ('post_id', 'post_type', 'post_creation_date', 'post_text')
+
+# Segmentations des followers LinkedIn relues depuis les snapshots (include_breakdown)
+FOLLOWER_BREAKDOWN_TYPES = ('company_size', 'function', 'industry', 'seniority', 'country')
+
 class APIStatus(str, Enum):
     SUCCESS = "success"
     ERROR = "error"
@@ -85,6 +95,8 @@ class LookerDataRequest(BaseModel):
     include_facebook_reactions: bool = Field(default=False)
     include_video_metrics: bool = Field(default=False)
     include_breakdown: bool = Field(default=False)
+    stream: bool = Field(default=False, description="Diffuser les lignes au fil de l'eau au lieu d'un seul corps JSON")
+    stream_format: StreamFormat = Field(default=StreamFormat.NDJSON, description="Format du streaming: ndjson ou json (tableau)")
     
     @validator('start_date', 'end_date')
     def validate_dates(cls, v):
@@ -132,38 +144,6 @@ class TokenInfo:
 # DÉCORATEURS ET UTILITAIRES
 # ========================================
 
-def rate_limit(calls_per_minute: int = 60):
-    """Décorateur pour gérer le rate limiting"""
-    
-    def decorator(func):
-        last_calls = {}
-        
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            now = time.time()
-            minute_ago = now - 60
-            
-            # Nettoyer les anciens appels
-            key = f"{func.__name__}"
-            if key not in last_calls:
-                last_calls[key] = []
-            
-            last_calls[key] = [call_time for call_time in last_calls[key] if call_time > minute_ago]
-            
-            # Vérifier la limite
-            if len(last_calls[key]) >= calls_per_minute:
-                raise HTTPException(
-                    status_code=429,
-                    detail=f"Rate limit dépassé: {calls_per_minute} appels/minute maximum"
-                )
-            
-            # Enregistrer l'appel
-            last_calls[key].append(now)
-            
-            return await func(*args, **kwargs)
-        return wrapper
-    return decorator
-
 async def handle_api_errors(func, *args, **kwargs):
     """Gestionnaire d'erreurs API centralisé"""
     
@@ -172,6 +152,17 @@ async def handle_api_errors(func, *args, **kwargs):
     except httpx.TimeoutException:
         logger.error(f"Timeout API pour {func.__name__}")
         raise HTTPException(status_code=504, detail="Timeout de l'API externe")
+    except PlatformAPIError as e:
+        logger.error(f"Erreur {e} pour {func.__name__}")
+        
+        if e.is_rate_limited:
+            raise HTTPException(status_code=429, detail="Rate limit API atteint")
+        elif e.is_auth_error:
+            raise HTTPException(status_code=401, detail="Token d'accès invalide ou expiré")
+        elif e.status_code == 403:
+            raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+        else:
+            raise HTTPException(status_code=502, detail="Erreur de l'API externe")
     except httpx.HTTPStatusError as e:
         logger.error(f"Erreur HTTP {e.response.status_code} pour {func.__name__}: {e.response.text}")
         
@@ -192,42 +183,51 @@ async def handle_api_errors(func, *args, **kwargs):
 # ========================================
 
 class TokenManager:
-    """Gestionnaire centralisé des tokens d'accès"""
+    """Gestionnaire centralisé des tokens d'accès (cache local, la base reste la référence)"""
+    
+    @staticmethod
+    def _load_token(platform: str, account_id: str) -> Optional[TokenInfo]:
+        """Lire le token actif d'un compte en base"""
+        
+        with db_manager.get_session() as session:
+            token_record = session.query(SocialAccessToken).filter(
+                SocialAccessToken.platform == platform,
+                SocialAccessToken.account_id == account_id,
+                SocialAccessToken.is_active == True
+            ).first()
+            
+            if token_record:
+                return TokenInfo(
+                    access_token=token_record.access_token,
+                    expires_at=token_record.expires_at,
+                    refresh_token=token_record.refresh_token if platform == "linkedin" else None,
+                    platform=platform,
+                    account_id=account_id
+                )
+        
+        if platform == "linkedin":
+            # Fallback sur token global
+            return TokenInfo(
+                access_token=Config.COMMUNITY_ACCESS_TOKEN,
+                platform="linkedin",
+                account_id=account_id
+            )
+        
+        return None
     
     @staticmethod
     async def get_linkedin_token(account_id: str) -> Optional[TokenInfo]:
         """Récupérer le token LinkedIn pour un compte"""
         
         try:
-            with db_manager.get_session() as session:
-                # Chercher dans SocialAccessToken
-                token_record = session.query(SocialAccessToken).filter(
-                    SocialAccessToken.platform == "linkedin",
-                    SocialAccessToken.account_id == account_id,
-                    SocialAccessToken.is_active == True
-                ).first()
-                
-                if token_record:
-                    token_info = TokenInfo(
-                        access_token=token_record.access_token,
-                        expires_at=token_record.expires_at,
-                        refresh_token=token_record.refresh_token,
-                        platform="linkedin",
-                        account_id=account_id
-                    )
-                    
-                    # Vérifier si expiré et rafraîchir si possible
-                    if token_info.is_expired and token_info.refresh_token:
-                        return await TokenManager.refresh_linkedin_token(token_info)
-                    
-                    return token_info
-                
-                # Fallback sur token global
-                return TokenInfo(
-                    access_token=Config.COMMUNITY_ACCESS_TOKEN,
-                    platform="linkedin",
-                    account_id=account_id
+            # Rafraîchi avant expiration, un seul rafraîchissement pour les appels concurrents
+            return await token_cache.aget(
+                (None, "linkedin", account_id),
+                loader=lambda: TokenManager._load_token("linkedin", account_id),
+                refresher=lambda token_info: (
+                    TokenManager.refresh_linkedin_token(token_info) if token_info.refresh_token else None
                 )
+            )
                 
         except Exception as e:
             logger.error(f"Erreur récupération token LinkedIn: {e}")
@@ -238,20 +238,10 @@ class TokenManager:
         """Récupérer le token Facebook pour une page"""
         
         try:
-            with db_manager.get_session() as session:
-                token_record = session.query(SocialAccessToken).filter(
-                    SocialAccessToken.platform == "facebook",
-                    SocialAccessToken.account_id == page_id,
-                    SocialAccessToken.is_active == True
-                ).first()
-                
-                if token_record:
-                    return TokenInfo(
-                        access_token=token_record.access_token,
-                        expires_at=token_record.expires_at,
-                        platform="facebook",
-                        account_id=page_id
-                    )
+            return await token_cache.aget(
+                (None, "facebook", page_id),
+                loader=lambda: TokenManager._load_token("facebook", page_id)
+            )
                     
         except Exception as e:
             logger.error(f"Erreur récupération token Facebook: {e}")
@@ -315,6 +305,7 @@ class LinkedInAPIClient:
     def __init__(self):
         self.base_url = "https://api.linkedin.com/rest"
         self.timeout = 30
+        self.client = platform_runtime.linkedin  # pool, retries et quotas partagés avec les collecteurs
         
     async def get_page_metrics(self, account_id: str, date_obj: date, metrics: List[str]) -> Dict[str, int]:
         """Récupérer les métriques de page LinkedIn"""
@@ -325,68 +316,68 @@ class LinkedInAPIClient:
         
         result = {}
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            
-            # Page Statistics
-            if any(m in metrics for m in ['total_page_views', 'unique_page_views', 'desktop_page_views', 'mobile_page_views']):
-                try:
-                    response = await client.get(
-                        f"{self.base_url}/organizationPageStatistics",
-                        headers={
-                            'Authorization': f'Bearer {token_info.access_token}',
-                            'X-Restli-Protocol-Version': '2.0.0',
-                            'LinkedIn-Version': '202305'
-                        },
-                        params={
-                            'q': 'organization',
-                            'organization': f'urn:li:organization:{account_id}',
-                            'timeIntervals.timeGranularityType': 'DAY',
-                            'timeIntervals.timeRange.start': int(date_obj.timestamp() * 1000),
-                            'timeIntervals.timeRange.end': int((date_obj + timedelta(days=1)).timestamp() * 1000)
-                        }
-                    )
+        # Page Statistics
+        if any(m in metrics for m in ['total_page_views', 'unique_page_views', 'desktop_page_views', 'mobile_page_views']):
+            try:
+                response = await self.client.get(
+                    f"{self.base_url}/organizationPageStatistics",
+                    headers={
+                        'Authorization': f'Bearer {token_info.access_token}',
+                        'X-Restli-Protocol-Version': '2.0.0',
+                        'LinkedIn-Version': '202305'
+                    },
+                    params={
+                        'q': 'organization',
+                        'organization': f'urn:li:organization:{account_id}',
+                        'timeIntervals.timeGranularityType': 'DAY',
+                        'timeIntervals.timeRange.start': int(date_obj.timestamp() * 1000),
+                        'timeIntervals.timeRange.end': int((date_obj + timedelta(days=1)).timestamp() * 1000)
+                    },
+                    timeout=self.timeout
+                )
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        elements = data.get('elements', [])
-                        if elements:
-                            stats = elements[0].get('totalPageStatistics', {})
+                if response.status_code == 200:
+                    data = response.json()
+                    elements = data.get('elements', [])
+                    if elements:
+                        stats = elements[0].get('totalPageStatistics', {})
                             
-                            # Mapper les métriques
-                            if 'total_page_views' in metrics:
-                                result['total_page_views'] = self._get_nested_value(stats, 'views.allPageViews.pageViews', 0)
-                            if 'unique_page_views' in metrics:
-                                result['unique_page_views'] = self._get_nested_value(stats, 'views.allPageViews.uniquePageViews', 0)
-                            if 'desktop_page_views' in metrics:
-                                result['desktop_page_views'] = self._get_nested_value(stats, 'views.desktopPageViews.pageViews', 0)
-                            if 'mobile_page_views' in metrics:
-                                result['mobile_page_views'] = self._get_nested_value(stats, 'views.mobilePageViews.pageViews', 0)
+                        # Mapper les métriques
+                        if 'total_page_views' in metrics:
+                            result['total_page_views'] = self._get_nested_value(stats, 'views.allPageViews.pageViews', 0)
+                        if 'unique_page_views' in metrics:
+                            result['unique_page_views'] = self._get_nested_value(stats, 'views.allPageViews.uniquePageViews', 0)
+                        if 'desktop_page_views' in metrics:
+                            result['desktop_page_views'] = self._get_nested_value(stats, 'views.desktopPageViews.pageViews', 0)
+                        if 'mobile_page_views' in metrics:
+                            result['mobile_page_views'] = self._get_nested_value(stats, 'views.mobilePageViews.pageViews', 0)
                     
-                except Exception as e:
-                    logger.error(f"Erreur page statistics LinkedIn: {e}")
+            except Exception as e:
+                logger.error(f"Erreur page statistics LinkedIn: {e}")
             
-            # Follower Statistics
-            if any(m in metrics for m in ['total_followers', 'followers_by_country', 'followers_by_industry']):
-                try:
-                    response = await client.get(
-                        f"{self.base_url}/networkSizes",
-                        headers={
-                            'Authorization': f'Bearer {token_info.access_token}',
-                            'X-Restli-Protocol-Version': '2.0.0'
-                        },
-                        params={
-                            'q': 'viewerConnection',
-                            'edgeType': 'COMPANY_FOLLOWED_BY_MEMBER'
-                        }
-                    )
+        # Follower Statistics
+        if any(m in metrics for m in ['total_followers', 'followers_by_country', 'followers_by_industry']):
+            try:
+                response = await self.client.get(
+                    f"{self.base_url}/networkSizes",
+                    headers={
+                        'Authorization': f'Bearer {token_info.access_token}',
+                        'X-Restli-Protocol-Version': '2.0.0'
+                    },
+                    params={
+                        'q': 'viewerConnection',
+                        'edgeType': 'COMPANY_FOLLOWED_BY_MEMBER'
+                    },
+                    timeout=self.timeout
+                )
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        if 'total_followers' in metrics:
-                            result['total_followers'] = data.get('firstDegreeSize', 0)
+                if response.status_code == 200:
+                    data = response.json()
+                    if 'total_followers' in metrics:
+                        result['total_followers'] = data.get('firstDegreeSize', 0)
                     
-                except Exception as e:
-                    logger.error(f"Erreur follower statistics LinkedIn: {e}")
+            except Exception as e:
+                logger.error(f"Erreur follower statistics LinkedIn: {e}")
         
         # Remplir les métriques manquantes avec 0
         for metric in metrics:
@@ -403,41 +394,41 @@ class LinkedInAPIClient:
             return []
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/posts",
-                    headers={
-                        'Authorization': f'Bearer {token_info.access_token}',
-                        'X-Restli-Protocol-Version': '2.0.0',
-                        'LinkedIn-Version': '202305'
-                    },
-                    params={
-                        'q': 'author',
-                        'author': f'urn:li:organization:{account_id}',
-                        'count': 50,
-                        'sortBy': 'LAST_MODIFIED'
-                    }
-                )
+            response = await self.client.get(
+                f"{self.base_url}/posts",
+                headers={
+                    'Authorization': f'Bearer {token_info.access_token}',
+                    'X-Restli-Protocol-Version': '2.0.0',
+                    'LinkedIn-Version': '202305'
+                },
+                params={
+                    'q': 'author',
+                    'author': f'urn:li:organization:{account_id}',
+                    'count': 50,
+                    'sortBy': 'LAST_MODIFIED'
+                },
+                timeout=self.timeout
+            )
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    posts = []
+            if response.status_code == 200:
+                data = response.json()
+                posts = []
                     
-                    for element in data.get('elements', []):
-                        created_time = element.get('createdAt', 0)
-                        if created_time:
-                            post_date = datetime.fromtimestamp(created_time / 1000).date()
-                            if start_date <= post_date <= end_date:
-                                posts.append({
-                                    'id': element.get('id'),
-                                    'type': element.get('contentType', 'UNKNOWN'),
-                                    'date': post_date,
-                                    'created_at': created_time,
-                                    'text': self._extract_post_text(element),
-                                    'author': element.get('author')
-                                })
+                for element in data.get('elements', []):
+                    created_time = element.get('createdAt', 0)
+                    if created_time:
+                        post_date = datetime.fromtimestamp(created_time / 1000).date()
+                        if start_date <= post_date <= end_date:
+                            posts.append({
+                                'id': element.get('id'),
+                                'type': element.get('contentType', 'UNKNOWN'),
+                                'date': post_date,
+                                'created_at': created_time,
+                                'text': self._extract_post_text(element),
+                                'author': element.get('author')
+                            })
                     
-                    return posts
+                return posts
                     
         except Exception as e:
             logger.error(f"Erreur récupération posts LinkedIn: {e}")
@@ -457,34 +448,34 @@ class LinkedInAPIClient:
         result = {}
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/socialActions/{post_id}",
-                    headers={
-                        'Authorization': f'Bearer {token_info.access_token}',
-                        'X-Restli-Protocol-Version': '2.0.0'
-                    }
-                )
+            response = await self.client.get(
+                f"{self.base_url}/socialActions/{post_id}",
+                headers={
+                    'Authorization': f'Bearer {token_info.access_token}',
+                    'X-Restli-Protocol-Version': '2.0.0'
+                },
+                timeout=self.timeout
+            )
                 
-                if response.status_code == 200:
-                    data = response.json()
+            if response.status_code == 200:
+                data = response.json()
                     
-                    # Mapper les métriques disponibles
-                    metric_mapping = {
-                        'post_impressions': 'impressionCount',
-                        'post_clicks': 'clickCount',
-                        'post_shares': 'shareCount',
-                        'post_comments': 'commentCount',
-                        'reactions_like': 'likeCount',
-                        'total_reactions': 'reactionCount'
-                    }
+                # Mapper les métriques disponibles
+                metric_mapping = {
+                    'post_impressions': 'impressionCount',
+                    'post_clicks': 'clickCount',
+                    'post_shares': 'shareCount',
+                    'post_comments': 'commentCount',
+                    'reactions_like': 'likeCount',
+                    'total_reactions': 'reactionCount'
+                }
                     
-                    for metric in metrics:
-                        api_field = metric_mapping.get(metric)
-                        if api_field:
-                            result[metric] = data.get(api_field, 0)
-                        else:
-                            result[metric] = 0
+                for metric in metrics:
+                    api_field = metric_mapping.get(metric)
+                    if api_field:
+                        result[metric] = data.get(api_field, 0)
+                    else:
+                        result[metric] = 0
                             
         except Exception as e:
             logger.error(f"Erreur métriques post LinkedIn {post_id}: {e}")
@@ -518,6 +509,7 @@ class FacebookAPIClient:
     def __init__(self):
         self.base_url = "https://graph.facebook.com/v21.0"
         self.timeout = 30
+        self.client = platform_runtime.facebook  # pool, retries et quotas partagés avec les collecteurs
         
     async def get_page_metrics(self, page_id: str, date_obj: date, metrics: List[str]) -> Dict[str, int]:
         """Récupérer les métriques de page Facebook"""
@@ -550,32 +542,32 @@ class FacebookAPIClient:
             return {metric: 0 for metric in metrics}
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/{page_id}/insights",
-                    params={
-                        'metric': ','.join(fb_metrics_to_fetch),
-                        'period': 'day',
-                        'since': date_obj.strftime('%Y-%m-%d'),
-                        'until': (date_obj + timedelta(days=1)).strftime('%Y-%m-%d'),
-                        'access_token': token_info.access_token
-                    }
-                )
+            response = await self.client.get(
+                f"{self.base_url}/{page_id}/insights",
+                params={
+                    'metric': ','.join(fb_metrics_to_fetch),
+                    'period': 'day',
+                    'since': date_obj.strftime('%Y-%m-%d'),
+                    'until': (date_obj + timedelta(days=1)).strftime('%Y-%m-%d'),
+                    'access_token': token_info.access_token
+                },
+                timeout=self.timeout
+            )
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    insights_data = data.get('data', [])
+            if response.status_code == 200:
+                data = response.json()
+                insights_data = data.get('data', [])
                     
-                    # Parser les résultats
-                    for insight in insights_data:
-                        metric_name = insight.get('name')
-                        values = insight.get('values', [])
+                # Parser les résultats
+                for insight in insights_data:
+                    metric_name = insight.get('name')
+                    values = insight.get('values', [])
                         
-                        if values and metric_name:
-                            # Trouver la métrique correspondante
-                            for original_metric, fb_metric in facebook_metrics.items():
-                                if fb_metric == metric_name and original_metric in metrics:
-                                    result[original_metric] = values[0].get('value', 0)
+                    if values and metric_name:
+                        # Trouver la métrique correspondante
+                        for original_metric, fb_metric in facebook_metrics.items():
+                            if fb_metric == metric_name and original_metric in metrics:
+                                result[original_metric] = values[0].get('value', 0)
                                     
         except Exception as e:
             logger.error(f"Erreur métriques page Facebook: {e}")
@@ -595,38 +587,36 @@ class FacebookAPIClient:
             return []
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/{page_id}/posts",
-                    params={
-                        'fields': 'id,message,created_time,type,story,permalink_url,attachments',
-                        'since': start_date.strftime('%Y-%m-%d'),
-                        'until': end_date.strftime('%Y-%m-%d'),
-                        'limit': 100,
-                        'access_token': token_info.access_token
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    posts = []
-                    
-                    for post in data.get('data', []):
-                        created_time = post.get('created_time')
-                        if created_time:
-                            post_date = datetime.fromisoformat(created_time.replace('Z', '+00:00')).date()
-                            
-                            posts.append({
-                                'id': post.get('id'),
-                                'type': post.get('type', 'status'),
-                                'date': post_date,
-                                'message': post.get('message', ''),
-                                'story': post.get('story', ''),
-                                'permalink_url': post.get('permalink_url')
-                            })
-                    
-                    return posts
-                    
+            posts = []
+            
+            # Toutes les pages de la période (curseur paging.next suivi par la couche client)
+            async for page in self.client.pages(
+                f"{self.base_url}/{page_id}/posts",
+                params={
+                    'fields': 'id,message,created_time,type,story,permalink_url,attachments',
+                    'since': start_date.strftime('%Y-%m-%d'),
+                    'until': end_date.strftime('%Y-%m-%d'),
+                    'access_token': token_info.access_token
+                },
+                page_size=100,
+                timeout=self.timeout
+            ):
+                for post in page:
+                    created_time = post.get('created_time')
+                    if created_time:
+                        post_date = datetime.fromisoformat(created_time.replace('Z', '+00:00')).date()
+                        
+                        posts.append({
+                            'id': post.get('id'),
+                            'type': post.get('type', 'status'),
+                            'date': post_date,
+                            'message': post.get('message', ''),
+                            'story': post.get('story', ''),
+                            'permalink_url': post.get('permalink_url')
+                        })
+            
+            return posts
+            
         except Exception as e:
             logger.error(f"Erreur récupération posts Facebook: {e}")
             
@@ -653,31 +643,31 @@ class FacebookAPIClient:
         result = {}
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # Récupérer les métriques disponibles
-                fb_metrics = [facebook_post_metrics[m] for m in metrics if m in facebook_post_metrics]
+            # Récupérer les métriques disponibles
+            fb_metrics = [facebook_post_metrics[m] for m in metrics if m in facebook_post_metrics]
                 
-                if fb_metrics:
-                    response = await client.get(
-                        f"{self.base_url}/{post_id}/insights",
-                        params={
-                            'metric': ','.join(fb_metrics),
-                            'access_token': token_info.access_token
-                        }
-                    )
+            if fb_metrics:
+                response = await self.client.get(
+                    f"{self.base_url}/{post_id}/insights",
+                    params={
+                        'metric': ','.join(fb_metrics),
+                        'access_token': token_info.access_token
+                    },
+                    timeout=self.timeout
+                )
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        insights_data = data.get('data', [])
+                if response.status_code == 200:
+                    data = response.json()
+                    insights_data = data.get('data', [])
                         
-                        for insight in insights_data:
-                            metric_name = insight.get('name')
-                            values = insight.get('values', [])
+                    for insight in insights_data:
+                        metric_name = insight.get('name')
+                        values = insight.get('values', [])
                             
-                            if values and metric_name:
-                                for original_metric, fb_metric in facebook_post_metrics.items():
-                                    if fb_metric == metric_name and original_metric in metrics:
-                                        result[original_metric] = values[0].get('value', 0)
+                        if values and metric_name:
+                            for original_metric, fb_metric in facebook_post_metrics.items():
+                                if fb_metric == metric_name and original_metric in metrics:
+                                    result[original_metric] = values[0].get('value', 0)
                         
         except Exception as e:
             logger.error(f"Erreur métriques post Facebook {post_id}: {e}")
@@ -693,8 +683,7 @@ class FacebookAPIClient:
 # ENDPOINTS PRINCIPAUX
 # ========================================
 
-@router.post("/check-user-looker")
-@rate_limit(calls_per_minute=100)
+@router.post("/check-user-looker", dependencies=[Depends(rate_limit(100, scope="check_user_looker"))])
 async def check_user_looker(request: Request):
     """Vérification robuste de l'accès utilisateur au connecteur Looker"""
     
@@ -731,104 +720,91 @@ async def check_user_looker(request: Request):
                 }
             )
         
-        # Récupération utilisateur avec vérifications complètes
-        with db_manager.get_session() as session:
-            user = session.query(User).filter(User.email == looker_request.email).first()
-            
-            if not user:
-                redirect_url = f"{Config.BASE_URL}/connect?source=looker&email={looker_request.email}&connector={looker_request.connector_id}"
-                return JSONResponse(
-                    status_code=404,
-                    content={
-                        "valid": False,
-                        "error": "USER_NOT_FOUND",
-                        "message": "Utilisateur non trouvé",
-                        "action": "signup",
-                        "redirect_url": redirect_url
-                    }
-                )
-            
-            if not user.is_active:
-                return JSONResponse(
-                    status_code=403,
-                    content={
-                        "valid": False,
-                        "error": "ACCOUNT_DISABLED",
-                        "message": "Compte désactivé",
-                        "action": "contact_support"
-                    }
-                )
-            
-            # Vérification du plan
-            if user.plan_type != user_plan_info['price_id']:
-                redirect_url = f"{Config.BASE_URL}/connect/plans?source=looker&email={looker_request.email}&connector={looker_request.connector_id}"
-                return JSONResponse(
-                    status_code=403,
-                    content={
-                        "valid": False,
-                        "error": "PLAN_INCOMPATIBLE",
-                        "message": f"Plan incompatible. Requis: {user_plan_info['name']}",
-                        "current_plan": user.plan_type,
-                        "required_plan": user_plan_info['name'],
-                        "action": "upgrade",
-                        "redirect_url": redirect_url
-                    }
-                )
-            
-            # Vérification expiration abonnement
-            if user.subscription_end_date and user.subscription_end_date < datetime.now().date():
-                redirect_url = f"{Config.BASE_URL}/connect/plans?source=looker&email={looker_request.email}&action=renew"
-                return JSONResponse(
-                    status_code=403,
-                    content={
-                        "valid": False,
-                        "error": "SUBSCRIPTION_EXPIRED",
-                        "message": "Abonnement expiré",
-                        "expired_date": user.subscription_end_date.isoformat(),
-                        "action": "renew",
-                        "redirect_url": redirect_url
-                    }
-                )
-            
-            # Vérification des comptes connectés
-            platforms_missing = []
-            for platform in user_plan_info['platforms']:
-                if platform == 'linkedin':
-                    linkedin_count = session.query(LinkedinAccount).filter(
-                        LinkedinAccount.user_id == user.id,
-                        LinkedinAccount.is_active == True
-                    ).count()
-                    if linkedin_count == 0:
-                        platforms_missing.append('linkedin')
-                        
-                elif platform == 'facebook':
-                    facebook_count = session.query(FacebookAccount).filter(
-                        FacebookAccount.user_id == user.id,
-                        FacebookAccount.is_active == True
-                    ).count()
-                    if facebook_count == 0:
-                        platforms_missing.append('facebook')
-            
-            warnings = []
-            if platforms_missing:
-                warnings.append(f"Plateformes non connectées: {', '.join(platforms_missing)}")
-            
-            # Succès
+        # Droits de l'utilisateur (cache mémoire, tenu à jour par les webhooks Stripe)
+        entitlement = entitlement_store.get_by_email(looker_request.email)
+        
+        if not entitlement:
+            redirect_url = f"{Config.BASE_URL}/connect?source=looker&email={looker_request.email}&connector={looker_request.connector_id}"
             return JSONResponse(
-                status_code=200,
+                status_code=404,
                 content={
-                    "valid": True,
-                    "user": {
-                        "id": user.id,
-                        "email": user.email,
-                        "plan_type": user.plan_type,
-                        "plan_name": user_plan_info['name'],
-                        "platforms_accessible": user_plan_info['platforms'],
-                        "subscription_end": user.subscription_end_date.isoformat() if user.subscription_end_date else None
-                    },
-                    "warnings": warnings
+                    "valid": False,
+                    "error": "USER_NOT_FOUND",
+                    "message": "Utilisateur non trouvé",
+                    "action": "signup",
+                    "redirect_url": redirect_url
+                }
+            )
+        
+        if not entitlement.is_active:
+            return JSONResponse(
+                status_code=403,
+                content={
+                    "valid": False,
+                    "error": "ACCOUNT_DISABLED",
+                    "message": "Compte désactivé",
+                    "action": "contact_support"
+                }
+            )
+        
+        # Vérification du plan
+        if entitlement.plan_type != user_plan_info['price_id']:
+            redirect_url = f"{Config.BASE_URL}/connect/plans?source=looker&email={looker_request.email}&connector={looker_request.connector_id}"
+            return JSONResponse(
+                status_code=403,
+                content={
+                    "valid": False,
+                    "error": "PLAN_INCOMPATIBLE",
+                    "message": f"Plan incompatible. Requis: {user_plan_info['name']}",
+                    "current_plan": entitlement.plan_type,
+                    "required_plan": user_plan_info['name'],
+                    "action": "upgrade",
+                    "redirect_url": redirect_url
                 }
             )
+        
+        # Vérification expiration abonnement
+        if not entitlement.is_valid:
+            redirect_url = f"{Config.BASE_URL}/connect/plans?source=looker&email={looker_request.email}&action=renew"
+            return JSONResponse(
+                status_code=403,
+                content={
+                    "valid": False,
+                    "error": "SUBSCRIPTION_EXPIRED",
+                    "message": "Abonnement expiré",
+                    "expired_date": entitlement.current_period_end.isoformat() if entitlement.current_period_end else None,
+                    "subscription_status": entitlement.status,
+                    "action": "renew",
+                    "redirect_url": redirect_url
+                }
+            )
+        
+        # Vérification des comptes connectés (compteurs des droits, sans requête)
+        platforms_missing = [
+            platform for platform in user_plan_info['platforms']
+            if platform in ('linkedin', 'facebook') and entitlement.account_count(platform) == 0
+        ]
+        
+        warnings = []
+        if platforms_missing:
+            warnings.append(f"Plateformes non connectées: {', '.join(platforms_missing)}")
+        
+        # Succès
+        return JSONResponse(
+            status_code=200,
+            content={
+                "valid": True,
+                "user": {
+                    "id": entitlement.user_id,
+                    "email": entitlement.email,
+                    "plan_type": entitlement.plan_type,
+                    "plan_name": user_plan_info['name'],
+                    "platforms_accessible": user_plan_info['platforms'],
+                    "subscription_end": entitlement.current_period_end.isoformat() if entitlement.current_period_end else None
+                },
+                "warnings": warnings
+            }
+        )
             
     except Exception as e:
         logger.error(f"Erreur check_user_looker: {e}")
@@ -841,8 +817,7 @@ async def check_user_looker(request: Request):
             }
         )
 
-@router.post("/combined/metrics")
-@rate_limit(calls_per_minute=30)
+@router.post("/combined/metrics", dependencies=[Depends(rate_limit(30, scope="combined_metrics"))])
 async def get_combined_metrics(request: Request):
     """Endpoint principal pour récupérer les métriques combinées avec gestion complète des erreurs"""
     
@@ -907,111 +882,150 @@ async def get_combined_metrics(request: Request):
                 content={"success": False, "error": "DATE_RANGE_TOO_LARGE", "message": "La plage de dates ne peut pas dépasser 365 jours"}
             )
         
-        # Initialisation des clients API
-        linkedin_client = LinkedInAPIClient()
-        facebook_client = FacebookAPIClient()
+        # Colonnes demandées par le rapport (toutes si `fields` est absent)
+        projection = FieldProjection.from_request(data.get("fields"))
+        
+        # Mode streaming: pas de cache, les lignes partent dès qu'un compte/jour est prêt
+        if looker_request.stream:
+            media_type = "application/x-ndjson" if looker_request.stream_format == StreamFormat.NDJSON else "application/json"
+            return StreamingResponse(
+                stream_combined_metrics(
+                    user, user_email, looker_request, start_date, end_date,
+                    looker_request.stream_format.value, projection
+                ),
+                media_type=media_type
+            )
         
-        # Préparer la réponse
-        result_data = {
-            "success": True,
-            "data": {},
-            "generated_at": datetime.now().isoformat(),
-            "user_email": user_email,
-            "date_range": {
-                "start": start_date.isoformat(),
-                "end": end_date.isoformat(),
-                "days": (end_date - start_date).days + 1
-            },
-            "request_params": {
-                "platforms": [p.value for p in looker_request.platforms],
-                "metrics_type": looker_request.metrics_type.value,
-                "include_reactions": looker_request.include_linkedin_reactions or looker_request.include_facebook_reactions,
-                "include_video": looker_request.include_video_metrics,
-                "include_breakdown": looker_request.include_breakdown
-            },
-            "errors": [],
-            "warnings": []
-        }
+        # Comptes concernés par la requête (clé et invalidation du cache)
+        account_tags = await looker_response_cache.account_tags(
+            user.id, tuple(sorted(p.value for p in looker_request.platforms)),
+            lambda: get_user_account_tags(user, looker_request.platforms)
+        )
+        response_cache_key = looker_response_cache.make_key(
+            "combined/metrics", user.id, account_tags, start_date, end_date,
+            fields=projection.cache_key(), aggregation=data.get("aggregation"),
+            params=looker_request.dict()
+        )
+        
+        async def compute_response():
+            # Initialisation des clients API
+            linkedin_client = LinkedInAPIClient()
+            facebook_client = FacebookAPIClient()
+        
+            # Préparer la réponse
+            result_data = {
+                "success": True,
+                "data": {},
+                "generated_at": datetime.now().isoformat(),
+                "user_email": user_email,
+                "date_range": {
+                    "start": start_date.isoformat(),
+                    "end": end_date.isoformat(),
+                    "days": (end_date - start_date).days + 1
+                },
+                "request_params": {
+                    "platforms": [p.value for p in looker_request.platforms],
+                    "metrics_type": looker_request.metrics_type.value,
+                    "include_reactions": looker_request.include_linkedin_reactions or looker_request.include_facebook_reactions,
+                    "include_video": looker_request.include_video_metrics,
+                    "include_breakdown": looker_request.include_breakdown,
+                    "fields": projection.cache_key()
+                },
+                "errors": [],
+                "warnings": []
+            }
         
-        total_records = 0
+            total_records = 0
         
-        # Récupération données LinkedIn
-        if PlatformType.LINKEDIN in looker_request.platforms or PlatformType.BOTH in looker_request.platforms:
-            logger.info(f"Récupération données LinkedIn pour {user_email}")
+            # Récupération données LinkedIn
+            if PlatformType.LINKEDIN in looker_request.platforms or PlatformType.BOTH in looker_request.platforms:
+                logger.info(f"Récupération données LinkedIn pour {user_email}")
             
-            try:
-                linkedin_data = await get_real_linkedin_data(
-                    user, linkedin_client, start_date, end_date, 
-                    looker_request.metrics_type.value, looker_request.include_linkedin_reactions
-                )
-                result_data["data"]["linkedin_data"] = linkedin_data
+                try:
+                    linkedin_data = await get_real_linkedin_data(
+                        user, linkedin_client, start_date, end_date, 
+                        looker_request.metrics_type.value, looker_request.include_linkedin_reactions,
+                        projection, looker_request.include_breakdown
+                    )
+                    result_data["data"]["linkedin_data"] = linkedin_data
                 
-                # Compter les enregistrements
-                for category in linkedin_data.values():
-                    if isinstance(category, list):
-                        total_records += len(category)
+                    # Compter les enregistrements
+                    for category in linkedin_data.values():
+                        if isinstance(category, list):
+                            total_records += len(category)
                         
-            except Exception as e:
-                error_msg = f"Erreur récupération LinkedIn: {str(e)}"
-                logger.error(error_msg)
-                result_data["errors"].append(error_msg)
-                result_data["data"]["linkedin_data"] = {"error": error_msg}
-        
-        # Récupération données Facebook
-        if PlatformType.FACEBOOK in looker_request.platforms or PlatformType.BOTH in looker_request.platforms:
-            logger.info(f"Récupération données Facebook pour {user_email}")
+                except Exception as e:
+                    error_msg = f"Erreur récupération LinkedIn: {str(e)}"
+                    logger.error(error_msg)
+                    result_data["errors"].append(error_msg)
+                    result_data["data"]["linkedin_data"] = {"error": error_msg}
+        
+            # Récupération données Facebook
+            if PlatformType.FACEBOOK in looker_request.platforms or PlatformType.BOTH in looker_request.platforms:
+                logger.info(f"Récupération données Facebook pour {user_email}")
             
-            try:
-                facebook_data = await get_real_facebook_data(
-                    user, facebook_client, start_date, end_date, 
-                    looker_request.metrics_type.value, looker_request.include_facebook_reactions
-                )
-                result_data["data"]["facebook_data"] = facebook_data
+                try:
+                    facebook_data = await get_real_facebook_data(
+                        user, facebook_client, start_date, end_date, 
+                        looker_request.metrics_type.value, looker_request.include_facebook_reactions,
+                        projection
+                    )
+                    result_data["data"]["facebook_data"] = facebook_data
                 
-                # Compter les enregistrements
-                for category in facebook_data.values():
-                    if isinstance(category, list):
-                        total_records += len(category)
+                    # Compter les enregistrements
+                    for category in facebook_data.values():
+                        if isinstance(category, list):
+                            total_records += len(category)
                         
-            except Exception as e:
-                error_msg = f"Erreur récupération Facebook: {str(e)}"
-                logger.error(error_msg)
-                result_data["errors"].append(error_msg)
-                result_data["data"]["facebook_data"] = {"error": error_msg}
+                except Exception as e:
+                    error_msg = f"Erreur récupération Facebook: {str(e)}"
+                    logger.error(error_msg)
+                    result_data["errors"].append(error_msg)
+                    result_data["data"]["facebook_data"] = {"error": error_msg}
+        
+            # Métadonnées de performance
+            execution_time = time.time() - start_time
+            result_data["total_records"] = total_records
+            result_data["execution_time"] = round(execution_time, 3)
+        
+            # Générer un résumé des plateformes
+            platform_summaries = {}
+            for platform in ["linkedin", "facebook"]:
+                if f"{platform}_data" in result_data["data"] and "error" not in result_data["data"][f"{platform}_data"]:
+                    platform_data = result_data["data"][f"{platform}_data"]
+                    platform_summaries[platform] = {
+                        "available": True,
+                        "page_metrics_count": len(platform_data.get("page_metrics", [])),
+                        "post_metrics_count": len(platform_data.get("post_metrics", [])),
+                        "total_metrics": sum(len(v) for v in platform_data.values() if isinstance(v, list))
+                    }
+                else:
+                    platform_summaries[platform] = {"available": False}
         
-        # Métadonnées de performance
-        execution_time = time.time() - start_time
-        result_data["total_records"] = total_records
-        result_data["execution_time"] = round(execution_time, 3)
-        
-        # Générer un résumé des plateformes
-        platform_summaries = {}
-        for platform in ["linkedin", "facebook"]:
-            if f"{platform}_data" in result_data["data"] and "error" not in result_data["data"][f"{platform}_data"]:
-                platform_data = result_data["data"][f"{platform}_data"]
-                platform_summaries[platform] = {
-                    "available": True,
-                    "page_metrics_count": len(platform_data.get("page_metrics", [])),
-                    "post_metrics_count": len(platform_data.get("post_metrics", [])),
-                    "total_metrics": sum(len(v) for v in platform_data.values() if isinstance(v, list))
-                }
+            result_data["platform_summaries"] = platform_summaries
+        
+            # Déterminer le statut de réponse
+            if result_data["errors"]:
+                if total_records == 0:
+                    status_code = 503  # Service indisponible
+                else:
+                    status_code = 207  # Multi-status (succès partiel)
             else:
-                platform_summaries[platform] = {"available": False}
+                status_code = 200
         
-        result_data["platform_summaries"] = platform_summaries
+            logger.info(f"Données générées pour {user_email}: {total_records} enregistrements en {execution_time:.3f}s")
         
-        # Déterminer le statut de réponse
-        if result_data["errors"]:
-            if total_records == 0:
-                status_code = 503  # Service indisponible
-            else:
-                status_code = 207  # Multi-status (succès partiel)
-        else:
-            status_code = 200
+            return status_code, result_data
         
-        logger.info(f"Données générées pour {user_email}: {total_records} enregistrements en {execution_time:.3f}s")
+        status_code, content, cache_state = await looker_response_cache.get_or_compute(
+            response_cache_key, compute_response, account_tags, user.id,
+            cacheable=lambda code, _: code == 200
+        )
+        if cache_state != "MISS":
+            logger.info(f"Réponse combined/metrics servie depuis le cache ({cache_state}) pour {user_email}")
         
-        return JSONResponse(status_code=status_code, content=result_data)
+        return JSONResponse(status_code=status_code, content=stamp_served(content, start_time),
+                            headers={"X-Cache": cache_state})
         
     except Exception as e:
         logger.error(f"Erreur inattendue combined_metrics: {e}")
@@ -1029,17 +1043,68 @@ async def get_combined_metrics(request: Request):
 # FONCTIONS DE RÉCUPÉRATION DE DONNÉES
 # ========================================
 
-async def get_real_linkedin_data(user: User, linkedin_client: LinkedInAPIClient, 
-                                 start_date: date, end_date: date, 
-                                 metrics_type: str, include_reactions: bool) -> Dict:
-    """Récupération complète des données LinkedIn avec gestion d'erreurs"""
+def get_user_account_tags(user: User, platforms: List[PlatformType]) -> List[tuple]:
+    """Lister les comptes actifs (plateforme, id) de l'utilisateur pour les plateformes demandées"""
+
+    tags = []
+    both = PlatformType.BOTH in platforms
+
+    with db_manager.get_session() as session:
+        if both or PlatformType.LINKEDIN in platforms:
+            rows = session.query(LinkedinAccount.organization_id).filter(
+                LinkedinAccount.user_id == user.id,
+                LinkedinAccount.is_active == True
+            ).all()
+            tags.extend(("linkedin", str(row[0])) for row in rows)
+
+        if both or PlatformType.FACEBOOK in platforms:
+            rows = session.query(FacebookAccount.page_id).filter(
+                FacebookAccount.user_id == user.id,
+                FacebookAccount.is_active == True
+            ).all()
+            tags.extend(("facebook", str(row[0])) for row in rows)
+
+    return tags
+
+def _days(start_date: date, end_date: date):
+    """Jours de la période, bornes incluses"""
+    current_date = start_date
+    while current_date <= end_date:
+        yield current_date
+        current_date += timedelta(days=1)
+
+async def merge_rows_by_day(*sources: AsyncIterator[Tuple[date, str, Dict]]) -> AsyncIterator[Tuple[date, str, Dict]]:
+    """
+    Fusionner des flux (jour, catégorie, ligne) déjà triés par jour.
+    À jour égal, l'ordre des flux est conservé; chaque flux n'avance que quand sa ligne est émise.
+    """
+    heads = []
+    for index, source in enumerate(sources):
+        iterator = source.__aiter__()
+        try:
+            heads.append([await iterator.__anext__(), index, iterator])
+        except StopAsyncIteration:
+            pass
     
-    data = {
-        "page_metrics": [],
-        "post_metrics": [],
-        "follower_metrics": [],
-        "breakdown_data": []
-    }
+    while heads:
+        head = min(heads, key=lambda item: (item[0][0], item[1]))
+        yield head[0]
+        try:
+            head[0] = await head[2].__anext__()
+        except StopAsyncIteration:
+            heads.remove(head)
+
+async def iter_real_linkedin_rows(user: User, linkedin_client: LinkedInAPIClient,
+                                  start_date: date, end_date: date,
+                                  metrics_type: str, include_reactions: bool,
+                                  projection: Optional[FieldProjection] = None,
+                                  include_breakdown: bool = False,
+                                  by_day: bool = False) -> AsyncIterator[Tuple[date, str, Dict]]:
+    """
+    Produire les lignes LinkedIn (jour, catégorie, ligne).
+    Par défaut compte par compte (ordre de la réponse JSON); by_day=True pour le streaming:
+    ordre des dates, avec pour chaque jour les pages, puis les posts, puis la segmentation.
+    """
     
     try:
         # Récupérer les comptes LinkedIn
@@ -1051,105 +1116,178 @@ async def get_real_linkedin_data(user: User, linkedin_client: LinkedInAPIClient,
         
         if not linkedin_accounts:
             logger.warning(f"Aucun compte LinkedIn trouvé pour {user.email}")
-            return data
+            return
         
-        # Initialiser les métriques selon le type demandé
-        metrics_manager = MetricsManager()
-        linkedin_metrics_obj = metrics_manager.get_platform_metrics('linkedin')
+        # Schéma précompilé du processus (aucune construction par requête)
+        linkedin_schema = get_registry().platform('linkedin')
         
-        if not linkedin_metrics_obj:
+        if not linkedin_schema:
             raise Exception("Module LinkedIn Metrics non disponible")
         
         # Définir les métriques à récupérer
-        page_metrics_list = linkedin_metrics_obj.get_page_metrics() if metrics_type in ['overview', 'pages'] else []
-        post_metrics_list = linkedin_metrics_obj.get_post_metrics() if metrics_type in ['overview', 'posts'] else []
+        page_metrics_list = linkedin_schema.page_metrics if metrics_type in ['overview', 'pages'] else ()
+        post_metrics_list = linkedin_schema.post_metrics if metrics_type in ['overview', 'posts'] else ()
+        
+        # Projection Looker: seules les métriques demandées sont récupérées,
+        # les familles d'API sans métrique demandée ne sont pas appelées
+        projection = projection or FieldProjection()
+        page_metrics_list = projection.filter_metrics('linkedin', page_metrics_list)
+        post_metrics_list = projection.filter_metrics('linkedin', post_metrics_list)
+        fetch_posts = include_reactions and metrics_type in ['overview', 'posts'] and (
+            bool(post_metrics_list) or (not projection.is_all and projection.wants(*POST_DIMENSION_COLUMNS))
+        )
         
-        # Récupération des métriques de pages
-        if page_metrics_list:
-            for account in linkedin_accounts:
-                logger.info(f"Récupération métriques page LinkedIn {account.organization_id}")
-                
-                # Pour chaque jour de la période
-                current_date = start_date
-                while current_date <= end_date:
-                    try:
-                        page_metrics = await linkedin_client.get_page_metrics(
-                            account.organization_id, current_date, page_metrics_list
-                        )
-                        
-                        page_data = {
-                            "date": current_date.strftime("%Y-%m-%d"),
-                            "account_name": account.organization_name or f"LinkedIn {account.organization_id}",
-                            "account_id": account.organization_id,
-                            "platform": "linkedin"
-                        }
-                        
-                        # Ajouter les métriques avec préfixe linkedin_
-                        for metric, value in page_metrics.items():
-                            page_data[f"linkedin_{metric}"] = value
-                        
-                        data["page_metrics"].append(page_data)
-                        
-                    except Exception as e:
-                        logger.error(f"Erreur métriques page LinkedIn {account.organization_id} pour {current_date}: {e}")
+        async def page_rows():
+            """Métriques de pages: jour par jour (tous les comptes) ou compte par compte"""
+            if by_day:
+                slots = ((account, day) for day in _days(start_date, end_date) for account in linkedin_accounts)
+            else:
+                slots = ((account, day) for account in linkedin_accounts for day in _days(start_date, end_date))
+            
+            for account, current_date in slots:
+                try:
+                    page_metrics = await linkedin_client.get_page_metrics(
+                        account.organization_id, current_date, page_metrics_list
+                    )
+                    
+                    page_data = {
+                        "date": current_date.strftime("%Y-%m-%d"),
+                        "account_name": account.organization_name or f"LinkedIn {account.organization_id}",
+                        "account_id": account.organization_id,
+                        "platform": "linkedin"
+                    }
+                    
+                    # Ajouter les métriques avec préfixe linkedin_
+                    for metric, value in page_metrics.items():
+                        page_data[f"linkedin_{metric}"] = value
+                    
+                    yield current_date, "page_metrics", projection.project_row(page_data)
                     
-                    current_date += timedelta(days=1)
+                except Exception as e:
+                    logger.error(f"Erreur métriques page LinkedIn {account.organization_id} pour {current_date}: {e}")
         
-        # Récupération des métriques de posts
-        if post_metrics_list and include_reactions:
+        async def post_rows():
+            """Métriques de posts: posts de chaque compte, triés par date en mode by_day"""
+            account_posts = []
             for account in linkedin_accounts:
                 logger.info(f"Récupération posts LinkedIn {account.organization_id}")
-                
                 try:
                     posts = await linkedin_client.get_posts(account.organization_id, start_date, end_date)
+                    account_posts.extend((post, account) for post in posts)
+                except Exception as e:
+                    logger.error(f"Erreur récupération posts LinkedIn {account.organization_id}: {e}")
+            
+            if by_day:
+                account_posts.sort(key=lambda item: item[0]['date'])
+            
+            for post, account in account_posts:
+                try:
+                    post_metrics = await linkedin_client.get_post_metrics(post['id'], post_metrics_list) if post_metrics_list else {}
                     
-                    for post in posts:
-                        try:
-                            post_metrics = await linkedin_client.get_post_metrics(post['id'], post_metrics_list)
-                            
-                            post_data = {
-                                "post_id": post['id'],
-                                "post_type": post['type'],
-                                "post_creation_date": post.get('created_at', ''),
-                                "post_text": post.get('text', ''),
-                                "account_name": account.organization_name,
+                    post_data = {
+                        "post_id": post['id'],
+                        "post_type": post['type'],
+                        "post_creation_date": post.get('created_at', ''),
+                        "post_text": post.get('text', ''),
+                        "account_name": account.organization_name,
+                        "account_id": account.organization_id,
+                        "platform": "linkedin",
+                        "date": post['date'].strftime("%Y-%m-%d")
+                    }
+                    
+                    # Ajouter les métriques avec préfixe
+                    for metric, value in post_metrics.items():
+                        post_data[f"linkedin_{metric}"] = value
+                    
+                    yield post['date'], "post_metrics", projection.project_row(post_data)
+                    
+                except Exception as e:
+                    logger.error(f"Erreur métriques post LinkedIn {post['id']}: {e}")
+        
+        async def breakdown_rows():
+            """Segmentation des followers: reconstituée jour par jour depuis les snapshots (keyframe + delta)"""
+            rows = []
+            for account in linkedin_accounts:
+                try:
+                    by_type = breakdown_snapshots.load_types(
+                        "linkedin", account.organization_id, FOLLOWER_BREAKDOWN_TYPES, start_date, end_date
+                    )
+                except Exception as e:
+                    logger.error(f"Erreur segmentation LinkedIn {account.organization_id}: {e}")
+                    continue
+                
+                for breakdown_type, days in by_type.items():
+                    for day, buckets in days.items():
+                        for segment, follower_count in buckets.items():
+                            rows.append((day, "breakdown_data", projection.project_row({
+                                "date": day.strftime("%Y-%m-%d"),
+                                "account_name": account.organization_name or f"LinkedIn {account.organization_id}",
                                 "account_id": account.organization_id,
                                 "platform": "linkedin",
-                                "date": post['date'].strftime("%Y-%m-%d")
-                            }
-                            
-                            # Ajouter les métriques avec préfixe
-                            for metric, value in post_metrics.items():
-                                post_data[f"linkedin_{metric}"] = value
-                            
-                            data["post_metrics"].append(post_data)
-                            
-                        except Exception as e:
-                            logger.error(f"Erreur métriques post LinkedIn {post['id']}: {e}")
-                
-                except Exception as e:
-                    logger.error(f"Erreur récupération posts LinkedIn {account.organization_id}: {e}")
+                                "breakdown_type": breakdown_type,
+                                "segment": segment,
+                                "linkedin_follower_count": follower_count
+                            })))
+            
+            if by_day:
+                rows.sort(key=lambda item: item[0])
+            for row in rows:
+                yield row
         
-        logger.info(f"LinkedIn data récupérée: {len(data['page_metrics'])} pages, {len(data['post_metrics'])} posts")
+        sources = []
+        if page_metrics_list:
+            sources.append(page_rows())
+        if fetch_posts:
+            sources.append(post_rows())
+        if include_breakdown and projection.wants("breakdown_type", "segment", "linkedin_follower_count"):
+            sources.append(breakdown_rows())
+        
+        if by_day:
+            async for item in merge_rows_by_day(*sources):
+                yield item
+        else:
+            for source in sources:
+                async for item in source:
+                    yield item
         
     except Exception as e:
         logger.error(f"Erreur globale récupération LinkedIn: {e}")
         raise
-    
-    return data
 
-async def get_real_facebook_data(user: User, facebook_client: FacebookAPIClient,
-                                start_date: date, end_date: date,
-                                metrics_type: str, include_reactions: bool) -> Dict:
-    """Récupération complète des données Facebook avec gestion d'erreurs"""
+async def get_real_linkedin_data(user: User, linkedin_client: LinkedInAPIClient, 
+                                 start_date: date, end_date: date, 
+                                 metrics_type: str, include_reactions: bool,
+                                 projection: Optional[FieldProjection] = None,
+                                 include_breakdown: bool = False) -> Dict:
+    """Récupération complète des données LinkedIn avec gestion d'erreurs"""
     
     data = {
         "page_metrics": [],
         "post_metrics": [],
-        "fan_metrics": [],
-        "video_metrics": []
+        "follower_metrics": [],
+        "breakdown_data": []
     }
     
+    async for _, category, row in iter_real_linkedin_rows(user, linkedin_client, start_date, end_date,
+                                                           metrics_type, include_reactions, projection,
+                                                           include_breakdown):
+        data[category].append(row)
+    
+    logger.info(f"LinkedIn data récupérée: {len(data['page_metrics'])} pages, {len(data['post_metrics'])} posts")
+    
+    return data
+
+async def iter_real_facebook_rows(user: User, facebook_client: FacebookAPIClient,
+                                  start_date: date, end_date: date,
+                                  metrics_type: str, include_reactions: bool,
+                                  projection: Optional[FieldProjection] = None,
+                                  by_day: bool = False) -> AsyncIterator[Tuple[date, str, Dict]]:
+    """
+    Produire les lignes Facebook (jour, catégorie, ligne).
+    Par défaut compte par compte (ordre de la réponse JSON); by_day=True pour le streaming:
+    ordre des dates, avec pour chaque jour les pages puis les posts.
+    """
+    
     try:
         # Récupérer les comptes Facebook
         with db_manager.get_session() as session:
@@ -1160,93 +1298,214 @@ async def get_real_facebook_data(user: User, facebook_client: FacebookAPIClient,
         
         if not facebook_accounts:
             logger.warning(f"Aucun compte Facebook trouvé pour {user.email}")
-            return data
+            return
         
-        # Initialiser les métriques
-        metrics_manager = MetricsManager()
-        facebook_metrics_obj = metrics_manager.get_platform_metrics('facebook')
+        # Schéma précompilé du processus (aucune construction par requête)
+        facebook_schema = get_registry().platform('facebook')
         
-        if not facebook_metrics_obj:
+        if not facebook_schema:
             raise Exception("Module Facebook Metrics non disponible")
         
         # Définir les métriques à récupérer
-        page_metrics_list = facebook_metrics_obj.get_page_metrics() if metrics_type in ['overview', 'pages'] else []
-        post_metrics_list = facebook_metrics_obj.get_post_metrics() if metrics_type in ['overview', 'posts'] else []
+        page_metrics_list = facebook_schema.page_metrics if metrics_type in ['overview', 'pages'] else ()
+        post_metrics_list = facebook_schema.post_metrics if metrics_type in ['overview', 'posts'] else ()
+        
+        # Projection Looker: seules les métriques demandées sont récupérées,
+        # les familles d'API sans métrique demandée ne sont pas appelées
+        projection = projection or FieldProjection()
+        page_metrics_list = projection.filter_metrics('facebook', page_metrics_list)
+        post_metrics_list = projection.filter_metrics('facebook', post_metrics_list)
+        fetch_posts = include_reactions and metrics_type in ['overview', 'posts'] and (
+            bool(post_metrics_list) or (not projection.is_all and projection.wants(*POST_DIMENSION_COLUMNS))
+        )
         
-        # Récupération des métriques de pages
-        if page_metrics_list:
-            for account in facebook_accounts:
-                logger.info(f"Récupération métriques page Facebook {account.page_id}")
-                
-                # Pour chaque jour de la période
-                current_date = start_date
-                while current_date <= end_date:
-                    try:
-                        page_metrics = await facebook_client.get_page_metrics(
-                            account.page_id, current_date, page_metrics_list
-                        )
-                        
-                        page_data = {
-                            "date": current_date.strftime("%Y-%m-%d"),
-                            "account_name": account.page_name or f"Facebook {account.page_id}",
-                            "account_id": account.page_id,
-                            "platform": "facebook"
-                        }
-                        
-                        # Ajouter les métriques avec préfixe facebook_
-                        for metric, value in page_metrics.items():
-                            page_data[f"facebook_{metric}"] = value
-                        
-                        data["page_metrics"].append(page_data)
-                        
-                    except Exception as e:
-                        logger.error(f"Erreur métriques page Facebook {account.page_id} pour {current_date}: {e}")
+        async def page_rows():
+            """Métriques de pages: jour par jour (tous les comptes) ou compte par compte"""
+            if by_day:
+                slots = ((account, day) for day in _days(start_date, end_date) for account in facebook_accounts)
+            else:
+                slots = ((account, day) for account in facebook_accounts for day in _days(start_date, end_date))
+            
+            for account, current_date in slots:
+                try:
+                    page_metrics = await facebook_client.get_page_metrics(
+                        account.page_id, current_date, page_metrics_list
+                    )
                     
-                    current_date += timedelta(days=1)
+                    page_data = {
+                        "date": current_date.strftime("%Y-%m-%d"),
+                        "account_name": account.page_name or f"Facebook {account.page_id}",
+                        "account_id": account.page_id,
+                        "platform": "facebook"
+                    }
+                    
+                    # Ajouter les métriques avec préfixe facebook_
+                    for metric, value in page_metrics.items():
+                        page_data[f"facebook_{metric}"] = value
+                    
+                    yield current_date, "page_metrics", projection.project_row(page_data)
+                    
+                except Exception as e:
+                    logger.error(f"Erreur métriques page Facebook {account.page_id} pour {current_date}: {e}")
         
-        # Récupération des métriques de posts
-        if post_metrics_list and include_reactions:
+        async def post_rows():
+            """Métriques de posts: posts de chaque compte, triés par date en mode by_day"""
+            account_posts = []
             for account in facebook_accounts:
                 logger.info(f"Récupération posts Facebook {account.page_id}")
-                
                 try:
                     posts = await facebook_client.get_posts(account.page_id, start_date, end_date)
-                    
-                    for post in posts:
-                        try:
-                            post_metrics = await facebook_client.get_post_metrics(post['id'], post_metrics_list)
-                            
-                            post_data = {
-                                "post_id": post['id'],
-                                "post_type": post['type'],
-                                "post_creation_date": post['date'].strftime("%Y-%m-%d"),
-                                "post_text": post.get('message', ''),
-                                "account_name": account.page_name,
-                                "account_id": account.page_id,
-                                "platform": "facebook",
-                                "date": post['date'].strftime("%Y-%m-%d")
-                            }
-                            
-                            # Ajouter les métriques avec préfixe
-                            for metric, value in post_metrics.items():
-                                post_data[f"facebook_{metric}"] = value
-                            
-                            data["post_metrics"].append(post_data)
-                            
-                        except Exception as e:
-                            logger.error(f"Erreur métriques post Facebook {post['id']}: {e}")
-                
+                    account_posts.extend((post, account) for post in posts)
                 except Exception as e:
                     logger.error(f"Erreur récupération posts Facebook {account.page_id}: {e}")
+            
+            if by_day:
+                account_posts.sort(key=lambda item: item[0]['date'])
+            
+            for post, account in account_posts:
+                try:
+                    post_metrics = await facebook_client.get_post_metrics(post['id'], post_metrics_list) if post_metrics_list else {}
+                    
+                    post_data = {
+                        "post_id": post['id'],
+                        "post_type": post['type'],
+                        "post_creation_date": post['date'].strftime("%Y-%m-%d"),
+                        "post_text": post.get('message', ''),
+                        "account_name": account.page_name,
+                        "account_id": account.page_id,
+                        "platform": "facebook",
+                        "date": post['date'].strftime("%Y-%m-%d")
+                    }
+                    
+                    # Ajouter les métriques avec préfixe
+                    for metric, value in post_metrics.items():
+                        post_data[f"facebook_{metric}"] = value
+                    
+                    yield post['date'], "post_metrics", projection.project_row(post_data)
+                    
+                except Exception as e:
+                    logger.error(f"Erreur métriques post Facebook {post['id']}: {e}")
         
-        logger.info(f"Facebook data récupérée: {len(data['page_metrics'])} pages, {len(data['post_metrics'])} posts")
+        sources = []
+        if page_metrics_list:
+            sources.append(page_rows())
+        if fetch_posts:
+            sources.append(post_rows())
+        
+        if by_day:
+            async for item in merge_rows_by_day(*sources):
+                yield item
+        else:
+            for source in sources:
+                async for item in source:
+                    yield item
         
     except Exception as e:
         logger.error(f"Erreur globale récupération Facebook: {e}")
         raise
+
+async def get_real_facebook_data(user: User, facebook_client: FacebookAPIClient,
+                                start_date: date, end_date: date,
+                                metrics_type: str, include_reactions: bool,
+                                projection: Optional[FieldProjection] = None) -> Dict:
+    """Récupération complète des données Facebook avec gestion d'erreurs"""
+    
+    data = {
+        "page_metrics": [],
+        "post_metrics": [],
+        "fan_metrics": [],
+        "video_metrics": []
+    }
+    
+    async for _, category, row in iter_real_facebook_rows(user, facebook_client, start_date, end_date,
+                                                           metrics_type, include_reactions, projection):
+        data[category].append(row)
+    
+    logger.info(f"Facebook data récupérée: {len(data['page_metrics'])} pages, {len(data['post_metrics'])} posts")
     
     return data
 
+async def stream_combined_metrics(user: User, user_email: str, looker_request: "LookerDataRequest",
+                                  start_date: date, end_date: date, stream_format: str,
+                                  projection: Optional[FieldProjection] = None) -> AsyncIterator[str]:
+    """
+    Diffuser les métriques combinées ligne par ligne (NDJSON ou tableau JSON en chunks).
+    Une ligne d'en-tête "meta", puis une ligne "row" par compte/jour ou post dans l'ordre des dates
+    (toutes plateformes confondues), puis une ligne "end".
+    """
+    
+    start_time = time.time()
+    ndjson = stream_format == "ndjson"
+    first = True
+    
+    def frame(obj: Dict[str, Any]) -> str:
+        nonlocal first
+        payload = json.dumps(obj, default=str, ensure_ascii=False)
+        if ndjson:
+            return payload + "\n"
+        prefix = "[" if first else ","
+        first = False
+        return prefix + payload + "\n"
+    
+    yield frame({
+        "type": "meta",
+        "user_email": user_email,
+        "date_range": {
+            "start": start_date.isoformat(),
+            "end": end_date.isoformat(),
+            "days": (end_date - start_date).days + 1
+        },
+        "request_params": {
+            "platforms": [p.value for p in looker_request.platforms],
+            "metrics_type": looker_request.metrics_type.value
+        },
+        "generated_at": datetime.now().isoformat()
+    })
+    
+    total_records = 0
+    errors = []
+    
+    async def guarded(platform: str, rows: AsyncIterator[Tuple[date, str, Dict]]):
+        """Une plateforme en échec s'arrête sans interrompre les autres"""
+        try:
+            async for item in rows:
+                yield item
+        except Exception as e:
+            error_msg = f"Erreur récupération {platform}: {str(e)}"
+            logger.error(error_msg)
+            errors.append(error_msg)
+    
+    sources = []
+    if PlatformType.LINKEDIN in looker_request.platforms or PlatformType.BOTH in looker_request.platforms:
+        sources.append(guarded("linkedin", iter_real_linkedin_rows(
+            user, LinkedInAPIClient(), start_date, end_date,
+            looker_request.metrics_type.value, looker_request.include_linkedin_reactions, projection,
+            looker_request.include_breakdown, by_day=True
+        )))
+    if PlatformType.FACEBOOK in looker_request.platforms or PlatformType.BOTH in looker_request.platforms:
+        sources.append(guarded("facebook", iter_real_facebook_rows(
+            user, FacebookAPIClient(), start_date, end_date,
+            looker_request.metrics_type.value, looker_request.include_facebook_reactions, projection,
+            by_day=True
+        )))
+    
+    # Un jour complet (toutes plateformes, pages puis posts) avant le jour suivant
+    async for _, category, row in merge_rows_by_day(*sources):
+        total_records += 1
+        yield frame({"type": "row", "category": category, "data": row})
+    
+    execution_time = time.time() - start_time
+    logger.info(f"Streaming combined/metrics terminé pour {user_email}: {total_records} enregistrements en {execution_time:.3f}s")
+    
+    end_frame = frame({
+        "type": "end",
+        "success": not errors or total_records > 0,
+        "total_records": total_records,
+        "errors": errors,
+        "execution_time": round(execution_time, 3)
+    })
+    yield end_frame if ndjson else end_frame + "]"
+
 # ========================================
 # ENDPOINTS UTILITAIRES
 # ========================================
@@ -1487,12 +1746,9 @@ async def get_test_data_extended():
     import random
     
     try:
-        # Imports locaux dans la fonction pour éviter les conflits au niveau module
-        from app.utils.metrics.linkedin_metrics import LinkedInMetrics
-        from app.utils.metrics.facebook_metrics import FacebookMetrics
-        
-        linkedin_metrics = LinkedInMetrics()
-        facebook_metrics = FacebookMetrics()
+        registry = get_registry()
+        linkedin_metrics = registry.platforms['linkedin']
+        facebook_metrics = registry.platforms['facebook']
     except Exception as e:
         logger.error(f"Erreur import metrics: {e}")
         return {
@@ -1522,7 +1778,7 @@ async def get_test_data_extended():
     }
     
     # Données LinkedIn - Page Metrics (30 jours)
-    linkedin_page_metrics_list = linkedin_metrics.get_page_metrics()
+    linkedin_page_metrics_list = linkedin_metrics.page_metrics
     for i in range(30):
         current_date = base_date - timedelta(days=i)
         page_data = {
@@ -1548,7 +1804,7 @@ async def get_test_data_extended():
         data["data"]["linkedin_data"]["page_metrics"].append(page_data)
     
     # Données LinkedIn - Post Metrics (10 posts factices)
-    linkedin_post_metrics_list = linkedin_metrics.get_post_metrics()
+    linkedin_post_metrics_list = linkedin_metrics.post_metrics
     for i in range(10):
         current_date = base_date - timedelta(days=i*3)
         post_data = {
@@ -1578,7 +1834,7 @@ async def get_test_data_extended():
         data["data"]["linkedin_data"]["post_metrics"].append(post_data)
     
     # Données Facebook - Page Metrics (30 jours)
-    facebook_page_metrics_list = facebook_metrics.get_page_metrics()
+    facebook_page_metrics_list = facebook_metrics.page_metrics
     for i in range(30):
         current_date = base_date - timedelta(days=i)
         page_data = {
@@ -1604,7 +1860,7 @@ async def get_test_data_extended():
         data["data"]["facebook_data"]["page_metrics"].append(page_data)
     
     # Données Facebook - Post Metrics (10 posts factices)
-    facebook_post_metrics_list = facebook_metrics.get_post_metrics()
+    facebook_post_metrics_list = facebook_metrics.post_metrics
     for i in range(10):
         current_date = base_date - timedelta(days=i*3)
         post_data = {
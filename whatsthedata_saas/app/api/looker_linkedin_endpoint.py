@@ -16,7 +16,7 @@ from dataclasses import dataclass
 from enum import Enum
 import time
 import hashlib
-from functools import wraps, lru_cache
+from functools import wraps
 import os
 
 # Imports locaux avec gestion d'erreur
@@ -25,8 +25,14 @@ try:
     from ..database.connection import db_manager
     from ..database.models import User, LinkedinAccount, SocialAccessToken
     from ..utils.config import Config
+    from ..utils.response_cache import looker_response_cache, stamp_served
+    from ..collectors.page_rollups import page_rollups, PageStatisticsRollups
+    from ..utils.field_projection import FieldProjection
+    from ..utils.platform_client import platform_runtime, PlatformAPIError
+    from ..utils.rate_limiter import rate_limit
 except ImportError as e:
     logging.error(f"Erreur import modules locaux: {e}")
+    looker_response_cache = None
     # Fallback pour développement
     class Config:
         LINKEDIN_CLIENT_ID = os.getenv('LINKEDIN_CLIENT_ID', '')
@@ -62,17 +68,27 @@ class AggregationLevel(str, Enum):
     CUMULATIVE = "cumulative"
 
 class LinkedInAPIEndpoints:
-    BASE_URL = "https://api.linkedin.com/rest"
     PAGE_STATISTICS = "/organizationPageStatistics"
     FOLLOWER_STATISTICS = "/networkSizes"
     POSTS = "/posts"
     SOCIAL_ACTIONS = "/socialActions"
 
-# Cache simple pour éviter les appels API répétés
-@lru_cache(maxsize=500)
-def get_cache_key(account_id: str, date_str: str, metric_type: str) -> str:
-    """Générer une clé de cache pour les métriques"""
-    return hashlib.md5(f"{account_id}_{date_str}_{metric_type}".encode()).hexdigest()
+# Colonnes produites par chaque famille d'API (la projection décide des appels)
+PAGE_STATISTICS_COLUMNS = (
+    'total_page_views', 'unique_page_views', 'desktop_page_views', 'mobile_page_views',
+    'overview_page_views', 'careers_page_views', 'about_page_views', 'people_page_views',
+    'jobs_page_views', 'life_at_page_views'
+)
+POST_DIMENSION_COLUMNS = ('post_id', 'post_type', 'post_creation_date', 'post_text')
+POST_STATISTICS_COLUMNS = (
+    'post_impressions', 'post_unique_impressions', 'post_clicks', 'post_shares', 'post_comments',
+    'reactions_like', 'reactions_celebrate', 'reactions_love', 'reactions_insightful',
+    'reactions_support', 'reactions_funny', 'total_reactions'
+)
+FOLLOWER_COLUMNS = ('total_followers', 'organic_follower_gain', 'paid_follower_gain')
+BREAKDOWN_COLUMNS = ('breakdown_type', 'breakdown_category', 'breakdown_value', 'followers_count')
+# Niveaux d'agrégation servis par les agrégats précalculés (collectors/page_rollups)
+ROLLUP_GRANULARITIES = {AggregationLevel.WEEKLY.value: 'week', AggregationLevel.MONTHLY.value: 'month'}
 
 # ========================================
 # MODÈLES PYDANTIC
@@ -143,42 +159,6 @@ class LinkedInToken:
 # DÉCORATEURS UTILITAIRES
 # ========================================
 
-def rate_limit_linkedin(calls_per_minute: int = 100):
-    """Rate limiting spécifique LinkedIn"""
-    
-    def decorator(func):
-        last_calls = {}
-        
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            now = time.time()
-            minute_ago = now - 60
-            
-            key = f"linkedin_{func.__name__}"
-            if key not in last_calls:
-                last_calls[key] = []
-            
-            # Nettoyer les anciens appels
-            last_calls[key] = [call_time for call_time in last_calls[key] if call_time > minute_ago]
-            
-            # Vérifier la limite
-            if len(last_calls[key]) >= calls_per_minute:
-                raise HTTPException(
-                    status_code=429,
-                    detail={
-                        "error": "RATE_LIMIT_EXCEEDED",
-                        "message": f"Rate limit LinkedIn dépassé: {calls_per_minute} appels/minute",
-                        "retry_after": 60
-                    }
-                )
-            
-            # Enregistrer l'appel
-            last_calls[key].append(now)
-            return await func(*args, **kwargs)
-        
-        return wrapper
-    return decorator
-
 def handle_linkedin_errors(func):
     """Gestionnaire d'erreurs spécifique LinkedIn"""
     
@@ -336,53 +316,23 @@ class LinkedInAPIClient:
     """Client API LinkedIn optimisé pour Looker Studio"""
     
     def __init__(self):
-        self.base_url = LinkedInAPIEndpoints.BASE_URL
         self.timeout = 30
-        self.max_retries = 3
-        self.retry_delay = 1
+        self.client = platform_runtime.linkedin  # pool, retries et quotas partagés avec les collecteurs
     
-    async def _make_request(self, method: str, endpoint: str, params: dict, token: LinkedInToken) -> Optional[dict]:
-        """Méthode générique pour les requêtes LinkedIn avec retry"""
-        
-        headers = {
-            'Authorization': f'Bearer {token.access_token}',
-            'X-Restli-Protocol-Version': '2.0.0',
-            'LinkedIn-Version': '202305',
-            'Content-Type': 'application/json'
-        }
-        
-        for attempt in range(self.max_retries):
-            try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.request(
-                        method=method,
-                        url=f"{self.base_url}{endpoint}",
-                        headers=headers,
-                        params=params
-                    )
-                    
-                    if response.status_code == 200:
-                        return response.json()
-                    elif response.status_code == 429:
-                        # Rate limit - attendre plus longtemps
-                        wait_time = self.retry_delay * (2 ** attempt)
-                        logger.warning(f"Rate limit LinkedIn, attente {wait_time}s")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    elif response.status_code in [401, 403]:
-                        # Erreur d'auth - pas de retry
-                        logger.error(f"Erreur auth LinkedIn {response.status_code}: {response.text}")
-                        break
-                    else:
-                        logger.warning(f"Erreur LinkedIn {response.status_code}, tentative {attempt + 1}")
-                        if attempt < self.max_retries - 1:
-                            await asyncio.sleep(self.retry_delay)
-                        
-            except Exception as e:
-                logger.error(f"Erreur requête LinkedIn, tentative {attempt + 1}: {e}")
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delay)
+    @staticmethod
+    def _auth(token: LinkedInToken) -> Dict[str, str]:
+        return {'Authorization': f'Bearer {token.access_token}'}
+    
+    async def _get_json(self, endpoint: str, params: dict, token: LinkedInToken) -> Optional[dict]:
+        """GET via le client partagé (retries et 429 gérés par le runtime); None en cas d'erreur"""
         
+        try:
+            return await self.client.get_json(endpoint, params=params, headers=self._auth(token),
+                                              timeout=self.timeout)
+        except PlatformAPIError as e:
+            logger.error(f"Erreur LinkedIn {e.status_code} sur {endpoint}: {e}")
+        except httpx.HTTPError as e:
+            logger.error(f"Erreur requête LinkedIn sur {endpoint}: {e}")
         return None
     
     async def get_page_statistics(self, account_id: str, date_obj: date) -> Dict[str, int]:
@@ -397,11 +347,11 @@ class LinkedInAPIClient:
             'q': 'organization',
             'organization': f'urn:li:organization:{account_id}',
             'timeIntervals.timeGranularityType': 'DAY',
-            'timeIntervals.timeRange.start': int(date_obj.timestamp() * 1000),
-            'timeIntervals.timeRange.end': int((date_obj + timedelta(days=1)).timestamp() * 1000)
+            'timeIntervals.timeRange.start': int(datetime.combine(date_obj, datetime.min.time()).timestamp() * 1000),
+            'timeIntervals.timeRange.end': int(datetime.combine(date_obj + timedelta(days=1), datetime.min.time()).timestamp() * 1000)
         }
         
-        data = await self._make_request('GET', LinkedInAPIEndpoints.PAGE_STATISTICS, params, token)
+        data = await self._get_json(LinkedInAPIEndpoints.PAGE_STATISTICS, params, token)
         
         if not data or not data.get('elements'):
             return {}
@@ -437,7 +387,7 @@ class LinkedInAPIClient:
             'edgeType': 'COMPANY_FOLLOWED_BY_MEMBER'
         }
         
-        data = await self._make_request('GET', LinkedInAPIEndpoints.FOLLOWER_STATISTICS, params, token)
+        data = await self._get_json(LinkedInAPIEndpoints.FOLLOWER_STATISTICS, params, token)
         
         if data:
             return data.get('firstDegreeSize', 0)
@@ -454,17 +404,21 @@ class LinkedInAPIClient:
         params = {
             'q': 'author',
             'author': f'urn:li:organization:{account_id}',
-            'count': min(limit, 50),  # LinkedIn max = 50
             'sortBy': 'LAST_MODIFIED'
         }
         
-        data = await self._make_request('GET', LinkedInAPIEndpoints.POSTS, params, token)
-        
-        if not data or not data.get('elements'):
-            return []
+        elements = []
+        try:
+            async for page in self.client.pages(LinkedInAPIEndpoints.POSTS, params=params,
+                                                page_size=50,  # LinkedIn max = 50
+                                                max_items=limit, headers=self._auth(token),
+                                                timeout=self.timeout):
+                elements.extend(page)
+        except (PlatformAPIError, httpx.HTTPError) as e:
+            logger.error(f"Erreur récupération posts LinkedIn pour {account_id}: {e}")
         
         posts = []
-        for element in data['elements']:
+        for element in elements:
             try:
                 created_time = element.get('createdAt', 0)
                 if created_time:
@@ -541,8 +495,26 @@ class LinkedInAPIClient:
 class LinkedInDataProcessor:
     """Processeur de données LinkedIn optimisé"""
     
-    def __init__(self, client: LinkedInAPIClient):
+    def __init__(self, client: LinkedInAPIClient, projection: Optional[FieldProjection] = None,
+                 rollups: Optional[PageStatisticsRollups] = None):
         self.client = client
+        self.projection = projection or FieldProjection()
+        self.rollups = rollups or page_rollups
+    
+    async def _fill_missing_days(self, account_id: str, start_date: date, end_date: date) -> int:
+        """Récupérer via l'API les jours absents des agrégats et les y enregistrer"""
+        
+        fetched = {}
+        for day in self.rollups.missing_days('linkedin', account_id, start_date, end_date):
+            try:
+                fetched[day] = await self.client.get_page_statistics(account_id, day)
+                await asyncio.sleep(0.1)
+            except Exception as e:
+                logger.error(f"Erreur page {account_id} pour {day}: {e}")
+        
+        if fetched:
+            logger.info(f"{len(fetched)} jours de statistiques LinkedIn récupérés pour {account_id}")
+        return self.rollups.store_days('linkedin', account_id, fetched)
     
     async def get_page_metrics(self, accounts: List, start_date: date, end_date: date, 
                               aggregation_level: str, include_sections: bool) -> List[Dict]:
@@ -550,18 +522,28 @@ class LinkedInDataProcessor:
         
         results = []
         
+        if not self.projection.wants(*PAGE_STATISTICS_COLUMNS):
+            logger.info("Aucune métrique de page demandée, statistiques de pages ignorées")
+            return results
+        
+        # Seules les colonnes demandées sont agrégées
+        summed_columns = [column for column in PAGE_STATISTICS_COLUMNS if self.projection.wants(column)]
+        
         for account in accounts:
             account_id = account.organization_id
             account_name = account.organization_name or f"LinkedIn {account_id}"
             
             logger.info(f"Traitement page LinkedIn {account_id}, agrégation: {aggregation_level}")
+            granularity = ROLLUP_GRANULARITIES.get(getattr(aggregation_level, 'value', aggregation_level))
             
             if aggregation_level == AggregationLevel.DAILY:
-                # Données quotidiennes
+                # Données quotidiennes (enregistrées au passage pour les agrégats)
+                fetched = {}
                 current_date = start_date
                 while current_date <= end_date:
                     try:
                         daily_stats = await self.client.get_page_statistics(account_id, current_date)
+                        fetched[current_date] = daily_stats
                         
                         page_data = {
                             "date": current_date.strftime("%Y-%m-%d"),
@@ -571,7 +553,7 @@ class LinkedInDataProcessor:
                             **daily_stats
                         }
                         
-                        results.append(page_data)
+                        results.append(self.projection.project_row(page_data))
                         
                         # Petite pause pour éviter le rate limiting
                         await asyncio.sleep(0.1)
@@ -580,91 +562,35 @@ class LinkedInDataProcessor:
                         logger.error(f"Erreur page {account_id} pour {current_date}: {e}")
                     
                     current_date += timedelta(days=1)
+                
+                try:
+                    self.rollups.store_days('linkedin', account_id, fetched)
+                except Exception as e:
+                    logger.warning(f"Jours non enregistrés dans les agrégats pour {account_id}: {e}")
             
-            elif aggregation_level == AggregationLevel.WEEKLY:
-                # Agrégation hebdomadaire
-                current_date = start_date
-                while current_date <= end_date:
-                    week_end = min(current_date + timedelta(days=6), end_date)
+            elif granularity or aggregation_level == AggregationLevel.CUMULATIVE:
+                # Agrégats précalculés: seuls les jours jamais collectés passent par l'API
+                try:
+                    await self._fill_missing_days(account_id, start_date, end_date)
                     
-                    try:
-                        # Initialiser les totaux
-                        week_totals = {
-                            'total_page_views': 0,
-                            'unique_page_views': 0,
-                            'desktop_page_views': 0,
-                            'mobile_page_views': 0,
-                            'overview_page_views': 0,
-                            'careers_page_views': 0,
-                            'about_page_views': 0,
-                            'people_page_views': 0,
-                            'jobs_page_views': 0,
-                            'life_at_page_views': 0
-                        }
-                        
-                        # Sommer les données de la semaine
-                        day = current_date
-                        while day <= week_end:
-                            daily_stats = await self.client.get_page_statistics(account_id, day)
-                            for metric, value in daily_stats.items():
-                                if metric in week_totals:
-                                    week_totals[metric] += value
-                            await asyncio.sleep(0.1)
-                            day += timedelta(days=1)
-                        
+                    if aggregation_level == AggregationLevel.CUMULATIVE:
+                        periods = [(end_date, self.rollups.load_cumulative('linkedin', account_id, start_date, end_date))]
+                    else:
+                        periods = self.rollups.load_periods('linkedin', account_id, granularity, start_date, end_date)
+                    
+                    for period_date, totals in periods:
                         page_data = {
-                            "date": current_date.strftime("%Y-%m-%d"),
+                            "date": period_date.strftime("%Y-%m-%d"),
                             "account_name": account_name,
                             "account_id": account_id,
                             "platform": "linkedin",
-                            **week_totals
+                            **{column: totals.get(column, 0) for column in summed_columns}
                         }
                         
-                        results.append(page_data)
-                        
-                    except Exception as e:
-                        logger.error(f"Erreur semaine {current_date} pour {account_id}: {e}")
-                    
-                    current_date = week_end + timedelta(days=1)
-            
-            elif aggregation_level == AggregationLevel.CUMULATIVE:
-                # Données cumulées sur toute la période
-                try:
-                    cumul_totals = {
-                        'total_page_views': 0,
-                        'unique_page_views': 0,
-                        'desktop_page_views': 0,
-                        'mobile_page_views': 0,
-                        'overview_page_views': 0,
-                        'careers_page_views': 0,
-                        'about_page_views': 0,
-                        'people_page_views': 0,
-                        'jobs_page_views': 0,
-                        'life_at_page_views': 0
-                    }
-                    
-                    # Sommer toute la période
-                    current_date = start_date
-                    while current_date <= end_date:
-                        daily_stats = await self.client.get_page_statistics(account_id, current_date)
-                        for metric, value in daily_stats.items():
-                            if metric in cumul_totals:
-                                cumul_totals[metric] += value
-                        await asyncio.sleep(0.1)
-                        current_date += timedelta(days=1)
-                    
-                    page_data = {
-                        "date": end_date.strftime("%Y-%m-%d"),
-                        "account_name": account_name,
-                        "account_id": account_id,
-                        "platform": "linkedin",
-                        **cumul_totals
-                    }
-                    
-                    results.append(page_data)
+                        results.append(self.projection.project_row(page_data))
                     
                 except Exception as e:
-                    logger.error(f"Erreur cumulé pour {account_id}: {e}")
+                    logger.error(f"Erreur agrégation {aggregation_level} pour {account_id}: {e}")
         
         return results
     
@@ -674,6 +600,11 @@ class LinkedInDataProcessor:
         
         results = []
         
+        want_stats = self.projection.wants(*POST_STATISTICS_COLUMNS)
+        if not want_stats and not self.projection.wants(*POST_DIMENSION_COLUMNS):
+            logger.info("Aucune colonne de post demandée, posts ignorés")
+            return results
+        
         for account in accounts:
             account_id = account.organization_id
             account_name = account.organization_name or f"LinkedIn {account_id}"
@@ -683,7 +614,7 @@ class LinkedInDataProcessor:
                 
                 for post in posts:
                     try:
-                        post_stats = await self.client.get_post_statistics(post['id'], account_id)
+                        post_stats = await self.client.get_post_statistics(post['id'], account_id) if want_stats else {}
                         
                         post_data = {
                             "post_id": post['id'],
@@ -697,7 +628,7 @@ class LinkedInDataProcessor:
                             **post_stats
                         }
                         
-                        results.append(post_data)
+                        results.append(self.projection.project_row(post_data))
                         await asyncio.sleep(0.1)
                         
                     except Exception as e:
@@ -713,6 +644,10 @@ class LinkedInDataProcessor:
         
         results = []
         
+        if not self.projection.wants(*FOLLOWER_COLUMNS):
+            logger.info("Aucune métrique de followers demandée, networkSizes ignoré")
+            return results
+        
         for account in accounts:
             account_id = account.organization_id
             account_name = account.organization_name or f"LinkedIn {account_id}"
@@ -730,7 +665,7 @@ class LinkedInDataProcessor:
                     "paid_follower_gain": 0
                 }
                 
-                results.append(follower_data)
+                results.append(self.projection.project_row(follower_data))
                 
             except Exception as e:
                 logger.error(f"Erreur followers {account_id}: {e}")
@@ -741,8 +676,7 @@ class LinkedInDataProcessor:
 # ENDPOINT PRINCIPAL
 # ========================================
 
-@router.post("/complete-metrics")
-@rate_limit_linkedin(calls_per_minute=50)
+@router.post("/complete-metrics", dependencies=[Depends(rate_limit(50, scope="linkedin_complete_metrics"))])
 @handle_linkedin_errors
 async def get_linkedin_complete_metrics(request: Request):
     """Endpoint principal pour le connecteur LinkedIn Looker Studio"""
@@ -830,6 +764,9 @@ async def get_linkedin_complete_metrics(request: Request):
                 is_active=True
             )]
         
+        # Colonnes demandées par le rapport (toutes si `fields` est absent)
+        projection = FieldProjection.from_request(request_data.get("fields"))
+        
         # Calcul des dates
         if linkedin_request.start_date and linkedin_request.end_date:
             start_date = datetime.strptime(linkedin_request.start_date, '%Y-%m-%d').date()
@@ -859,112 +796,138 @@ async def get_linkedin_complete_metrics(request: Request):
                 }
             )
         
-        # Initialisation du processeur de données
-        linkedin_client = LinkedInAPIClient()
-        processor = LinkedInDataProcessor(linkedin_client)
-        
-        # Structure de données pour la réponse
-        linkedin_data = {
-            "page_metrics": [],
-            "post_metrics": [],
-            "follower_metrics": [],
-            "breakdown_data": []
-        }
+        async def compute_response():
+            # Initialisation du processeur de données
+            linkedin_client = LinkedInAPIClient()
+            processor = LinkedInDataProcessor(linkedin_client, projection)
+        
+            # Structure de données pour la réponse
+            linkedin_data = {
+                "page_metrics": [],
+                "post_metrics": [],
+                "follower_metrics": [],
+                "breakdown_data": []
+            }
         
-        warnings = []
+            warnings = []
         
-        # Récupération des métriques de pages
-        if linkedin_request.metrics_scope in [MetricsScope.ALL, MetricsScope.PAGES]:
-            try:
-                page_metrics = await processor.get_page_metrics(
-                    linkedin_accounts,
-                    start_date,
-                    end_date,
-                    linkedin_request.aggregation_level.value,
-                    linkedin_request.include_page_sections
-                )
-                linkedin_data["page_metrics"] = page_metrics
-                logger.info(f"Récupéré {len(page_metrics)} métriques de pages")
+            # Récupération des métriques de pages
+            if linkedin_request.metrics_scope in [MetricsScope.ALL, MetricsScope.PAGES]:
+                try:
+                    page_metrics = await processor.get_page_metrics(
+                        linkedin_accounts,
+                        start_date,
+                        end_date,
+                        linkedin_request.aggregation_level.value,
+                        linkedin_request.include_page_sections
+                    )
+                    linkedin_data["page_metrics"] = page_metrics
+                    logger.info(f"Récupéré {len(page_metrics)} métriques de pages")
                 
-            except Exception as e:
-                error_msg = f"Erreur récupération métriques pages: {str(e)}"
-                logger.error(error_msg)
-                warnings.append(error_msg)
+                except Exception as e:
+                    error_msg = f"Erreur récupération métriques pages: {str(e)}"
+                    logger.error(error_msg)
+                    warnings.append(error_msg)
         
-        # Récupération des métriques de posts
-        if (linkedin_request.metrics_scope in [MetricsScope.ALL, MetricsScope.POSTS] and 
-            linkedin_request.include_post_details):
-            try:
-                post_metrics = await processor.get_post_metrics(
-                    linkedin_accounts,
-                    start_date,
-                    end_date,
-                    linkedin_request.include_reactions_detail
-                )
-                linkedin_data["post_metrics"] = post_metrics
-                logger.info(f"Récupéré {len(post_metrics)} métriques de posts")
+            # Récupération des métriques de posts
+            if (linkedin_request.metrics_scope in [MetricsScope.ALL, MetricsScope.POSTS] and 
+                linkedin_request.include_post_details):
+                try:
+                    post_metrics = await processor.get_post_metrics(
+                        linkedin_accounts,
+                        start_date,
+                        end_date,
+                        linkedin_request.include_reactions_detail
+                    )
+                    linkedin_data["post_metrics"] = post_metrics
+                    logger.info(f"Récupéré {len(post_metrics)} métriques de posts")
                 
-            except Exception as e:
-                error_msg = f"Erreur récupération métriques posts: {str(e)}"
-                logger.error(error_msg)
-                warnings.append(error_msg)
+                except Exception as e:
+                    error_msg = f"Erreur récupération métriques posts: {str(e)}"
+                    logger.error(error_msg)
+                    warnings.append(error_msg)
         
-        # Récupération des métriques de followers
-        if linkedin_request.metrics_scope in [MetricsScope.ALL, MetricsScope.FOLLOWERS]:
-            try:
-                follower_metrics = await processor.get_follower_metrics(
-                    linkedin_accounts,
-                    end_date
-                )
-                linkedin_data["follower_metrics"] = follower_metrics
-                logger.info(f"Récupéré {len(follower_metrics)} métriques de followers")
+            # Récupération des métriques de followers
+            if linkedin_request.metrics_scope in [MetricsScope.ALL, MetricsScope.FOLLOWERS]:
+                try:
+                    follower_metrics = await processor.get_follower_metrics(
+                        linkedin_accounts,
+                        end_date
+                    )
+                    linkedin_data["follower_metrics"] = follower_metrics
+                    logger.info(f"Récupéré {len(follower_metrics)} métriques de followers")
                 
-            except Exception as e:
-                error_msg = f"Erreur récupération métriques followers: {str(e)}"
-                logger.error(error_msg)
-                warnings.append(error_msg)
-        
-        # Génération de breakdown démographique factice si demandé
-        if (linkedin_request.metrics_scope in [MetricsScope.ALL, MetricsScope.BREAKDOWNS] and 
-            linkedin_request.include_demographic_breakdown):
+                except Exception as e:
+                    error_msg = f"Erreur récupération métriques followers: {str(e)}"
+                    logger.error(error_msg)
+                    warnings.append(error_msg)
+        
+            # Génération de breakdown démographique factice si demandé
+            if (linkedin_request.metrics_scope in [MetricsScope.ALL, MetricsScope.BREAKDOWNS] and 
+                linkedin_request.include_demographic_breakdown and
+                projection.wants(*BREAKDOWN_COLUMNS)):
             
-            breakdown_types = ['country', 'industry', 'function', 'seniority', 'company_size']
-            for breakdown_type in breakdown_types:
-                linkedin_data["breakdown_data"].append({
-                    "date": end_date.strftime("%Y-%m-%d"),
-                    "breakdown_type": breakdown_type,
-                    "breakdown_category": f"Sample {breakdown_type}",
-                    "breakdown_value": "Sample Value",
-                    "followers_count": 0
-                })
-        
-        # Calcul des totaux
-        total_records = sum(len(category) for category in linkedin_data.values() if isinstance(category, list))
-        execution_time = time.time() - start_time
+                breakdown_types = ['country', 'industry', 'function', 'seniority', 'company_size']
+                for breakdown_type in breakdown_types:
+                    linkedin_data["breakdown_data"].append(projection.project_row({
+                        "date": end_date.strftime("%Y-%m-%d"),
+                        "breakdown_type": breakdown_type,
+                        "breakdown_category": f"Sample {breakdown_type}",
+                        "breakdown_value": "Sample Value",
+                        "followers_count": 0
+                    }))
+        
+            # Calcul des totaux
+            total_records = sum(len(category) for category in linkedin_data.values() if isinstance(category, list))
+            execution_time = time.time() - start_time
+        
+            # Construction de la réponse finale
+            response_data = {
+                "success": True,
+                "data": {
+                    "linkedin_data": linkedin_data
+                },
+                "total_records": total_records,
+                "generated_at": datetime.now().isoformat(),
+                "user_email": user_email,
+                "date_range": {
+                    "start": start_date.isoformat(),
+                    "end": end_date.isoformat(),
+                    "days": (end_date - start_date).days + 1
+                },
+                "request_params": {**linkedin_request.dict(), "fields": projection.cache_key()},
+                "execution_time": round(execution_time, 3),
+                "warnings": warnings,
+                "errors": []
+            }
         
-        # Construction de la réponse finale
-        response_data = {
-            "success": True,
-            "data": {
-                "linkedin_data": linkedin_data
-            },
-            "total_records": total_records,
-            "generated_at": datetime.now().isoformat(),
-            "user_email": user_email,
-            "date_range": {
-                "start": start_date.isoformat(),
-                "end": end_date.isoformat(),
-                "days": (end_date - start_date).days + 1
-            },
-            "request_params": linkedin_request.dict(),
-            "execution_time": round(execution_time, 3),
-            "warnings": warnings,
-            "errors": []
-        }
+            logger.info(f"LinkedIn complete-metrics terminé: {total_records} enregistrements, {execution_time:.3f}s")
         
-        logger.info(f"LinkedIn complete-metrics terminé: {total_records} enregistrements, {execution_time:.3f}s")
+            return 200, response_data
+        
+        # Les comptes factices de test ne sont jamais mis en cache
+        if looker_response_cache is None or user is None or not getattr(linkedin_accounts[0], 'id', None):
+            status_code, content = await compute_response()
+            return JSONResponse(status_code=status_code, content=content)
+        
+        account_tags = [("linkedin", str(account.organization_id)) for account in linkedin_accounts]
+        response_cache_key = looker_response_cache.make_key(
+            "linkedin/complete-metrics", user.id, account_tags, start_date, end_date,
+            fields=projection.cache_key(),
+            aggregation=linkedin_request.aggregation_level.value,
+            params=linkedin_request.dict()
+        )
+        
+        # Réponses partielles (warnings) non mises en cache pour retenter au prochain chargement
+        status_code, content, cache_state = await looker_response_cache.get_or_compute(
+            response_cache_key, compute_response, account_tags, user.id,
+            cacheable=lambda code, payload: code == 200 and not payload.get("warnings")
+        )
+        if cache_state != "MISS":
+            logger.info(f"LinkedIn complete-metrics servi depuis le cache ({cache_state}) pour {user_email}")
         
-        return JSONResponse(status_code=200, content=response_data)
+        return JSONResponse(status_code=status_code, content=stamp_served(content, start_time),
+                            headers={"X-Cache": cache_state})
         
     except HTTPException:
         # Re-raise HTTPException pour préserver le code de statut
@@ -23,6 +23,8 @@ from .user_manager import user_manager, UserManager
 from ..database.connection import db_manager
 from ..database.models import User, SocialAccessToken, FacebookAccount
 from ..utils.config import get_env_var
+from ..utils.state_store import create_state_store
+from ..utils.tracing import traced
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
@@ -111,8 +113,8 @@ class FacebookOAuthManager:
         # URLs de redirection
         self.redirect_uri = get_env_var('FACEBOOK_REDIRECT_URI', 'http://localhost:8501/auth/facebook/callback')
         
-        # Cache des états OAuth (en production, utiliser Redis)
-        self._oauth_states = {}
+        # États OAuth (partagés entre workers, expiration 10 minutes)
+        self._oauth_states = create_state_store('facebook_oauth')
         
         # Codes d'erreur Facebook spécifiques
         self.facebook_error_codes = {
@@ -201,13 +203,7 @@ class FacebookOAuthManager:
         state_hash = hashlib.sha256(state_json.encode()).hexdigest()[:16]
         
         # Stocker l'état avec TTL de 10 minutes
-        self._oauth_states[state_hash] = {
-            'data': state_data,
-            'expires_at': time.time() + 600  # 10 minutes
-        }
-        
-        # Nettoyer les états expirés
-        self._cleanup_expired_states()
+        self._oauth_states.put(state_hash, state_data, ttl=600)
         
         logger.debug(f"🔑 État OAuth Facebook généré: {state_hash}")
         return state_hash
@@ -215,38 +211,19 @@ class FacebookOAuthManager:
     def validate_oauth_state(self, state: str) -> Optional[Dict]:
         """Valider un état OAuth Facebook"""
         
-        if not state or state not in self._oauth_states:
-            logger.warning(f"⚠️  État OAuth Facebook invalide ou inexistant: {state}")
+        # Lecture et suppression atomiques: un état ne sert qu'une fois
+        try:
+            state_data = self._oauth_states.pop(state) if state else None
+        except Exception as e:
+            logger.error(f"❌ Stockage des états OAuth indisponible: {e}")
             return None
         
-        state_info = self._oauth_states[state]
-        
-        # Vérifier l'expiration
-        if time.time() > state_info['expires_at']:
-            logger.warning(f"⚠️  État OAuth Facebook expiré: {state}")
-            del self._oauth_states[state]
+        if state_data is None:
+            logger.warning(f"⚠️  État OAuth Facebook invalide, expiré ou déjà utilisé: {state}")
             return None
         
-        # Supprimer l'état utilisé
-        del self._oauth_states[state]
-        
         logger.debug(f"✅ État OAuth Facebook validé: {state}")
-        return state_info['data']
-    
-    def _cleanup_expired_states(self):
-        """Nettoyer les états OAuth expirés"""
-        
-        current_time = time.time()
-        expired_states = [
-            state for state, info in self._oauth_states.items()
-            if current_time > info['expires_at']
-        ]
-        
-        for state in expired_states:
-            del self._oauth_states[state]
-        
-        if expired_states:
-            logger.debug(f"🧹 {len(expired_states)} états OAuth Facebook expirés nettoyés")
+        return state_data
     
     def get_authorization_url(self, user_id: int = None, custom_scopes: List[str] = None,
                              custom_redirect_uri: str = None) -> Tuple[str, str]:
@@ -730,6 +707,7 @@ class FacebookOAuthManager:
             logger.error(f"❌ Erreur lors du stockage des tokens Facebook: {e}")
             return False
     
+    @traced('token')
     def get_user_token(self, user_id: int) -> Optional[SocialAccessToken]:
         """Récupérer le token Facebook actif d'un utilisateur"""
         
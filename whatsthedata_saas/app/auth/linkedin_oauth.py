@@ -20,9 +20,12 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from .user_manager import user_manager, UserManager
+from .token_cache import TokenCache
 from ..database.connection import db_manager
 from ..database.models import User, LinkedinTokens, LinkedinAccount
 from ..utils.config import get_env_var
+from ..utils.state_store import create_state_store
+from ..utils.tracing import traced
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
@@ -99,8 +102,11 @@ class LinkedinOAuthManager:
         # URLs de redirection
         self.base_redirect_uri = get_env_var('LINKEDIN_REDIRECT_URI', 'http://localhost:8501/auth/linkedin/callback')
         
-        # Cache des états OAuth (en production, utiliser Redis)
-        self._oauth_states = {}
+        # États OAuth (partagés entre workers, expiration 10 minutes)
+        self._oauth_states = create_state_store('linkedin_oauth')
+        
+        # Cache local des tokens actifs: clé (user_id, "linkedin", type d'app)
+        self._token_cache = TokenCache()
         
     def _create_session(self) -> requests.Session:
         """Créer une session HTTP avec retry automatique"""
@@ -206,13 +212,7 @@ class LinkedinOAuthManager:
         state_hash = hashlib.sha256(state_json.encode()).hexdigest()[:16]
         
         # Stocker l'état (TTL de 10 minutes)
-        self._oauth_states[state_hash] = {
-            'data': state_data,
-            'expires_at': time.time() + 600  # 10 minutes
-        }
-        
-        # Nettoyer les états expirés
-        self._cleanup_expired_states()
+        self._oauth_states.put(state_hash, state_data, ttl=600)
         
         logger.debug(f"🔑 État OAuth généré: {state_hash}")
         return state_hash
@@ -220,38 +220,19 @@ class LinkedinOAuthManager:
     def validate_oauth_state(self, state: str) -> Optional[Dict]:
         """Valider un état OAuth"""
         
-        if not state or state not in self._oauth_states:
-            logger.warning(f"⚠️  État OAuth invalide ou inexistant: {state}")
+        # Lecture et suppression atomiques: un état ne sert qu'une fois
+        try:
+            state_data = self._oauth_states.pop(state) if state else None
+        except Exception as e:
+            logger.error(f"❌ Stockage des états OAuth indisponible: {e}")
             return None
         
-        state_info = self._oauth_states[state]
-        
-        # Vérifier l'expiration
-        if time.time() > state_info['expires_at']:
-            logger.warning(f"⚠️  État OAuth expiré: {state}")
-            del self._oauth_states[state]
+        if state_data is None:
+            logger.warning(f"⚠️  État OAuth invalide, expiré ou déjà utilisé: {state}")
             return None
         
-        # Supprimer l'état utilisé
-        del self._oauth_states[state]
-        
         logger.debug(f"✅ État OAuth validé: {state}")
-        return state_info['data']
-    
-    def _cleanup_expired_states(self):
-        """Nettoyer les états OAuth expirés"""
-        
-        current_time = time.time()
-        expired_states = [
-            state for state, info in self._oauth_states.items()
-            if current_time > info['expires_at']
-        ]
-        
-        for state in expired_states:
-            del self._oauth_states[state]
-        
-        if expired_states:
-            logger.debug(f"🧹 {len(expired_states)} états OAuth expirés nettoyés")
+        return state_data
     
     def get_authorization_url(self, app_type: LinkedinAppType, user_id: int = None, 
                              custom_scopes: List[str] = None) -> Tuple[str, str]:
@@ -630,6 +611,8 @@ class LinkedinOAuthManager:
                 session.add(new_token)
                 session.commit()
                 
+                self._token_cache.invalidate((user_id, "linkedin", app_type))
+                
                 logger.info(f"✅ Tokens LinkedIn stockés pour user {user_id} ({app_type})")
                 return True
                 
@@ -637,41 +620,50 @@ class LinkedinOAuthManager:
             logger.error(f"❌ Erreur lors du stockage des tokens: {e}")
             return False
     
+    @traced('token')
     def get_user_token(self, user_id: int, app_type: LinkedinAppType) -> Optional[LinkedinTokens]:
-        """Récupérer le token actif d'un utilisateur pour une app"""
+        """Récupérer le token actif d'un utilisateur pour une app (sans requête si déjà en cache)"""
         
         try:
-            with db_manager.get_session() as session:
-                token = session.query(LinkedinTokens).filter(
-                    LinkedinTokens.user_id == user_id,
-                    LinkedinTokens.application_type == app_type.value,
-                    LinkedinTokens.is_active == True
-                ).first()
-                
-                # Vérifier l'expiration
-                if token and token.expires_at and token.expires_at <= datetime.utcnow():
-                    logger.warning(f"⚠️  Token expiré pour user {user_id} ({app_type.value})")
-                    
-                    # Essayer de rafraîchir si refresh_token disponible
-                    if token.refresh_token:
-                        try:
-                            new_token_info = self.refresh_access_token(token.refresh_token, app_type)
-                            new_token_info['app_type'] = app_type.value
-                            
-                            if self.store_user_tokens(user_id, new_token_info):
-                                # Récupérer le nouveau token
-                                return self.get_user_token(user_id, app_type)
-                        except Exception as e:
-                            logger.error(f"❌ Échec du rafraîchissement automatique: {e}")
-                    
-                    return None
-                
-                return token
+            return self._token_cache.get(
+                (user_id, "linkedin", app_type.value),
+                loader=lambda: self._load_user_token(user_id, app_type),
+                refresher=lambda token: self._refresh_user_token(user_id, app_type, token)
+            )
                 
         except Exception as e:
             logger.error(f"❌ Erreur lors de la récupération du token: {e}")
             return None
     
+    def _load_user_token(self, user_id: int, app_type: LinkedinAppType) -> Optional[LinkedinTokens]:
+        """Lire le token actif en base"""
+        
+        with db_manager.get_session() as session:
+            return session.query(LinkedinTokens).filter(
+                LinkedinTokens.user_id == user_id,
+                LinkedinTokens.application_type == app_type.value,
+                LinkedinTokens.is_active == True
+            ).first()
+    
+    def _refresh_user_token(self, user_id: int, app_type: LinkedinAppType,
+                            token: LinkedinTokens) -> Optional[LinkedinTokens]:
+        """Rafraîchir un token proche de l'expiration (appelé une seule fois par le cache)"""
+        
+        if not token.refresh_token:
+            logger.warning(f"⚠️  Token bientôt expiré sans refresh_token pour user {user_id} ({app_type.value})")
+            return None
+        
+        try:
+            new_token_info = self.refresh_access_token(token.refresh_token, app_type)
+            new_token_info['app_type'] = app_type.value
+            
+            if self.store_user_tokens(user_id, new_token_info):
+                return self._load_user_token(user_id, app_type)
+        except Exception as e:
+            logger.error(f"❌ Échec du rafraîchissement automatique: {e}")
+        
+        return None
+    
     def connect_linkedin_account(self, user_id: int, code: str, state: str, 
                                 app_type: LinkedinAppType) -> Dict[str, Any]:
         """Processus complet de connexion d'un compte LinkedIn"""
@@ -774,6 +766,11 @@ class LinkedinOAuthManager:
                 
                 session.commit()
                 
+                if app_type:
+                    self._token_cache.invalidate((user_id, "linkedin", app_type.value))
+                else:
+                    self._token_cache.invalidate_user(user_id)
+                
                 app_desc = app_type.value if app_type else "tous les types"
                 logger.info(f"✅ Comptes LinkedIn déconnectés pour user {user_id} ({app_desc})")
                 return True
@@ -0,0 +1,238 @@
+"""
+Cache local des tokens d'accès (clé: utilisateur, plateforme, compte)
+La base reste le stockage durable: une lecture au premier accès, puis aucune requête
+tant que le token est frais. Le rafraîchissement est anticipé avant l'expiration et
+les rafraîchissements concurrents d'un même token sont fusionnés en un seul.
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from ..utils.config import get_env_int
+
+logger = logging.getLogger(__name__)
+
+# Marge avant expiration à partir de laquelle on rafraîchit (secondes)
+REFRESH_MARGIN = get_env_int('TOKEN_REFRESH_MARGIN', 300)
+# Durée max sans relire la base (révocation/rotation faite par un autre processus)
+MAX_AGE = get_env_int('TOKEN_CACHE_MAX_AGE', 900)
+# Durée de mémorisation d'une absence de token
+NEGATIVE_TTL = 60
+# Délai avant de retenter un rafraîchissement échoué
+RETRY_DELAY = 30
+
+
+@dataclass
+class _CachedToken:
+    value: Any
+    loaded_at: float   # horloge monotone
+    recheck_at: float
+
+
+class TokenCache:
+    """Cache de tokens thread-safe, utilisable en synchrone (get) ou en asynchrone (aget)"""
+
+    def __init__(self, now_func: Callable[[], datetime] = datetime.utcnow,
+                 refresh_margin: int = REFRESH_MARGIN, max_age: int = MAX_AGE):
+        self.now_func = now_func
+        self.refresh_margin = refresh_margin
+        self.max_age = max_age
+
+        self._entries: Dict[Hashable, _CachedToken] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._async_locks: Dict[Any, asyncio.Lock] = {}
+        self._guard = threading.Lock()
+
+        self.stats = {'hits': 0, 'loads': 0, 'refreshes': 0, 'refresh_failures': 0}
+
+    # ========================================
+    # ÉTAT DES TOKENS
+    # ========================================
+
+    @staticmethod
+    def _expires_at(value: Any) -> Optional[datetime]:
+        return getattr(value, 'expires_at', None)
+
+    def _seconds_left(self, value: Any) -> Optional[float]:
+        expires_at = self._expires_at(value)
+        if expires_at is None:
+            return None
+        return (expires_at - self.now_func()).total_seconds()
+
+    def _needs_refresh(self, value: Any) -> bool:
+        left = self._seconds_left(value)
+        return left is not None and left <= self.refresh_margin
+
+    def _is_expired(self, value: Any) -> bool:
+        left = self._seconds_left(value)
+        return left is not None and left <= 0
+
+    def _lookup(self, key: Hashable):
+        """Retourne (entrée, fraîche, utilisable sans attendre)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False, False
+        fresh = time.monotonic() < entry.recheck_at
+        usable = entry.value is not None and not self._is_expired(entry.value)
+        return entry, fresh and (usable or entry.value is None), usable
+
+    def _store(self, key: Hashable, value: Any) -> Any:
+        now = time.monotonic()
+        if value is None:
+            recheck_at = now + NEGATIVE_TTL
+        else:
+            left = self._seconds_left(value)
+            if left is None:
+                recheck_at = now + self.max_age
+            else:
+                until_refresh = left - self.refresh_margin
+                if until_refresh <= 0:
+                    # Rafraîchissement échoué: on réessaiera plus tard, sans dépasser l'expiration
+                    until_refresh = min(RETRY_DELAY, max(left, 0))
+                recheck_at = now + min(self.max_age, until_refresh)
+
+        self._entries[key] = _CachedToken(value, now, recheck_at)
+        return value
+
+    def _reusable(self, entry: Optional[_CachedToken]) -> bool:
+        """L'entrée peut éviter une relecture en base (seul le rafraîchissement est dû)"""
+        return (entry is not None and entry.value is not None
+                and time.monotonic() - entry.loaded_at < self.max_age)
+
+    # ========================================
+    # ACCÈS SYNCHRONE
+    # ========================================
+
+    def get(self, key: Hashable, loader: Callable[[], Any],
+            refresher: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        Retourner le token en cache, sinon le charger (loader = lecture en base)
+        et le rafraîchir (refresher) s'il approche de l'expiration
+        """
+        entry, fresh, usable = self._lookup(key)
+        if fresh:
+            self.stats['hits'] += 1
+            return entry.value
+
+        lock = self._lock_for(key)
+        if usable:
+            # Token encore valide: un seul appelant rafraîchit, les autres l'utilisent
+            if not lock.acquire(blocking=False):
+                self.stats['hits'] += 1
+                return entry.value
+        else:
+            lock.acquire()
+
+        try:
+            entry, fresh, _ = self._lookup(key)
+            if fresh:
+                self.stats['hits'] += 1
+                return entry.value
+
+            value = entry.value if self._reusable(entry) else self._load(loader)
+            if value is not None and refresher and self._needs_refresh(value):
+                value = self._after_refresh(value, refresher(value))
+            if value is not None and self._is_expired(value):
+                value = None
+            return self._store(key, value)
+        finally:
+            lock.release()
+
+    # ========================================
+    # ACCÈS ASYNCHRONE
+    # ========================================
+
+    async def aget(self, key: Hashable, loader: Callable[[], Any],
+                   refresher: Optional[Callable[[Any], Any]] = None) -> Any:
+        """Équivalent asynchrone de get (loader/refresher synchrones ou coroutines)"""
+        entry, fresh, usable = self._lookup(key)
+        if fresh:
+            self.stats['hits'] += 1
+            return entry.value
+
+        lock = self._async_lock_for(key)
+        if usable and lock.locked():
+            self.stats['hits'] += 1
+            return entry.value
+
+        async with lock:
+            entry, fresh, _ = self._lookup(key)
+            if fresh:
+                self.stats['hits'] += 1
+                return entry.value
+
+            if self._reusable(entry):
+                value = entry.value
+            else:
+                self.stats['loads'] += 1
+                value = await _maybe_await(loader())
+            if value is not None and refresher and self._needs_refresh(value):
+                value = self._after_refresh(value, await _maybe_await(refresher(value)))
+            if value is not None and self._is_expired(value):
+                value = None
+            return self._store(key, value)
+
+    # ========================================
+    # INVALIDATION
+    # ========================================
+
+    def put(self, key: Hashable, value: Any):
+        """Enregistrer un token tout juste obtenu (échange de code, rafraîchissement externe)"""
+        self._store(key, value)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id: Any):
+        """Oublier tous les tokens d'un utilisateur (déconnexion, révocation)"""
+        for key in [k for k in list(self._entries) if isinstance(k, tuple) and k and k[0] == user_id]:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'size': len(self._entries)}
+
+    # ========================================
+    # INTERNES
+    # ========================================
+
+    def _load(self, loader: Callable[[], Any]) -> Any:
+        self.stats['loads'] += 1
+        return loader()
+
+    def _after_refresh(self, current: Any, refreshed: Any) -> Any:
+        if refreshed is not None:
+            self.stats['refreshes'] += 1
+            return refreshed
+        self.stats['refresh_failures'] += 1
+        return current
+
+    def _lock_for(self, key: Hashable) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _async_lock_for(self, key: Hashable) -> asyncio.Lock:
+        # Un verrou asyncio est lié à sa boucle: un par (clé, boucle)
+        lock_key = (key, id(asyncio.get_running_loop()))
+        with self._guard:
+            lock = self._async_locks.get(lock_key)
+            if lock is None:
+                lock = self._async_locks[lock_key] = asyncio.Lock()
+            return lock
+
+
+async def _maybe_await(result: Any) -> Any:
+    if inspect.isawaitable(result):
+        return await result
+    return result
@@ -24,6 +24,8 @@ from ..database.models import (
     LookerTemplate, UserTemplateAccess
 )
 from ..utils.config import get_env_var
+from ..utils.response_cache import looker_response_cache
+from ..utils.tracing import traced
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
@@ -368,6 +370,7 @@ class UserManager:
             logger.error(f"❌ Erreur lors du stockage du token: {e}")
             return False
     
+    @traced('token')
     def get_social_token(self, user_id: int, platform: str) -> Optional[SocialAccessToken]:
         """Récupérer le token social actif d'un utilisateur"""
         
@@ -440,6 +443,8 @@ class UserManager:
                     existing.is_active = True
                     existing.page_name = page_name or existing.page_name
                     session.commit()
+                    # Comptes de l'utilisateur mémorisés par le cache Looker
+                    looker_response_cache.invalidate_user(user_id)
                     logger.info(f"✅ Compte Facebook réactivé: {page_id}")
                     return existing
                 
@@ -453,6 +458,7 @@ class UserManager:
                 
                 session.add(fb_account)
                 session.commit()
+                looker_response_cache.invalidate_user(user_id)
                 
                 logger.info(f"✅ Compte Facebook ajouté: {page_id} pour user {user_id}")
                 return fb_account
@@ -490,6 +496,8 @@ class UserManager:
                     existing.is_active = True
                     existing.organization_name = organization_name or existing.organization_name
                     session.commit()
+                    # Comptes de l'utilisateur mémorisés par le cache Looker
+                    looker_response_cache.invalidate_user(user_id)
                     logger.info(f"✅ Compte LinkedIn réactivé: {organization_id}")
                     return existing
                 
@@ -503,6 +511,7 @@ class UserManager:
                 
                 session.add(li_account)
                 session.commit()
+                looker_response_cache.invalidate_user(user_id)
                 
                 logger.info(f"✅ Compte LinkedIn ajouté: {organization_id} pour user {user_id}")
                 return li_account
@@ -0,0 +1,241 @@
+"""
+Stockage des segmentations (followers par pays, séniorité, secteur, fonction, taille,
+démographie des fans) en snapshots à changement supprimé
+Chaque collecte calcule l'empreinte de la segmentation complète: identique au dernier
+snapshot, rien n'est écrit; sinon seul le delta des tranches modifiées par rapport à la
+dernière image complète (keyframe) est écrit. Une image complète est reprise
+périodiquement ou quand le delta devient trop gros, si bien que la segmentation d'un jour
+se reconstitue toujours avec au plus deux lignes (keyframe + delta).
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, true
+
+from ..database.connection import db_manager
+from ..database.models import BreakdownSnapshot
+from ..utils.config import get_env_int, get_env_var
+
+logger = logging.getLogger(__name__)
+
+KEYFRAME_INTERVAL_DAYS = get_env_int('BREAKDOWN_KEYFRAME_INTERVAL_DAYS', 30)
+# Au-delà de cette part de tranches modifiées, une image complète coûte autant qu'un delta
+MAX_DELTA_RATIO = float(get_env_var('BREAKDOWN_MAX_DELTA_RATIO', '0.5'))
+
+Buckets = Dict[str, Any]
+
+_MISSING = object()
+
+
+def breakdown_digest(buckets: Buckets) -> str:
+    """Empreinte indépendante de l'ordre des tranches"""
+    return hashlib.sha256(json.dumps(buckets, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def diff_buckets(base: Buckets, current: Buckets) -> Buckets:
+    """Tranches ajoutées ou modifiées; None pour une tranche disparue"""
+    delta = {key: value for key, value in current.items() if base.get(key, _MISSING) != value}
+    delta.update({key: None for key in base.keys() - current.keys()})
+    return delta
+
+
+def apply_delta(base: Buckets, delta: Buckets) -> Buckets:
+    buckets = dict(base)
+    for key, value in delta.items():
+        if value is None:
+            buckets.pop(key, None)
+        else:
+            buckets[key] = value
+    return buckets
+
+
+class BreakdownSnapshotStore:
+    """Écriture et relecture des snapshots de segmentation (table breakdown_snapshots)"""
+
+    def __init__(self, keyframe_interval_days: int = KEYFRAME_INTERVAL_DAYS,
+                 max_delta_ratio: float = MAX_DELTA_RATIO):
+        self.keyframe_interval_days = keyframe_interval_days
+        self.max_delta_ratio = max_delta_ratio
+        self._lock = threading.Lock()
+        self.stats = {'unchanged': 0, 'deltas': 0, 'keyframes': 0, 'buckets_written': 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    # ========================================
+    # ÉCRITURE
+    # ========================================
+
+    def store(self, platform: str, account_id: str, breakdown_type: str, buckets: Buckets,
+              snapshot_date: Optional[date] = None) -> int:
+        """
+        Enregistrer la segmentation du jour. Retourne le nombre de tranches écrites
+        (0 si la segmentation n'a pas changé depuis le dernier snapshot).
+        """
+        snapshot_date = snapshot_date or date.today()
+        digest = breakdown_digest(buckets)
+
+        with db_manager.get_session() as session:
+            series = self._series_filter(platform, account_id, breakdown_type)
+            head = session.query(BreakdownSnapshot).filter(
+                series, BreakdownSnapshot.snapshot_date <= snapshot_date
+            ).order_by(BreakdownSnapshot.snapshot_date.desc()).first()
+
+            if head is not None and head.digest == digest:
+                self._count('unchanged')
+                return 0
+
+            # Delta contre la keyframe de la série, sauf si elle est trop ancienne ou si c'est la ligne du jour
+            delta = None
+            keyframe_date = snapshot_date
+            if head is not None and not (head.is_keyframe and head.snapshot_date == snapshot_date) \
+                    and (snapshot_date - head.keyframe_date).days < self.keyframe_interval_days:
+                keyframe = self._keyframe_buckets(session, series, head)
+                if keyframe is not None:
+                    candidate = diff_buckets(keyframe, buckets)
+                    if len(candidate) <= self.max_delta_ratio * max(1, len(buckets)):
+                        delta, keyframe_date = candidate, head.keyframe_date
+
+            payload = buckets if delta is None else delta
+            row = head if head is not None and head.snapshot_date == snapshot_date else None
+            if row is None:
+                row = BreakdownSnapshot(platform=platform, account_id=account_id,
+                                        breakdown_type=breakdown_type, snapshot_date=snapshot_date)
+                session.add(row)
+            row.is_keyframe = delta is None
+            row.keyframe_date = keyframe_date
+            row.buckets = json.dumps(payload, separators=(',', ':'))
+            row.digest = digest
+            row.bucket_count = len(buckets)
+            session.commit()
+
+        self._count('keyframes' if delta is None else 'deltas')
+        self._count('buckets_written', len(payload))
+        return len(payload)
+
+    @staticmethod
+    def _series_filter(platform: str, account_id: str, breakdown_type: str):
+        return and_(BreakdownSnapshot.platform == platform,
+                    BreakdownSnapshot.account_id == account_id,
+                    BreakdownSnapshot.breakdown_type == breakdown_type)
+
+    @staticmethod
+    def _keyframe_buckets(session, series, row: BreakdownSnapshot) -> Optional[Buckets]:
+        if row.is_keyframe:
+            return json.loads(row.buckets)
+        keyframe = session.query(BreakdownSnapshot.buckets).filter(
+            series, BreakdownSnapshot.snapshot_date == row.keyframe_date,
+            BreakdownSnapshot.is_keyframe == True
+        ).first()
+        return json.loads(keyframe[0]) if keyframe else None
+
+    # ========================================
+    # LECTURE
+    # ========================================
+
+    def load(self, platform: str, account_id: str, breakdown_type: str,
+             day: Optional[date] = None) -> Optional[Buckets]:
+        """Segmentation en vigueur à une date (dernier snapshot antérieur ou égal)"""
+        day = day or date.today()
+        return self.load_range(platform, account_id, breakdown_type, day, day).get(day)
+
+    def load_range(self, platform: str, account_id: str, breakdown_type: str,
+                   start_date: date, end_date: date) -> Dict[date, Buckets]:
+        """
+        Segmentation de chaque jour de la période (jours sans snapshot: valeur précédente).
+        Deux ou trois requêtes quelle que soit la durée; les jours identiques partagent le même dict
+        (à traiter en lecture seule).
+        """
+        with db_manager.get_session() as session:
+            series = self._series_filter(platform, account_id, breakdown_type)
+            # Dernier snapshot avant la période: il porte la valeur du premier jour
+            anchor = session.query(func.max(BreakdownSnapshot.snapshot_date)).filter(
+                series, BreakdownSnapshot.snapshot_date <= start_date
+            ).scalar()
+            rows: List[Tuple[date, bool, date, str]] = session.query(
+                BreakdownSnapshot.snapshot_date, BreakdownSnapshot.is_keyframe,
+                BreakdownSnapshot.keyframe_date, BreakdownSnapshot.buckets
+            ).filter(
+                series,
+                BreakdownSnapshot.snapshot_date >= (anchor or start_date),
+                BreakdownSnapshot.snapshot_date <= end_date
+            ).order_by(BreakdownSnapshot.snapshot_date).all()
+
+            keyframes = {row[0]: json.loads(row[3]) for row in rows if row[1]}
+            missing = {row[2] for row in rows if not row[1] and row[2] not in keyframes}
+            if missing:
+                for snapshot_date, buckets in session.query(
+                    BreakdownSnapshot.snapshot_date, BreakdownSnapshot.buckets
+                ).filter(series, BreakdownSnapshot.is_keyframe == True,
+                         BreakdownSnapshot.snapshot_date.in_(missing)):
+                    keyframes[snapshot_date] = json.loads(buckets)
+
+        states: List[Tuple[date, Buckets]] = []
+        for snapshot_date, is_keyframe, keyframe_date, buckets in rows:
+            if is_keyframe:
+                states.append((snapshot_date, keyframes[snapshot_date]))
+            elif keyframe_date in keyframes:
+                states.append((snapshot_date, apply_delta(keyframes[keyframe_date], json.loads(buckets))))
+            else:
+                logger.warning(f"⚠️  Keyframe {keyframe_date} manquante pour {platform}/{account_id}/{breakdown_type}")
+
+        result: Dict[date, Buckets] = {}
+        index, current = 0, None
+        day = start_date
+        while day <= end_date:
+            while index < len(states) and states[index][0] <= day:
+                current = states[index][1]
+                index += 1
+            if current is not None:
+                result[day] = current
+            day += timedelta(days=1)
+        return result
+
+    def load_types(self, platform: str, account_id: str, breakdown_types: Iterable[str],
+                   start_date: date, end_date: date) -> Dict[str, Dict[date, Buckets]]:
+        return {breakdown_type: self.load_range(platform, account_id, breakdown_type, start_date, end_date)
+                for breakdown_type in breakdown_types}
+
+    # ========================================
+    # RÉTENTION
+    # ========================================
+
+    def purge_before(self, cutoff: date, platform: Optional[str] = None) -> int:
+        """
+        Supprimer l'historique antérieur à la dernière keyframe précédant cutoff (par série):
+        la valeur en vigueur à cutoff et tous les deltas suivants restent reconstituables
+        """
+        deleted = 0
+        with db_manager.get_session() as session:
+            keyframes = session.query(
+                BreakdownSnapshot.platform, BreakdownSnapshot.account_id, BreakdownSnapshot.breakdown_type,
+                func.max(BreakdownSnapshot.snapshot_date)
+            ).filter(
+                BreakdownSnapshot.is_keyframe == True, BreakdownSnapshot.snapshot_date <= cutoff,
+                BreakdownSnapshot.platform == platform if platform else true()
+            ).group_by(
+                BreakdownSnapshot.platform, BreakdownSnapshot.account_id, BreakdownSnapshot.breakdown_type
+            ).all()
+
+            for series_platform, account_id, breakdown_type, keyframe_date in keyframes:
+                series = self._series_filter(series_platform, account_id, breakdown_type)
+                # Une ligne postérieure peut encore viser une keyframe plus ancienne (collecte rattrapée)
+                oldest_referenced = session.query(func.min(BreakdownSnapshot.keyframe_date)).filter(
+                    series, BreakdownSnapshot.snapshot_date >= keyframe_date
+                ).scalar()
+                keep_from = min(keyframe_date, oldest_referenced or keyframe_date)
+                deleted += session.query(BreakdownSnapshot).filter(
+                    series, BreakdownSnapshot.snapshot_date < keep_from
+                ).delete(synchronize_session=False)
+            session.commit()
+        return deleted
+
+
+# Instance globale
+breakdown_snapshots = BreakdownSnapshotStore()
@@ -15,18 +15,21 @@ from typing import Optional, Dict, Any, List, Tuple, Set
 from dataclasses import dataclass, asdict
 from enum import Enum
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import httpx
 
 from ..auth.facebook_oauth import facebook_oauth_manager, FacebookOAuthError, FacebookAPIError
 from ..auth.user_manager import user_manager
 from ..database.connection import db_manager
+from ..database.partitioning import partition_manager
 from ..database.models import (
     User, FacebookAccount, SocialAccessToken, FacebookPageMetadata,
     FacebookPageDaily, FacebookPostsMetadata, FacebookPostsLifetime
 )
 from ..utils.config import get_env_var
+from ..utils.http_cache import served_from_cache
+from ..utils.platform_client import platform_runtime, PlatformSession
+from ..utils.prometheus import Gauge, metrics_registry
+from ..utils.tracing import traced, traced_sleep
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
@@ -168,33 +171,15 @@ class FacebookCollector:
             'post_video_view_time', 'post_fan_reach'
         ]
         
-    def _create_session(self) -> requests.Session:
-        """Créer une session HTTP optimisée pour Facebook Graph API"""
-        
-        session = requests.Session()
-        
-        # Configuration du retry spécifique à Facebook
-        retry_strategy = Retry(
-            total=3,
-            status_forcelist=[429, 500, 502, 503, 504],
-            method_whitelist=["HEAD", "GET", "POST"],
-            backoff_factor=3,  # Plus agressif pour Facebook
-            respect_retry_after_header=True,
-            raise_on_status=False
-        )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+    def _create_session(self) -> PlatformSession:
+        """Session Graph API sur la couche client partagée (pool httpx, retries, quotas, métriques)"""
         
         # Headers optimisés pour Facebook Graph API
-        session.headers.update({
+        return platform_runtime.session('facebook', headers={
             'User-Agent': f'{get_env_var("APP_NAME", "WhatsTheData")}/{get_env_var("APP_VERSION", "1.0.0")} (+{get_env_var("BASE_URL", "http://localhost:8501")})',
             'Accept': 'application/json',
             'Accept-Encoding': 'gzip, deflate'
         })
-        
-        return session
     
     def _load_collection_config(self) -> Dict[str, Any]:
         """Charger la configuration de collecte Facebook"""
@@ -226,23 +211,24 @@ class FacebookCollector:
         """Récupérer les informations de quota Facebook depuis les headers de réponse"""
         
         try:
-            # Faire un appel de test pour récupérer les headers de quota
-            response = self.session.get(
-                f"{self.graph_url}/me",
-                params={'access_token': access_token},
-                timeout=10
-            )
-            
-            # Facebook renvoie les quotas dans les headers de réponse
-            app_usage = response.headers.get('X-App-Usage', '{}')
-            business_usage = response.headers.get('X-Business-Use-Case-Usage', '{}')
-            
-            try:
-                app_usage_data = json.loads(app_usage)
-                business_usage_data = json.loads(business_usage)
-            except:
-                app_usage_data = {}
-                business_usage_data = {}
+            # En-têtes d'usage déjà vus sur une réponse récente (collecteurs ou endpoints Looker)
+            snapshot = self.session.quota(access_token)
+            if snapshot is not None and 'X-App-Usage' in snapshot.usage:
+                app_usage_data = snapshot.usage['X-App-Usage']
+            else:
+                # Faire un appel de test pour récupérer les headers de quota
+                response = self.session.get(
+                    f"{self.graph_url}/me",
+                    params={'access_token': access_token},
+                    timeout=10
+                )
+                
+                # Facebook renvoie les quotas dans les headers de réponse
+                # (sauf réponse rejouée par le cache HTTP: en-têtes datant du stockage)
+                try:
+                    app_usage_data = {} if served_from_cache(response) else json.loads(response.headers.get('X-App-Usage', '{}'))
+                except:
+                    app_usage_data = {}
             
             # Analyser les quotas d'application
             quota = FacebookQuota(
@@ -280,6 +266,7 @@ class FacebookCollector:
                 cpu_time=0
             )
     
+    @traced('quota')
     def _check_rate_limits(self, access_token: str, calls_needed: int = 1) -> Tuple[bool, FacebookQuota]:
         """Vérifier les rate limits Facebook avant de faire des appels"""
         
@@ -302,7 +289,7 @@ class FacebookCollector:
         
         return is_safe, quota
     
-    def _handle_rate_limit_response(self, response: requests.Response, access_token: str):
+    def _handle_rate_limit_response(self, response: httpx.Response, access_token: str):
         """Gérer les réponses de rate limiting Facebook"""
         
         if response.status_code == 429:
@@ -313,11 +300,11 @@ class FacebookCollector:
             if retry_after:
                 wait_time = int(retry_after)
                 logger.warning(f"⚠️  Rate limit Facebook hit, attente {wait_time}s")
-                time.sleep(wait_time)
+                traced_sleep(wait_time, 'rate_limit')
             else:
                 # Attente par défaut
                 logger.warning("⚠️  Rate limit Facebook hit, attente 60s par défaut")
-                time.sleep(60)
+                traced_sleep(60, 'rate_limit')
         
         # Mettre à jour le cache de quota avec les nouvelles informations
         self._get_quota_info(access_token)
@@ -357,8 +344,8 @@ class FacebookCollector:
             result.status = CollectionStatus.RUNNING
             
             # Récupérer les informations de la page
-            page_info = self._fetch_page_details(token.access_token, page_id)
-            result.api_calls_made += 1
+            page_info, api_calls = self._fetch_page_details(token.access_token, page_id)
+            result.api_calls_made += api_calls
             
             # Récupérer le token de page si disponible
             page_token = self._get_page_access_token(token.access_token, page_id)
@@ -390,8 +377,8 @@ class FacebookCollector:
             
         return result
     
-    def _fetch_page_details(self, access_token: str, page_id: str) -> Dict[str, Any]:
-        """Récupérer les détails d'une page Facebook"""
+    def _fetch_page_details(self, access_token: str, page_id: str) -> Tuple[Dict[str, Any], int]:
+        """Récupérer les détails d'une page Facebook (et le nombre d'appels API réels: 0 si servi par le cache HTTP)"""
         
         try:
             fields = [
@@ -427,7 +414,7 @@ class FacebookCollector:
                     'talking_about_count': data.get('talking_about_count', 0),
                     'fan_count': data.get('fan_count', 0),
                     'followers_count': data.get('followers_count', 0)
-                }
+                }, 0 if served_from_cache(response) else 1
             
             elif response.status_code == 429:
                 self._handle_rate_limit_response(response, access_token)
@@ -457,6 +444,7 @@ class FacebookCollector:
                 page_id=page_id
             )
     
+    @traced('token')
     def _get_page_access_token(self, user_token: str, page_id: str) -> Optional[str]:
         """Récupérer le token d'accès spécifique à une page"""
         
@@ -636,7 +624,7 @@ class FacebookCollector:
                     continue
                 
                 # Pause entre les batches pour respecter les rate limits
-                time.sleep(0.5)
+                traced_sleep(0.5)
                 
             except Exception as e:
                 logger.warning(f"⚠️  Erreur lors du traitement du batch {i}: {e}")
@@ -647,6 +635,7 @@ class FacebookCollector:
             'api_calls_made': api_calls_made
         }
     
+    @traced('transform')
     def _transform_page_metrics_to_daily(self, metrics_data: Dict[date, Dict[str, Any]], 
                                        page_id: str) -> List[Dict[str, Any]]:
         """Transformer les métriques en format quotidien pour la base de données"""
@@ -861,7 +850,7 @@ class FacebookCollector:
                     params = None  # next_url contient déjà tous les paramètres
                     
                     # Pause pour respecter les rate limits
-                    time.sleep(0.2)
+                    traced_sleep(0.2)
                 
                 elif response.status_code == 429:
                     self._handle_rate_limit_response(response, access_token)
@@ -882,6 +871,7 @@ class FacebookCollector:
             'api_calls_made': api_calls_made
         }
     
+    @traced('transform')
     def _normalize_facebook_post(self, post_data: Dict[str, Any], page_id: str) -> Dict[str, Any]:
         """Normaliser les données d'un post Facebook"""
         
@@ -1027,7 +1017,7 @@ class FacebookCollector:
                     
                     # Pause entre les batches
                     if i + batch_size < len(post_ids):
-                        time.sleep(1)
+                        traced_sleep(1)
                     
                 except Exception as e:
                     result.warnings.append(f"Erreur batch {i}-{i+batch_size}: {e}")
@@ -1112,7 +1102,7 @@ class FacebookCollector:
                 metrics.append(post_metrics)
                 
                 # Pause courte entre les posts
-                time.sleep(0.1)
+                traced_sleep(0.1)
                 
             except Exception as e:
                 logger.warning(f"⚠️  Erreur métriques post Facebook {post_id}: {e}")
@@ -1123,6 +1113,7 @@ class FacebookCollector:
             'api_calls_made': api_calls_made
         }
     
+    @traced('transform')
     def _calculate_facebook_derived_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
         """Calculer les métriques dérivées Facebook"""
         
@@ -1182,6 +1173,7 @@ class FacebookCollector:
     # STOCKAGE EN BASE DE DONNÉES
     # ========================================
     
+    @traced('store')
     def _store_page_info(self, page_id: str, page_data: Dict[str, Any]):
         """Stocker les informations de page en base"""
         
@@ -1220,6 +1212,7 @@ class FacebookCollector:
             logger.error(f"❌ Erreur stockage page Facebook: {e}")
             raise
     
+    @traced('store')
     def _store_page_daily_metrics(self, daily_metrics: List[Dict[str, Any]]) -> int:
         """Stocker les métriques quotidiennes de page"""
         
@@ -1259,6 +1252,7 @@ class FacebookCollector:
             logger.error(f"❌ Erreur stockage métriques quotidiennes Facebook: {e}")
             return 0
     
+    @traced('store')
     def _store_posts_metadata(self, page_id: str, posts_data: List[Dict]) -> int:
         """Stocker les métadonnées des posts Facebook"""
         
@@ -1308,6 +1302,7 @@ class FacebookCollector:
             logger.error(f"❌ Erreur stockage posts Facebook: {e}")
             return 0
     
+    @traced('store')
     def _store_posts_lifetime_metrics(self, page_id: str, metrics_data: List[Dict]) -> int:
         """Stocker les métriques lifetime des posts"""
         
@@ -1452,7 +1447,7 @@ class FacebookCollector:
                         self.session_stats['total_records_collected'] += result.records_collected
                         
                         # Pause entre les types de données pour respecter les rate limits
-                        time.sleep(2)
+                        traced_sleep(2)
                         
                     except Exception as e:
                         logger.error(f"❌ Erreur collecte Facebook {data_type.value}: {e}")
@@ -1555,7 +1550,7 @@ class FacebookCollector:
                                 failed_collections += 1
                         
                         # Pause entre pages pour respecter les rate limits Facebook
-                        time.sleep(3)
+                        traced_sleep(3)
                         
                     except Exception as e:
                         logger.error(f"❌ Erreur collecte séquentielle Facebook {account.page_id}: {e}")
@@ -1618,7 +1613,7 @@ class FacebookCollector:
     # UTILITAIRES ET HELPERS
     # ========================================
     
-    def _parse_facebook_error(self, response: requests.Response) -> Dict[str, Any]:
+    def _parse_facebook_error(self, response: httpx.Response) -> Dict[str, Any]:
         """Parser une réponse d'erreur Facebook"""
         
         try:
@@ -1642,6 +1637,17 @@ class FacebookCollector:
                 'status_code': response.status_code
             }
     
+    def prometheus_metrics(self) -> List[Gauge]:
+        """Utilisation du quota applicatif (pourcentage le plus élevé connu) pour /metrics"""
+        
+        usage = Gauge('platform_api_quota_usage_percent', "Utilisation du quota d'application (%)", ('platform', 'metric'))
+        entries = [entry['quota'] for entry in list(self._quota_cache.values()) if 'quota' in entry]
+        if entries:
+            usage.set(max(quota.call_count for quota in entries), 'facebook', 'call_count')
+            usage.set(max(quota.total_time for quota in entries), 'facebook', 'total_time')
+            usage.set(max(quota.total_cputime for quota in entries), 'facebook', 'total_cputime')
+        return [usage]
+    
     def get_collection_statistics(self) -> Dict[str, Any]:
         """Obtenir les statistiques de collecte Facebook de la session"""
         
@@ -1718,18 +1724,12 @@ class FacebookCollector:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             deleted_counts = {}
             
+            # Métriques quotidiennes: partitions mensuelles expirées supprimées en bloc
+            deleted_counts['page_daily'] = partition_manager.apply_retention(
+                db_manager.engine, FacebookPageDaily.__tablename__, cutoff_date.date()
+            )
+            
             with db_manager.get_session() as session:
-                # Nettoyer les métriques quotidiennes anciennes
-                deleted_page_daily = session.query(FacebookPageDaily).filter(
-                    FacebookPageDaily.created_at < cutoff_date
-                ).count()
-                
-                session.query(FacebookPageDaily).filter(
-                    FacebookPageDaily.created_at < cutoff_date
-                ).delete()
-                
-                deleted_counts['page_daily'] = deleted_page_daily
-                
                 # Nettoyer les posts très anciens (garde plus longtemps car lifetime)
                 very_old_cutoff = datetime.utcnow() - timedelta(days=days * 2)
                 
@@ -1759,6 +1759,7 @@ class FacebookCollector:
 # ========================================
 
 facebook_collector = FacebookCollector()
+metrics_registry.register_collector(facebook_collector.prometheus_metrics)
 
 # ========================================
 # FONCTIONS HELPER
@@ -1881,7 +1882,7 @@ class FacebookCollectionScheduler:
                             self._collect_async(user_id, page_id)
                         
                         # Pause plus longue entre les vérifications (Facebook rate limits)
-                        time.sleep(2)
+                        traced_sleep(2)
                     
                 except Exception as e:
                     logger.error(f"❌ Erreur vérification utilisateur Facebook {user_id}: {e}")
@@ -10,18 +10,17 @@ import time
 import logging
 import asyncio
 import threading
+import contextvars
 from datetime import datetime, timedelta, date
 from typing import Optional, Dict, Any, List, Tuple, Set
 from dataclasses import dataclass, asdict
 from enum import Enum
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 from ..auth.linkedin_oauth import linkedin_oauth_manager, LinkedinAppType, LinkedinOAuthError, LinkedinAPIError
 from ..auth.user_manager import user_manager
 from ..database.connection import db_manager
+from ..database.partitioning import partition_manager
 from ..database.models import (
     User, LinkedinAccount, LinkedinTokens, LinkedinPagesMetadata,
     LinkedinPageDaily, LinkedinPageLifetime, LinkedinPostsMetadata, 
@@ -30,6 +29,12 @@ from ..database.models import (
     LinkedinPageViewsByCountry, LinkedinPageViewsByIndustry, LinkedinPageViewsBySeniority
 )
 from ..utils.config import get_env_var
+from ..utils.http_cache import served_from_cache
+from ..utils.platform_client import platform_runtime, PlatformSession, PlatformAPIError
+from ..utils.prometheus import Gauge, metrics_registry
+from ..utils.tracing import traced, traced_sleep, span
+from .breakdown_store import breakdown_snapshots
+from .page_rollups import page_rollups, page_statistics_from_api
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
@@ -55,6 +60,22 @@ class DataType(Enum):
     POSTS_METRICS = "posts_metrics"
     ORGANIZATION_INFO = "organization_info"
 
+# Dépendances entre types de données d'une collecte d'organisation: les métriques des posts
+# sont lues à partir des posts stockés par la collecte POSTS; tout le reste est indépendant
+DATA_TYPE_DEPENDENCIES: Dict[DataType, Tuple[DataType, ...]] = {
+    DataType.POSTS_METRICS: (DataType.POSTS,),
+}
+
+# Champ identifiant la tranche dans chaque type de segmentation des followers
+FOLLOWER_BREAKDOWN_KEYS: Dict[str, str] = {
+    'company_size': 'companySize',
+    'function': 'function',
+    'industry': 'industry',
+    'seniority': 'seniority',
+    'country': 'country',
+    'region': 'region',
+}
+
 @dataclass
 class CollectionResult:
     """Résultat d'une collecte"""
@@ -109,11 +130,20 @@ class LinkedinCollector:
         # Configuration de collecte
         self.config = self._load_collection_config()
         
-        # Cache des quotas par application
+        # Cache des quotas par application (réservation atomique: vérification et décompte sous verrou)
         self._quota_cache = {}
+        self._quota_lock = threading.Lock()
         
         # Verrous pour éviter les collectes concurrentes par organisation
         self._collection_locks = {}
+        self._stats_lock = threading.Lock()
+        
+        # Pool partagé des types de données: borne le nombre de collectes LinkedIn simultanées
+        # du processus, toutes organisations confondues
+        self._data_type_executor = ThreadPoolExecutor(
+            max_workers=max(1, self.config['max_concurrent_data_types']),
+            thread_name_prefix='linkedin-data-type'
+        )
         
         # Statistiques de session
         self.session_stats = {
@@ -144,34 +174,16 @@ class LinkedinCollector:
             'organization_acls': '/rest/organizationAcls'
         }
         
-    def _create_session(self) -> requests.Session:
-        """Créer une session HTTP optimisée pour LinkedIn"""
-        
-        session = requests.Session()
-        
-        # Configuration du retry spécifique à LinkedIn
-        retry_strategy = Retry(
-            total=3,
-            status_forcelist=[429, 500, 502, 503, 504],
-            method_whitelist=["HEAD", "GET", "POST"],
-            backoff_factor=2,
-            respect_retry_after_header=True,
-            raise_on_status=False
-        )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+    def _create_session(self) -> PlatformSession:
+        """Session LinkedIn sur la couche client partagée (pool httpx, retries, quotas, métriques)"""
         
         # Headers optimisés pour LinkedIn
-        session.headers.update({
+        return platform_runtime.session('linkedin', headers={
             'User-Agent': f'{get_env_var("APP_NAME", "WhatsTheData")}/{get_env_var("APP_VERSION", "1.0.0")}',
             'Accept': 'application/json',
             'LinkedIn-Version': '202408',
             'X-Restli-Protocol-Version': '2.0.0'
         })
-        
-        return session
     
     def _load_collection_config(self) -> Dict[str, Any]:
         """Charger la configuration de collecte"""
@@ -186,6 +198,8 @@ class LinkedinCollector:
             'max_posts_per_org': int(get_env_var('MAX_POSTS_PER_ORG', '1000')),
             'rate_limit_margin': int(get_env_var('RATE_LIMIT_MARGIN', '10')),  # % de marge sur les quotas
             'enable_concurrent_collection': get_env_var('ENABLE_CONCURRENT_COLLECTION', 'true').lower() == 'true',
+            'max_concurrent_data_types': int(get_env_var('LINKEDIN_MAX_CONCURRENT_DATA_TYPES', '8')),
+            'page_statistics_days': max(1, int(get_env_var('LINKEDIN_PAGE_STATISTICS_DAYS', '7'))),  # jours repris à chaque collecte
             'debug_mode': get_env_var('DEBUG_MODE', 'false').lower() == 'true'
         }
         
@@ -209,6 +223,20 @@ class LinkedinCollector:
                 if datetime.utcnow() < cached_quota.reset_time:
                     return cached_quota
             
+            # En-têtes de quota déjà vus sur une réponse récente (collecteurs ou endpoints Looker)
+            snapshot = self.session.quota(access_token)
+            if snapshot is not None and snapshot.remaining is not None:
+                daily_limit = snapshot.limit or 1000
+                quota = LinkedinQuota(
+                    app_type=app_type,
+                    daily_limit=daily_limit,
+                    requests_made=daily_limit - snapshot.remaining,
+                    reset_time=snapshot.reset_at or datetime.utcnow() + timedelta(hours=1),
+                    remaining=snapshot.remaining
+                )
+                self._quota_cache[cache_key] = quota
+                return quota
+            
             # Faire un appel de test pour récupérer les headers de quota
             headers = {
                 'Authorization': f'Bearer {access_token}',
@@ -221,6 +249,11 @@ class LinkedinCollector:
                 timeout=10
             )
             
+            # Réponse rejouée par le cache HTTP: ses en-têtes de quota datent du stockage
+            if served_from_cache(response):
+                logger.debug(f"ℹ️  /rest/me servi par le cache HTTP: quota {app_type.value} non relu")
+                return self._quota_cache.get(cache_key) or self._default_quota(app_type)
+            
             # Extraire les informations de quota des headers
             daily_limit = int(response.headers.get('X-RateLimit-Limit', '1000'))
             remaining = int(response.headers.get('X-RateLimit-Remaining', '999'))
@@ -251,26 +284,43 @@ class LinkedinCollector:
             
         except Exception as e:
             logger.warning(f"⚠️  Impossible de récupérer le quota LinkedIn: {e}")
-            # Retourner un quota par défaut conservateur
-            return LinkedinQuota(
-                app_type=app_type,
-                daily_limit=500,
-                requests_made=0,
-                reset_time=datetime.utcnow() + timedelta(hours=1),
-                remaining=500
-            )
+            return self._default_quota(app_type)
+    
+    def _default_quota(self, app_type: LinkedinAppType) -> LinkedinQuota:
+        """Quota par défaut conservateur (quota réel inconnu)"""
+        return LinkedinQuota(
+            app_type=app_type,
+            daily_limit=500,
+            requests_made=0,
+            reset_time=datetime.utcnow() + timedelta(hours=1),
+            remaining=500
+        )
     
+    @traced('quota')
     def _check_quota_available(self, app_type: LinkedinAppType, access_token: str, 
                               requests_needed: int = 1) -> Tuple[bool, LinkedinQuota]:
-        """Vérifier si le quota est suffisant pour les requêtes demandées"""
+        """
+        Vérifier si le quota est suffisant et, si oui, réserver les requêtes demandées
+        Vérification et décompte se font sous le même verrou: les types de données collectés
+        en parallèle ne peuvent pas tous passer sur le même reste de quota. La réservation est
+        ajustée au nombre réel d'appels par _update_quota_cache(..., reserved=requests_needed).
+        """
         
         quota = self._get_quota_info(app_type, access_token)
+        cache_key = f"{app_type.value}_{access_token[-10:]}"
         
-        # Appliquer la marge de sécurité
-        margin = int(quota.remaining * (self.config['rate_limit_margin'] / 100))
-        available_with_margin = quota.remaining - margin
-        
-        is_available = available_with_margin >= requests_needed
+        with self._quota_lock:
+            # Toujours décompter sur l'entrée du cache (partagée par les appels concurrents)
+            quota = self._quota_cache.get(cache_key, quota)
+            
+            # Appliquer la marge de sécurité
+            margin = int(quota.remaining * (self.config['rate_limit_margin'] / 100))
+            available_with_margin = quota.remaining - margin
+            
+            is_available = available_with_margin >= requests_needed
+            if is_available:
+                quota.remaining -= requests_needed
+                quota.requests_made += requests_needed
         
         if not is_available:
             logger.warning(f"⚠️  Quota insuffisant: {available_with_margin} disponible, {requests_needed} nécessaire")
@@ -278,15 +328,17 @@ class LinkedinCollector:
         return is_available, quota
     
     def _update_quota_cache(self, app_type: LinkedinAppType, access_token: str, 
-                           requests_made: int):
-        """Mettre à jour le cache de quota après des requêtes"""
+                           requests_made: int, reserved: int = 0):
+        """Mettre à jour le cache de quota après des requêtes (reserved: déjà décompté à la vérification)"""
         
         cache_key = f"{app_type.value}_{access_token[-10:]}"
         
-        if cache_key in self._quota_cache:
-            cached_quota = self._quota_cache[cache_key]
-            cached_quota.requests_made += requests_made
-            cached_quota.remaining = max(0, cached_quota.remaining - requests_made)
+        with self._quota_lock:
+            if cache_key in self._quota_cache:
+                cached_quota = self._quota_cache[cache_key]
+                adjustment = requests_made - reserved
+                cached_quota.requests_made = max(0, cached_quota.requests_made + adjustment)
+                cached_quota.remaining = max(0, min(cached_quota.daily_limit, cached_quota.remaining - adjustment))
     
     # ========================================
     # COLLECTE DES DONNÉES D'ORGANISATION
@@ -323,8 +375,8 @@ class LinkedinCollector:
             result.status = CollectionStatus.RUNNING
             
             # Récupérer les informations de l'organisation
-            org_info = self._fetch_organization_details(token.access_token, organization_id)
-            result.api_calls_made += 1
+            org_info, api_calls = self._fetch_organization_details(token.access_token, organization_id)
+            result.api_calls_made += api_calls
             
             # Récupérer le nombre de followers
             follower_count = self._fetch_follower_count(token.access_token, organization_id)
@@ -342,7 +394,8 @@ class LinkedinCollector:
             result.records_collected = 1
             
             # Mettre à jour le quota
-            self._update_quota_cache(LinkedinAppType.COMMUNITY, token.access_token, result.api_calls_made)
+            self._update_quota_cache(LinkedinAppType.COMMUNITY, token.access_token, result.api_calls_made,
+                                    reserved=2)
             
             result.status = CollectionStatus.SUCCESS
             logger.info(f"✅ Informations organisation collectées: {organization_id}")
@@ -362,8 +415,8 @@ class LinkedinCollector:
             
         return result
     
-    def _fetch_organization_details(self, access_token: str, organization_id: str) -> Dict[str, Any]:
-        """Récupérer les détails d'une organisation"""
+    def _fetch_organization_details(self, access_token: str, organization_id: str) -> Tuple[Dict[str, Any], int]:
+        """Récupérer les détails d'une organisation (et le nombre d'appels API réels: 0 si servi par le cache HTTP)"""
         
         try:
             headers = {
@@ -387,6 +440,8 @@ class LinkedinCollector:
                 timeout=self.config['api_timeout_seconds']
             )
             
+            api_calls = 0 if served_from_cache(response) else 1
+            
             if response.status_code == 200:
                 data = response.json()
                 elements = data.get('elements', [])
@@ -402,14 +457,14 @@ class LinkedinCollector:
                         'headquarters': org.get('headquarters', {}).get('localized', {}).get('en_US', ''),
                         'founded': org.get('founded'),
                         'logo_url': self._extract_logo_url(org.get('logoV2', {}))
-                    }
+                    }, api_calls
             
             logger.warning(f"⚠️  Impossible de récupérer les détails de l'organisation {organization_id}")
-            return {}
+            return {}, api_calls
             
         except Exception as e:
             logger.error(f"❌ Erreur lors de la récupération des détails organisation: {e}")
-            return {}
+            return {}, 1
     
     def _fetch_follower_count(self, access_token: str, organization_id: str) -> int:
         """Récupérer le nombre total de followers"""
@@ -490,7 +545,8 @@ class LinkedinCollector:
             result.records_collected = records_stored
             
             # Mettre à jour le quota
-            self._update_quota_cache(LinkedinAppType.COMMUNITY, token.access_token, result.api_calls_made)
+            self._update_quota_cache(LinkedinAppType.COMMUNITY, token.access_token, result.api_calls_made,
+                                    reserved=5)
             
             result.status = CollectionStatus.SUCCESS if records_stored > 0 else CollectionStatus.PARTIAL_SUCCESS
             logger.info(f"✅ Breakdown followers collecté: {organization_id} ({records_stored} records)")
@@ -569,6 +625,111 @@ class LinkedinCollector:
         
         return breakdowns
     
+    # ========================================
+    # COLLECTE DES STATISTIQUES DE PAGE
+    # ========================================
+    
+    def collect_page_statistics(self, user_id: int, organization_id: str) -> CollectionResult:
+        """
+        Collecter les vues de page quotidiennes des derniers jours (LinkedIn révise les jours
+        récents: chaque collecte les reprend et seuls les écarts sont reportés sur les agrégats)
+        """
+        
+        start_time = time.time()
+        result = CollectionResult(
+            status=CollectionStatus.PENDING,
+            data_type=DataType.PAGE_VIEWS,
+            organization_id=organization_id
+        )
+        
+        try:
+            token = self.oauth_manager.get_user_token(user_id, LinkedinAppType.COMMUNITY)
+            if not token:
+                raise LinkedinCollectionError(
+                    "Token Community Management non trouvé",
+                    error_code="TOKEN_NOT_FOUND",
+                    organization_id=organization_id
+                )
+            
+            quota_ok, quota = self._check_quota_available(LinkedinAppType.COMMUNITY, token.access_token, 1)
+            if not quota_ok:
+                result.status = CollectionStatus.QUOTA_EXCEEDED
+                result.quota_remaining = quota.remaining
+                result.next_collection_allowed = quota.reset_time
+                return result
+            
+            result.status = CollectionStatus.RUNNING
+            
+            end_date = date.today()
+            start_date = end_date - timedelta(days=self.config['page_statistics_days'] - 1)
+            days = self._fetch_page_statistics(token.access_token, organization_id, start_date, end_date)
+            result.api_calls_made += 1
+            
+            changed = page_rollups.store_days('linkedin', organization_id, days)
+            result.records_collected = changed
+            
+            self._update_quota_cache(LinkedinAppType.COMMUNITY, token.access_token, result.api_calls_made,
+                                    reserved=1)
+            
+            result.status = CollectionStatus.SUCCESS if days else CollectionStatus.PARTIAL_SUCCESS
+            logger.info(f"✅ Statistiques de page collectées: {organization_id} ({len(days)} jours, {changed} nouveaux ou corrigés)")
+        
+        except LinkedinCollectionError as e:
+            result.status = CollectionStatus.FAILED
+            result.errors.append(str(e))
+            logger.error(f"❌ Erreur collecte statistiques de page {organization_id}: {e}")
+        
+        except Exception as e:
+            result.status = CollectionStatus.FAILED
+            result.errors.append(f"Erreur inattendue: {e}")
+            logger.error(f"❌ Erreur inattendue collecte statistiques de page {organization_id}: {e}")
+        
+        finally:
+            result.execution_time = time.time() - start_time
+        
+        return result
+    
+    def _fetch_page_statistics(self, access_token: str, organization_id: str,
+                               start_date: date, end_date: date) -> Dict[date, Dict[str, int]]:
+        """Vues de page jour par jour sur la période (un seul appel, granularité DAY)"""
+        
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'LinkedIn-Version': '202408'
+        }
+        
+        range_start = int(datetime.combine(start_date, datetime.min.time()).timestamp() * 1000)
+        params = {
+            'q': 'organization',
+            'organization': f'urn:li:organization:{organization_id}',
+            'timeIntervals.timeGranularityType': 'DAY',
+            'timeIntervals.timeRange.start': range_start,
+            'timeIntervals.timeRange.end': int(datetime.combine(end_date + timedelta(days=1), datetime.min.time()).timestamp() * 1000)
+        }
+        
+        days = {}
+        
+        try:
+            response = self.session.get(
+                'https://api.linkedin.com/rest/organizationPageStatistics',
+                headers=headers,
+                params=params,
+                timeout=self.config['api_timeout_seconds']
+            )
+            
+            if response.status_code == 200:
+                for element in response.json().get('elements', []):
+                    element_start = element.get('timeRange', {}).get('start', range_start)
+                    day = datetime.fromtimestamp(element_start / 1000).date()
+                    days[day] = page_statistics_from_api(element.get('totalPageStatistics', {}))
+            else:
+                logger.warning(f"⚠️  Statistiques de page indisponibles pour {organization_id}: {response.status_code}")
+        
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de la récupération des statistiques de page: {e}")
+        
+        return days
+    
     # ========================================
     # COLLECTE DES POSTS
     # ========================================
@@ -625,7 +786,8 @@ class LinkedinCollector:
             result.records_collected = stored_count
             
             # Mettre à jour le quota
-            self._update_quota_cache(LinkedinAppType.COMMUNITY, token.access_token, result.api_calls_made)
+            self._update_quota_cache(LinkedinAppType.COMMUNITY, token.access_token, result.api_calls_made,
+                                    reserved=estimated_requests)
             
             result.status = CollectionStatus.SUCCESS
             logger.info(f"✅ Posts collectés: {organization_id} ({stored_count} posts)")
@@ -659,60 +821,43 @@ class LinkedinCollector:
         
         posts = []
         api_calls_made = 0
-        start = 0
-        count = min(100, max_posts)  # LinkedIn limite à 100 par requête
+        params = {
+            'q': 'author',
+            'author': org_urn,
+            'sortBy': 'CREATED'
+        }
         
         try:
-            while len(posts) < max_posts:
-                params = {
-                    'q': 'author',
-                    'author': org_urn,
-                    'count': count,
-                    'start': start,
-                    'sortBy': 'CREATED'
-                }
-                
-                response = self.session.get(
-                    'https://api.linkedin.com/rest/posts',
-                    headers=headers,
-                    params=params,
-                    timeout=self.config['api_timeout_seconds']
-                )
-                
-                api_calls_made += 1
-                
-                if response.status_code != 200:
-                    logger.warning(f"⚠️  Erreur récupération posts: {response.status_code}")
-                    break
-                
-                data = response.json()
-                elements = data.get('elements', [])
-                
-                if not elements:
-                    logger.info("ℹ️  Plus de posts à récupérer")
-                    break
-                
-                # Filtrer les posts par date
-                filtered_posts = []
-                for post in elements:
-                    created_time = post.get('createdAt', 0)
-                    if created_time >= since_timestamp:
-                        filtered_posts.append(self._normalize_post_data(post, organization_id))
-                    else:
+            # Pagination start/count (100 par requête au plus); retries et rate limits gérés par la couche client
+            pages = self.session.iter_pages(
+                'https://api.linkedin.com/rest/posts',
+                headers=headers,
+                params=params,
+                page_size=min(100, max_posts),
+                max_items=max_posts,
+                timeout=self.config['api_timeout_seconds']
+            )
+            try:
+                for elements in pages:
+                    api_calls_made += 1
+                    
+                    # Filtrer les posts par date (triés du plus récent au plus ancien)
+                    too_old = False
+                    for post in elements:
+                        if post.get('createdAt', 0) < since_timestamp:
+                            too_old = True
+                            break
+                        posts.append(self._normalize_post_data(post, organization_id))
+                    
+                    if too_old:
                         # Si on trouve un post trop ancien, arrêter
                         logger.info(f"ℹ️  Post trop ancien trouvé, arrêt de la collecte")
                         break
-                
-                posts.extend(filtered_posts)
-                
-                # Si on a moins d'éléments que demandé, on a atteint la fin
-                if len(elements) < count:
-                    break
-                
-                start += count
-                
-                # Pause pour respecter les rate limits
-                time.sleep(0.1)
+            except PlatformAPIError as e:
+                api_calls_made += 1
+                logger.warning(f"⚠️  Erreur récupération posts: {e.status_code}")
+            finally:
+                pages.close()
             
             # Récupérer aussi les reposts instantanés si possible
             try:
@@ -789,6 +934,7 @@ class LinkedinCollector:
             'api_calls_made': api_calls_made
         }
     
+    @traced('transform')
     def _normalize_post_data(self, post_data: Dict[str, Any], organization_id: str) -> Dict[str, Any]:
         """Normaliser les données d'un post LinkedIn"""
         
@@ -858,6 +1004,7 @@ class LinkedinCollector:
             logger.error(f"❌ Erreur normalisation post: {e}")
             return {}
     
+    @traced('transform')
     def _normalize_repost_data(self, repost_data: Dict[str, Any], organization_id: str) -> Dict[str, Any]:
         """Normaliser les données d'un repost instantané"""
         
@@ -947,7 +1094,7 @@ class LinkedinCollector:
                     
                     # Pause entre les batches
                     if i + batch_size < len(post_urns):
-                        time.sleep(1)
+                        traced_sleep(1)
                     
                 except Exception as e:
                     result.warnings.append(f"Erreur batch {i}-{i+batch_size}: {e}")
@@ -956,7 +1103,8 @@ class LinkedinCollector:
             result.records_collected = total_metrics_collected
             
             # Mettre à jour le quota
-            self._update_quota_cache(LinkedinAppType.COMMUNITY, token.access_token, result.api_calls_made)
+            self._update_quota_cache(LinkedinAppType.COMMUNITY, token.access_token, result.api_calls_made,
+                                    reserved=estimated_requests)
             
             result.status = CollectionStatus.SUCCESS if total_metrics_collected > 0 else CollectionStatus.PARTIAL_SUCCESS
             logger.info(f"✅ Métriques posts collectées: {organization_id} ({total_metrics_collected} records)")
@@ -1019,7 +1167,7 @@ class LinkedinCollector:
                 metrics.append(post_metrics)
                 
                 # Pause courte entre les posts
-                time.sleep(0.1)
+                traced_sleep(0.1)
                 
             except Exception as e:
                 logger.warning(f"⚠️  Erreur métriques post {post_urn}: {e}")
@@ -1135,6 +1283,7 @@ class LinkedinCollector:
         
         return {}
     
+    @traced('transform')
     def _calculate_derived_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
         """Calculer les métriques dérivées"""
         
@@ -1171,6 +1320,7 @@ class LinkedinCollector:
     # STOCKAGE EN BASE DE DONNÉES
     # ========================================
     
+    @traced('store')
     def _store_organization_info(self, organization_id: str, org_data: Dict[str, Any]):
         """Stocker les informations d'organisation en base"""
         
@@ -1202,93 +1352,37 @@ class LinkedinCollector:
             logger.error(f"❌ Erreur stockage organisation: {e}")
             raise
     
+    @traced('store')
     def _store_follower_breakdown(self, organization_id: str, breakdown_type: str, 
                                  breakdown_data: List[Dict]) -> int:
-        """Stocker la segmentation des followers"""
+        """Stocker la segmentation des followers (snapshot: rien si inchangée, sinon delta ou keyframe)"""
+        
+        key_field = FOLLOWER_BREAKDOWN_KEYS.get(breakdown_type)
+        if key_field is None:
+            return 0  # Type non supporté
         
         try:
-            with db_manager.get_session() as session:
-                stored_count = 0
-                today = date.today()
-                
-                for item in breakdown_data:
-                    try:
-                        # Déterminer la table selon le type
-                        if breakdown_type == 'company_size':
-                            # Supprimer les anciens records du jour
-                            session.query(LinkedinFollowerByCompanySize).filter(
-                                LinkedinFollowerByCompanySize.organization_id == organization_id,
-                                LinkedinFollowerByCompanySize.date_collected == today
-                            ).delete()
-                            
-                            record = LinkedinFollowerByCompanySize(
-                                organization_id=organization_id,
-                                company_size=item.get('companySize', 'Unknown'),
-                                follower_count=item.get('followerCounts', 0),
-                                percentage=item.get('followerCounts', 0) / max(1, sum(i.get('followerCounts', 0) for i in breakdown_data)),
-                                date_collected=today
-                            )
-                            
-                        elif breakdown_type == 'function':
-                            session.query(LinkedinFollowerByFunction).filter(
-                                LinkedinFollowerByFunction.organization_id == organization_id,
-                                LinkedinFollowerByFunction.date_collected == today
-                            ).delete()
-                            
-                            record = LinkedinFollowerByFunction(
-                                organization_id=organization_id,
-                                function_name=item.get('function', 'Unknown'),
-                                follower_count=item.get('followerCounts', 0),
-                                percentage=item.get('followerCounts', 0) / max(1, sum(i.get('followerCounts', 0) for i in breakdown_data)),
-                                date_collected=today
-                            )
-                            
-                        elif breakdown_type == 'industry':
-                            session.query(LinkedinFollowerByIndustry).filter(
-                                LinkedinFollowerByIndustry.organization_id == organization_id,
-                                LinkedinFollowerByIndustry.date_collected == today
-                            ).delete()
-                            
-                            record = LinkedinFollowerByIndustry(
-                                organization_id=organization_id,
-                                industry_name=item.get('industry', 'Unknown'),
-                                follower_count=item.get('followerCounts', 0),
-                                percentage=item.get('followerCounts', 0) / max(1, sum(i.get('followerCounts', 0) for i in breakdown_data)),
-                                date_collected=today
-                            )
-                            
-                        elif breakdown_type == 'seniority':
-                            session.query(LinkedinFollowerBySeniority).filter(
-                                LinkedinFollowerBySeniority.organization_id == organization_id,
-                                LinkedinFollowerBySeniority.date_collected == today
-                            ).delete()
-                            
-                            record = LinkedinFollowerBySeniority(
-                                organization_id=organization_id,
-                                seniority_level=item.get('seniority', 'Unknown'),
-                                follower_count=item.get('followerCounts', 0),
-                                percentage=item.get('followerCounts', 0) / max(1, sum(i.get('followerCounts', 0) for i in breakdown_data)),
-                                date_collected=today
-                            )
-                            
-                        else:
-                            continue  # Type non supporté
-                        
-                        session.add(record)
-                        stored_count += 1
-                        
-                    except Exception as e:
-                        logger.warning(f"⚠️  Erreur stockage item breakdown: {e}")
-                        continue
-                
-                session.commit()
-                logger.debug(f"✅ Breakdown {breakdown_type} stocké: {stored_count} records")
-                return stored_count
+            buckets = {}
+            for item in breakdown_data:
+                counts = item.get('followerCounts', 0)
+                if isinstance(counts, dict):
+                    # Format API: {'organicFollowerCount': ..., 'paidFollowerCount': ...}
+                    counts = sum(value for value in counts.values() if isinstance(value, (int, float)))
+                segment = str(item.get(key_field, 'Unknown'))
+                buckets[segment] = buckets.get(segment, 0) + int(counts or 0)
+            
+            written = breakdown_snapshots.store('linkedin', organization_id, breakdown_type, buckets)
+            if written:
+                logger.debug(f"✅ Breakdown {breakdown_type} stocké: {written}/{len(buckets)} tranches écrites")
+            else:
+                logger.debug(f"ℹ️  Breakdown {breakdown_type} inchangé pour {organization_id}")
+            return written
                 
         except Exception as e:
             logger.error(f"❌ Erreur stockage breakdown: {e}")
             return 0
     
+    @traced('store')
     def _store_posts_metadata(self, organization_id: str, posts_data: List[Dict]) -> int:
         """Stocker les métadonnées des posts"""
         
@@ -1335,6 +1429,7 @@ class LinkedinCollector:
             logger.error(f"❌ Erreur stockage posts: {e}")
             return 0
     
+    @traced('store')
     def _store_posts_metrics(self, metrics_data: List[Dict]) -> int:
         """Stocker les métriques des posts"""
         
@@ -1428,6 +1523,7 @@ class LinkedinCollector:
             data_types = [
                 DataType.ORGANIZATION_INFO,
                 DataType.FOLLOWERS_BREAKDOWN,
+                DataType.PAGE_VIEWS,
                 DataType.POSTS,
                 DataType.POSTS_METRICS
             ]
@@ -1447,39 +1543,15 @@ class LinkedinCollector:
                 
                 logger.info(f"🚀 Début collecte complète: {organization_id}")
                 
-                results = {}
-                
-                # Collecter chaque type de données
-                for data_type in data_types:
-                    try:
-                        if data_type == DataType.ORGANIZATION_INFO:
-                            result = self.collect_organization_info(user_id, organization_id)
-                        elif data_type == DataType.FOLLOWERS_BREAKDOWN:
-                            result = self.collect_followers_breakdown(user_id, organization_id)
-                        elif data_type == DataType.POSTS:
-                            result = self.collect_posts(user_id, organization_id)
-                        elif data_type == DataType.POSTS_METRICS:
-                            result = self.collect_posts_metrics(user_id, organization_id)
-                        else:
-                            continue
-                        
-                        results[data_type.value] = result
-                        
-                        # Mettre à jour les statistiques
-                        self.session_stats['total_api_calls'] += result.api_calls_made
-                        self.session_stats['total_records_collected'] += result.records_collected
-                        
-                        # Pause entre les types de données
-                        time.sleep(1)
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erreur collecte {data_type.value}: {e}")
-                        results[data_type.value] = CollectionResult(
-                            status=CollectionStatus.FAILED,
-                            data_type=data_type,
-                            organization_id=organization_id,
-                            errors=[str(e)]
-                        )
+                # Chaque type est stocké dès sa fin de collecte (résultats partiels persistés)
+                if self.config['enable_concurrent_collection'] and len(data_types) > 1:
+                    results = self._collect_data_types_concurrently(user_id, organization_id, data_types)
+                else:
+                    results = {}
+                    for data_type in data_types:
+                        result = self._collect_data_type(user_id, organization_id, data_type)
+                        if result is not None:
+                            results[data_type.value] = result
                 
                 # Statistiques finales
                 execution_time = time.time() - start_time
@@ -1498,6 +1570,81 @@ class LinkedinCollector:
             if lock_key in self._collection_locks:
                 del self._collection_locks[lock_key]
     
+    def _collect_data_type(self, user_id: int, organization_id: str, data_type: DataType) -> Optional[CollectionResult]:
+        """Collecter un type de données d'une organisation (None si le type n'est pas géré ici)"""
+        
+        try:
+            if data_type == DataType.ORGANIZATION_INFO:
+                result = self.collect_organization_info(user_id, organization_id)
+            elif data_type == DataType.FOLLOWERS_BREAKDOWN:
+                result = self.collect_followers_breakdown(user_id, organization_id)
+            elif data_type == DataType.PAGE_VIEWS:
+                result = self.collect_page_statistics(user_id, organization_id)
+            elif data_type == DataType.POSTS:
+                result = self.collect_posts(user_id, organization_id)
+            elif data_type == DataType.POSTS_METRICS:
+                result = self.collect_posts_metrics(user_id, organization_id)
+            else:
+                return None
+            
+            # Mettre à jour les statistiques
+            with self._stats_lock:
+                self.session_stats['total_api_calls'] += result.api_calls_made
+                self.session_stats['total_records_collected'] += result.records_collected
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur collecte {data_type.value}: {e}")
+            return CollectionResult(
+                status=CollectionStatus.FAILED,
+                data_type=data_type,
+                organization_id=organization_id,
+                errors=[str(e)]
+            )
+    
+    def _collect_data_types_concurrently(self, user_id: int, organization_id: str,
+                                         data_types: List[DataType]) -> Dict[str, CollectionResult]:
+        """
+        Collecter les types de données en parallèle selon DATA_TYPE_DEPENDENCIES
+        Un type part dès que ses dépendances demandées sont terminées (quel que soit leur
+        statut, comme en séquentiel); la soumission se fait depuis le thread appelant, les
+        threads du pool n'attendent donc jamais d'autres tâches du pool
+        """
+        
+        requested = list(dict.fromkeys(data_types))
+        pending = {
+            data_type: {dep for dep in DATA_TYPE_DEPENDENCIES.get(data_type, ()) if dep in requested}
+            for data_type in requested
+        }
+        results: Dict[str, CollectionResult] = {}
+        running = {}
+        
+        def submit_ready():
+            for data_type in [dt for dt, deps in pending.items() if not deps]:
+                del pending[data_type]
+                # Copie du contexte: les spans du type de données vont dans la trace de la tâche
+                future = self._data_type_executor.submit(
+                    contextvars.copy_context().run, self._collect_data_type, user_id, organization_id, data_type
+                )
+                running[future] = data_type
+        
+        with span('data_types', organization_id):
+            submit_ready()
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    data_type = running.pop(future)
+                    result = future.result()
+                    if result is not None:
+                        results[data_type.value] = result
+                    for deps in pending.values():
+                        deps.discard(data_type)
+                submit_ready()
+        
+        # Ordre des résultats identique à celui de la demande
+        return {dt.value: results[dt.value] for dt in requested if dt.value in results}
+    
     def collect_user_organizations(self, user_id: int, force_refresh: bool = False) -> Dict[str, Any]:
         """Collecter les données de toutes les organisations d'un utilisateur"""
         
@@ -1573,7 +1720,7 @@ class LinkedinCollector:
                                 failed_collections += 1
                         
                         # Pause entre organisations
-                        time.sleep(2)
+                        traced_sleep(2)
                         
                     except Exception as e:
                         logger.error(f"❌ Erreur collecte séquentielle {account.organization_id}: {e}")
@@ -1680,6 +1827,18 @@ class LinkedinCollector:
         
         return None
     
+    def prometheus_metrics(self) -> List[Gauge]:
+        """Quota restant (minimum connu par type d'application) pour /metrics"""
+        
+        remaining = Gauge('platform_api_quota_remaining', 'Appels restants dans le quota connu', ('platform', 'app'))
+        lowest = {}
+        for quota in list(self._quota_cache.values()):
+            app_type = quota.app_type.value
+            lowest[app_type] = min(lowest.get(app_type, quota.remaining), quota.remaining)
+        for app_type, value in lowest.items():
+            remaining.set(value, 'linkedin', app_type)
+        return [remaining]
+    
     def get_collection_statistics(self) -> Dict[str, Any]:
         """Obtenir les statistiques de collecte de la session"""
         
@@ -1754,18 +1913,12 @@ class LinkedinCollector:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             deleted_counts = {}
             
+            # Métriques quotidiennes: partitions mensuelles expirées supprimées en bloc
+            deleted_counts['posts_daily'] = partition_manager.apply_retention(
+                db_manager.engine, LinkedinPostsDaily.__tablename__, cutoff_date.date()
+            )
+            
             with db_manager.get_session() as session:
-                # Nettoyer les métriques quotidiennes anciennes
-                deleted_posts_daily = session.query(LinkedinPostsDaily).filter(
-                    LinkedinPostsDaily.created_at < cutoff_date
-                ).count()
-                
-                session.query(LinkedinPostsDaily).filter(
-                    LinkedinPostsDaily.created_at < cutoff_date
-                ).delete()
-                
-                deleted_counts['posts_daily'] = deleted_posts_daily
-                
                 # Nettoyer les breakdowns anciens
                 deleted_followers = session.query(LinkedinFollowerByCompanySize).filter(
                     LinkedinFollowerByCompanySize.created_at < cutoff_date
@@ -1789,6 +1942,9 @@ class LinkedinCollector:
                 
                 session.commit()
             
+            # Snapshots de segmentation: la keyframe encore utile à la période conservée reste
+            deleted_counts['breakdown_snapshots'] = breakdown_snapshots.purge_before(cutoff_date.date(), 'linkedin')
+            
             total_deleted = sum(deleted_counts.values())
             logger.info(f"🧹 Nettoyage terminé: {total_deleted} enregistrements supprimés")
             
@@ -1803,6 +1959,7 @@ class LinkedinCollector:
 # ========================================
 
 linkedin_collector = LinkedinCollector()
+metrics_registry.register_collector(linkedin_collector.prometheus_metrics)
 
 # ========================================
 # FONCTIONS HELPER
@@ -1925,7 +2082,7 @@ class LinkedinCollectionScheduler:
                             self._collect_async(user_id, org_id)
                         
                         # Pause courte entre les vérifications
-                        time.sleep(1)
+                        traced_sleep(1)
                     
                 except Exception as e:
                     logger.error(f"❌ Erreur vérification utilisateur {user_id}: {e}")
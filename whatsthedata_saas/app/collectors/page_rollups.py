@@ -0,0 +1,286 @@
+"""
+Agrégats précalculés des statistiques de page (semaine, mois, total courant)
+Chaque collecte écrit les jours reçus (granularity='day'); seul l'écart avec la valeur déjà
+stockée est reporté sur la semaine et le mois du jour et sur les totaux courants à partir de
+ce jour. Une correction tardive ne recalcule donc que les périodes qu'elle touche, et les
+vues hebdomadaires, mensuelles ou cumulées se lisent en quelques lignes au lieu d'un appel
+d'API par jour.
+"""
+
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import and_
+
+from ..database.cold_storage import cold_storage
+from ..database.connection import db_manager
+from ..database.models import PageStatisticsRollup
+
+logger = logging.getLogger(__name__)
+
+# Colonne -> chemin dans totalPageStatistics (organizationPageStatistics)
+PAGE_STATISTICS_FIELDS: Dict[str, str] = {
+    'total_page_views': 'views.allPageViews.pageViews',
+    'unique_page_views': 'views.allPageViews.uniquePageViews',
+    'desktop_page_views': 'views.desktopPageViews.pageViews',
+    'mobile_page_views': 'views.mobilePageViews.pageViews',
+    'overview_page_views': 'views.overviewPageViews.pageViews',
+    'careers_page_views': 'views.careersPageViews.pageViews',
+    'about_page_views': 'views.aboutPageViews.pageViews',
+    'people_page_views': 'views.peoplePageViews.pageViews',
+    'jobs_page_views': 'views.jobsPageViews.pageViews',
+    'life_at_page_views': 'views.lifeAtPageViews.pageViews',
+}
+PAGE_STATISTICS_METRICS: Tuple[str, ...] = tuple(PAGE_STATISTICS_FIELDS)
+
+Metrics = Dict[str, int]
+
+
+def page_statistics_from_api(stats: Dict[str, Any]) -> Metrics:
+    """Extraire les vues de page d'un bloc totalPageStatistics (0 si absent)"""
+    metrics = {}
+    for column, path in PAGE_STATISTICS_FIELDS.items():
+        value: Any = stats
+        for key in path.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        metrics[column] = int(value or 0)
+    return metrics
+
+
+def week_bounds(day: date) -> Tuple[date, date]:
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=6)
+
+
+def month_bounds(day: date) -> Tuple[date, date]:
+    start = day.replace(day=1)
+    next_month = (start + timedelta(days=32)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+
+PERIODS = {'week': week_bounds, 'month': month_bounds}
+
+
+def _zeros() -> Metrics:
+    return dict.fromkeys(PAGE_STATISTICS_METRICS, 0)
+
+
+def _metrics_of(row) -> Metrics:
+    return {column: getattr(row, column) or 0 for column in PAGE_STATISTICS_METRICS}
+
+
+def _metrics_from(values: Dict[str, Any]) -> Metrics:
+    return {column: values.get(column) or 0 for column in PAGE_STATISTICS_METRICS}
+
+
+class PageStatisticsRollups:
+    """Écriture des jours collectés et lecture des agrégats (table page_statistics_rollups)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {'unchanged_days': 0, 'new_days': 0, 'corrected_days': 0, 'periods_rerolled': 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    @staticmethod
+    def _series_filter(platform: str, account_id: str, granularity: str):
+        return and_(PageStatisticsRollup.platform == platform,
+                    PageStatisticsRollup.account_id == account_id,
+                    PageStatisticsRollup.granularity == granularity)
+
+    # ========================================
+    # ÉCRITURE
+    # ========================================
+
+    def store_days(self, platform: str, account_id: str, days: Dict[date, Metrics]) -> int:
+        """
+        Enregistrer les statistiques de jours collectés et reporter les écarts sur les agrégats.
+        Retourne le nombre de jours nouveaux ou corrigés (0 si tout était déjà à jour).
+        """
+        days = {day: {column: int(metrics.get(column) or 0) for column in PAGE_STATISTICS_METRICS}
+                for day, metrics in days.items() if metrics}
+        if not days:
+            return 0
+
+        with db_manager.get_session() as session:
+            existing = {row.period_start: row for row in session.query(PageStatisticsRollup).filter(
+                self._series_filter(platform, account_id, 'day'),
+                PageStatisticsRollup.period_start.in_(list(days))
+            )}
+
+            # Jours absents de la base mais déjà compactés en Parquet: ce sont des corrections
+            absent = [day for day in days if day not in existing]
+            archived = {}
+            if absent and min(absent) < cold_storage.horizon():
+                archived = {row['period_start']: _metrics_from(row) for row in cold_storage.read_archived(
+                    PageStatisticsRollup.__tablename__, platform, account_id, min(absent), max(absent)
+                )}
+
+            # (jour, écart par métrique, 1 si le jour est nouveau)
+            changes: List[Tuple[date, Metrics, int]] = []
+            for day in sorted(days):
+                metrics = days[day]
+                row = existing.get(day)
+                if row is None:
+                    previous = archived.get(day)
+                    if previous is not None:
+                        delta = {column: metrics[column] - previous[column] for column in PAGE_STATISTICS_METRICS}
+                        if not any(delta.values()):
+                            continue
+                    row = PageStatisticsRollup(platform=platform, account_id=account_id, granularity='day',
+                                               period_start=day, day_count=1)
+                    session.add(row)
+                    changes.append((day, dict(metrics), 1) if previous is None else (day, delta, 0))
+                else:
+                    delta = {column: metrics[column] - (getattr(row, column) or 0) for column in PAGE_STATISTICS_METRICS}
+                    if not any(delta.values()):
+                        continue
+                    changes.append((day, delta, 0))
+                for column, value in metrics.items():
+                    setattr(row, column, value)
+
+            if changes:
+                periods = self._reroll_periods(session, platform, account_id, changes)
+                self._reroll_running(session, platform, account_id, changes)
+                session.commit()
+
+        added = sum(change[2] for change in changes)
+        self._count('unchanged_days', len(days) - len(changes))
+        self._count('new_days', added)
+        self._count('corrected_days', len(changes) - added)
+        if changes:
+            self._count('periods_rerolled', periods)
+        return len(changes)
+
+    def _reroll_periods(self, session, platform: str, account_id: str,
+                        changes: List[Tuple[date, Metrics, int]]) -> int:
+        """Ajouter les écarts aux semaines et mois des jours modifiés (une ligne par période)"""
+        pending: Dict[Tuple[str, date], List] = {}
+        for day, delta, added in changes:
+            for granularity, bounds in PERIODS.items():
+                entry = pending.setdefault((granularity, bounds(day)[0]), [_zeros(), 0])
+                for column, value in delta.items():
+                    entry[0][column] += value
+                entry[1] += added
+
+        rows = {(row.granularity, row.period_start): row for row in session.query(PageStatisticsRollup).filter(
+            PageStatisticsRollup.platform == platform,
+            PageStatisticsRollup.account_id == account_id,
+            PageStatisticsRollup.granularity.in_(list(PERIODS)),
+            PageStatisticsRollup.period_start.in_(list({period_start for _, period_start in pending}))
+        )}
+        for (granularity, period_start), (delta, added) in pending.items():
+            row = rows.get((granularity, period_start))
+            if row is None:
+                row = PageStatisticsRollup(platform=platform, account_id=account_id, granularity=granularity,
+                                           period_start=period_start, day_count=0, **_zeros())
+                session.add(row)
+            row.day_count = (row.day_count or 0) + added
+            for column, value in delta.items():
+                setattr(row, column, (getattr(row, column) or 0) + value)
+        return len(pending)
+
+    def _reroll_running(self, session, platform: str, account_id: str,
+                        changes: List[Tuple[date, Metrics, int]]):
+        """Reporter chaque écart sur les totaux courants arrêtés à ce jour ou après"""
+        series = self._series_filter(platform, account_id, 'running')
+        columns = [getattr(PageStatisticsRollup, column) for column in PAGE_STATISTICS_METRICS]
+
+        # Ordre croissant: le total précédant un jour nouveau inclut déjà les écarts antérieurs
+        for day, delta, added in changes:
+            if added:
+                previous = session.query(PageStatisticsRollup.day_count, *columns).filter(
+                    series, PageStatisticsRollup.period_start < day
+                ).order_by(PageStatisticsRollup.period_start.desc()).first()
+                base = dict(zip(PAGE_STATISTICS_METRICS, previous[1:])) if previous else _zeros()
+                session.add(PageStatisticsRollup(platform=platform, account_id=account_id, granularity='running',
+                                                 period_start=day, day_count=previous[0] if previous else 0,
+                                                 **base))
+                session.flush()
+
+            values = {getattr(PageStatisticsRollup, column): getattr(PageStatisticsRollup, column) + value
+                      for column, value in delta.items() if value}
+            if added:
+                values[PageStatisticsRollup.day_count] = PageStatisticsRollup.day_count + added
+            if values:
+                session.query(PageStatisticsRollup).filter(
+                    series, PageStatisticsRollup.period_start >= day
+                ).update(values, synchronize_session=False)
+
+    # ========================================
+    # LECTURE
+    # ========================================
+
+    def load_days(self, platform: str, account_id: str, start_date: date, end_date: date) -> Dict[date, Metrics]:
+        """Jours collectés de la période (base et mois compactés en Parquet)"""
+        rows = cold_storage.read_history(PageStatisticsRollup.__tablename__, platform, account_id, start_date, end_date)
+        return {row['period_start']: _metrics_from(row) for row in rows}
+
+    def missing_days(self, platform: str, account_id: str, start_date: date, end_date: date) -> List[date]:
+        """Jours de la période sans statistiques stockées"""
+        stored = set(self.load_days(platform, account_id, start_date, end_date))
+        return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)
+                if start_date + timedelta(days=offset) not in stored]
+
+    def load_periods(self, platform: str, account_id: str, granularity: str,
+                     start_date: date, end_date: date) -> List[Tuple[date, Metrics]]:
+        """
+        Sommes par semaine ou par mois sur la période, datées du premier jour couvert.
+        Les périodes entières viennent des agrégats; seules les périodes coupées par les
+        bornes de la demande sont sommées à partir des jours.
+        """
+        bounds = PERIODS[granularity]
+        periods: List[Tuple[date, date]] = []
+        cursor = start_date
+        while cursor <= end_date:
+            period_start, period_end = bounds(cursor)
+            periods.append((period_start, period_end))
+            cursor = period_end + timedelta(days=1)
+
+        whole = [period_start for period_start, period_end in periods
+                 if period_start >= start_date and period_end <= end_date]
+        with db_manager.get_session() as session:
+            rollups = {row.period_start: _metrics_of(row) for row in session.query(PageStatisticsRollup).filter(
+                self._series_filter(platform, account_id, granularity),
+                PageStatisticsRollup.period_start.in_(whole)
+            )} if whole else {}
+
+        results: List[Tuple[date, Metrics]] = []
+        for period_start, period_end in periods:
+            if period_start in whole:
+                totals = rollups.get(period_start) or _zeros()
+            else:
+                totals = _zeros()
+                for metrics in self.load_days(platform, account_id, max(period_start, start_date),
+                                              min(period_end, end_date)).values():
+                    for column, value in metrics.items():
+                        totals[column] += value
+            results.append((max(period_start, start_date), totals))
+        return results
+
+    def load_cumulative(self, platform: str, account_id: str, start_date: date, end_date: date) -> Metrics:
+        """Somme de la période: total courant à la fin moins total courant avant le début"""
+        with db_manager.get_session() as session:
+            series = self._series_filter(platform, account_id, 'running')
+
+            def latest(*condition):
+                return session.query(PageStatisticsRollup).filter(
+                    series, *condition
+                ).order_by(PageStatisticsRollup.period_start.desc()).first()
+
+            at_end = latest(PageStatisticsRollup.period_start <= end_date)
+            before_start = latest(PageStatisticsRollup.period_start < start_date)
+
+            totals = _metrics_of(at_end) if at_end is not None else _zeros()
+            if before_start is not None:
+                for column, value in _metrics_of(before_start).items():
+                    totals[column] -= value
+        return totals
+
+
+# Instance globale
+page_rollups = PageStatisticsRollups()
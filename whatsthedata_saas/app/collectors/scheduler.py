@@ -11,11 +11,13 @@ import time
 import logging
 import threading
 import asyncio
+import contextvars
 from datetime import datetime, timedelta, date
-from typing import Optional, Dict, Any, List, Tuple, Set, Union, Callable
+from typing import Optional, Dict, Any, List, Tuple, Set, Union, Callable, Iterable
 from dataclasses import dataclass, asdict, field
 from enum import Enum
-from concurrent.futures import ThreadPoolExecutor, as_completed, Future
+from concurrent.futures import ThreadPoolExecutor, as_completed, Future, wait as wait_futures
+from functools import lru_cache
 from queue import Queue, PriorityQueue, Empty
 import schedule
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -25,6 +27,7 @@ from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.executors.thread import ThreadPoolExecutor as APSThreadPoolExecutor
 import psutil
 import uuid
+from types import MappingProxyType
 from collections import defaultdict, deque
 import pickle
 import signal
@@ -33,9 +36,16 @@ import sys
 from .linkedin_collector import linkedin_collector, LinkedinCollector, DataType as LinkedinDataType
 from .facebook_collector import facebook_collector, FacebookCollector, FacebookDataType
 from ..auth.user_manager import user_manager
+from ..database.cold_storage import cold_storage
 from ..database.connection import db_manager
 from ..database.models import User, LinkedinAccount, FacebookAccount
 from ..utils.config import get_env_var
+from ..utils.response_cache import looker_response_cache
+from .task_metrics import TaskOutcomeMetrics, OUTCOMES
+from .task_queue import TaskQueue
+from .task_records import TaskHistory, TaskResultStore, TaskSummary, intern_strings, truncate_error
+from ..utils.prometheus import Counter, Gauge, metrics_registry, serve_metrics
+from ..utils.tracing import flight_recorder
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
@@ -83,14 +93,37 @@ class HealthStatus(Enum):
     CRITICAL = "critical"
     UNKNOWN = "unknown"
 
-@dataclass
+# Clés propres à une exécution en cours, sans objet une fois la tâche archivée
+TRANSIENT_METADATA_KEYS = frozenset({'resources_reserved', 'reservation_time'})
+
+def _summary_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Métadonnées conservées dans le résumé (cibles hybrides, retry_count, politiques...)"""
+    return {key: value for key, value in (metadata or {}).items() if key not in TRANSIENT_METADATA_KEYS}
+
+# Tables d'appartenance des types de données (calculées une fois, pas à chaque tâche hybride)
+LINKEDIN_DATA_TYPE_VALUES = frozenset(data_type.value for data_type in LinkedinDataType)
+FACEBOOK_DATA_TYPE_VALUES = frozenset(data_type.value for data_type in FacebookDataType)
+
+@lru_cache(maxsize=256)
+def split_hybrid_data_types(data_types: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Répartir les types de données d'une tâche hybride entre LinkedIn et Facebook"""
+    linkedin_types = tuple(dt for dt in data_types if dt in LINKEDIN_DATA_TYPE_VALUES)
+    facebook_types = tuple(dt for dt in data_types if dt in FACEBOOK_DATA_TYPE_VALUES and dt not in LINKEDIN_DATA_TYPE_VALUES)
+    return linkedin_types, facebook_types
+
+@dataclass(slots=True)
 class CollectionTask:
-    """Tâche de collecte unifiée"""
+    """
+    Tâche de collecte unifiée
+    Forme fixe (slots), types de données et cible internés: des dizaines de milliers de
+    tâches récurrentes partagent les mêmes chaînes. Les résultats ne sont jamais portés
+    par la tâche (TaskResultStore), et une tâche terminée ne survit que sous forme de TaskSummary.
+    """
     task_id: str
     user_id: int
     collector_type: CollectorType
     target_id: str  # page_id ou organization_id
-    data_types: List[str]
+    data_types: Tuple[str, ...]
     priority: Priority
     scheduled_time: datetime
     created_at: datetime = field(default_factory=datetime.utcnow)
@@ -100,12 +133,18 @@ class CollectionTask:
     last_error: Optional[str] = None
     execution_time: Optional[float] = None
     resources_needed: Dict[ResourceType, int] = field(default_factory=dict)
-    dependencies: List[str] = field(default_factory=list)  # IDs des tâches dépendantes
+    dependencies: Tuple[str, ...] = ()  # IDs des tâches dépendantes
     metadata: Dict[str, Any] = field(default_factory=dict)
     timeout_seconds: int = 300  # 5 minutes par défaut
     worker_assigned: Optional[str] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    outcome_recorded: bool = False  # issue de l'exécution en cours déjà comptée (échéance ou worker)
+    
+    def __post_init__(self):
+        self.target_id = sys.intern(str(self.target_id))
+        self.data_types = intern_strings(self.data_types)
+        self.dependencies = tuple(self.dependencies or ())
     
     def __lt__(self, other):
         """Comparaison pour la PriorityQueue"""
@@ -127,7 +166,7 @@ class CollectionTask:
             'user_id': self.user_id,
             'collector_type': self.collector_type.value,
             'target_id': self.target_id,
-            'data_types': self.data_types,
+            'data_types': list(self.data_types),
             'priority': self.priority.value,
             'status': self.status.value,
             'scheduled_time': self.scheduled_time.isoformat(),
@@ -142,6 +181,25 @@ class CollectionTask:
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
+    
+    def summarize(self) -> TaskSummary:
+        """Résumé compact conservé dans l'historique une fois la tâche sortie du suivi"""
+        return TaskSummary(
+            task_id=self.task_id,
+            user_id=self.user_id,
+            collector_type=self.collector_type,
+            target_id=self.target_id,
+            data_types=self.data_types,
+            priority=self.priority,
+            status=self.status,
+            attempts=self.attempts,
+            max_attempts=self.max_attempts,
+            execution_time=round(self.execution_time, 3) if self.execution_time is not None else None,
+            created_at=self.created_at,
+            completed_at=self.completed_at or datetime.utcnow(),
+            last_error=truncate_error(self.last_error),
+            metadata=_summary_metadata(self.metadata)
+        )
 
 @dataclass
 class ResourceUsage:
@@ -268,25 +326,60 @@ class CircuitBreaker:
         self.failure_count = 0
         self.last_failure_time = None
         self.state = 'CLOSED'  # CLOSED, OPEN, HALF_OPEN
+        # En HALF_OPEN un seul appel d'essai passe; les autres sont refusés jusqu'à son issue
+        self.half_open_in_flight = False
+        self.half_open_since = None
         self._lock = threading.Lock()
     
     def call(self, func: Callable, *args, **kwargs):
         """Exécuter une fonction avec circuit breaker"""
         
+        if not self.allow():
+            raise SchedulerError("Circuit breaker ouvert", error_code="CIRCUIT_BREAKER_OPEN")
+        
+        # Le verrou ne protège que l'état: les appels d'un même collecteur restent concurrents
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record(False)
+            raise
+        
+        self.record(True)
+        return result
+    
+    def allow(self) -> bool:
+        """
+        Le circuit laisse-t-il passer un appel (passage en HALF_OPEN si le délai est écoulé).
+        En HALF_OPEN seul le premier appel est admis comme essai; un essai sans issue au bout
+        de timeout_seconds est considéré perdu et un nouvel essai est admis.
+        """
+        
         with self._lock:
             if self.state == 'OPEN':
-                if self._should_attempt_reset():
-                    self.state = 'HALF_OPEN'
-                else:
-                    raise SchedulerError("Circuit breaker ouvert", error_code="CIRCUIT_BREAKER_OPEN")
+                if not self._should_attempt_reset():
+                    return False
+                self.state = 'HALF_OPEN'
+            elif self.state != 'HALF_OPEN':
+                return True
             
-            try:
-                result = func(*args, **kwargs)
+            probe_lost = (self.half_open_since is not None and
+                          (datetime.utcnow() - self.half_open_since).total_seconds() > self.timeout_seconds)
+            if self.half_open_in_flight and not probe_lost:
+                return False
+            self.half_open_in_flight = True
+            self.half_open_since = datetime.utcnow()
+            return True
+    
+    def record(self, success: bool):
+        """Enregistrer l'issue d'un appel effectué hors de call()"""
+        
+        with self._lock:
+            self.half_open_in_flight = False
+            self.half_open_since = None
+            if success:
                 self._on_success()
-                return result
-            except Exception as e:
+            else:
                 self._on_failure()
-                raise
     
     def _should_attempt_reset(self) -> bool:
         """Vérifier si on peut tenter de fermer le circuit"""
@@ -304,17 +397,57 @@ class CircuitBreaker:
         self.failure_count += 1
         self.last_failure_time = datetime.utcnow()
         
-        if self.failure_count >= self.failure_threshold:
+        # Échec de l'essai HALF_OPEN: réouverture immédiate, quel que soit le compteur
+        if self.failure_count >= self.failure_threshold or self.state == 'HALF_OPEN':
             self.state = 'OPEN'
 
 class MetricsCollector:
     """Collecteur de métriques système et de performance"""
     
+    # Statut final d'une tâche -> code de résultat de l'anneau
+    TASK_OUTCOMES = {
+        TaskStatus.COMPLETED: 'completed',
+        TaskStatus.FAILED: 'failed',
+        TaskStatus.RETRYING: 'retrying',
+        TaskStatus.TIMEOUT: 'timeout',
+        TaskStatus.CANCELLED: 'cancelled'
+    }
+    
     def __init__(self):
         self.metrics_history = deque(maxlen=1000)  # Garder 1000 points de données
         self.collection_interval = 30  # secondes
         self.is_collecting = False
         self._stop_event = threading.Event()
+        
+        # Résultats des tâches: anneau compact + agrégats incrémentaux (O(1) par tâche)
+        self.task_outcomes = TaskOutcomeMetrics(
+            capacity=int(get_env_var('SCHEDULER_TASK_METRICS_CAPACITY', '4096'))
+        )
+        self._record_lock = threading.Lock()
+    
+    def record_task(self, task: 'CollectionTask', execution_time: float) -> bool:
+        """
+        Enregistrer le résultat d'une tâche terminée, en retry ou en échec
+        Une seule fois par exécution: le worker d'une tâche déjà comptée en timeout par la
+        surveillance des échéances ne la compte pas une seconde fois (retourne False)
+        """
+        with self._record_lock:
+            if task.outcome_recorded:
+                return False
+            task.outcome_recorded = True
+        self.task_outcomes.record(
+            task.collector_type.value,
+            execution_time or 0.0,
+            self.TASK_OUTCOMES.get(task.status, 'failed')
+        )
+        return True
+    
+    def get_task_summary(self) -> Dict[str, Any]:
+        """Résumé des résultats de tâches (global et par type de collecteur)"""
+        return {
+            'overall': self.task_outcomes.summary(),
+            'by_type': self.task_outcomes.summary_by_type()
+        }
     
     def start_collection(self):
         """Démarrer la collecte de métriques"""
@@ -515,11 +648,16 @@ class UnifiedCollectionScheduler:
         )
         
         # Queues de tâches et stockage
-        self.task_queue = PriorityQueue()
+        self.task_queue = TaskQueue(demand=lambda task: task.resources_needed.get(ResourceType.API_QUOTA, 0))
         self.running_tasks: Dict[str, CollectionTask] = {}
-        self.completed_tasks: Dict[str, CollectionTask] = {}
-        self.failed_tasks: Dict[str, CollectionTask] = {}
-        self.cancelled_tasks: Dict[str, CollectionTask] = {}
+        
+        self._resource_estimates: Dict[Tuple[CollectorType, Tuple[str, ...]], Dict[ResourceType, int]] = {}
+        
+        # Historique borné des tâches sorties du suivi (résumés compacts) et de leurs résultats
+        self.completed_tasks: Dict[str, TaskSummary] = TaskHistory(self.config['completed_history_size'])
+        self.failed_tasks: Dict[str, TaskSummary] = TaskHistory(self.config['failed_history_size'])
+        self.cancelled_tasks: Dict[str, TaskSummary] = TaskHistory(self.config['cancelled_history_size'])
+        self.result_store = TaskResultStore(self.config['result_store_size'])
         
         # Politique de planification
         self.scheduling_policy = TaskSchedulingPolicy()
@@ -539,6 +677,7 @@ class UnifiedCollectionScheduler:
         self.stats = CollectionStats()
         self.metrics_collector = MetricsCollector()
         self.persistence_manager = PersistenceManager()
+        self._metrics_server = None
         
         # Contrôle d'exécution
         self.is_running = False
@@ -547,6 +686,7 @@ class UnifiedCollectionScheduler:
         self._stop_event = threading.Event()
         self._pause_event = threading.Event()
         self._resource_lock = threading.RLock()
+        self._hybrid_executor: Optional[ThreadPoolExecutor] = None
         
         # Cache des utilisateurs et comptes
         self._user_cache = {}
@@ -611,6 +751,12 @@ class UnifiedCollectionScheduler:
             'state_file': get_env_var('SCHEDULER_STATE_FILE', 'scheduler_state.pkl'),
             'auto_save_interval': int(get_env_var('SCHEDULER_AUTO_SAVE_INTERVAL', '300')),
             
+            # Historique des tâches
+            'completed_history_size': int(get_env_var('SCHEDULER_COMPLETED_HISTORY_SIZE', '500')),
+            'failed_history_size': int(get_env_var('SCHEDULER_FAILED_HISTORY_SIZE', '200')),
+            'cancelled_history_size': int(get_env_var('SCHEDULER_CANCELLED_HISTORY_SIZE', '200')),
+            'result_store_size': int(get_env_var('SCHEDULER_RESULT_STORE_SIZE', '500')),
+            
             # Debugging et logging
             'debug_mode': get_env_var('SCHEDULER_DEBUG_MODE', 'false').lower() == 'true',
             'log_task_details': get_env_var('SCHEDULER_LOG_TASK_DETAILS', 'false').lower() == 'true',
@@ -750,7 +896,7 @@ class UnifiedCollectionScheduler:
         """Obtenir les types de données par défaut pour un collecteur"""
         
         if collector_type == CollectorType.LINKEDIN:
-            return ["organization_info", "followers_breakdown", "posts", "posts_metrics"]
+            return ["organization_info", "followers_breakdown", "page_views", "posts", "posts_metrics"]
         elif collector_type == CollectorType.FACEBOOK:
             return ["page_info", "page_metrics", "posts", "posts_metrics"]
         elif collector_type == CollectorType.HYBRID:
@@ -920,7 +1066,7 @@ class UnifiedCollectionScheduler:
                 self._release_resources(task)
                 
                 # Déplacer vers les tâches annulées
-                self.cancelled_tasks[task_id] = task
+                self._archive_task(self.cancelled_tasks, task)
                 del self.running_tasks[task_id]
                 
                 self.stats.total_tasks_cancelled += 1
@@ -939,7 +1085,7 @@ class UnifiedCollectionScheduler:
                             task.status = TaskStatus.CANCELLED
                             task.last_error = reason
                             task.completed_at = datetime.utcnow()
-                            self.cancelled_tasks[task_id] = task
+                            self._archive_task(self.cancelled_tasks, task)
                             self.stats.total_tasks_cancelled += 1
                             task_found = True
                             logger.info(f"✅ Tâche en queue annulée: {task_id}")
@@ -1011,7 +1157,7 @@ class UnifiedCollectionScheduler:
                 logger.warning(f"⚠️  Tâche non trouvée dans les échecs: {task_id}")
                 return False
             
-            task = self.failed_tasks[task_id]
+            task = self._task_from_summary(self.failed_tasks[task_id])
             
             # Réinitialiser les tentatives si demandé
             if reset_attempts:
@@ -1094,6 +1240,16 @@ class UnifiedCollectionScheduler:
             if self.config['performance_monitoring']:
                 self.metrics_collector.start_collection()
             
+            # Exposition Prometheus quand le scheduler tourne hors du processus API
+            metrics_port = int(get_env_var('SCHEDULER_METRICS_PORT', '0'))
+            if metrics_port and self._metrics_server is None:
+                try:
+                    self._metrics_server = serve_metrics(
+                        metrics_port, json_routes={'/admin/task-traces': flight_recorder.snapshot}
+                    )
+                except OSError as e:
+                    logger.warning(f"⚠️  Exposition des métriques impossible sur :{metrics_port}: {e}")
+            
             # Démarrer la sauvegarde automatique
             if self.config['state_persistence_enabled']:
                 self.persistence_manager.start_auto_save(self._get_current_state)
@@ -1172,6 +1328,12 @@ class UnifiedCollectionScheduler:
             # Forcer l'arrêt des tâches en cours
             self._force_stop_running_tasks()
             
+            # Abandonner les moitiés de tâches hybrides encore en attente
+            with self._resource_lock:
+                if self._hybrid_executor is not None:
+                    self._hybrid_executor.shutdown(wait=False, cancel_futures=True)
+                    self._hybrid_executor = None
+            
             # Nettoyer les ressources
             self._cleanup_resources()
             
@@ -1221,18 +1383,18 @@ class UnifiedCollectionScheduler:
             # Restaurer les tâches terminées récentes (pour les statistiques)
             for task_id, task_dict in saved_state.get('completed_tasks', {}).items():
                 try:
-                    task = self._dict_to_task(task_dict)
-                    if task:
-                        self.completed_tasks[task_id] = task
+                    summary = self._dict_to_summary(task_dict)
+                    if summary:
+                        self.completed_tasks[task_id] = summary
                 except Exception as e:
                     logger.warning(f"⚠️  Erreur restauration tâche terminée {task_id}: {e}")
             
             # Restaurer les tâches échouées
             for task_id, task_dict in saved_state.get('failed_tasks', {}).items():
                 try:
-                    task = self._dict_to_task(task_dict)
-                    if task:
-                        self.failed_tasks[task_id] = task
+                    summary = self._dict_to_summary(task_dict)
+                    if summary:
+                        self.failed_tasks[task_id] = summary
                 except Exception as e:
                     logger.warning(f"⚠️  Erreur restauration tâche échouée {task_id}: {e}")
             
@@ -1278,6 +1440,62 @@ class UnifiedCollectionScheduler:
             logger.warning(f"⚠️  Erreur conversion dictionnaire vers tâche: {e}")
             return None
     
+    def _dict_to_summary(self, task_dict: Dict[str, Any]) -> Optional[TaskSummary]:
+        """Convertir un dictionnaire sauvegardé (résumé, ou tâche complète d'un ancien état) en résumé"""
+        
+        try:
+            metadata = _summary_metadata(task_dict.get('metadata'))
+            # Résumés sauvegardés avant que les métadonnées ne soient conservées
+            for platform, account_id in task_dict.get('targets') or ():
+                metadata.setdefault(f"{platform}_target", account_id)
+            
+            return TaskSummary(
+                task_id=task_dict['task_id'],
+                user_id=task_dict['user_id'],
+                collector_type=CollectorType(task_dict['collector_type']),
+                target_id=sys.intern(str(task_dict['target_id'])),
+                data_types=intern_strings(task_dict['data_types']),
+                priority=Priority(task_dict['priority']),
+                status=TaskStatus(task_dict['status']),
+                attempts=task_dict['attempts'],
+                max_attempts=task_dict['max_attempts'],
+                execution_time=task_dict.get('execution_time'),
+                created_at=datetime.fromisoformat(task_dict['created_at']),
+                completed_at=datetime.fromisoformat(task_dict['completed_at']) if task_dict.get('completed_at') else None,
+                last_error=truncate_error(task_dict.get('last_error')),
+                metadata=metadata
+            )
+        except Exception as e:
+            logger.warning(f"⚠️  Erreur conversion dictionnaire vers résumé: {e}")
+            return None
+    
+    def _task_from_summary(self, summary: TaskSummary) -> CollectionTask:
+        """Reconstruire une tâche relançable à partir de son résumé"""
+        
+        return CollectionTask(
+            task_id=summary.task_id,
+            user_id=summary.user_id,
+            collector_type=summary.collector_type,
+            target_id=summary.target_id,
+            data_types=summary.data_types,
+            priority=summary.priority,
+            scheduled_time=datetime.utcnow(),
+            created_at=summary.created_at,
+            status=summary.status,
+            attempts=summary.attempts,
+            max_attempts=summary.max_attempts,
+            last_error=summary.last_error,
+            execution_time=summary.execution_time,
+            resources_needed=self._estimate_resources(summary.collector_type, summary.data_types),
+            metadata=dict(summary.metadata),
+            timeout_seconds=self.config['task_timeout_seconds']
+        )
+    
+    def _archive_task(self, history: TaskHistory, task: CollectionTask):
+        """Sortir une tâche du suivi: seul son résumé est conservé (historique borné)"""
+        
+        history[task.task_id] = task.summarize()
+    
     def _get_current_state(self) -> Dict[str, Any]:
         """Obtenir l'état actuel du scheduler pour la persistance"""
         
@@ -1322,7 +1540,7 @@ class UnifiedCollectionScheduler:
                 self._release_resources(task)
                 
                 # Déplacer vers les tâches annulées
-                self.cancelled_tasks[task_id] = task
+                self._archive_task(self.cancelled_tasks, task)
                 del self.running_tasks[task_id]
                 
                 logger.debug(f"🛑 Tâche forcée à l'arrêt: {task_id}")
@@ -1385,10 +1603,12 @@ class UnifiedCollectionScheduler:
                 self._release_resources(task)
                 
                 # Déplacer vers les tâches échouées
-                self.failed_tasks[task.task_id] = task
+                self._archive_task(self.failed_tasks, task)
                 del self.running_tasks[task.task_id]
                 
                 self.stats.total_tasks_timeout += 1
+                if task.started_at:
+                    self.metrics_collector.record_task(task, (task.completed_at - task.started_at).total_seconds())
                 
                 # Émettre un événement
                 self._emit_event('task_timeout', {
@@ -1843,6 +2063,17 @@ class UnifiedCollectionScheduler:
         
         start_time = time.time()
         task.started_at = datetime.utcnow()
+        task.outcome_recorded = False
+        
+        # Trace de la tâche: les phases des collecteurs y enregistrent leurs spans
+        trace_token = flight_recorder.begin(
+            task.task_id,
+            collector_type=task.collector_type.value,
+            user_id=task.user_id,
+            target_id=task.target_id,
+            worker=worker_name,
+            attempt=task.attempts + 1
+        )
         
         try:
             # Marquer comme en cours
@@ -1894,6 +2125,12 @@ class UnifiedCollectionScheduler:
             
             # Marquer comme terminée
             task.completed_at = datetime.utcnow()
+            
+            flight_recorder.end(
+                trace_token,
+                status=task.status.value,
+                error=task.last_error if task.status != TaskStatus.COMPLETED else None
+            )
     
     def _execute_task_core(self, task: CollectionTask) -> Dict[str, Any]:
         """Exécution principale d'une tâche"""
@@ -1987,24 +2224,19 @@ class UnifiedCollectionScheduler:
             return {'success': False, 'error': str(e)}
     
     def _execute_hybrid_task(self, task: CollectionTask) -> Dict[str, Any]:
-        """Exécuter une tâche hybride (LinkedIn + Facebook)"""
+        """
+        Exécuter une tâche hybride (LinkedIn + Facebook)
+        Les deux moitiés partent en parallèle (quotas, tokens et limites indépendants), chacune
+        derrière son circuit breaker; les résultats sont fusionnés quand les deux ont fini ou
+        à l'échéance de la tâche, ce qui ramène la durée à celle de la plateforme la plus lente
+        """
         
         try:
-            results = {}
+            linkedin_types, facebook_types = split_hybrid_data_types(task.data_types)
             
-            # Séparer les types de données par collecteur
-            linkedin_types = []
-            facebook_types = []
-            
-            for dt in task.data_types:
-                if dt in [e.value for e in LinkedinDataType]:
-                    linkedin_types.append(dt)
-                elif dt in [e.value for e in FacebookDataType]:
-                    facebook_types.append(dt)
-            
-            # Exécuter LinkedIn si applicable
+            halves = []
             if linkedin_types and 'linkedin_target' in task.metadata:
-                linkedin_task = CollectionTask(
+                halves.append(('linkedin', CollectorType.LINKEDIN, self._execute_linkedin_task, CollectionTask(
                     task_id=f"{task.task_id}_linkedin",
                     user_id=task.user_id,
                     collector_type=CollectorType.LINKEDIN,
@@ -2012,12 +2244,10 @@ class UnifiedCollectionScheduler:
                     data_types=linkedin_types,
                     priority=task.priority,
                     scheduled_time=task.scheduled_time
-                )
-                results['linkedin'] = self._execute_linkedin_task(linkedin_task)
+                )))
             
-            # Exécuter Facebook si applicable
             if facebook_types and 'facebook_target' in task.metadata:
-                facebook_task = CollectionTask(
+                halves.append(('facebook', CollectorType.FACEBOOK, self._execute_facebook_task, CollectionTask(
                     task_id=f"{task.task_id}_facebook",
                     user_id=task.user_id,
                     collector_type=CollectorType.FACEBOOK,
@@ -2025,8 +2255,31 @@ class UnifiedCollectionScheduler:
                     data_types=facebook_types,
                     priority=task.priority,
                     scheduled_time=task.scheduled_time
-                )
-                results['facebook'] = self._execute_facebook_task(facebook_task)
+                )))
+            
+            # Chaque moitié s'exécute dans une copie du contexte: ses spans vont dans la trace de la tâche
+            executor = self._get_hybrid_executor()
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._execute_hybrid_half,
+                                collector_type, execute, half_task): platform
+                for platform, collector_type, execute, half_task in halves
+            }
+            
+            deadline = self._task_remaining_seconds(task)
+            done, not_done = wait_futures(futures, timeout=deadline)
+            
+            results = {}
+            for future, platform in futures.items():
+                if future in done:
+                    results[platform] = future.result()
+                else:
+                    # La moitié continue en arrière-plan, son résultat n'est plus attendu
+                    results[platform] = {'success': False, 'error': f"Échéance de la tâche atteinte ({task.timeout_seconds}s)"}
+                    logger.warning(f"⏰ Moitié {platform} de la tâche hybride {task.task_id} non terminée à l'échéance")
+            
+            if not_done:
+                # Quotas et créneau restent réservés tant qu'une moitié consomme encore l'API
+                self._hold_resources_until(task, not_done)
             
             self.stats.hybrid_collections += 1
             success = any(r.get('success', False) for r in results.values())
@@ -2037,23 +2290,62 @@ class UnifiedCollectionScheduler:
             logger.error(f"❌ Erreur exécution tâche hybride {task.task_id}: {e}")
             return {'success': False, 'error': str(e)}
     
+    def _execute_hybrid_half(self, collector_type: CollectorType, execute: Callable,
+                             half_task: CollectionTask) -> Dict[str, Any]:
+        """Exécuter une moitié de tâche hybride derrière le circuit breaker de sa plateforme"""
+        
+        circuit_breaker = self.circuit_breakers.get(collector_type)
+        if circuit_breaker and not circuit_breaker.allow():
+            return {'success': False, 'error': f"Circuit breaker {collector_type.value} ouvert"}
+        
+        result = {'success': False}
+        try:
+            result = execute(half_task)
+        finally:
+            # Toujours clore l'appel admis (libère l'essai HALF_OPEN même sur exception)
+            if circuit_breaker:
+                circuit_breaker.record(result.get('success', False))
+        return result
+    
+    def _get_hybrid_executor(self) -> ThreadPoolExecutor:
+        """Pool partagé des moitiés de tâches hybrides (recréé après un arrêt du scheduler)"""
+        
+        with self._resource_lock:
+            if self._hybrid_executor is None:
+                self._hybrid_executor = ThreadPoolExecutor(
+                    max_workers=max(2, self.config['max_concurrent_tasks'] * 2),
+                    thread_name_prefix='hybrid-half'
+                )
+            return self._hybrid_executor
+    
+    def _task_remaining_seconds(self, task: CollectionTask) -> float:
+        """Temps restant avant l'échéance de la tâche (timeout compté depuis son démarrage)"""
+        
+        if not task.started_at:
+            return float(task.timeout_seconds)
+        elapsed = (datetime.utcnow() - task.started_at).total_seconds()
+        return max(0.0, task.timeout_seconds - elapsed)
+    
     def _process_task_result(self, task: CollectionTask, result: Dict[str, Any], start_time: float):
         """Traiter le résultat d'une tâche avec monitoring complet"""
         
         execution_time = time.time() - start_time
         task.execution_time = execution_time
         
+        # Les résultats des collecteurs vont dans le magasin borné, jamais sur la tâche
+        self.result_store.put(task.task_id, result)
+        
         if result.get('success', False):
             # Succès
             task.status = TaskStatus.COMPLETED
-            self.completed_tasks[task.task_id] = task
+            self._archive_task(self.completed_tasks, task)
             self.stats.total_tasks_completed += 1
             
-            # Nettoyer les anciennes tâches terminées
-            self._cleanup_old_completed_tasks()
-            
             logger.info(f"✅ Tâche réussie: {task.task_id} ({execution_time:.2f}s)")
             
+            # Les réponses Looker en cache pour ces comptes sont désormais obsolètes
+            self._invalidate_looker_cache(task)
+            
             # Émettre un événement de succès
             self._emit_event('task_completed', {
                 'task_id': task.task_id,
@@ -2097,7 +2389,7 @@ class UnifiedCollectionScheduler:
             else:
                 # Échec définitif
                 task.status = TaskStatus.FAILED
-                self.failed_tasks[task.task_id] = task
+                self._archive_task(self.failed_tasks, task)
                 self.stats.total_tasks_failed += 1
                 
                 logger.error(f"❌ Tâche échouée définitivement: {task.task_id}")
@@ -2114,6 +2406,25 @@ class UnifiedCollectionScheduler:
         # Mettre à jour les statistiques de performance
         self._update_performance_stats(task, execution_time)
     
+    def _invalidate_looker_cache(self, task: CollectionTask):
+        """Invalider les réponses Looker en cache des comptes qui viennent d'être collectés"""
+        
+        try:
+            if task.collector_type == CollectorType.HYBRID:
+                targets = [
+                    ('linkedin', task.metadata.get('linkedin_target')),
+                    ('facebook', task.metadata.get('facebook_target'))
+                ]
+            else:
+                targets = [(task.collector_type.value, task.target_id)]
+            
+            for platform, account_id in targets:
+                if account_id:
+                    looker_response_cache.invalidate_account(platform, account_id)
+                    
+        except Exception as e:
+            logger.warning(f"⚠️  Erreur invalidation cache Looker pour {task.task_id}: {e}")
+    
     def _handle_task_failure(self, task: CollectionTask, error: Exception, start_time: float):
         """Gérer l'échec d'une tâche avec analyse complète"""
         
@@ -2140,7 +2451,7 @@ class UnifiedCollectionScheduler:
         elif isinstance(error, TimeoutError):
             # Timeout, traiter comme un échec partiel
             task.status = TaskStatus.TIMEOUT
-            self.failed_tasks[task.task_id] = task
+            self._archive_task(self.failed_tasks, task)
             self.stats.total_tasks_timeout += 1
             
             logger.error(f"⏰ Timeout tâche: {task.task_id}")
@@ -2157,7 +2468,7 @@ class UnifiedCollectionScheduler:
         else:
             # Échec définitif
             task.status = TaskStatus.FAILED
-            self.failed_tasks[task.task_id] = task
+            self._archive_task(self.failed_tasks, task)
             self.stats.total_tasks_failed += 1
             
             logger.error(f"❌ Tâche échouée après {task.attempts} tentatives: {task.task_id} - {error}")
@@ -2173,13 +2484,29 @@ class UnifiedCollectionScheduler:
             'execution_time': execution_time,
             'will_retry': task.status == TaskStatus.RETRYING
         })
+        
+        self.metrics_collector.record_task(task, execution_time)
     
     # ========================================
     # GESTION AVANCÉE DES RESSOURCES
     # ========================================
     
     def _estimate_resources(self, collector_type: CollectorType, data_types: List[str]) -> Dict[ResourceType, int]:
-        """Estimer les ressources nécessaires avec précision"""
+        """
+        Estimer les ressources nécessaires avec précision
+        L'estimation ne dépend que du collecteur et des types de données: calculée une fois par
+        combinaison, puis partagée (lecture seule) par toutes les tâches récurrentes
+        """
+        
+        key = (collector_type, intern_strings(data_types))
+        estimate = self._resource_estimates.get(key)
+        if estimate is None:
+            estimate = MappingProxyType(self._compute_resource_estimate(collector_type, key[1]))
+            self._resource_estimates[key] = estimate
+        return estimate
+    
+    def _compute_resource_estimate(self, collector_type: CollectorType, data_types: Tuple[str, ...]) -> Dict[ResourceType, int]:
+        """Calcul de l'estimation des ressources d'une combinaison collecteur / types de données"""
         
         base_resources = {
             ResourceType.API_QUOTA: 0,
@@ -2195,6 +2522,7 @@ class UnifiedCollectionScheduler:
             'posts': 3.0,
             'posts_metrics': 4.0,
             'page_metrics': 2.0,
+            'page_views': 1.0,
             'organization_info': 1.0,
             'followers_breakdown': 2.5,
             'page_info': 1.0
@@ -2221,8 +2549,8 @@ class UnifiedCollectionScheduler:
             
         elif collector_type == CollectorType.HYBRID:
             # Combiner les estimations
-            linkedin_estimate = self._estimate_resources(CollectorType.LINKEDIN, data_types)
-            facebook_estimate = self._estimate_resources(CollectorType.FACEBOOK, data_types)
+            linkedin_estimate = self._compute_resource_estimate(CollectorType.LINKEDIN, data_types)
+            facebook_estimate = self._compute_resource_estimate(CollectorType.FACEBOOK, data_types)
             
             for resource_type in base_resources:
                 base_resources[resource_type] = (
@@ -2287,10 +2615,10 @@ class UnifiedCollectionScheduler:
             elif task.collector_type == CollectorType.FACEBOOK:
                 self.resource_usage.api_calls_facebook += task.resources_needed.get(ResourceType.API_QUOTA, 0)
             elif task.collector_type == CollectorType.HYBRID:
-                # Répartir entre LinkedIn et Facebook
-                api_quota = task.resources_needed.get(ResourceType.API_QUOTA, 0)
-                self.resource_usage.api_calls_linkedin += api_quota // 2
-                self.resource_usage.api_calls_facebook += api_quota // 2
+                # Chaque plateforme réserve le budget de sa propre moitié
+                linkedin_quota, facebook_quota = self._hybrid_quota_budgets(task)
+                self.resource_usage.api_calls_linkedin += linkedin_quota
+                self.resource_usage.api_calls_facebook += facebook_quota
             
             self.resource_usage.memory_usage_mb += task.resources_needed.get(ResourceType.MEMORY, 0)
             self.resource_usage.database_connections += task.resources_needed.get(ResourceType.DATABASE, 0)
@@ -2300,14 +2628,30 @@ class UnifiedCollectionScheduler:
             task.metadata['resources_reserved'] = task.resources_needed.copy()
             task.metadata['reservation_time'] = datetime.utcnow().isoformat()
     
-    def _release_resources(self, task: CollectionTask):
-        """Libérer les ressources avec nettoyage complet"""
+    def _hybrid_quota_budgets(self, task: CollectionTask) -> Tuple[int, int]:
+        """Budgets d'appels LinkedIn et Facebook d'une tâche hybride (estimation de chaque moitié)"""
+        
+        linkedin_types, facebook_types = split_hybrid_data_types(task.data_types)
+        linkedin_quota = self._estimate_resources(CollectorType.LINKEDIN, linkedin_types)[ResourceType.API_QUOTA] if linkedin_types else 0
+        facebook_quota = self._estimate_resources(CollectorType.FACEBOOK, facebook_types)[ResourceType.API_QUOTA] if facebook_types else 0
+        return linkedin_quota, facebook_quota
+    
+    def _release_resources(self, task: CollectionTask, reserved: Optional[Dict[ResourceType, Any]] = None):
+        """
+        Libérer les ressources avec nettoyage complet. Sans réservation explicite, libère celle
+        enregistrée sur la tâche une seule fois: les appels suivants (échéance puis fin du worker,
+        réservation transférée aux moitiés hybrides) ne libèrent plus rien.
+        """
         
         with self._resource_lock:
-            self.resource_usage.concurrent_tasks = max(0, self.resource_usage.concurrent_tasks - 1)
+            if reserved is None:
+                # Utiliser les ressources réellement réservées
+                reserved = task.metadata.pop('resources_reserved', None)
+                task.metadata.pop('reservation_time', None)
+                if reserved is None:
+                    return
             
-            # Utiliser les ressources réellement réservées
-            reserved = task.metadata.get('resources_reserved', task.resources_needed)
+            self.resource_usage.concurrent_tasks = max(0, self.resource_usage.concurrent_tasks - 1)
             
             if task.collector_type == CollectorType.LINKEDIN:
                 api_quota = reserved.get(ResourceType.API_QUOTA, 0)
@@ -2316,9 +2660,9 @@ class UnifiedCollectionScheduler:
                 api_quota = reserved.get(ResourceType.API_QUOTA, 0)
                 self.resource_usage.api_calls_facebook = max(0, self.resource_usage.api_calls_facebook - api_quota)
             elif task.collector_type == CollectorType.HYBRID:
-                api_quota = reserved.get(ResourceType.API_QUOTA, 0)
-                self.resource_usage.api_calls_linkedin = max(0, self.resource_usage.api_calls_linkedin - (api_quota // 2))
-                self.resource_usage.api_calls_facebook = max(0, self.resource_usage.api_calls_facebook - (api_quota // 2))
+                linkedin_quota, facebook_quota = self._hybrid_quota_budgets(task)
+                self.resource_usage.api_calls_linkedin = max(0, self.resource_usage.api_calls_linkedin - linkedin_quota)
+                self.resource_usage.api_calls_facebook = max(0, self.resource_usage.api_calls_facebook - facebook_quota)
             
             self.resource_usage.memory_usage_mb = max(0, 
                 self.resource_usage.memory_usage_mb - reserved.get(ResourceType.MEMORY, 0)
@@ -2327,10 +2671,32 @@ class UnifiedCollectionScheduler:
                 self.resource_usage.database_connections - reserved.get(ResourceType.DATABASE, 0)
             )
             self.resource_usage.last_updated = datetime.utcnow()
-            
-            # Nettoyer les métadonnées
-            task.metadata.pop('resources_reserved', None)
+    
+    def _hold_resources_until(self, task: CollectionTask, futures: Iterable[Future]):
+        """Transférer la réservation de la tâche aux futures encore en cours: libérée à la fin de la dernière"""
+        
+        futures = list(futures)
+        with self._resource_lock:
+            reserved = task.metadata.pop('resources_reserved', None)
             task.metadata.pop('reservation_time', None)
+        if reserved is None or not futures:
+            if reserved is not None:
+                self._release_resources(task, reserved)
+            return
+        
+        remaining = [len(futures)]
+        remaining_lock = threading.Lock()
+        
+        def on_done(_future):
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._release_resources(task, reserved)
+                logger.debug(f"♻️  Ressources de la tâche {task.task_id} libérées à la fin de ses moitiés en retard")
+        
+        for future in futures:
+            future.add_done_callback(on_done)
     
     def _get_current_usage(self, resource_type: ResourceType) -> Union[int, float]:
         """Obtenir l'utilisation actuelle d'une ressource avec données réelles"""
@@ -2459,8 +2825,13 @@ class UnifiedCollectionScheduler:
                 stats = self.facebook_collector.get_collection_statistics()
                 base_interval = self.config['facebook_interval_hours']
             
-            # Adapter basé sur le taux de succès
-            success_rate = stats.get('success_rate', 1.0)
+            # Adapter basé sur le taux de succès: moyenne exponentielle des tâches du scheduler
+            # si assez de résultats, sinon statistiques de session du collecteur
+            task_outcomes = self.metrics_collector.task_outcomes
+            if task_outcomes.count(collector_type.value) >= 10:
+                success_rate = task_outcomes.ewma_success_rate(collector_type.value)
+            else:
+                success_rate = stats.get('success_rate', 1.0)
             if success_rate < 0.5:
                 # Taux de succès faible, augmenter l'intervalle
                 return int(base_interval * 1.5)
@@ -2952,6 +3323,7 @@ class UnifiedCollectionScheduler:
             
             for task_id in old_completed:
                 del self.completed_tasks[task_id]
+                self.result_store.discard(task_id)
             
             # Nettoyer les tâches échouées (plus sélectif)
             old_failed = []
@@ -2970,6 +3342,7 @@ class UnifiedCollectionScheduler:
             
             for task_id in old_failed:
                 del self.failed_tasks[task_id]
+                self.result_store.discard(task_id)
             
             # Nettoyer les tâches annulées
             old_cancelled = [
@@ -2985,25 +3358,16 @@ class UnifiedCollectionScheduler:
         except Exception as e:
             logger.error(f"❌ Erreur nettoyage tâches: {e}")
     
-    def _cleanup_old_completed_tasks(self):
-        """Nettoyer les tâches terminées si trop nombreuses"""
-        
-        if len(self.completed_tasks) > 200:
-            # Garder seulement les 150 plus récentes
-            sorted_tasks = sorted(
-                self.completed_tasks.items(),
-                key=lambda x: x[1].completed_at or datetime.min,
-                reverse=True
-            )
-            
-            tasks_to_remove = sorted_tasks[150:]
-            for task_id, _ in tasks_to_remove:
-                del self.completed_tasks[task_id]
-    
     def _cleanup_old_collector_data(self):
         """Nettoyer les anciennes données des collecteurs"""
         
         try:
+            # Partitions mensuelles des mois à venir (tables de métriques quotidiennes)
+            db_manager.maintain_partitions()
+            
+            # Mois clos compactés en Parquet avant que la rétention ne supprime leurs partitions
+            cold_storage.compact()
+            
             # Nettoyer LinkedIn
             linkedin_deleted = self.linkedin_collector.cleanup_old_data(days=90)
             
@@ -3341,6 +3705,10 @@ class UnifiedCollectionScheduler:
     def _update_performance_stats(self, task: CollectionTask, execution_time: float):
         """Mettre à jour les statistiques de performance avec analyse détaillée"""
         
+        if not self.metrics_collector.record_task(task, execution_time):
+            # Issue déjà comptée (timeout): ne pas fausser moyennes et taux de succès
+            return
+        
         # Moyenne mobile du temps d'exécution
         if self.stats.average_execution_time == 0:
             self.stats.average_execution_time = execution_time
@@ -3398,10 +3766,12 @@ class UnifiedCollectionScheduler:
             self._user_cache.clear()
             self.error_counts.clear()
             self.performance_metrics.clear()
+            self.result_store.clear()
             
             # Nettoyer les métriques
             if hasattr(self.metrics_collector, 'metrics_history'):
                 self.metrics_collector.metrics_history.clear()
+            self.metrics_collector.task_outcomes.reset()
             
             # Reset des circuit breakers
             for cb in self.circuit_breakers.values():
@@ -3427,10 +3797,12 @@ class UnifiedCollectionScheduler:
             'workers_active': len([w for w in self.worker_threads if w.is_alive()]),
             'workers_total': self.config['max_workers'],
             'tasks_queued': self.task_queue.qsize(),
+            'queue': self.task_queue.snapshot(),
             'tasks_running': len(self.running_tasks),
             'tasks_completed': len(self.completed_tasks),
             'tasks_failed': len(self.failed_tasks),
             'tasks_cancelled': len(self.cancelled_tasks),
+            'task_results_stored': len(self.result_store),
             'resource_usage': self.resource_usage.to_dict(),
             'resource_limits': {k.value: v for k, v in self.resource_limits.items()},
             'health_status': self.health_checks.get('overall_status', 'unknown'),
@@ -3443,9 +3815,54 @@ class UnifiedCollectionScheduler:
                 }
                 for cb_type, cb in self.circuit_breakers.items()
             },
+            'task_outcomes': self.metrics_collector.get_task_summary(),
             'timestamp': datetime.utcnow().isoformat()
         }
     
+    def prometheus_metrics(self) -> List[Any]:
+        """Jauges du scheduler pour /metrics (lues à la demande, sans parcourir l'historique)"""
+        
+        breaker_states = {'CLOSED': 0, 'HALF_OPEN': 1, 'OPEN': 2}
+        
+        queue = self.task_queue.snapshot()
+        queue_depth = Gauge('scheduler_queue_depth', 'Tâches en attente dans la file')
+        queue_depth.set(queue['total_size'])
+        queue_by_collector = Gauge('scheduler_queue_tasks', 'Tâches en attente par collecteur', ('collector',))
+        for collector, count in queue['by_collector'].items():
+            queue_by_collector.set(count, collector)
+        queue_overdue = Gauge('scheduler_queue_overdue', 'Tâches en attente dont l\'échéance est passée')
+        queue_overdue.set(queue['overdue_tasks'])
+        queue_oldest = Gauge('scheduler_queue_oldest_wait_seconds', 'Ancienneté de la plus vieille tâche en attente')
+        queue_oldest.set(queue['oldest_waiting_seconds'])
+        workers = Gauge('scheduler_workers', 'Workers du scheduler', ('state',))
+        workers.set(len([w for w in self.worker_threads if w.is_alive()]), 'alive')
+        workers.set(self.config['max_workers'], 'configured')
+        running = Gauge('scheduler_tasks_running', 'Tâches en cours d\'exécution')
+        running.set(len(self.running_tasks))
+        
+        breaker_state = Gauge(
+            'scheduler_circuit_breaker_state', 'État du circuit breaker (0 fermé, 1 semi-ouvert, 2 ouvert)', ('collector',)
+        )
+        breaker_failures = Gauge('scheduler_circuit_breaker_failures', 'Échecs consécutifs du circuit breaker', ('collector',))
+        for cb_type, cb in self.circuit_breakers.items():
+            breaker_state.set(breaker_states.get(cb.state, 2), cb_type.value)
+            breaker_failures.set(cb.failure_count, cb_type.value)
+        
+        api_calls = Gauge('scheduler_api_calls_reserved', 'Appels d\'API réservés par les tâches en cours', ('platform',))
+        api_calls.set(self.resource_usage.api_calls_linkedin, 'linkedin')
+        api_calls.set(self.resource_usage.api_calls_facebook, 'facebook')
+        
+        tasks = Counter('scheduler_tasks_total', 'Résultats des tâches du scheduler', ('collector', 'outcome'))
+        duration = Gauge('scheduler_task_duration_seconds', 'Durée des tâches par quantile', ('collector', 'quantile'))
+        for collector, summary in self.metrics_collector.task_outcomes.summary_by_type().items():
+            for outcome in OUTCOMES:
+                tasks.inc(collector, outcome, amount=summary['outcomes'][outcome])
+            for name, value in summary['percentiles_seconds'].items():
+                if value is not None:
+                    duration.set(value, collector, str(int(name[1:]) / 100))
+        
+        return [queue_depth, queue_by_collector, queue_overdue, queue_oldest, workers, running, breaker_state, breaker_failures, api_calls, tasks, duration]
+    
     def get_statistics(self) -> Dict[str, Any]:
         """Obtenir les statistiques détaillées du système"""
         
@@ -3466,57 +3883,14 @@ class UnifiedCollectionScheduler:
         }
     
     def _analyze_queue(self) -> Dict[str, Any]:
-        """Analyser la composition de la queue"""
-        
-        analysis = {
-            'total_size': self.task_queue.qsize(),
-            'by_priority': defaultdict(int),
-            'by_collector': defaultdict(int),
-            'by_user': defaultdict(int),
-            'overdue_tasks': 0,
-            'scheduled_future': 0
-        }
-        
-        # Analyser sans vider la queue
-        temp_queue = PriorityQueue()
-        tasks_analyzed = []
+        """Analyser la composition de la queue (agrégats maintenus par la file, sans la vider)"""
         
         try:
-            while not self.task_queue.empty():
-                try:
-                    task = self.task_queue.get_nowait()
-                    tasks_analyzed.append(task)
-                    temp_queue.put(task)
-                    
-                    # Analyser la tâche
-                    analysis['by_priority'][task.priority.name] += 1
-                    analysis['by_collector'][task.collector_type.value] += 1
-                    analysis['by_user'][task.user_id] += 1
-                    
-                    if task.scheduled_time < datetime.utcnow():
-                        analysis['overdue_tasks'] += 1
-                    else:
-                        analysis['scheduled_future'] += 1
-                        
-                except Empty:
-                    break
-            
-            # Remettre les tâches
-            while not temp_queue.empty():
-                try:
-                    self.task_queue.put(temp_queue.get_nowait())
-                except Empty:
-                    break
-                    
+            return self.task_queue.snapshot(include_users=True)
         except Exception as e:
             logger.error(f"❌ Erreur analyse queue: {e}")
-        
-        # Convertir les defaultdict en dict normaux
-        analysis['by_priority'] = dict(analysis['by_priority'])
-        analysis['by_collector'] = dict(analysis['by_collector'])
-        analysis['by_user'] = dict(analysis['by_user'])
-        
-        return analysis
+            return {'total_size': self.task_queue.qsize(), 'by_priority': {}, 'by_collector': {},
+                    'by_user': {}, 'overdue_tasks': 0, 'scheduled_future': 0}
     
     def get_task_details(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Obtenir les détails complets d'une tâche"""
@@ -3569,6 +3943,11 @@ class UnifiedCollectionScheduler:
                 details['runtime_seconds'] = (datetime.utcnow() - task.started_at).total_seconds() if task.started_at else 0
                 details['is_expired'] = task.is_expired()
             
+            # Résultat compact de la dernière exécution, s'il est encore en magasin
+            stored_result = self.result_store.get(task_id)
+            if stored_result is not None:
+                details['result'] = stored_result.to_dict()
+            
             # Ajouter l'historique de performance si disponible
             if task_id in self.performance_metrics:
                 details['performance_history'] = self.performance_metrics[task_id]
@@ -3669,6 +4048,7 @@ class UnifiedCollectionScheduler:
 # ========================================
 
 unified_scheduler = UnifiedCollectionScheduler()
+metrics_registry.register_collector(unified_scheduler.prometheus_metrics)
 
 # ========================================
 # FONCTIONS D'API PUBLIQUE
@@ -0,0 +1,233 @@
+"""
+Métriques des résultats de tâches du scheduler
+Anneau de taille fixe d'enregistrements numériques compacts (horodatage, durée, type, résultat)
+et agrégats incrémentaux: compteurs par type, moyennes exponentielles (EWMA) et histogramme
+log-linéaire (style HDR) pour les percentiles p50/p95/p99.
+Enregistrer est en O(1) sans verrou; les résumés sont en O(buckets), jamais en O(historique).
+"""
+
+import itertools
+import logging
+import math
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TASK_TYPES = ('linkedin', 'facebook', 'hybrid', 'other')
+OUTCOMES = ('completed', 'failed', 'retrying', 'timeout', 'cancelled')
+
+_TYPE_CODES = {name: code for code, name in enumerate(TASK_TYPES)}
+_OUTCOME_CODES = {name: code for code, name in enumerate(OUTCOMES)}
+_OTHER = _TYPE_CODES['other']
+
+# Histogramme: durées en millisecondes, 16 sous-buckets par puissance de 2 (erreur relative < 6.25%)
+SUB_BUCKETS = 16
+MAX_EXPONENT = 23               # 2^23 ms ≈ 2h20, au-delà tout tombe dans le dernier bucket
+N_BUCKETS = MAX_EXPONENT * SUB_BUCKETS + 2
+
+EWMA_ALPHA = 0.1
+
+
+def _bucket_index(duration_ms: float) -> int:
+    if duration_ms < 1.0:
+        return 0
+    mantissa, exponent = math.frexp(duration_ms)   # duration = mantissa * 2^exponent, mantissa in [0.5, 1)
+    if exponent > MAX_EXPONENT:
+        return N_BUCKETS - 1
+    return 1 + (exponent - 1) * SUB_BUCKETS + int((mantissa * 2.0 - 1.0) * SUB_BUCKETS)
+
+
+def _bucket_upper_ms(index: int) -> float:
+    """Borne haute d'un bucket (valeur rapportée pour un percentile)"""
+    if index == 0:
+        return 1.0
+    if index >= N_BUCKETS - 1:
+        return float(2 ** MAX_EXPONENT)
+    exponent, sub = divmod(index - 1, SUB_BUCKETS)
+    return (1.0 + (sub + 1) / SUB_BUCKETS) * 2.0 ** exponent
+
+
+class _Shard:
+    """Agrégats cumulés d'un thread écrivain (un seul écrivain par shard, donc pas de verrou)"""
+    __slots__ = ('histogram', 'outcomes', 'duration_sum')
+
+    def __init__(self):
+        self.histogram = array('q', bytes(8 * len(TASK_TYPES) * N_BUCKETS))
+        self.outcomes = array('q', bytes(8 * len(TASK_TYPES) * len(OUTCOMES)))
+        self.duration_sum = array('d', bytes(8 * len(TASK_TYPES)))
+
+
+class TaskOutcomeMetrics:
+    """
+    Résultats de tâches du scheduler.
+    - anneau: chaque écrivain réserve un emplacement via un compteur atomique puis écrit ses
+      quatre champs dans des tableaux préalloués (un lecteur concurrent peut voir un
+      enregistrement en cours d'écriture, jamais un emplacement réservé deux fois)
+    - agrégats cumulés: un shard par thread écrivain, fusionnés à la lecture
+    - EWMA de latence et de succès par type: écriture d'un flottant, une mise à jour concurrente
+      perdue ne fait que décaler légèrement la moyenne
+    """
+
+    def __init__(self, capacity: int = 4096, ewma_alpha: float = EWMA_ALPHA):
+        self.capacity = capacity
+        self.ewma_alpha = ewma_alpha
+
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._durations = array('d', bytes(8 * capacity))
+        self._types = array('B', bytes(capacity))
+        self._outcomes = array('B', bytes(capacity))
+        self._sequence = itertools.count()
+        self._written = 0
+
+        self._ewma_latency = array('d', bytes(8 * len(TASK_TYPES)))
+        self._ewma_success = array('d', [1.0] * len(TASK_TYPES))
+
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+
+    # ========================================
+    # ENREGISTREMENT
+    # ========================================
+
+    def record(self, task_type: str, duration: float, outcome: str, timestamp: Optional[float] = None):
+        """Enregistrer le résultat d'une tâche (durée en secondes)"""
+        type_code = _TYPE_CODES.get(task_type, _OTHER)
+        outcome_code = _OUTCOME_CODES.get(outcome, _OUTCOME_CODES['failed'])
+        duration = max(duration, 0.0)
+
+        seq = next(self._sequence)
+        slot = seq % self.capacity
+        self._timestamps[slot] = timestamp if timestamp is not None else time.time()
+        self._durations[slot] = duration
+        self._types[slot] = type_code
+        self._outcomes[slot] = outcome_code
+        self._written = seq + 1
+
+        shard = self._shard()
+        shard.histogram[type_code * N_BUCKETS + _bucket_index(duration * 1000.0)] += 1
+        shard.outcomes[type_code * len(OUTCOMES) + outcome_code] += 1
+        shard.duration_sum[type_code] += duration
+
+        alpha = self.ewma_alpha
+        if self._ewma_latency[type_code] == 0.0:
+            self._ewma_latency[type_code] = duration
+        else:
+            self._ewma_latency[type_code] += alpha * (duration - self._ewma_latency[type_code])
+        # Un retry n'est pas un verdict: seul le résultat final compte pour le taux de succès
+        if outcome_code != _OUTCOME_CODES['retrying']:
+            success = 1.0 if outcome_code == _OUTCOME_CODES['completed'] else 0.0
+            self._ewma_success[type_code] += alpha * (success - self._ewma_success[type_code])
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            self._shards.append(shard)
+        return shard
+
+    # ========================================
+    # LECTURE
+    # ========================================
+
+    def ewma_latency(self, task_type: str) -> float:
+        return self._ewma_latency[_TYPE_CODES.get(task_type, _OTHER)]
+
+    def ewma_success_rate(self, task_type: str) -> float:
+        return self._ewma_success[_TYPE_CODES.get(task_type, _OTHER)]
+
+    def count(self, task_type: Optional[str] = None) -> int:
+        outcomes = self._merged_outcomes()
+        codes = [_TYPE_CODES[task_type]] if task_type in _TYPE_CODES else range(len(TASK_TYPES))
+        return sum(outcomes[code * len(OUTCOMES) + o] for code in codes for o in range(len(OUTCOMES)))
+
+    def summary(self, task_type: Optional[str] = None) -> Dict[str, Any]:
+        """Résumé cumulé (tous types, ou un type): compteurs, moyenne, EWMA, p50/p95/p99"""
+        codes = [_TYPE_CODES[task_type]] if task_type in _TYPE_CODES else list(range(len(TASK_TYPES)))
+        histogram = [0] * N_BUCKETS
+        outcomes = dict.fromkeys(OUTCOMES, 0)
+        duration_sum = 0.0
+
+        for shard in list(self._shards):
+            for code in codes:
+                base = code * N_BUCKETS
+                for index in range(N_BUCKETS):
+                    value = shard.histogram[base + index]
+                    if value:
+                        histogram[index] += value
+                for o, name in enumerate(OUTCOMES):
+                    outcomes[name] += shard.outcomes[code * len(OUTCOMES) + o]
+                duration_sum += shard.duration_sum[code]
+
+        total = sum(outcomes.values())
+        finished = total - outcomes['retrying']
+        summary = {
+            'count': total,
+            'outcomes': outcomes,
+            'success_rate': outcomes['completed'] / finished if finished else None,
+            'avg_seconds': duration_sum / total if total else 0.0,
+            'percentiles_seconds': self._percentiles(histogram, total, (50, 95, 99)),
+        }
+        if task_type in _TYPE_CODES:
+            code = _TYPE_CODES[task_type]
+            summary['ewma_seconds'] = self._ewma_latency[code]
+            summary['ewma_success_rate'] = self._ewma_success[code]
+        return summary
+
+    def summary_by_type(self) -> Dict[str, Dict[str, Any]]:
+        return {name: self.summary(name) for name in TASK_TYPES if self.count(name)}
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Derniers enregistrements de l'anneau (du plus récent au plus ancien)"""
+        written = self._written
+        limit = min(limit, written, self.capacity)
+        records = []
+        for seq in range(written - 1, written - 1 - limit, -1):
+            slot = seq % self.capacity
+            records.append({
+                'timestamp': self._timestamps[slot],
+                'duration': self._durations[slot],
+                'type': TASK_TYPES[self._types[slot]],
+                'outcome': OUTCOMES[self._outcomes[slot]],
+            })
+        return records
+
+    def reset(self):
+        self._sequence = itertools.count()
+        self._written = 0
+        for shard in list(self._shards):
+            for values in (shard.histogram, shard.outcomes, shard.duration_sum):
+                for index in range(len(values)):
+                    values[index] = 0
+        for index in range(len(TASK_TYPES)):
+            self._ewma_latency[index] = 0.0
+            self._ewma_success[index] = 1.0
+
+    def _merged_outcomes(self) -> List[int]:
+        merged = [0] * (len(TASK_TYPES) * len(OUTCOMES))
+        for shard in list(self._shards):
+            for index, value in enumerate(shard.outcomes):
+                merged[index] += value
+        return merged
+
+    @staticmethod
+    def _percentiles(histogram: List[int], total: int, quantiles) -> Dict[str, Optional[float]]:
+        if not total:
+            return {f"p{q}": None for q in quantiles}
+
+        targets = [(q, math.ceil(total * q / 100)) for q in quantiles]
+        result = {}
+        cumulative = 0
+        position = 0
+        for index, value in enumerate(histogram):
+            if not value:
+                continue
+            cumulative += value
+            while position < len(targets) and cumulative >= targets[position][1]:
+                result[f"p{targets[position][0]}"] = round(_bucket_upper_ms(index) / 1000.0, 4)
+                position += 1
+            if position == len(targets):
+                break
+        return result
@@ -0,0 +1,111 @@
+"""
+File de priorité du scheduler avec agrégats incrémentaux
+Chaque entrée et sortie de la file (planification, prise par un worker, remise en file,
+annulation) met à jour, sous le verrou de la file, des compteurs par collecteur, priorité
+et utilisateur ainsi que deux index triés (échéance, ancienneté). Le statut se lit en
+copiant quelques entiers, sans vider ni parcourir la file.
+"""
+
+import itertools
+import logging
+from bisect import bisect_left, insort
+from datetime import datetime
+from queue import PriorityQueue
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _increment(counts: Dict[Any, int], key: Any, amount: int = 1):
+    value = counts.get(key, 0) + amount
+    if value:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+class TaskQueue(PriorityQueue):
+    """PriorityQueue de CollectionTask dont la composition est connue en O(1)"""
+
+    def __init__(self, maxsize: int = 0, demand: Optional[Callable[[Any], int]] = None):
+        # Appels d'API réservés par une tâche (agrégés par collecteur)
+        self._demand = demand or (lambda task: 0)
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self._sequence = itertools.count()
+        self._entries: Dict[int, List[tuple]] = {}   # id(tâche) -> entrées (une tâche remise deux fois: deux entrées)
+        self._due: List[tuple] = []       # trié: (scheduled_time, séquence)
+        self._waiting: List[tuple] = []   # trié: (created_at, séquence)
+        self._by_priority: Dict[str, int] = {}
+        self._by_collector: Dict[str, int] = {}
+        self._by_user: Dict[Any, int] = {}
+        self._demand_by_collector: Dict[str, int] = {}
+
+    def _put(self, task):
+        super()._put(task)
+        try:
+            # Clés figées à l'entrée: une tâche modifiée pendant son attente se retire proprement
+            entry = (next(self._sequence), task.scheduled_time, task.created_at, task.priority.name,
+                     task.collector_type.value, task.user_id, int(self._demand(task) or 0))
+            self._entries.setdefault(id(task), []).append(entry)
+            self._apply(entry, 1)
+        except Exception as e:
+            logger.warning(f"⚠️  Agrégats de file non mis à jour (ajout): {e}")
+
+    def _get(self):
+        task = super()._get()
+        try:
+            entries = self._entries.get(id(task))
+            if entries:
+                entry = entries.pop()
+                if not entries:
+                    del self._entries[id(task)]
+                self._apply(entry, -1)
+        except Exception as e:
+            logger.warning(f"⚠️  Agrégats de file non mis à jour (retrait): {e}")
+        return task
+
+    def _apply(self, entry: tuple, sign: int):
+        sequence, due, waiting_since, priority, collector, user_id, demand = entry
+        if sign > 0:
+            insort(self._due, (due, sequence))
+            insort(self._waiting, (waiting_since, sequence))
+        else:
+            del self._due[bisect_left(self._due, (due, sequence))]
+            del self._waiting[bisect_left(self._waiting, (waiting_since, sequence))]
+        _increment(self._by_priority, priority, sign)
+        _increment(self._by_collector, collector, sign)
+        _increment(self._by_user, user_id, sign)
+        if demand:
+            _increment(self._demand_by_collector, collector, sign * demand)
+
+    def snapshot(self, include_users: bool = False, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Composition de la file (copie des compteurs sous le verrou, sans parcours)"""
+        now = now or datetime.utcnow()
+        with self.mutex:
+            size = len(self.queue)
+            overdue = bisect_left(self._due, (now,))
+            earliest_due = self._due[0][0] if self._due else None
+            oldest_waiting = self._waiting[0][0] if self._waiting else None
+            by_priority = dict(self._by_priority)
+            by_collector = dict(self._by_collector)
+            demand = dict(self._demand_by_collector)
+            users_waiting = len(self._by_user)
+            by_user = dict(self._by_user) if include_users else None
+
+        snapshot = {
+            'total_size': size,
+            'by_priority': by_priority,
+            'by_collector': by_collector,
+            'overdue_tasks': overdue,
+            'scheduled_future': size - overdue,
+            'earliest_due': earliest_due.isoformat() if earliest_due else None,
+            'oldest_waiting_seconds': round((now - oldest_waiting).total_seconds(), 1) if oldest_waiting else 0.0,
+            'api_quota_queued': demand,
+            'users_waiting': users_waiting
+        }
+        if include_users:
+            snapshot['by_user'] = by_user
+        return snapshot
@@ -0,0 +1,200 @@
+"""
+Historique compact des tâches du scheduler
+Une tâche terminée, échouée ou annulée quitte le suivi sous forme de résumé (tuple nommé,
+champs enum partagés, erreur tronquée) dans un historique de taille bornée; les résultats
+des collecteurs sont réduits à quelques nombres par type de données et rangés dans un
+magasin LRU borné. La mémoire résidente ne dépend plus du nombre de comptes × exécutions.
+"""
+
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ERROR_MAX_LENGTH = 300
+
+
+def truncate_error(error: Optional[str], max_length: int = ERROR_MAX_LENGTH) -> Optional[str]:
+    if error is None:
+        return None
+    error = str(error)
+    return error if len(error) <= max_length else error[:max_length - 1] + '…'
+
+
+def intern_strings(values) -> Tuple[str, ...]:
+    """Les mêmes types de données reviennent à chaque exécution: une seule copie par chaîne"""
+    return tuple(sys.intern(str(value)) for value in values or ())
+
+
+class TaskSummary(NamedTuple):
+    """Trace d'une tâche sortie du suivi (mêmes noms d'attributs que CollectionTask)"""
+    task_id: str
+    user_id: int
+    collector_type: Any               # CollectorType
+    target_id: str
+    data_types: Tuple[str, ...]
+    priority: Any                     # Priority
+    status: Any                       # TaskStatus
+    attempts: int
+    max_attempts: int
+    execution_time: Optional[float]
+    created_at: datetime
+    completed_at: Optional[datetime]
+    last_error: Optional[str]
+    metadata: Dict[str, Any]          # métadonnées de la tâche (cibles hybrides, retry_count...)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'task_id': self.task_id,
+            'user_id': self.user_id,
+            'collector_type': self.collector_type.value,
+            'target_id': self.target_id,
+            'data_types': list(self.data_types),
+            'priority': self.priority.value,
+            'status': self.status.value,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'execution_time': self.execution_time,
+            'created_at': self.created_at.isoformat(),
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'last_error': self.last_error,
+            'metadata': self.metadata
+        }
+
+
+class TaskHistory(OrderedDict):
+    """Dictionnaire task_id -> résumé, dans l'ordre d'arrivée, limité aux maxlen derniers"""
+
+    def __init__(self, maxlen: int):
+        super().__init__()
+        self.maxlen = maxlen
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if key in self:
+                self.move_to_end(key)
+            super().__setitem__(key, value)
+            while len(self) > self.maxlen:
+                self.popitem(last=False)
+                self.evicted += 1
+
+    def __reduce__(self):
+        return self.__class__, (self.maxlen,), None, None, iter(self.items())
+
+
+class ResultEntry(NamedTuple):
+    """Résultat d'un type de données: quelques nombres, pas les listes d'erreurs complètes"""
+    name: str
+    status: Optional[str]
+    records: int
+    api_calls: int
+    execution_time: float
+    errors: int
+    first_error: Optional[str]
+
+
+class CompactResult(NamedTuple):
+    success: bool
+    error: Optional[str]
+    entries: Tuple[ResultEntry, ...]
+    stored_at: datetime
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'success': self.success,
+            'error': self.error,
+            'stored_at': self.stored_at.isoformat(),
+            'results': {entry.name: entry._asdict() for entry in self.entries}
+        }
+
+
+def _flatten_results(results: Dict[str, Any], prefix: str, entries: List[ResultEntry]):
+    for name, value in results.items():
+        key = sys.intern(f"{prefix}{getattr(name, 'value', name)}")
+        if isinstance(value, dict):
+            # Tâche hybride: {'linkedin': {'success': ..., 'results': {...}}}
+            nested = value.get('results')
+            if isinstance(nested, dict):
+                _flatten_results(nested, f"{key}.", entries)
+            else:
+                entries.append(ResultEntry(key, 'success' if value.get('success') else 'failed',
+                                           0, 0, 0.0, 0 if value.get('success') else 1,
+                                           truncate_error(value.get('error'))))
+            continue
+
+        errors = getattr(value, 'errors', None) or ()
+        status = getattr(value, 'status', None)
+        entries.append(ResultEntry(
+            key,
+            sys.intern(str(getattr(status, 'value', status))) if status is not None else None,
+            int(getattr(value, 'records_collected', 0) or 0),
+            int(getattr(value, 'api_calls_made', 0) or 0),
+            float(getattr(value, 'execution_time', 0.0) or 0.0),
+            len(errors),
+            truncate_error(errors[0]) if errors else None
+        ))
+
+
+def compact_result(result: Dict[str, Any]) -> CompactResult:
+    """Réduire le retour d'exécution d'une tâche ({'success', 'error', 'results'})"""
+    entries: List[ResultEntry] = []
+    results = result.get('results')
+    if isinstance(results, dict):
+        _flatten_results(results, '', entries)
+    return CompactResult(bool(result.get('success', False)), truncate_error(result.get('error')),
+                         tuple(entries), datetime.utcnow())
+
+
+class TaskResultStore:
+    """Résultats compacts des dernières tâches (LRU borné, partagé par les workers)"""
+
+    def __init__(self, capacity: int = 500):
+        self.capacity = capacity
+        self._results: 'OrderedDict[str, CompactResult]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'stored': 0, 'evicted': 0}
+
+    def put(self, task_id: str, result: Dict[str, Any]) -> Optional[CompactResult]:
+        if self.capacity <= 0:
+            return None
+        try:
+            compact = compact_result(result)
+        except Exception as e:
+            logger.warning(f"⚠️  Résultat de tâche non stockable {task_id}: {e}")
+            return None
+
+        with self._lock:
+            self._results[task_id] = compact
+            self._results.move_to_end(task_id)
+            self.stats['stored'] += 1
+            while len(self._results) > self.capacity:
+                self._results.popitem(last=False)
+                self.stats['evicted'] += 1
+        return compact
+
+    def get(self, task_id: str) -> Optional[CompactResult]:
+        with self._lock:
+            compact = self._results.get(task_id)
+            if compact is not None:
+                self._results.move_to_end(task_id)
+            return compact
+
+    def discard(self, task_id: str):
+        with self._lock:
+            self._results.pop(task_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._results
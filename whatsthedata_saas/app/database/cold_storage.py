@@ -0,0 +1,314 @@
+"""
+Tier froid des métriques historiques (fichiers Parquet locaux)
+Les mois clos (plus aucune révision après COLD_STORAGE_SETTLE_DAYS jours) sont compactés par
+compte dans <racine>/<table>/platform=<p>/account=<id>/month=<AAAA-MM>.parquet. La lecture
+(read_history) réunit ces fichiers et les lignes encore en base (la ligne en base l'emporte
+à clé égale). Sans pyarrow le tier froid est désactivé et la lecture se limite à la base.
+
+Seules les tables ayant un chemin de lecture par read_history sont archivées: les jours
+collectés des agrégats de page, lus par les endpoints Looker (collectors/page_rollups).
+Les tables quotidiennes partitionnées (facebook_page_daily, linkedin_page_daily,
+linkedin_posts_daily) ne sont pas archivées: leur rétention supprime définitivement les mois
+concernés.
+
+Aucune garantie de rétention sans stockage durable: le répertoire local ne l'est pas par
+défaut (Heroku: disque propre à chaque dyno, vidé au redémarrage), les fichiers Parquet n'y
+sont qu'une copie de lecture qui peut disparaître à tout moment, et la base reste la seule
+source de l'historique (aucune ligne archivée n'est supprimée). Seul un stockage déclaré
+durable (COLD_STORAGE_DURABLE=true, volume partagé et sauvegardé) autorise la suppression
+des lignes compactées; l'historique en dépend alors.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, func, select
+
+from .connection import db_manager
+from .models import Base
+from .partitioning import add_months, month_start
+from ..utils.config import get_env_int, get_env_var
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Dépendance optionnelle: tier froid désactivé
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+COLD_STORAGE_PATH = get_env_var('COLD_STORAGE_PATH', 'cache/cold_storage')
+# Jours après la fin d'un mois au-delà desquels ses métriques ne bougent plus
+SETTLE_DAYS = get_env_int('COLD_STORAGE_SETTLE_DAYS', 7)
+# Stockage partagé et persistant (volume monté): seule condition pour supprimer des lignes archivées
+COLD_STORAGE_DURABLE = get_env_var('COLD_STORAGE_DURABLE', 'false').lower() == 'true'
+
+# Métadonnée Parquet: empreinte des lignes en base au dernier compactage du mois
+_DIGEST_KEY = b'wtd_rows_digest'
+
+
+class ColdTable(NamedTuple):
+    """Table archivable: compte, date, clé d'unicité d'une ligne"""
+    name: str
+    platform: Optional[str]                # plateforme fixe; None: colonne 'platform'
+    account_column: str
+    date_column: str
+    key_columns: Tuple[str, ...]
+    filters: Tuple[Tuple[str, Any], ...] = ()
+    delete_compacted: bool = False         # True: lignes supprimées après archivage (stockage durable seulement)
+
+
+# Tables archivées: chacune doit être relue par read_history (sinon ses archives sont inutiles)
+COLD_TABLES: Dict[str, ColdTable] = {table.name: table for table in (
+    # Jours collectés des agrégats de statistiques de page (lus par Looker via page_rollups)
+    ColdTable('page_statistics_rollups', None, 'account_id', 'period_start', ('period_start',),
+              filters=(('granularity', 'day'),), delete_compacted=True),
+)}
+
+Row = Dict[str, Any]
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column.type, Date):
+        return pa.date32()
+    if isinstance(column.type, Numeric):
+        return pa.float64()
+    return pa.string()
+
+
+def _plain(value: Any) -> Any:
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def rows_digest(rows: Sequence[Row]) -> str:
+    """Empreinte du contenu des lignes (ordre indifférent): détecte toute valeur modifiée"""
+    encoded = sorted(repr(sorted((key, _plain(value)) for key, value in row.items())) for row in rows)
+    return hashlib.sha256('\n'.join(encoded).encode('utf-8')).hexdigest()
+
+
+def merge_rows(cold: Sequence[Row], hot: Sequence[Row], key_columns: Sequence[str]) -> List[Row]:
+    """Union des lignes archivées et des lignes en base (la base l'emporte à clé égale)"""
+    merged = {tuple(row[column] for column in key_columns): row for row in cold}
+    merged.update((tuple(row[column] for column in key_columns), row) for row in hot)
+    return list(merged.values())
+
+
+class ColdStorage:
+    """Compactage des mois clos en Parquet et lecture unifiée base + Parquet"""
+
+    def __init__(self, root: str = COLD_STORAGE_PATH, settle_days: int = SETTLE_DAYS,
+                 durable: bool = COLD_STORAGE_DURABLE):
+        self.root = root
+        self.settle_days = settle_days
+        self.durable = durable
+        self._lock = threading.Lock()
+        self.stats = {'months_written': 0, 'rows_archived': 0, 'files_read': 0}
+
+    @property
+    def available(self) -> bool:
+        return pq is not None
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def path_for(self, table_name: str, platform: str, account_id: str, month: date) -> str:
+        return os.path.join(self.root, table_name, f"platform={platform}",
+                            f"account={quote(str(account_id), safe='')}", f"month={month:%Y-%m}.parquet")
+
+    def deletes_rows(self, spec: ColdTable) -> bool:
+        """Suppression des lignes archivées: demandée par la table et permise par le stockage"""
+        return spec.delete_compacted and self.durable
+
+    def horizon(self, today: Optional[date] = None) -> date:
+        """Premier mois encore ouvert: tout ce qui précède est archivable"""
+        return month_start((today or date.today()) - timedelta(days=self.settle_days))
+
+    # ========================================
+    # BASE
+    # ========================================
+
+    @staticmethod
+    def _conditions(spec: ColdTable, table, platform: Optional[str], account_id: Optional[str]) -> List:
+        conditions = [table.c[column] == value for column, value in spec.filters]
+        if spec.platform is None and platform is not None:
+            conditions.append(table.c.platform == platform)
+        if account_id is not None:
+            conditions.append(table.c[spec.account_column] == account_id)
+        return conditions
+
+    def read_hot(self, table_name: str, platform: str, account_id: str,
+                 start_date: date, end_date: date) -> List[Row]:
+        """Lignes de la période encore en base"""
+        spec = COLD_TABLES[table_name]
+        table = Base.metadata.tables[table_name]
+        date_column = table.c[spec.date_column]
+        with db_manager.get_session() as session:
+            result = session.execute(select(table).where(
+                *self._conditions(spec, table, platform, account_id),
+                date_column >= start_date, date_column <= end_date
+            ))
+            return [{key: _plain(value) for key, value in row._mapping.items() if key != 'id'} for row in result]
+
+    # ========================================
+    # COMPACTAGE
+    # ========================================
+
+    def compact(self, today: Optional[date] = None) -> Dict[str, int]:
+        """Archiver les mois clos de chaque compte; retourne les lignes écrites par table"""
+        if not self.available:
+            logger.info("ℹ️  pyarrow absent: tier froid désactivé")
+            return {}
+
+        horizon = self.horizon(today)
+        if not self.durable and any(spec.delete_compacted for spec in COLD_TABLES.values()):
+            logger.info("ℹ️  Tier froid non durable (aucune garantie de rétention): les lignes archivées restent en base")
+        written: Dict[str, int] = {}
+        for spec in COLD_TABLES.values():
+            table = Base.metadata.tables[spec.name]
+            date_column = table.c[spec.date_column]
+            platform_column = table.c.platform if spec.platform is None else None
+            try:
+                with db_manager.get_session() as session:
+                    group_columns = [column for column in (platform_column, table.c[spec.account_column]) if column is not None]
+                    groups = session.execute(
+                        select(*group_columns, func.min(date_column), func.max(date_column))
+                        .where(*self._conditions(spec, table, None, None), date_column < horizon)
+                        .group_by(*group_columns)
+                    ).all()
+
+                rows_written = 0
+                for group in groups:
+                    platform = group[0] if platform_column is not None else spec.platform
+                    account_id, first, last = group[-3], group[-2], group[-1]
+                    month = month_start(first)
+                    while month <= last:
+                        rows_written += self._compact_month(spec, platform, account_id, month)
+                        month = add_months(month, 1)
+                written[spec.name] = rows_written
+            except Exception as e:
+                logger.error(f"❌ Erreur compactage {spec.name}: {e}")
+
+        logger.info(f"🧊 Compactage des mois clos terminé: {written}")
+        return written
+
+    def _compact_month(self, spec: ColdTable, platform: str, account_id: str, month: date) -> int:
+        month_end = add_months(month, 1) - timedelta(days=1)
+        rows = self.read_hot(spec.name, platform, account_id, month, month_end)
+        if not rows:
+            return 0
+
+        path = self.path_for(spec.name, platform, account_id, month)
+        digest = rows_digest(rows)
+        # Mois déjà archivé depuis ces mêmes lignes (valeurs comprises): rien à réécrire
+        unchanged = os.path.exists(path) and self._stored_digest(path) == digest
+        if unchanged and not self.deletes_rows(spec):
+            return 0
+        if not unchanged:
+            if os.path.exists(path):
+                rows = merge_rows(self._read_file(path), rows, spec.key_columns)
+            self._write_file(spec, path, rows, digest)
+
+        if self.deletes_rows(spec):
+            table = Base.metadata.tables[spec.name]
+            date_column = table.c[spec.date_column]
+            with db_manager.get_session() as session:
+                session.execute(table.delete().where(
+                    *self._conditions(spec, table, platform, account_id),
+                    date_column >= month, date_column <= month_end
+                ))
+                session.commit()
+
+        self._count('months_written')
+        self._count('rows_archived', len(rows))
+        return len(rows)
+
+    def _write_file(self, spec: ColdTable, path: str, rows: List[Row], digest: str):
+        table = Base.metadata.tables[spec.name]
+        schema = pa.schema([(column.name, _arrow_type(column)) for column in table.columns if column.name != 'id'],
+                           metadata={_DIGEST_KEY: digest.encode('ascii')})
+        rows = sorted(rows, key=lambda row: tuple(row[column] for column in (spec.date_column, *spec.key_columns)))
+
+        # Écriture atomique: un lecteur voit l'ancien fichier ou le nouveau, jamais un fichier partiel
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), temporary, compression='zstd')
+        os.replace(temporary, path)
+
+    @staticmethod
+    def _stored_digest(path: str) -> Optional[str]:
+        try:
+            metadata = pq.read_schema(path).metadata or {}
+        except Exception as e:
+            logger.warning(f"⚠️  Fichier froid illisible {path}: {e}")
+            return None
+        digest = metadata.get(_DIGEST_KEY)
+        return digest.decode('ascii') if digest else None
+
+    def _read_file(self, path: str, columns: Optional[List[str]] = None, filters=None) -> List[Row]:
+        self._count('files_read')
+        return pq.read_table(path, columns=columns, filters=filters).to_pylist()
+
+    # ========================================
+    # LECTURE
+    # ========================================
+
+    def _month_paths(self, table_name: str, platform: str, account_id: str,
+                     start_date: date, end_date: date) -> Iterator[str]:
+        month = month_start(start_date)
+        while month <= end_date:
+            path = self.path_for(table_name, platform, account_id, month)
+            if os.path.exists(path):
+                yield path
+            month = add_months(month, 1)
+
+    def read_archived(self, table_name: str, platform: str, account_id: str,
+                      start_date: date, end_date: date, columns: Optional[List[str]] = None) -> List[Row]:
+        """Lignes archivées de la période (mois concernés seulement)"""
+        if not self.available:
+            return []
+        spec = COLD_TABLES[table_name]
+        filters = [(spec.date_column, '>=', start_date), (spec.date_column, '<=', end_date)]
+        rows: List[Row] = []
+        for path in self._month_paths(table_name, platform, account_id, start_date, end_date):
+            try:
+                rows.extend(self._read_file(path, columns, filters))
+            except Exception as e:
+                logger.warning(f"⚠️  Fichier froid illisible {path}: {e}")
+        return rows
+
+    def read_history(self, table_name: str, platform: str, account_id: str,
+                     start_date: date, end_date: date) -> List[Row]:
+        """Lignes de la période, archives Parquet et base réunies, triées par date"""
+        spec = COLD_TABLES[table_name]
+        rows = merge_rows(self.read_archived(table_name, platform, account_id, start_date, end_date),
+                          self.read_hot(table_name, platform, account_id, start_date, end_date),
+                          spec.key_columns)
+        return sorted(rows, key=lambda row: row[spec.date_column])
+
+    def footprint(self, table_name: Optional[str] = None) -> Dict[str, int]:
+        """Fichiers et octets sur disque (toutes tables ou une seule)"""
+        root = os.path.join(self.root, table_name) if table_name else self.root
+        files = size = 0
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith('.parquet'):
+                    files += 1
+                    size += os.path.getsize(os.path.join(directory, name))
+        return {'files': files, 'bytes': size}
+
+
+# Instance globale
+cold_storage = ColdStorage()
@@ -6,6 +6,7 @@ Avec pool de connexions, retry automatique et gestion d'erreurs robuste
 import os
 import time
 import logging
+from datetime import datetime, timedelta
 from contextlib import contextmanager
 from typing import Optional, Generator
 from urllib.parse import quote_plus
@@ -17,12 +18,24 @@ from sqlalchemy.pool import QueuePool
 from psycopg2 import OperationalError as Psycopg2OperationalError
 
 from .models import Base, User, FacebookAccount, LinkedinAccount
+from .partitioning import partition_manager, partitioned_tables
 from ..utils.config import get_env_var
+from ..utils.prometheus import Gauge, metrics_registry, db_pool_checkout_wait
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class TimedQueuePool(QueuePool):
+    """QueuePool mesurant l'attente d'obtention d'une connexion (pool saturé, ouverture)"""
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start)
+
 class DatabaseManager:
     """Gestionnaire principal de la base de données avec pool de connexions"""
     
@@ -66,7 +79,7 @@ class DatabaseManager:
         
         # Configuration du pool de connexions
         engine_config = {
-            'poolclass': QueuePool,
+            'poolclass': TimedQueuePool,
             'pool_size': int(get_env_var('DB_POOL_SIZE', '10')),
             'max_overflow': int(get_env_var('DB_MAX_OVERFLOW', '20')),
             'pool_pre_ping': True,  # Vérifier les connexions avant utilisation
@@ -168,8 +181,10 @@ class DatabaseManager:
         """Créer toutes les tables définies dans les modèles"""
         
         try:
-            # Créer toutes les tables
+            # Tables de métriques quotidiennes partitionnées par mois (PostgreSQL), puis le reste
+            partition_manager.create_tables(self.engine)
             Base.metadata.create_all(bind=self.engine)
+            partition_manager.ensure_partitions(self.engine)
             logger.info("✅ Tables créées/vérifiées avec succès")
             
             # Vérifier que les tables principales existent
@@ -289,32 +304,31 @@ class DatabaseManager:
             logger.error(f"❌ Erreur lors de la récupération des statistiques: {e}")
             return {}
     
+    def maintain_partitions(self) -> int:
+        """Créer à l'avance les partitions mensuelles des tables de métriques"""
+        
+        try:
+            return partition_manager.ensure_partitions(self.engine)
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de la création des partitions: {e}")
+            return 0
+    
     def cleanup_old_data(self, days: int = 90):
-        """Nettoyer les anciennes données (par exemple logs anciens)"""
-        
-        cleanup_queries = [
-            f"""
-            DELETE FROM facebook_page_daily 
-            WHERE created_at < NOW() - INTERVAL '{days} days'
-            AND date < CURRENT_DATE - INTERVAL '{days} days'
-            """,
-            f"""
-            DELETE FROM linkedin_page_daily 
-            WHERE created_at < NOW() - INTERVAL '{days} days'
-            AND date < CURRENT_DATE - INTERVAL '{days} days'
-            """
-        ]
+        """
+        Appliquer la rétention aux tables de métriques quotidiennes: suppression des
+        partitions mensuelles expirées (PostgreSQL), DELETE sur la date sinon
+        """
+        
+        cutoff = (datetime.utcnow() - timedelta(days=days)).date()
         
         try:
+            self.maintain_partitions()
+            
             deleted_total = 0
-            with self.engine.connect() as conn:
-                for query in cleanup_queries:
-                    result = conn.execute(text(query))
-                    deleted_count = result.rowcount
-                    deleted_total += deleted_count
-                    logger.info(f"🧹 Supprimé {deleted_count} lignes anciennes")
-                
-                conn.commit()
+            for table_name in partitioned_tables():
+                deleted_count = partition_manager.apply_retention(self.engine, table_name, cutoff)
+                deleted_total += deleted_count
+                logger.info(f"🧹 {table_name}: {deleted_count} lignes anciennes supprimées")
             
             logger.info(f"✅ Nettoyage terminé: {deleted_total} lignes supprimées")
             return deleted_total
@@ -337,6 +351,21 @@ class DatabaseManager:
 # Instance globale du gestionnaire de base de données
 db_manager = DatabaseManager()
 
+def _pool_metrics():
+    """État du pool de connexions pour /metrics"""
+    engine_pool = db_manager.engine.pool if db_manager.engine else None
+    if not isinstance(engine_pool, QueuePool):
+        return []
+    
+    connections = Gauge('db_pool_connections', 'Connexions du pool', ('state',))
+    connections.set(engine_pool.checkedout(), 'checked_out')
+    connections.set(engine_pool.checkedin(), 'idle')
+    connections.set(max(engine_pool.overflow(), 0), 'overflow')
+    connections.set(engine_pool.size(), 'size')
+    return [connections]
+
+metrics_registry.register_collector(_pool_metrics)
+
 def init_database():
     """Initialiser la base de données (à appeler au démarrage de l'app)"""
     
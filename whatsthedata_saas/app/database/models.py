@@ -3,7 +3,7 @@ Modèles SQLAlchemy pour la base de données WhatTheData
 Basé sur le schéma PostgreSQL existant
 """
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, Numeric, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -85,6 +85,10 @@ class FacebookPageMetadata(Base):
 
 class FacebookPageDaily(Base):
     __tablename__ = 'facebook_page_daily'
+    __table_args__ = (
+        Index('ix_facebook_page_daily_lookup', 'page_id', 'date'),
+        {'info': {'partition_by': 'date'}},   # partitions mensuelles (voir database/partitioning)
+    )
     
     id = Column(Integer, primary_key=True)
     page_id = Column(String(255), nullable=False)
@@ -262,6 +266,10 @@ class LinkedinPagesMetadata(Base):
 
 class LinkedinPageDaily(Base):
     __tablename__ = 'linkedin_page_daily'
+    __table_args__ = (
+        Index('ix_linkedin_page_daily_lookup', 'organization_id', 'date'),
+        {'info': {'partition_by': 'date'}},   # partitions mensuelles (voir database/partitioning)
+    )
     
     id = Column(Integer, primary_key=True)
     organization_id = Column(Text, nullable=False)
@@ -326,6 +334,10 @@ class LinkedinPostsMetadata(Base):
 
 class LinkedinPostsDaily(Base):
     __tablename__ = 'linkedin_posts_daily'
+    __table_args__ = (
+        Index('ix_linkedin_posts_daily_lookup', 'post_urn', 'date'),
+        {'info': {'partition_by': 'date'}},   # partitions mensuelles (voir database/partitioning)
+    )
     
     id = Column(Integer, primary_key=True)
     post_urn = Column(Text, nullable=False)
@@ -450,6 +462,93 @@ class LinkedinPageViewsBySeniority(Base):
     date_collected = Column(Date, default=func.current_date())
     created_at = Column(DateTime, default=func.now())
 
+# ========================================
+# SNAPSHOTS DE SEGMENTATION (followers, démographie des fans)
+# ========================================
+
+class BreakdownSnapshot(Base):
+    """
+    Segmentation d'un compte à une date: image complète (keyframe) ou delta des seules
+    tranches modifiées par rapport à la dernière image complète (voir collectors/breakdown_store)
+    """
+    __tablename__ = 'breakdown_snapshots'
+    __table_args__ = (
+        UniqueConstraint('platform', 'account_id', 'breakdown_type', 'snapshot_date',
+                         name='uq_breakdown_snapshots_day'),
+        Index('ix_breakdown_snapshots_lookup', 'platform', 'account_id', 'breakdown_type', 'snapshot_date'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    platform = Column(String(20), nullable=False)          # linkedin, facebook
+    account_id = Column(Text, nullable=False)              # organization_id ou page_id
+    breakdown_type = Column(String(50), nullable=False)    # country, seniority, industry, function, company_size...
+    snapshot_date = Column(Date, nullable=False)
+    is_keyframe = Column(Boolean, nullable=False, default=False)
+    keyframe_date = Column(Date, nullable=False)           # image complète de référence (elle-même si keyframe)
+    buckets = Column(Text, nullable=False)                 # JSON {tranche: valeur}; delta: null = tranche disparue
+    digest = Column(String(64), nullable=False)            # empreinte de la segmentation complète
+    bucket_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=func.now())
+
+# ========================================
+# AGRÉGATS PRÉCALCULÉS DES STATISTIQUES DE PAGE
+# ========================================
+
+class PageStatisticsRollup(Base):
+    """
+    Statistiques de page d'un compte par période: jour collecté (granularity='day'), semaine
+    (lundi), mois, ou total courant arrêté à un jour ('running'), maintenus incrémentalement
+    à chaque collecte (voir collectors/page_rollups)
+    """
+    __tablename__ = 'page_statistics_rollups'
+    __table_args__ = (
+        UniqueConstraint('platform', 'account_id', 'granularity', 'period_start',
+                         name='uq_page_statistics_rollups_period'),
+        Index('ix_page_statistics_rollups_lookup', 'platform', 'account_id', 'granularity', 'period_start'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    platform = Column(String(20), nullable=False)          # linkedin
+    account_id = Column(Text, nullable=False)              # organization_id
+    granularity = Column(String(10), nullable=False)       # day, week, month, running
+    period_start = Column(Date, nullable=False)            # jour, lundi, 1er du mois ou jour d'arrêt du total
+    day_count = Column(Integer, nullable=False, default=0) # jours collectés inclus dans la ligne
+
+    # Vues de page (sommes sur la période)
+    total_page_views = Column(Integer, nullable=False, default=0)
+    unique_page_views = Column(Integer, nullable=False, default=0)
+    desktop_page_views = Column(Integer, nullable=False, default=0)
+    mobile_page_views = Column(Integer, nullable=False, default=0)
+    overview_page_views = Column(Integer, nullable=False, default=0)
+    careers_page_views = Column(Integer, nullable=False, default=0)
+    about_page_views = Column(Integer, nullable=False, default=0)
+    people_page_views = Column(Integer, nullable=False, default=0)
+    jobs_page_views = Column(Integer, nullable=False, default=0)
+    life_at_page_views = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+# ========================================
+# INVALIDATION DU CACHE DE RÉPONSES LOOKER
+# ========================================
+
+class ResponseCacheGeneration(Base):
+    """
+    Génération des données d'un compte, renouvelée après chaque collecte: canal d'invalidation
+    partagé entre le scheduler et les processus API (voir utils/response_cache).
+    Numérotation croissante commune à toutes les lignes: un relevé ne lit que les nouvelles.
+    """
+    __tablename__ = 'response_cache_generations'
+    __table_args__ = (
+        UniqueConstraint('platform', 'account_id', name='uq_response_cache_generations_account'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    platform = Column(String(20), nullable=False)          # linkedin, facebook, user (comptes d'un utilisateur)
+    account_id = Column(Text, nullable=False)              # organization_id, page_id ou id utilisateur
+    generation = Column(Integer, nullable=False, default=0, index=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 # ========================================
 # LOOKER STUDIO TEMPLATES
 # ========================================
@@ -477,6 +576,34 @@ class UserTemplateAccess(Base):
     expires_at = Column(DateTime)
     is_active = Column(Boolean, default=True)
 
+# ========================================
+# DROITS D'ABONNEMENT
+# ========================================
+
+class UserEntitlement(Base):
+    """Copie locale de l'abonnement Stripe et des compteurs d'utilisation (tenue par les webhooks)"""
+    __tablename__ = 'user_entitlements'
+    
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    plan_type = Column(String(50), nullable=False, default='free')
+    status = Column(String(50), nullable=False, default='active')
+    stripe_customer_id = Column(String(255))
+    stripe_subscription_id = Column(String(255))
+    current_period_start = Column(DateTime)
+    current_period_end = Column(DateTime)
+    trial_end = Column(DateTime)
+    cancel_at_period_end = Column(Boolean, default=False)
+    amount = Column(Integer, default=0)  # en centimes
+    currency = Column(String(10), default='eur')
+    max_facebook_accounts = Column(Integer, default=0)
+    max_linkedin_accounts = Column(Integer, default=0)
+    max_instagram_accounts = Column(Integer, default=0)
+    data_retention_days = Column(Integer, default=30)
+    facebook_accounts = Column(Integer, nullable=False, default=0)
+    linkedin_accounts = Column(Integer, nullable=False, default=0)
+    reconciled_at = Column(DateTime)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 # ========================================
 # HELPER FUNCTIONS
 # ========================================
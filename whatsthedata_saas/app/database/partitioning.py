@@ -0,0 +1,250 @@
+"""
+Partitionnement mensuel des tables de métriques quotidiennes
+PostgreSQL: les tables marquées info={'partition_by': 'date'} dans les modèles sont créées
+PARTITION BY RANGE sur cette colonne, avec une partition par mois (<table>_pAAAAMM) créée à
+l'avance et une partition DEFAULT de secours, vidée à chaque maintenance: les lignes qui y
+tombent (historique rattrapé hors de la fenêtre) sont déplacées dans leur partition mensuelle.
+La rétention détache puis supprime les mois entièrement antérieurs à la date limite au lieu
+de DELETE massifs (ni verrous longs ni travail de vacuum), et les requêtes bornées sur la
+date ne lisent que les mois concernés.
+SQLite (tests locaux) et tables existantes non partitionnées: tables simples, rétention par
+DELETE sur la date.
+"""
+
+import logging
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn, Table
+
+from .models import Base
+from ..utils.config import get_env_int
+
+logger = logging.getLogger(__name__)
+
+PARTITION_MONTHS_AHEAD = get_env_int('PARTITION_MONTHS_AHEAD', 3)
+# Mois passés couverts à la création (rattrapage des collectes, jours révisés)
+PARTITION_MONTHS_BEHIND = get_env_int('PARTITION_MONTHS_BEHIND', 4)
+
+_PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table_name: str, month: date) -> str:
+    return f"{table_name}_p{month:%Y%m}"
+
+
+def partitioned_tables() -> Dict[str, str]:
+    """Tables partitionnées déclarées dans les modèles: nom -> colonne de partition"""
+    return {table.name: table.info['partition_by']
+            for table in Base.metadata.sorted_tables if 'partition_by' in table.info}
+
+
+class PartitionManager:
+    """Création des tables partitionnées, des partitions à venir et rétention par partition"""
+
+    def __init__(self, months_ahead: int = PARTITION_MONTHS_AHEAD, months_behind: int = PARTITION_MONTHS_BEHIND):
+        self.months_ahead = months_ahead
+        self.months_behind = months_behind
+
+    @staticmethod
+    def supported(engine: Engine) -> bool:
+        return engine.dialect.name == 'postgresql'
+
+    # ========================================
+    # CRÉATION
+    # ========================================
+
+    def create_tables(self, engine: Engine) -> List[str]:
+        """
+        Créer les tables partitionnées absentes (avant Base.metadata.create_all, qui ne
+        recrée pas une table existante). Une table déjà présente et non partitionnée est
+        laissée telle quelle: sa rétention passe par DELETE.
+        """
+        if not self.supported(engine):
+            return []
+
+        created = []
+        existing = set(inspect(engine).get_table_names())
+        with engine.begin() as conn:
+            for table_name, column in partitioned_tables().items():
+                if table_name in existing:
+                    continue
+                self._create_parent(conn, Base.metadata.tables[table_name], column)
+                created.append(table_name)
+
+        if created:
+            logger.info(f"✅ Tables partitionnées par mois créées: {', '.join(created)}")
+        return created
+
+    @staticmethod
+    def _create_parent(conn: Connection, table: Table, column: str):
+        # La clé primaire d'une table partitionnée doit contenir la colonne de partition;
+        # l'ORM garde l'id seul comme identité (unique par séquence)
+        columns = [str(CreateColumn(col).compile(dialect=conn.dialect)) for col in table.columns]
+        primary_key = [col.name for col in table.primary_key.columns if col.name != column] + [column]
+        conn.execute(text(
+            f"CREATE TABLE {table.name} ({', '.join(columns)}, PRIMARY KEY ({', '.join(primary_key)})) "
+            f"PARTITION BY RANGE ({column})"
+        ))
+        conn.execute(text(f"CREATE TABLE {table.name}_default PARTITION OF {table.name} DEFAULT"))
+        for index in table.indexes:
+            index.create(conn)
+
+    def is_partitioned(self, conn: Connection, table_name: str) -> bool:
+        if conn.dialect.name != 'postgresql':
+            return False
+        return conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+        ), {'name': table_name}).first() is not None
+
+    def partitions(self, conn: Connection, table_name: str) -> List[Tuple[str, date]]:
+        """Partitions mensuelles d'une table (nom, premier jour du mois), DEFAULT exclue"""
+        rows = conn.execute(text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :name AND parent.relnamespace = current_schema()::regnamespace"
+        ), {'name': table_name}).all()
+        months = []
+        for (name,) in rows:
+            match = _PARTITION_SUFFIX.search(name)
+            if match:
+                months.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+        return sorted(months, key=lambda item: item[1])
+
+    def ensure_partitions(self, engine: Engine, today: Optional[date] = None) -> int:
+        """
+        Créer les partitions manquantes: de months_behind mois passés à months_ahead mois à
+        venir, plus chaque mois dont des lignes sont tombées dans la partition DEFAULT
+        (rattrapages d'historique antérieurs à la fenêtre). Ces lignes sont déplacées dans
+        leur partition mensuelle: la DEFAULT reste vide et la rétention supprime des
+        partitions plutôt que de faire des DELETE dans la DEFAULT.
+        """
+        if not self.supported(engine):
+            return 0
+
+        current = month_start(today or date.today())
+        window = {add_months(current, offset) for offset in range(-self.months_behind, self.months_ahead + 1)}
+        created = 0
+        for table_name, column in partitioned_tables().items():
+            with engine.begin() as conn:
+                if not self.is_partitioned(conn, table_name):
+                    continue
+                existing = {month for _, month in self.partitions(conn, table_name)}
+                in_default = set(self._default_months(conn, table_name, column)) - existing
+
+            if in_default:
+                try:
+                    created += self._split_default(engine, table_name, column, sorted(in_default))
+                except Exception as e:
+                    logger.warning(f"⚠️  Lignes de {table_name}_default non déplacées ({len(in_default)} mois): {e}")
+                existing |= in_default
+
+            for month in sorted(window - existing):
+                try:
+                    # Une transaction par partition: un conflit avec la DEFAULT n'arrête pas les suivantes
+                    with engine.begin() as conn:
+                        self._create_partition(conn, table_name, month)
+                    created += 1
+                except Exception as e:
+                    logger.warning(f"⚠️  Partition {partition_name(table_name, month)} non créée: {e}")
+
+        if created:
+            logger.info(f"✅ {created} partitions mensuelles créées")
+        return created
+
+    @staticmethod
+    def _create_partition(conn: Connection, table_name: str, month: date):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(table_name, month)} "
+            f"PARTITION OF {table_name} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+
+    @staticmethod
+    def _default_months(conn: Connection, table_name: str, column: str) -> List[date]:
+        """Mois présents dans la partition DEFAULT"""
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': f"{table_name}_default"}).scalar() is None:
+            return []
+        rows = conn.execute(text(
+            f"SELECT DISTINCT date_trunc('month', {column})::date FROM {table_name}_default"
+        )).all()
+        return [row[0] for row in rows if row[0] is not None]
+
+    def _split_default(self, engine: Engine, table_name: str, column: str, months: List[date]) -> int:
+        """
+        Sortir de la DEFAULT les lignes des mois donnés: une partition ne peut pas être créée
+        tant que la DEFAULT contient des lignes de sa plage. En une transaction: détacher la
+        DEFAULT, créer les partitions, y réinsérer les lignes (routage par la table mère),
+        les supprimer de la DEFAULT, la rattacher.
+        """
+        default = f"{table_name}_default"
+        ranges = " OR ".join(
+            f"({column} >= '{month.isoformat()}' AND {column} < '{add_months(month, 1).isoformat()}')"
+            for month in months
+        )
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table_name} DETACH PARTITION {default}"))
+            for month in months:
+                self._create_partition(conn, table_name, month)
+            moved = conn.execute(text(
+                f"INSERT INTO {table_name} SELECT * FROM {default} WHERE {ranges}"
+            )).rowcount or 0
+            conn.execute(text(f"DELETE FROM {default} WHERE {ranges}"))
+            conn.execute(text(f"ALTER TABLE {table_name} ATTACH PARTITION {default} DEFAULT"))
+
+        logger.info(f"✅ {table_name}: {moved} lignes de la DEFAULT déplacées dans {len(months)} partitions mensuelles")
+        return len(months)
+
+    # ========================================
+    # RÉTENTION
+    # ========================================
+
+    def apply_retention(self, engine: Engine, table_name: str, cutoff: date) -> int:
+        """
+        Supprimer les lignes antérieures à cutoff. Table partitionnée: seuls les mois
+        entièrement antérieurs sont détachés puis supprimés (le mois de cutoff est conservé
+        en entier); retourne alors le nombre de lignes estimé par les statistiques.
+        """
+        column = partitioned_tables().get(table_name, 'date')
+        with engine.begin() as conn:
+            if not self.is_partitioned(conn, table_name):
+                table = Base.metadata.tables[table_name]
+                result = conn.execute(table.delete().where(table.c[column] < cutoff))
+                return result.rowcount or 0
+
+            # Lignes hors des mois couverts: la partition DEFAULT reste petite, un DELETE suffit
+            removed_default = conn.execute(text(
+                f"DELETE FROM {table_name}_default WHERE {column} < :cutoff"
+            ), {'cutoff': cutoff}).rowcount or 0
+
+            expired = [name for name, month in self.partitions(conn, table_name)
+                       if add_months(month, 1) <= cutoff]
+            if not expired:
+                return removed_default
+            removed = conn.execute(text(
+                "SELECT COALESCE(SUM(GREATEST(reltuples, 0)), 0) FROM pg_class WHERE relname = ANY(:names)"
+            ), {'names': expired}).scalar()
+            for name in expired:
+                conn.execute(text(f"ALTER TABLE {table_name} DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+
+        logger.info(f"🧹 {table_name}: {len(expired)} partitions supprimées ({', '.join(expired)})")
+        return int(removed or 0) + removed_default
+
+
+# Instance globale
+partition_manager = PartitionManager()
@@ -22,6 +22,10 @@ try:
     from app.database.connection import init_database, test_database_connection, db_manager
     from app.api.looker_endpoints import router as looker_router
     from app.api.connect_routes import router as connect_router
+    from app.payments.entitlements import entitlement_store
+    from app.utils.metrics import get_registry
+    from app.utils.prometheus import metrics_registry, http_request_duration, CONTENT_TYPE as METRICS_CONTENT_TYPE
+    from app.utils.tracing import flight_recorder
 except ImportError as e:
     print(f"ERREUR CRITIQUE: Import manquant - {e}")
     sys.exit(1)
@@ -116,10 +120,24 @@ async def lifespan(app: FastAPI):
             if Config.ENVIRONMENT == 'production':
                 raise Exception("Base de données requise en production")
         
-        # 3. Test des APIs externes critiques
+        # 3. Réconciliation périodique des droits d'abonnement (webhooks Stripe manqués)
+        if db_initialized:
+            try:
+                entitlement_store.start_reconciler()
+            except Exception as e:
+                logger.warning(f"Réconciliation des droits non démarrée: {e}")
+        
+        # 4. Registre des schémas de métriques (compilé une fois pour tout le processus)
+        try:
+            registry = get_registry()
+            logger.info(f"Registre des métriques prêt: version {registry.version}")
+        except Exception as e:
+            logger.warning(f"Registre des métriques non préchargé: {e}")
+        
+        # 5. Test des APIs externes critiques
         await test_external_apis()
         
-        # 4. Validation des tokens
+        # 6. Validation des tokens
         validate_api_tokens()
         
         startup_time = time.time() - startup_start
@@ -142,6 +160,8 @@ async def lifespan(app: FastAPI):
     logger.info("Arrêt WhatsTheData API...")
     
     try:
+        entitlement_store.stop_reconciler()
+        
         # Nettoyage connexions DB
         if hasattr(db_manager, 'close_connections'):
             db_manager.close_connections()
@@ -283,6 +303,11 @@ app.add_middleware(
     max_age=3600
 )
 
+def _route_label(request: Request) -> str:
+    """Gabarit de la route (/api/v1/users/{user_id}) pour borner la cardinalité des métriques"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
 # Middleware de monitoring avancé
 @app.middleware("http")
 async def monitoring_middleware(request: Request, call_next):
@@ -299,9 +324,14 @@ async def monitoring_middleware(request: Request, call_next):
         
         # Calcul du temps de traitement
         process_time = time.time() - start_time
+        http_request_duration.observe(process_time, request.method, _route_label(request), str(response.status_code))
         response.headers["X-Process-Time"] = f"{process_time:.4f}"
         response.headers["X-API-Version"] = Config.APP_VERSION
         
+        # En-têtes RateLimit-* posés par la dépendance de rate limiting
+        for name, value in getattr(request.state, "rate_limit_headers", {}).items():
+            response.headers[name] = value
+        
         # Log des réponses lentes
         if process_time > 2.0:
             logger.warning(f"Requête lente: {request.method} {request.url.path} - {process_time:.2f}s")
@@ -310,6 +340,7 @@ async def monitoring_middleware(request: Request, call_next):
         
     except Exception as e:
         process_time = time.time() - start_time
+        http_request_duration.observe(process_time, request.method, _route_label(request), "500")
         logger.error(f"Erreur middleware: {request.method} {request.url.path} - {e} - {process_time:.2f}s")
         raise
 
@@ -400,6 +431,29 @@ async def health_check():
             status_code=503
         )
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Exposition Prometheus (format texte) des métriques API, collecteurs et base"""
+    
+    metrics_token = os.getenv("METRICS_TOKEN")
+    if metrics_token and request.headers.get("Authorization") != f"Bearer {metrics_token}":
+        raise HTTPException(status_code=401, detail="Token de métriques invalide")
+    
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/admin/task-traces", include_in_schema=False)
+async def task_traces(request: Request, spans: bool = True):
+    """Traces des tâches de collecte les plus lentes et en échec (enregistreur de vol)"""
+    
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        if not Config.DEBUG:
+            raise HTTPException(status_code=404, detail="Not found")
+    elif request.headers.get("Authorization") != f"Bearer {admin_token}":
+        raise HTTPException(status_code=401, detail="Token d'administration invalide")
+    
+    return flight_recorder.snapshot(include_spans=spans)
+
 @app.get("/status")
 async def system_status():
     """Status système détaillé pour monitoring"""
@@ -593,7 +647,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     elif exc.status_code >= 400:
         logger.warning(f"HTTP {exc.status_code}: {exc.detail} - {request.url.path}")
     
-    return JSONResponse(content=error_response, status_code=exc.status_code)
+    return JSONResponse(content=error_response, status_code=exc.status_code, headers=getattr(exc, "headers", None))
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,528 @@
+"""
+Droits d'abonnement locaux (plan, statut, fin de période, limites, utilisation)
+La table user_entitlements est tenue à jour par les webhooks Stripe et, pour les
+compteurs de comptes, dans la même transaction que l'ajout/désactivation du compte.
+Un cache en mémoire évite toute requête en régime établi; une réconciliation
+périodique rattrape les webhooks manqués et les modifications faites hors API.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, event, func, inspect, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from ..database.connection import db_manager
+from ..database.models import User, UserEntitlement, FacebookAccount, LinkedinAccount
+from ..utils.config import get_env_int
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie d'une entrée en mémoire (les autres workers voient les webhooks après ce délai)
+CACHE_TTL = get_env_int('ENTITLEMENT_CACHE_TTL', 300)
+# Intervalle de réconciliation avec Stripe et les tables de comptes (secondes)
+RECONCILE_INTERVAL = get_env_int('ENTITLEMENT_RECONCILE_INTERVAL', 3600)
+# Durée pendant laquelle une lecture Stripe en échec n'est pas retentée (secondes)
+STRIPE_FAILURE_TTL = get_env_int('ENTITLEMENT_STRIPE_FAILURE_TTL', 60)
+
+# Statuts Stripe qui donnent accès aux données
+ACTIVE_STATUSES = ('active', 'trialing', 'past_due')
+
+# Colonne de compteur par modèle de compte
+ACCOUNT_COUNTERS = {
+    FacebookAccount: 'facebook_accounts',
+    LinkedinAccount: 'linkedin_accounts',
+}
+
+
+@dataclass(frozen=True)
+class Entitlement:
+    """Instantané immuable des droits d'un utilisateur"""
+    user_id: int
+    email: str
+    is_active: bool
+    plan_type: str
+    status: str
+    stripe_customer_id: Optional[str]
+    stripe_subscription_id: Optional[str]
+    current_period_start: Optional[datetime]
+    current_period_end: Optional[datetime]
+    trial_end: Optional[datetime]
+    cancel_at_period_end: bool
+    amount: int
+    currency: str
+    max_facebook_accounts: int
+    max_linkedin_accounts: int
+    max_instagram_accounts: int
+    data_retention_days: int
+    facebook_accounts: int
+    linkedin_accounts: int
+    instagram_accounts: int = 0
+
+    @property
+    def is_free(self) -> bool:
+        return self.plan_type == 'free'
+
+    @property
+    def is_expired(self) -> bool:
+        if self.is_free:
+            return False
+        return self.current_period_end is not None and self.current_period_end < datetime.now()
+
+    @property
+    def is_valid(self) -> bool:
+        """Abonnement utilisable (compte actif, statut Stripe actif, période non échue)"""
+        if not self.is_active:
+            return False
+        if self.is_free:
+            return True
+        return self.status in ACTIVE_STATUSES and not self.is_expired
+
+    def account_count(self, platform: str) -> int:
+        return getattr(self, f"{platform.lower()}_accounts", 0)
+
+    def account_limit(self, platform: str) -> int:
+        return getattr(self, f"max_{platform.lower()}_accounts", 0)
+
+
+class EntitlementStore:
+    """Lecture en mémoire, écriture transactionnelle dans user_entitlements"""
+
+    def __init__(self, cache_ttl: int = CACHE_TTL):
+        self.cache_ttl = cache_ttl
+        # Limites par plan: renseignées par SubscriptionManager, PlanManager sinon
+        self.plan_limits: Dict[str, Any] = {}
+
+        self._entries: Dict[int, tuple] = {}  # user_id -> (Entitlement, chargé à)
+        self._by_email: Dict[str, int] = {}
+        self._stripe_failures: Dict[Any, float] = {}  # clé de lecture -> échec à
+        self._lock = threading.Lock()
+
+        self._reconcile_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        self.stats = {'hits': 0, 'loads': 0, 'writes': 0, 'reconciled': 0, 'corrections': 0,
+                      'stripe_skipped': 0}
+
+    # ========================================
+    # LECTURE
+    # ========================================
+
+    def get(self, user_id: int, refresh: bool = False) -> Optional[Entitlement]:
+        """Droits d'un utilisateur (None si l'utilisateur n'existe pas)"""
+        if not refresh:
+            entitlement = self._cached(user_id)
+            if entitlement is not None:
+                return entitlement
+
+        with db_manager.get_session() as session:
+            user = session.query(User).filter(User.id == user_id).first()
+            if not user:
+                return None
+            return self._load(session, user)
+
+    def get_by_email(self, email: str, refresh: bool = False) -> Optional[Entitlement]:
+        """Droits d'un utilisateur identifié par son email (connecteur Looker)"""
+        if not refresh:
+            user_id = self._by_email.get(email)
+            entitlement = self._cached(user_id) if user_id is not None else None
+            if entitlement is not None:
+                return entitlement
+
+        with db_manager.get_session() as session:
+            user = session.query(User).filter(User.email == email).first()
+            if not user:
+                return None
+            return self._load(session, user)
+
+    def _cached(self, user_id: int) -> Optional[Entitlement]:
+        cached = self._entries.get(user_id)
+        if cached is None:
+            return None
+        entitlement, loaded_at = cached
+        if time.monotonic() - loaded_at >= self.cache_ttl:
+            return None
+        self.stats['hits'] += 1
+        return entitlement
+
+    def _load(self, session: Session, user: User) -> Entitlement:
+        self.stats['loads'] += 1
+        row = session.query(UserEntitlement).filter(UserEntitlement.user_id == user.id).first()
+        if row is None:
+            row = self._bootstrap(session, user)
+        return self._remember(self._snapshot(user, row))
+
+    def _bootstrap(self, session: Session, user: User) -> UserEntitlement:
+        """
+        Première lecture: initialiser la ligne depuis l'utilisateur et ses comptes.
+        L'insertion se fait dans un savepoint: si un autre worker a créé la ligne
+        entre-temps, on relit la sienne au lieu de faire échouer la requête.
+        """
+        row = UserEntitlement(
+            user_id=user.id,
+            plan_type=user.plan_type or 'free',
+            status='active',
+            current_period_end=user.subscription_end_date,
+            facebook_accounts=self._count_accounts(session, FacebookAccount, user.id),
+            linkedin_accounts=self._count_accounts(session, LinkedinAccount, user.id),
+        )
+        self._apply_limits(row)
+        try:
+            with session.begin_nested():
+                session.add(row)
+        except IntegrityError:
+            logger.info(f"ℹ️  Droits de user {user.id} initialisés par un autre worker, relecture")
+            return session.query(UserEntitlement).filter(UserEntitlement.user_id == user.id).one()
+        logger.info(f"✅ Droits initialisés pour user {user.id} ({row.plan_type})")
+        return row
+
+    # ========================================
+    # ÉCRITURE (WEBHOOKS STRIPE)
+    # ========================================
+
+    def apply_subscription(self, user_id: int, **fields) -> Optional[Entitlement]:
+        """
+        Mettre à jour plan/statut/période d'un utilisateur en une transaction.
+        Les limites sont recalculées quand le plan change; users.plan_type et
+        users.subscription_end_date sont écrits dans la même transaction.
+        """
+        with db_manager.get_session() as session:
+            user = session.query(User).filter(User.id == user_id).first()
+            if not user:
+                logger.warning(f"⚠️  Droits non mis à jour: user {user_id} introuvable")
+                return None
+
+            row = session.query(UserEntitlement).filter(
+                UserEntitlement.user_id == user_id
+            ).with_for_update().first()
+            if row is None:
+                row = self._bootstrap(session, user)
+
+            for name, value in fields.items():
+                setattr(row, name, value)
+            self._apply_limits(row)
+            row.updated_at = datetime.utcnow()
+
+            if 'plan_type' in fields or 'current_period_end' in fields:
+                user.plan_type = row.plan_type
+                user.subscription_end_date = None if row.plan_type == 'free' else row.current_period_end
+            session.flush()
+
+            entitlement = self._snapshot(user, row)
+
+        self.stats['writes'] += 1
+        return self._remember(entitlement)
+
+    def apply_stripe_subscription(self, user_id: int, subscription: Any,
+                                  plan_type: Optional[str] = None) -> Optional[Entitlement]:
+        """Reporter un objet Subscription Stripe (webhook ou API) dans les droits locaux"""
+        status = subscription['status']
+        fields = {
+            'status': status,
+            'stripe_customer_id': subscription.get('customer'),
+            'stripe_subscription_id': subscription.get('id'),
+            'current_period_start': _from_timestamp(subscription.get('current_period_start')),
+            'current_period_end': _from_timestamp(subscription.get('current_period_end')),
+            'trial_end': _from_timestamp(subscription.get('trial_end')),
+            'cancel_at_period_end': bool(subscription.get('cancel_at_period_end')),
+        }
+
+        items = (subscription.get('items') or {}).get('data') or []
+        if items:
+            price = items[0].get('price') or {}
+            fields['amount'] = price.get('unit_amount') or 0
+            fields['currency'] = price.get('currency') or 'eur'
+
+        if status in ('canceled', 'incomplete_expired', 'unpaid'):
+            fields['plan_type'] = 'free'
+        elif plan_type:
+            fields['plan_type'] = plan_type
+
+        return self.apply_subscription(user_id, **fields)
+
+    def _apply_limits(self, row: UserEntitlement):
+        limits = self._limits_for(row.plan_type)
+        row.max_facebook_accounts = getattr(limits, 'max_facebook_accounts', 0)
+        row.max_linkedin_accounts = getattr(limits, 'max_linkedin_accounts', 0)
+        row.max_instagram_accounts = getattr(limits, 'max_instagram_accounts', 0)
+        row.data_retention_days = getattr(limits, 'data_retention_days', 30)
+
+    def _limits_for(self, plan_type: str) -> Any:
+        limits = self.plan_limits.get(plan_type) or self.plan_limits.get('free')
+        if limits is not None:
+            return limits
+
+        from ..auth.user_manager import PlanManager
+        try:
+            return PlanManager.get_plan_features(plan_type)
+        except ValueError:
+            return PlanManager.get_plan_features('free')
+
+    # ========================================
+    # LECTURES STRIPE EN ÉCHEC
+    # ========================================
+
+    def stripe_failed_recently(self, key: Any) -> bool:
+        """Une lecture Stripe pour cette clé a échoué il y a moins de STRIPE_FAILURE_TTL"""
+        failed_at = self._stripe_failures.get(key)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at >= STRIPE_FAILURE_TTL:
+            with self._lock:
+                self._stripe_failures.pop(key, None)
+            return False
+        self.stats['stripe_skipped'] += 1
+        return True
+
+    def stripe_lookup_failed(self, key: Any):
+        with self._lock:
+            self._stripe_failures[key] = time.monotonic()
+
+    def stripe_lookup_succeeded(self, key: Any):
+        with self._lock:
+            self._stripe_failures.pop(key, None)
+
+    # ========================================
+    # COMPTEURS D'UTILISATION
+    # ========================================
+
+    def _on_account_change(self, connection, model, user_id: int, delta: int):
+        """Ajuster le compteur dans la transaction qui ajoute/désactive le compte"""
+        column = getattr(UserEntitlement.__table__.c, ACCOUNT_COUNTERS[model])
+        connection.execute(
+            update(UserEntitlement.__table__)
+            .where(UserEntitlement.__table__.c.user_id == user_id)
+            .values({column: case((column + delta < 0, 0), else_=column + delta)})
+        )
+
+    # ========================================
+    # CACHE
+    # ========================================
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_email.clear()
+
+    def _remember(self, entitlement: Entitlement) -> Entitlement:
+        with self._lock:
+            self._entries[entitlement.user_id] = (entitlement, time.monotonic())
+            self._by_email[entitlement.email] = entitlement.user_id
+        return entitlement
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'size': len(self._entries),
+            'reconciler_running': bool(self._reconcile_thread and self._reconcile_thread.is_alive())
+        }
+
+    # ========================================
+    # RÉCONCILIATION
+    # ========================================
+
+    def reconcile(self, check_stripe: bool = True) -> Dict[str, int]:
+        """
+        Recompter les comptes actifs (deux requêtes groupées) et relire dans Stripe
+        les abonnements payants. Rattrape les webhooks perdus et les désactivations
+        faites par d'autres processus (dashboard).
+        """
+        result = {'rows': 0, 'usage_fixed': 0, 'stripe_checked': 0, 'stripe_fixed': 0, 'errors': 0}
+
+        with db_manager.get_session() as session:
+            counts = {
+                model: dict(
+                    session.query(model.user_id, func.count(model.id))
+                    .filter(model.is_active == True)
+                    .group_by(model.user_id)
+                    .all()
+                )
+                for model in ACCOUNT_COUNTERS
+            }
+
+            rows = session.query(UserEntitlement, User).join(User, User.id == UserEntitlement.user_id).all()
+            paid = []
+            stale = []
+            now = datetime.utcnow()
+
+            for row, user in rows:
+                result['rows'] += 1
+                changed = False
+
+                for model, column in ACCOUNT_COUNTERS.items():
+                    actual = counts[model].get(row.user_id, 0)
+                    if getattr(row, column) != actual:
+                        logger.warning(
+                            f"⚠️  Compteur {column} corrigé pour user {row.user_id}: "
+                            f"{getattr(row, column)} → {actual}"
+                        )
+                        setattr(row, column, actual)
+                        changed = True
+                if changed:
+                    result['usage_fixed'] += 1
+
+                # Plan modifié hors Stripe (administration, scripts)
+                if not row.stripe_subscription_id and user.plan_type and row.plan_type != user.plan_type:
+                    row.plan_type = user.plan_type
+                    row.current_period_end = user.subscription_end_date
+                    self._apply_limits(row)
+                    changed = True
+
+                row.reconciled_at = now
+                if changed:
+                    row.updated_at = now
+                    stale.append(row.user_id)
+                if row.stripe_subscription_id:
+                    paid.append((row.user_id, row.stripe_subscription_id, row.status, row.current_period_end))
+
+        for user_id in stale:
+            self.invalidate(user_id)
+
+        if check_stripe and paid:
+            import stripe
+
+            for user_id, subscription_id, status, period_end in paid:
+                if self.stripe_failed_recently(subscription_id):
+                    continue
+                try:
+                    subscription = stripe.Subscription.retrieve(subscription_id)
+                    self.stripe_lookup_succeeded(subscription_id)
+                    result['stripe_checked'] += 1
+                    if (subscription['status'] != status
+                            or _from_timestamp(subscription['current_period_end']) != period_end):
+                        logger.warning(f"⚠️  Abonnement {subscription_id} désynchronisé pour user {user_id}, correction")
+                        self.apply_stripe_subscription(user_id, subscription)
+                        result['stripe_fixed'] += 1
+                except Exception as e:
+                    self.stripe_lookup_failed(subscription_id)
+                    result['errors'] += 1
+                    logger.error(f"❌ Réconciliation Stripe échouée pour user {user_id}: {e}")
+
+        self.stats['reconciled'] += 1
+        self.stats['corrections'] += result['usage_fixed'] + result['stripe_fixed']
+        logger.info(f"✅ Réconciliation des droits: {result}")
+        return result
+
+    def start_reconciler(self, interval: int = RECONCILE_INTERVAL):
+        """Lancer la réconciliation périodique dans un thread de fond"""
+        if self._reconcile_thread and self._reconcile_thread.is_alive():
+            return
+
+        self._stop_event.clear()
+
+        def reconcile_loop():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error(f"❌ Erreur de réconciliation des droits: {e}")
+
+        self._reconcile_thread = threading.Thread(target=reconcile_loop, daemon=True)
+        self._reconcile_thread.start()
+        logger.info(f"✅ Réconciliation des droits programmée toutes les {interval}s")
+
+    def stop_reconciler(self):
+        self._stop_event.set()
+
+    # ========================================
+    # INTERNES
+    # ========================================
+
+    @staticmethod
+    def _count_accounts(session: Session, model, user_id: int) -> int:
+        return session.query(func.count(model.id)).filter(
+            model.user_id == user_id,
+            model.is_active == True
+        ).scalar() or 0
+
+    @staticmethod
+    def _snapshot(user: User, row: UserEntitlement) -> Entitlement:
+        return Entitlement(
+            user_id=user.id,
+            email=user.email,
+            is_active=bool(user.is_active),
+            plan_type=row.plan_type,
+            status=row.status,
+            stripe_customer_id=row.stripe_customer_id,
+            stripe_subscription_id=row.stripe_subscription_id,
+            current_period_start=row.current_period_start,
+            current_period_end=row.current_period_end,
+            trial_end=row.trial_end,
+            cancel_at_period_end=bool(row.cancel_at_period_end),
+            amount=row.amount or 0,
+            currency=row.currency or 'eur',
+            max_facebook_accounts=row.max_facebook_accounts or 0,
+            max_linkedin_accounts=row.max_linkedin_accounts or 0,
+            max_instagram_accounts=row.max_instagram_accounts or 0,
+            data_retention_days=row.data_retention_days or 30,
+            facebook_accounts=row.facebook_accounts or 0,
+            linkedin_accounts=row.linkedin_accounts or 0,
+        )
+
+
+def _from_timestamp(value: Any) -> Optional[datetime]:
+    return datetime.fromtimestamp(value) if value else None
+
+
+# Instance globale
+entitlement_store = EntitlementStore()
+
+
+# ========================================
+# SUIVI TRANSACTIONNEL DES COMPTES
+# ========================================
+
+def _mark_dirty(target, user_id: int):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('entitlements_dirty', set()).add(user_id)
+
+
+def _register_account_events(model):
+    @event.listens_for(model, 'after_insert')
+    def account_inserted(mapper, connection, target):
+        if target.is_active is not False:
+            entitlement_store._on_account_change(connection, model, target.user_id, 1)
+            _mark_dirty(target, target.user_id)
+
+    @event.listens_for(model, 'after_update')
+    def account_updated(mapper, connection, target):
+        history = inspect(target).attrs.is_active.history
+        if not history.has_changes():
+            return
+        was_active = bool(history.deleted and history.deleted[0])
+        is_active = bool(target.is_active)
+        if was_active != is_active:
+            entitlement_store._on_account_change(connection, model, target.user_id, 1 if is_active else -1)
+            _mark_dirty(target, target.user_id)
+
+    @event.listens_for(model, 'after_delete')
+    def account_deleted(mapper, connection, target):
+        if target.is_active:
+            entitlement_store._on_account_change(connection, model, target.user_id, -1)
+            _mark_dirty(target, target.user_id)
+
+
+for _model in ACCOUNT_COUNTERS:
+    _register_account_events(_model)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    # Le cache n'est invalidé qu'une fois la transaction validée
+    for user_id in session.info.pop('entitlements_dirty', ()):
+        entitlement_store.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('entitlements_dirty', None)
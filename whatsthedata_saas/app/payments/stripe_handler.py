@@ -23,6 +23,7 @@ from stripe.error import (
 )
 
 from ..auth.user_manager import user_manager, PlanType, PlanManager
+from .entitlements import entitlement_store
 from ..database.connection import db_manager
 from ..database.models import User
 from ..utils.config import get_env_var
@@ -765,14 +766,11 @@ class StripeHandler:
                 # Calculer la date de fin de l'abonnement
                 subscription_end = datetime.fromtimestamp(subscription.current_period_end)
                 
-                # Mettre à jour le plan de l'utilisateur
-                success = user_manager.update_user_plan(
-                    user_id=user_id,
-                    new_plan=plan_type,
-                    subscription_end_date=subscription_end
-                )
+                # Mettre à jour le plan de l'utilisateur et ses droits (une transaction)
+                entitlement = entitlement_store.apply_stripe_subscription(user_id, subscription, plan_type)
                 
-                if success:
+                if entitlement:
+                    user_manager.grant_template_access(user_id, entitlement.plan_type)
                     logger.info(f"✅ Abonnement activé: user {user_id} → {plan_type}")
                     return {
                         'success': True,
@@ -803,6 +801,9 @@ class StripeHandler:
             user_id = int(customer.metadata.get('user_id', 0))
             
             if user_id:
+                entitlement_store.apply_stripe_subscription(
+                    user_id, subscription, self._plan_from_subscription(subscription)
+                )
                 logger.info(f"✅ Abonnement créé: {subscription['id']} pour user {user_id}")
                 return {
                     'success': True,
@@ -831,26 +832,12 @@ class StripeHandler:
             user_id = int(customer.metadata.get('user_id', 0))
             
             if user_id:
-                # Mettre à jour la date de fin d'abonnement
-                subscription_end = datetime.fromtimestamp(subscription['current_period_end'])
-                
                 # Déterminer le plan à partir des items de l'abonnement
-                plan_type = None
-                for item in subscription['items']['data']:
-                    price_id = item['price']['id']
-                    for plan, price_info in self.plan_prices.items():
-                        if price_info.stripe_price_id == price_id:
-                            plan_type = plan
-                            break
-                    if plan_type:
-                        break
+                plan_type = self._plan_from_subscription(subscription)
                 
-                if plan_type:
-                    user_manager.update_user_plan(
-                        user_id=user_id,
-                        new_plan=plan_type,
-                        subscription_end_date=subscription_end
-                    )
+                entitlement = entitlement_store.apply_stripe_subscription(user_id, subscription, plan_type)
+                if entitlement and plan_type:
+                    user_manager.grant_template_access(user_id, entitlement.plan_type)
                 
                 logger.info(f"✅ Abonnement mis à jour: {subscription['id']} pour user {user_id}")
                 return {
@@ -880,12 +867,8 @@ class StripeHandler:
             user_id = int(customer.metadata.get('user_id', 0))
             
             if user_id:
-                # Rétrograder vers le plan gratuit
-                user_manager.update_user_plan(
-                    user_id=user_id,
-                    new_plan=PlanType.FREE.value,
-                    subscription_end_date=None
-                )
+                # Rétrograder vers le plan gratuit (utilisateur et droits dans la même transaction)
+                entitlement_store.apply_stripe_subscription(user_id, subscription, PlanType.FREE.value)
                 
                 logger.info(f"✅ Abonnement supprimé: user {user_id} rétrogradé vers plan gratuit")
                 return {
@@ -902,6 +885,16 @@ class StripeHandler:
             logger.error(f"❌ Erreur lors du traitement subscription deleted: {e}")
             return {'success': False, 'processed': False, 'message': str(e)}
     
+    def _plan_from_subscription(self, subscription: Dict[str, Any]) -> Optional[str]:
+        """Retrouver le plan à partir des prix de l'abonnement"""
+        
+        for item in subscription['items']['data']:
+            price_id = item['price']['id']
+            for plan, price_info in self.plan_prices.items():
+                if price_info.stripe_price_id == price_id:
+                    return plan
+        return None
+    
     def _handle_payment_succeeded(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
         """Traiter un paiement réussi"""
         
@@ -15,10 +15,13 @@ from decimal import Decimal
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
+import stripe
+
 from .stripe_handler import (
     stripe_handler, StripePaymentError, StripeSubscriptionError, 
     StripeWebhookError, SubscriptionStatus, PaymentStatus
 )
+from .entitlements import entitlement_store, Entitlement
 from ..auth.user_manager import user_manager, PlanType, PlanManager
 from ..database.connection import db_manager
 from ..database.models import User
@@ -117,9 +120,9 @@ class SubscriptionManager:
         # Configuration des limites par plan
         self.plan_limits = self._initialize_plan_limits()
         
-        # Cache des informations d'abonnement
-        self._subscription_cache = {}
-        self._cache_ttl = 300  # 5 minutes
+        # Droits locaux (table user_entitlements + cache mémoire), tenus par les webhooks
+        self.entitlements = entitlement_store
+        self.entitlements.plan_limits = self.plan_limits
         
         # Pool de threads pour les opérations asynchrones
         self.executor = ThreadPoolExecutor(max_workers=4)
@@ -295,16 +298,12 @@ class SubscriptionManager:
                 reason=reason
             )
             
-            # Mettre à jour le cache
-            self._invalidate_subscription_cache(user_id)
+            # Reporter l'annulation dans les droits locaux
+            self._resync_entitlement(user_id, subscription.stripe_subscription_id)
             
-            # Si annulation immédiate, mettre à jour le plan utilisateur
+            # Si annulation immédiate, repasser l'utilisateur et ses droits au plan gratuit
             if not at_period_end:
-                self.user_manager.update_user_plan(
-                    user_id=user_id,
-                    new_plan=PlanType.FREE.value,
-                    subscription_end_date=None
-                )
+                self.entitlements.apply_subscription(user_id, plan_type=PlanType.FREE.value, status='canceled')
             
             # Enregistrer l'événement
             self._log_subscription_event(
@@ -353,8 +352,8 @@ class SubscriptionManager:
                 subscription.stripe_subscription_id
             )
             
-            # Mettre à jour le cache
-            self._invalidate_subscription_cache(user_id)
+            # Reporter la réactivation dans les droits locaux
+            self._resync_entitlement(user_id, subscription.stripe_subscription_id)
             
             # Enregistrer l'événement
             self._log_subscription_event(
@@ -425,15 +424,12 @@ class SubscriptionManager:
                 proration_behavior='always_invoice' if is_upgrade else 'create_prorations'
             )
             
-            # Mettre à jour le plan utilisateur
-            self.user_manager.update_user_plan(
-                user_id=user_id,
-                new_plan=new_plan_type,
-                subscription_end_date=datetime.fromisoformat(change_result['current_period_end'])
+            # Reporter le changement de plan dans l'utilisateur et ses droits locaux
+            self._resync_entitlement(
+                user_id, subscription.stripe_subscription_id, new_plan_type,
+                current_period_end=datetime.fromisoformat(change_result['current_period_end'])
             )
-            
-            # Mettre à jour le cache
-            self._invalidate_subscription_cache(user_id)
+            self.user_manager.grant_template_access(user_id, new_plan_type)
             
             # Enregistrer l'événement
             event_type = SubscriptionEvent.UPGRADED if is_upgrade else SubscriptionEvent.DOWNGRADED
@@ -491,128 +487,126 @@ class SubscriptionManager:
     # ========================================
     
     def get_user_subscription(self, user_id: int, use_cache: bool = True) -> Optional[SubscriptionInfo]:
-        """Récupérer les informations d'abonnement d'un utilisateur"""
+        """Récupérer les informations d'abonnement d'un utilisateur (depuis les droits locaux)"""
         
         try:
-            # Vérifier le cache d'abord
-            cache_key = f"subscription_{user_id}"
-            if use_cache and cache_key in self._subscription_cache:
-                cached_data, timestamp = self._subscription_cache[cache_key]
-                if (datetime.utcnow() - timestamp).seconds < self._cache_ttl:
-                    return cached_data
+            entitlement = self.entitlements.get(user_id, refresh=not use_cache)
+            if not entitlement:
+                return None
             
-            # Récupérer l'utilisateur
-            user = self.user_manager.get_user_by_id(user_id)
-            if not user:
+            # Abonnement payant jamais reçu par webhook: lecture Stripe unique, puis stockage local
+            if not entitlement.is_free and not entitlement.stripe_subscription_id:
+                entitlement = self._sync_from_stripe(user_id, entitlement.plan_type)
+                if not entitlement:
+                    return None
+            
+            if not entitlement.is_free and entitlement.status not in ['active', 'trialing', 'past_due']:
+                logger.warning(f"⚠️  Aucun abonnement actif trouvé pour user {user_id}")
                 return None
             
-            # Si plan gratuit, retourner une structure minimale
-            if user.plan_type == PlanType.FREE.value:
-                subscription_info = SubscriptionInfo(
-                    user_id=user_id,
-                    stripe_customer_id="",
-                    stripe_subscription_id="",
-                    plan_type=PlanType.FREE.value,
-                    status="active",
-                    current_period_start=datetime.utcnow(),
-                    current_period_end=datetime.utcnow() + timedelta(days=365),
-                    limits=self.plan_limits[PlanType.FREE.value],
-                    usage=self.get_subscription_usage(user_id),
-                    created_at=user.created_at
-                )
-                
-                # Mettre en cache
-                self._subscription_cache[cache_key] = (subscription_info, datetime.utcnow())
-                return subscription_info
+            return self._subscription_info(entitlement)
             
-            # Récupérer les informations de paiement Stripe
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de la récupération d'abonnement pour user {user_id}: {e}")
+            return None
+    
+    def _sync_from_stripe(self, user_id: int, plan_type: str) -> Optional[Entitlement]:
+        """Initialiser les droits d'un abonnement payant depuis l'API Stripe"""
+        
+        # Lecture récemment en échec: ne pas solliciter Stripe à chaque requête
+        if self.entitlements.stripe_failed_recently(user_id):
+            return None
+        
+        try:
             payment_info = self.stripe_handler.get_user_payment_info(user_id)
             if 'error' in payment_info or not payment_info.get('subscriptions'):
                 logger.warning(f"⚠️  Aucune information d'abonnement Stripe pour user {user_id}")
+                self.entitlements.stripe_lookup_failed(user_id)
                 return None
             
             # Prendre le premier abonnement actif
-            stripe_subscription = None
             for sub in payment_info['subscriptions']:
                 if sub['status'] in ['active', 'trialing', 'past_due']:
-                    stripe_subscription = sub
-                    break
-            
-            if not stripe_subscription:
-                logger.warning(f"⚠️  Aucun abonnement actif trouvé pour user {user_id}")
-                return None
-            
-            # Construire l'objet SubscriptionInfo
-            subscription_info = SubscriptionInfo(
-                user_id=user_id,
-                stripe_customer_id=payment_info['customer_id'],
-                stripe_subscription_id=stripe_subscription['id'],
-                plan_type=user.plan_type,
-                status=stripe_subscription['status'],
-                current_period_start=datetime.fromisoformat(stripe_subscription['current_period_start']),
-                current_period_end=datetime.fromisoformat(stripe_subscription['current_period_end']),
-                trial_start=datetime.fromisoformat(stripe_subscription['trial_start']) if stripe_subscription.get('trial_start') else None,
-                trial_end=datetime.fromisoformat(stripe_subscription['trial_end']) if stripe_subscription.get('trial_end') else None,
-                cancel_at_period_end=stripe_subscription['cancel_at_period_end'],
-                canceled_at=datetime.fromisoformat(stripe_subscription['canceled_at']) if stripe_subscription.get('canceled_at') else None,
-                limits=self.plan_limits.get(user.plan_type, self.plan_limits[PlanType.FREE.value]),
-                usage=self.get_subscription_usage(user_id),
-                next_billing_date=datetime.fromisoformat(stripe_subscription['current_period_end']) if not stripe_subscription['cancel_at_period_end'] else None,
-                amount=stripe_subscription['items'][0]['amount'] if stripe_subscription.get('items') else 0,
-                currency=stripe_subscription['items'][0]['currency'] if stripe_subscription.get('items') else 'eur',
-                created_at=user.created_at,
-                updated_at=datetime.utcnow()
+                    subscription = stripe.Subscription.retrieve(sub['id'])
+                    self.entitlements.stripe_lookup_succeeded(user_id)
+                    return self.entitlements.apply_stripe_subscription(user_id, subscription, plan_type)
+        except Exception:
+            self.entitlements.stripe_lookup_failed(user_id)
+            raise
+        
+        logger.warning(f"⚠️  Aucun abonnement actif trouvé pour user {user_id}")
+        self.entitlements.stripe_lookup_failed(user_id)
+        return None
+    
+    def _subscription_info(self, entitlement: Entitlement) -> SubscriptionInfo:
+        """Construire SubscriptionInfo à partir des droits locaux"""
+        
+        if entitlement.is_free:
+            now = datetime.utcnow()
+            return SubscriptionInfo(
+                user_id=entitlement.user_id,
+                stripe_customer_id="",
+                stripe_subscription_id="",
+                plan_type=PlanType.FREE.value,
+                status="active",
+                current_period_start=now,
+                current_period_end=now + timedelta(days=365),
+                limits=self._limits_for(entitlement.plan_type),
+                usage=self._usage_from(entitlement)
             )
-            
-            # Mettre en cache
-            self._subscription_cache[cache_key] = (subscription_info, datetime.utcnow())
-            
-            return subscription_info
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur lors de la récupération d'abonnement pour user {user_id}: {e}")
-            return None
+        
+        return SubscriptionInfo(
+            user_id=entitlement.user_id,
+            stripe_customer_id=entitlement.stripe_customer_id or "",
+            stripe_subscription_id=entitlement.stripe_subscription_id or "",
+            plan_type=entitlement.plan_type,
+            status=entitlement.status,
+            current_period_start=entitlement.current_period_start,
+            current_period_end=entitlement.current_period_end,
+            trial_end=entitlement.trial_end,
+            cancel_at_period_end=entitlement.cancel_at_period_end,
+            limits=self._limits_for(entitlement.plan_type),
+            usage=self._usage_from(entitlement),
+            next_billing_date=entitlement.current_period_end if not entitlement.cancel_at_period_end else None,
+            amount=entitlement.amount,
+            currency=entitlement.currency
+        )
     
     def get_subscription_usage(self, user_id: int) -> SubscriptionUsage:
-        """Calculer l'utilisation actuelle d'un abonnement"""
+        """Utilisation actuelle d'un abonnement (compteurs tenus à jour avec les comptes)"""
         
         try:
-            usage = SubscriptionUsage(last_updated=datetime.utcnow())
-            
-            # Compter les comptes connectés
-            with db_manager.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Comptes Facebook
-                    cursor.execute(
-                        "SELECT COUNT(*) FROM facebook_accounts WHERE user_id = %s AND is_active = true",
-                        (user_id,)
-                    )
-                    usage.facebook_accounts = cursor.fetchone()[0]
-                    
-                    # Comptes LinkedIn
-                    cursor.execute(
-                        "SELECT COUNT(*) FROM linkedin_accounts WHERE user_id = %s AND is_active = true",
-                        (user_id,)
-                    )
-                    usage.linkedin_accounts = cursor.fetchone()[0]
-                    
-                    # TODO: Compter les appels API du mois actuel
-                    # TODO: Calculer l'espace de stockage utilisé
-            
-            return usage
+            entitlement = self.entitlements.get(user_id)
+            if not entitlement:
+                return SubscriptionUsage()
+            return self._usage_from(entitlement)
             
         except Exception as e:
             logger.error(f"❌ Erreur lors du calcul d'utilisation pour user {user_id}: {e}")
             return SubscriptionUsage()
     
+    @staticmethod
+    def _usage_from(entitlement: Entitlement) -> SubscriptionUsage:
+        # TODO: Compter les appels API du mois actuel
+        # TODO: Calculer l'espace de stockage utilisé
+        return SubscriptionUsage(
+            facebook_accounts=entitlement.facebook_accounts,
+            linkedin_accounts=entitlement.linkedin_accounts,
+            instagram_accounts=entitlement.instagram_accounts,
+            last_updated=datetime.utcnow()
+        )
+    
+    def _limits_for(self, plan_type: str) -> SubscriptionLimits:
+        return self.plan_limits.get(plan_type, self.plan_limits[PlanType.FREE.value])
+    
     def get_subscription_limits(self, user_id: int) -> SubscriptionLimits:
         """Récupérer les limites d'abonnement d'un utilisateur"""
         
-        user = self.user_manager.get_user_by_id(user_id)
-        if not user:
+        entitlement = self.entitlements.get(user_id)
+        if not entitlement:
             return self.plan_limits[PlanType.FREE.value]
         
-        return self.plan_limits.get(user.plan_type, self.plan_limits[PlanType.FREE.value])
+        return self._limits_for(entitlement.plan_type)
     
     # ========================================
     # VÉRIFICATION D'ACCÈS ET LIMITES
@@ -641,21 +635,16 @@ class SubscriptionManager:
         """Vérifier si l'utilisateur peut ajouter un compte sur une plateforme"""
         
         try:
-            limits = self.get_subscription_limits(user_id)
-            usage = self.get_subscription_usage(user_id)
-            
-            if platform.lower() == 'facebook':
-                current = usage.facebook_accounts
-                max_allowed = limits.max_facebook_accounts
-            elif platform.lower() == 'linkedin':
-                current = usage.linkedin_accounts
-                max_allowed = limits.max_linkedin_accounts
-            elif platform.lower() == 'instagram':
-                current = usage.instagram_accounts
-                max_allowed = limits.max_instagram_accounts
-            else:
+            if platform.lower() not in ('facebook', 'linkedin', 'instagram'):
                 return {'allowed': False, 'reason': f'Plateforme {platform} non supportée'}
             
+            entitlement = self.entitlements.get(user_id)
+            if not entitlement:
+                return {'allowed': False, 'reason': 'Utilisateur non trouvé'}
+            
+            current = entitlement.account_count(platform)
+            max_allowed = entitlement.account_limit(platform)
+            
             allowed = current < max_allowed
             
             return {
@@ -862,9 +851,24 @@ class SubscriptionManager:
     
     def _invalidate_subscription_cache(self, user_id: int):
         """Invalider le cache d'abonnement pour un utilisateur"""
-        cache_key = f"subscription_{user_id}"
-        if cache_key in self._subscription_cache:
-            del self._subscription_cache[cache_key]
+        self.entitlements.invalidate(user_id)
+    
+    def _resync_entitlement(self, user_id: int, subscription_id: str, plan_type: Optional[str] = None,
+                            current_period_end: Optional[datetime] = None):
+        """Reporter sans attendre le webhook un changement fait via l'API Stripe"""
+        
+        try:
+            subscription = stripe.Subscription.retrieve(subscription_id)
+            self.entitlements.apply_stripe_subscription(user_id, subscription, plan_type)
+        except Exception as e:
+            logger.warning(f"⚠️  Droits non resynchronisés pour user {user_id} (webhook attendu): {e}")
+            if plan_type:
+                # Le plan connu est écrit quand même; le webhook complétera statut et période
+                self.entitlements.apply_subscription(
+                    user_id, plan_type=plan_type, current_period_end=current_period_end
+                )
+            else:
+                self._invalidate_subscription_cache(user_id)
     
     def _log_subscription_event(self, user_id: int, event_type: SubscriptionEvent, 
                                metadata: Dict[str, Any] = None):
@@ -981,7 +985,7 @@ class SubscriptionManager:
         health = {
             'subscription_manager': 'ok',
             'stripe_handler': 'ok',
-            'cache_size': len(self._subscription_cache),
+            'cache_size': self.entitlements.get_stats()['size'],
             'plans_configured': len(self.plan_limits),
             'available_plans': list(self.plan_limits.keys()),
             'timestamp': datetime.utcnow().isoformat()
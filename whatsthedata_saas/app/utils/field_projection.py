@@ -0,0 +1,90 @@
+"""
+Projection des champs demandés par le connecteur Looker Studio
+Le champ `fields` de getData détermine les familles d'API appelées,
+les métriques calculées et les colonnes sérialisées
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Colonnes toujours conservées pour que chaque ligne reste identifiable
+IDENTITY_COLUMNS = frozenset({'date', 'platform', 'account_id'})
+
+# Préfixes ajoutés par les endpoints combinés (linkedin_total_page_views, ...)
+PLATFORM_PREFIXES = ('linkedin_', 'facebook_')
+
+
+class FieldProjection:
+    """Ensemble des colonnes demandées (None = toutes les colonnes)"""
+
+    def __init__(self, names: Optional[Iterable[str]] = None):
+        self.names = frozenset(names) if names is not None else None
+
+    @classmethod
+    def from_request(cls, fields: Any) -> 'FieldProjection':
+        """
+        Construire la projection depuis le `fields` de la requête.
+        Accepte ["a", "b"], [{"name": "a"}, ...] (format getData) ou "a,b".
+        """
+        if not fields:
+            return cls()
+
+        if isinstance(fields, str):
+            fields = fields.split(',')
+
+        names = set()
+        for item in fields:
+            if isinstance(item, dict):
+                item = item.get('name')
+            if item and isinstance(item, str):
+                names.add(item.strip())
+
+        if not names:
+            return cls()
+        return cls(names)
+
+    @property
+    def is_all(self) -> bool:
+        return self.names is None
+
+    def wants(self, *columns: str) -> bool:
+        """True si au moins une des colonnes est demandée"""
+        if self.names is None:
+            return True
+        for column in columns:
+            if column in self.names:
+                return True
+            for prefix in PLATFORM_PREFIXES:
+                if column.startswith(prefix) and column[len(prefix):] in self.names:
+                    return True
+        return False
+
+    def wants_metric(self, platform: str, metric: str) -> bool:
+        """Métrique demandée avec ou sans le préfixe de plateforme"""
+        return self.wants(metric, f"{platform}_{metric}")
+
+    def filter_metrics(self, platform: str, metrics: List[str]) -> List[str]:
+        """Restreindre une liste de métriques du schéma aux métriques demandées"""
+        if self.names is None:
+            return metrics
+        return [metric for metric in metrics if self.wants_metric(platform, metric)]
+
+    def project_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Ne garder que les colonnes demandées (et les colonnes d'identité)"""
+        if self.names is None:
+            return row
+        return {key: value for key, value in row.items() if key in IDENTITY_COLUMNS or self.wants(key)}
+
+    def project_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.names is None:
+            return rows
+        return [self.project_row(row) for row in rows]
+
+    def cache_key(self) -> Optional[List[str]]:
+        """Représentation stable pour les clés de cache"""
+        return sorted(self.names) if self.names is not None else None
+
+    def __repr__(self) -> str:
+        return f"FieldProjection({'*' if self.names is None else sorted(self.names)})"
@@ -14,8 +14,10 @@ import uuid
 import logging
 import functools
 import threading
+import asyncio
+import sys
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Union, Callable, Tuple
+from typing import Any, Dict, List, Optional, Set, Union, Callable, Tuple
 from decimal import Decimal, ROUND_HALF_UP
 from urllib.parse import urlparse, parse_qs, urlencode
 from email.utils import parseaddr
@@ -488,126 +490,166 @@ def retry_with_backoff(max_retries: int = 3, base_delay: float = 1.0,
         return wrapper
     return decorator
 
-class RateLimiter:
-    """Rate limiter simple basé sur token bucket"""
+# Rate limiting GCRA (une dépendance FastAPI utilisable aussi par les collecteurs)
+from .rate_limiter import RateLimiter, RateLimit, RateLimitDecision, rate_limiter, rate_limit
+
+# ========================================
+# CACHE SIMPLE
+# ========================================
+
+# Valeur sentinelle: distingue une entrée absente d'une valeur falsy en cache
+_MISSING = object()
+
+# Rafraîchissements asynchrones en cours (référencés jusqu'à leur fin, sinon collectables)
+_background_refreshes: Set[asyncio.Future] = set()
+
+def approximate_size(value: Any, _depth: int = 0) -> int:
+    """Taille approximative en octets d'une valeur (parcours limité des conteneurs)"""
     
-    def __init__(self, max_calls: int, window_seconds: int):
-        self.max_calls = max_calls
-        self.window_seconds = window_seconds
-        self.calls = defaultdict(list)
-        self.lock = threading.Lock()
+    size = sys.getsizeof(value, 64)
+    if _depth >= 3:
+        return size
     
-    def is_allowed(self, key: str) -> bool:
-        """Vérifier si l'appel est autorisé"""
-        
-        with self.lock:
-            now = time.time()
-            window_start = now - self.window_seconds
-            
-            # Nettoyer les anciens appels
-            self.calls[key] = [call_time for call_time in self.calls[key] if call_time > window_start]
-            
-            # Vérifier la limite
-            if len(self.calls[key]) >= self.max_calls:
-                return False
-            
-            # Enregistrer l'appel
-            self.calls[key].append(now)
-            return True
+    if isinstance(value, dict):
+        size += sum(approximate_size(k, _depth + 1) + approximate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, _depth + 1) for item in value)
     
-    def get_reset_time(self, key: str) -> float:
-        """Obtenir le temps jusqu'au reset"""
-        
-        with self.lock:
-            if key not in self.calls or not self.calls[key]:
-                return 0
-            
-            oldest_call = min(self.calls[key])
-            reset_time = oldest_call + self.window_seconds
-            return max(0, reset_time - time.time())
+    return size
 
-# Instance globale de rate limiter
-rate_limiter = RateLimiter(max_calls=100, window_seconds=60)
+@dataclass
+class CacheEntry:
+    """Entrée de cache: valeur fraîche jusqu'à expires_at, servie périmée jusqu'à stale_until"""
+    value: Any
+    expires_at: float
+    stale_until: float
+    size: int
+    refreshing: bool = False
 
-def rate_limit(key_func: Callable = None, max_calls: int = 60, window_seconds: int = 60):
-    """Décorateur de rate limiting"""
+class _CacheShard:
+    """Segment du cache: LRU ordonné, verrou et budget mémoire propres"""
     
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            # Déterminer la clé
-            if key_func:
-                key = key_func(*args, **kwargs)
-            else:
-                key = f"{func.__name__}:default"
-            
-            # Vérifier la limite
-            limiter = RateLimiter(max_calls, window_seconds)
-            if not limiter.is_allowed(key):
-                reset_time = limiter.get_reset_time(key)
-                raise Exception(f"Rate limit dépassé. Reset dans {reset_time:.0f}s")
-            
-            return func(*args, **kwargs)
-        
-        return wrapper
-    return decorator
-
-# ========================================
-# CACHE SIMPLE
-# ========================================
+    def __init__(self, max_bytes: int):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.stats = defaultdict(int)
+    
+    def remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes_used -= entry.size
+    
+    def evict(self) -> None:
+        # Les entrées les moins récemment utilisées sortent en premier
+        while self.bytes_used > self.max_bytes and self.entries:
+            _, entry = self.entries.popitem(last=False)
+            self.bytes_used -= entry.size
+            self.stats['evictions'] += 1
 
 class SimpleCache:
-    """Cache simple en mémoire avec TTL"""
+    """
+    Cache mémoire segmenté (un verrou par segment) avec LRU, TTL par entrée,
+    limite en octets approximatifs et compteurs hits/misses/évictions
+    """
     
-    def __init__(self, default_ttl: int = 300):
-        self.cache = OrderedDict()
+    def __init__(self, default_ttl: int = 300, max_bytes: int = 64 * 1024 * 1024, shards: int = 16):
         self.default_ttl = default_ttl
-        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self._shards = [_CacheShard(max(1, max_bytes // shards)) for _ in range(shards)]
+    
+    def _shard(self, key: str) -> _CacheShard:
+        return self._shards[hash(key) % len(self._shards)]
     
-    def get(self, key: str) -> Any:
-        """Récupérer une valeur du cache"""
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Récupérer l'entrée brute (fraîche ou périmée mais encore servable)"""
         
-        with self.lock:
-            if key in self.cache:
-                value, expiry = self.cache[key]
-                if time.time() < expiry:
-                    # Déplacer vers la fin (LRU)
-                    self.cache.move_to_end(key)
-                    return value
-                else:
-                    # Expiré
-                    del self.cache[key]
+        shard = self._shard(key)
+        now = time.time()
+        
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                shard.stats['misses'] += 1
+                return None
             
-            return None
+            if now >= entry.stale_until:
+                # Expirée et hors fenêtre stale-while-revalidate
+                shard.remove(key)
+                shard.stats['expirations'] += 1
+                shard.stats['misses'] += 1
+                return None
+            
+            shard.entries.move_to_end(key)
+            shard.stats['hits' if now < entry.expires_at else 'stale_hits'] += 1
+            return entry
     
-    def set(self, key: str, value: Any, ttl: int = None) -> None:
-        """Stocker une valeur dans le cache"""
+    def get(self, key: str, default: Any = None) -> Any:
+        """Récupérer une valeur fraîche du cache"""
+        
+        entry = self.get_entry(key)
+        if entry is None or time.time() >= entry.expires_at:
+            return default
+        return entry.value
+    
+    def set(self, key: str, value: Any, ttl: int = None, stale_ttl: int = 0) -> None:
+        """Stocker une valeur (servable périmée pendant stale_ttl secondes après le TTL)"""
         
         if ttl is None:
             ttl = self.default_ttl
         
-        expiry = time.time() + ttl
+        now = time.time()
+        size = approximate_size(key) + approximate_size(value)
+        shard = self._shard(key)
         
-        with self.lock:
-            self.cache[key] = (value, expiry)
-            self.cache.move_to_end(key)
+        with shard.lock:
+            if size > shard.max_bytes:
+                # Plus gros que le segment entier: on ne le garde pas
+                shard.remove(key)
+                shard.stats['rejected'] += 1
+                return
             
-            # Limiter la taille du cache
-            if len(self.cache) > 1000:
-                self.cache.popitem(last=False)
+            shard.remove(key)
+            shard.entries[key] = CacheEntry(value, now + ttl, now + ttl + stale_ttl, size)
+            shard.bytes_used += size
+            shard.evict()
+    
+    def try_begin_refresh(self, key: str) -> bool:
+        """Réserver le rafraîchissement d'une entrée périmée (un seul appelant gagne)"""
+        
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None or entry.refreshing:
+                return False
+            entry.refreshing = True
+            shard.stats['refreshes'] += 1
+            return True
+    
+    def end_refresh(self, key: str) -> None:
+        """Libérer la réservation si le rafraîchissement a échoué"""
+        
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is not None:
+                entry.refreshing = False
     
     def delete(self, key: str) -> None:
         """Supprimer une clé du cache"""
         
-        with self.lock:
-            if key in self.cache:
-                del self.cache[key]
+        shard = self._shard(key)
+        with shard.lock:
+            shard.remove(key)
     
     def clear(self) -> None:
         """Vider le cache"""
         
-        with self.lock:
-            self.cache.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.bytes_used = 0
     
     def cleanup_expired(self) -> int:
         """Nettoyer les entrées expirées"""
@@ -615,45 +657,127 @@ class SimpleCache:
         removed = 0
         current_time = time.time()
         
-        with self.lock:
-            expired_keys = [
-                key for key, (value, expiry) in self.cache.items()
-                if current_time >= expiry
-            ]
-            
-            for key in expired_keys:
-                del self.cache[key]
-                removed += 1
+        for shard in self._shards:
+            with shard.lock:
+                expired_keys = [key for key, entry in shard.entries.items() if current_time >= entry.stale_until]
+                for key in expired_keys:
+                    shard.remove(key)
+                shard.stats['expirations'] += len(expired_keys)
+                removed += len(expired_keys)
         
         return removed
+    
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Compteurs agrégés de tous les segments"""
+        
+        totals = defaultdict(int)
+        for shard in self._shards:
+            for name, value in shard.stats.items():
+                totals[name] += value
+        
+        lookups = totals['hits'] + totals['stale_hits'] + totals['misses']
+        return {
+            'entries': len(self),
+            'bytes_used': sum(shard.bytes_used for shard in self._shards),
+            'max_bytes': self.max_bytes,
+            'hits': totals['hits'],
+            'stale_hits': totals['stale_hits'],
+            'misses': totals['misses'],
+            'evictions': totals['evictions'],
+            'expirations': totals['expirations'],
+            'refreshes': totals['refreshes'],
+            'rejected': totals['rejected'],
+            'hit_rate': round((totals['hits'] + totals['stale_hits']) / lookups, 3) if lookups else 0.0
+        }
 
 # Instance globale de cache
-cache = SimpleCache()
-
-def cached(ttl: int = 300, key_func: Callable = None):
-    """Décorateur de cache"""
+cache = SimpleCache(
+    default_ttl=int(os.getenv('CACHE_DEFAULT_TTL', '300')),
+    max_bytes=int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+)
+
+def cached(ttl: int = 300, key_func: Callable = None, stale_ttl: int = 0):
+    """
+    Décorateur de cache (fonctions synchrones et coroutines).
+    Avec stale_ttl, une valeur expirée depuis moins de stale_ttl secondes est
+    renvoyée immédiatement et rafraîchie une seule fois en arrière-plan.
+    Un résultat None (échec masqué, ressource absente) n'est jamais mis en cache.
+    """
     
     def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            # Générer la clé de cache
+        def make_key(args, kwargs):
             if key_func:
-                cache_key = key_func(*args, **kwargs)
-            else:
-                cache_key = f"{func.__name__}:{hash(str(args) + str(sorted(kwargs.items())))}"
-            
-            # Vérifier le cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
+                return key_func(*args, **kwargs)
+            return f"{func.__name__}:{hash(str(args) + str(sorted(kwargs.items())))}"
+        
+        def lookup(cache_key):
+            """Retourne (valeur, doit_rafraîchir) ou (_MISSING, False)"""
+            entry = cache.get_entry(cache_key)
+            if entry is None:
+                return _MISSING, False
+            if time.time() < entry.expires_at:
                 logger.debug(f"Cache hit pour {cache_key}")
-                return cached_result
+                return entry.value, False
+            return entry.value, cache.try_begin_refresh(cache_key)
+        
+        def store(cache_key, result, refreshing=False):
+            if result is None:
+                # Garder l'ancienne valeur (si rafraîchissement) et réessayer au prochain appel
+                if refreshing:
+                    cache.end_refresh(cache_key)
+                return
+            cache.set(cache_key, result, ttl, stale_ttl)
+            logger.debug(f"Résultat mis en cache pour {cache_key}")
+        
+        if asyncio.iscoroutinefunction(func):
+            async def refresh_async(cache_key, args, kwargs):
+                try:
+                    store(cache_key, await func(*args, **kwargs), refreshing=True)
+                except Exception as e:
+                    cache.end_refresh(cache_key)
+                    logger.warning(f"Rafraîchissement en arrière-plan échoué pour {cache_key}: {e}")
+            
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = make_key(args, kwargs)
+                value, refresh = lookup(cache_key)
+                if refresh:
+                    task = asyncio.ensure_future(refresh_async(cache_key, args, kwargs))
+                    _background_refreshes.add(task)
+                    task.add_done_callback(_background_refreshes.discard)
+                if value is not _MISSING:
+                    return value
+                
+                result = await func(*args, **kwargs)
+                store(cache_key, result)
+                return result
+            
+            return async_wrapper
+        
+        def refresh_sync(cache_key, args, kwargs):
+            try:
+                store(cache_key, func(*args, **kwargs), refreshing=True)
+            except Exception as e:
+                cache.end_refresh(cache_key)
+                logger.warning(f"Rafraîchissement en arrière-plan échoué pour {cache_key}: {e}")
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = make_key(args, kwargs)
+            value, refresh = lookup(cache_key)
+            if refresh:
+                threading.Thread(target=refresh_sync, args=(cache_key, args, kwargs), daemon=True).start()
+            if value is not _MISSING:
+                return value
             
             # Exécuter la fonction
             result = func(*args, **kwargs)
             
             # Stocker en cache
-            cache.set(cache_key, result, ttl)
-            logger.debug(f"Résultat mis en cache pour {cache_key}")
+            store(cache_key, result)
             
             return result
         
@@ -1016,8 +1140,9 @@ def system_health_check() -> Dict[str, Any]:
     # Vérifier le cache
     health['checks']['cache'] = {
         'status': 'ok',
-        'size': len(cache.cache),
-        'expired_cleaned': cache.cleanup_expired()
+        'size': len(cache),
+        'expired_cleaned': cache.cleanup_expired(),
+        **cache.get_stats()
     }
     
     # Déterminer le statut global
@@ -1086,8 +1211,8 @@ __all__ = [
     'encrypt_text', 'decrypt_text',
     
     # Retry et cache
-    'retry_with_backoff', 'RateLimiter', 'rate_limiter', 'rate_limit',
-    'SimpleCache', 'cache', 'cached',
+    'retry_with_backoff', 'RateLimiter', 'RateLimit', 'RateLimitDecision', 'rate_limiter', 'rate_limit',
+    'SimpleCache', 'CacheEntry', 'approximate_size', 'cache', 'cached',
     
     # Logging
     'log_execution_time', 'safe_execute', 'log_function_call',
@@ -0,0 +1,294 @@
+"""
+Cache HTTP sur disque (SQLite) des métadonnées des plateformes
+Les GET sur des ressources qui changent rarement (profil /me, détails d'organisation ou de
+page, métadonnées de post, noms localisés des URN géo/secteur/fonction) sont servis depuis
+le cache tant qu'ils sont frais selon la politique de leur endpoint; une fois périmés, ils
+sont redemandés avec If-None-Match / If-Modified-Since et un 304 prolonge l'entrée sans
+retransférer le corps. Les entrées sont isolées par token (empreinte, jamais le token).
+Les réponses porteuses de tokens (/me/accounts, champ access_token) ne sont jamais stockées:
+les tokens de page viennent toujours de l'API.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+from .config import get_env_int, get_env_var
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_ENABLED = get_env_var('PLATFORM_HTTP_CACHE_ENABLED', 'true').lower() == 'true'
+HTTP_CACHE_PATH = get_env_var('PLATFORM_HTTP_CACHE_PATH', 'cache/platform_http_cache.sqlite3')
+# Une entrée périmée sans validateur (ni ETag ni Last-Modified) est gardée au plus ce délai
+HTTP_CACHE_MAX_STALE_SECONDS = get_env_int('PLATFORM_HTTP_CACHE_MAX_STALE_SECONDS', 7 * 86400)
+
+# Corps jamais stockés: un token en clair ne doit pas atterrir sur disque
+_TOKEN_MARKERS = (b'"access_token"', b'"refresh_token"')
+
+# En-têtes conservés avec le corps (les autres ne servent pas aux collecteurs)
+_STORED_HEADERS = ('content-type', 'etag', 'last-modified', 'x-ratelimit-limit', 'x-ratelimit-remaining',
+                   'x-ratelimit-reset', 'x-app-usage', 'x-business-use-case-usage')
+
+
+class CachePolicy(NamedTuple):
+    """Fraîcheur d'un endpoint: chemin (regex sur le chemin de l'URL) et durée de validité"""
+    name: str
+    platform: str
+    path: Pattern
+    max_age: int
+
+
+def _policy(name: str, platform: str, path: str, env_var: str, default: int) -> CachePolicy:
+    return CachePolicy(name, platform, re.compile(path), get_env_int(env_var, default))
+
+
+DEFAULT_POLICIES: List[CachePolicy] = [
+    # LinkedIn: /rest/me sert de sonde de quota, durée alignée sur le cache de quota (5 min)
+    _policy('linkedin_me', 'linkedin', r'^/rest/me$', 'HTTP_CACHE_TTL_LINKEDIN_ME', 300),
+    _policy('linkedin_organization', 'linkedin', r'^/rest/organizations(/[^/]+)?$',
+            'HTTP_CACHE_TTL_LINKEDIN_ORGANIZATION', 86400),
+    _policy('linkedin_organization_acls', 'linkedin', r'^/rest/organizationAcls$',
+            'HTTP_CACHE_TTL_LINKEDIN_ORGANIZATION_ACLS', 3600),
+    _policy('linkedin_post', 'linkedin', r'^/rest/posts/[^/]+$', 'HTTP_CACHE_TTL_LINKEDIN_POST', 21600),
+    # Noms localisés des URN (géo, secteurs, fonctions, séniorités...)
+    _policy('linkedin_standardized', 'linkedin',
+            r'^/rest/(geo|industries|industryTaxonomyVersions|functions|seniorities|countries|regions|skills)(/.*)?$',
+            'HTTP_CACHE_TTL_LINKEDIN_STANDARDIZED', 7 * 86400),
+    # Graph API: /me, détails de page (id numérique) et de post (page_post). Pas /me/accounts:
+    # la réponse contient le token de chaque page
+    _policy('facebook_me', 'facebook', r'^/v[\d.]+/me$', 'HTTP_CACHE_TTL_FACEBOOK_ME', 300),
+    _policy('facebook_page', 'facebook', r'^/v[\d.]+/\d+$', 'HTTP_CACHE_TTL_FACEBOOK_PAGE', 21600),
+    _policy('facebook_post', 'facebook', r'^/v[\d.]+/\d+_\d+$', 'HTTP_CACHE_TTL_FACEBOOK_POST', 21600),
+]
+
+
+def served_from_cache(response: httpx.Response) -> bool:
+    """Réponse rejouée depuis le cache sans appel à la plateforme (X-Cache: HIT): ni quota consommé,
+    ni en-têtes de quota du moment (ceux rejoués datent du stockage). Un 304 revalidé reste un appel réel."""
+    return response.headers.get('X-Cache') == 'HIT'
+
+
+@dataclass
+class CachedEntry:
+    """Réponse stockée et ses validateurs"""
+    key: str
+    policy: str
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    expires_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def can_revalidate(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_response(self, method: str, url: str, source: str) -> httpx.Response:
+        """Réponse httpx reconstituée (X-Cache: HIT ou REVALIDATED)"""
+        response = httpx.Response(self.status_code, headers={**self.headers, 'X-Cache': source},
+                                  content=self.content, request=httpx.Request(method, url))
+        response.elapsed = timedelta(0)
+        return response
+
+
+class HTTPCache:
+    """
+    Cache des GET de métadonnées, partagé par tous les appels du processus (et entre processus
+    via le fichier SQLite, en WAL). Les accès passent par une connexion unique sous verrou:
+    lectures et écritures sont des recherches par clé primaire, bien plus courtes qu'un appel d'API.
+    """
+
+    def __init__(self, path: str = HTTP_CACHE_PATH, policies: Optional[List[CachePolicy]] = None,
+                 enabled: bool = HTTP_CACHE_ENABLED, max_stale: int = HTTP_CACHE_MAX_STALE_SECONDS):
+        self.path = path
+        self.policies = list(DEFAULT_POLICIES if policies is None else policies)
+        self.enabled = enabled
+        self.max_stale = max_stale
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'errors': 0}
+
+    # ========================================
+    # STOCKAGE
+    # ========================================
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ':memory:':
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    key TEXT PRIMARY KEY,
+                    policy TEXT NOT NULL,
+                    status_code INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    content BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_http_cache_expires ON http_cache (expires_at)')
+            # Purge à l'ouverture: le fichier survit aux redémarrages (politiques retirées comprises)
+            purged = connection.execute('DELETE FROM http_cache WHERE expires_at < ?',
+                                        (time.time() - self.max_stale,)).rowcount
+            names = [policy.name for policy in self.policies]
+            purged += connection.execute(
+                f"DELETE FROM http_cache WHERE policy NOT IN ({', '.join('?' * len(names)) or 'NULL'})", names
+            ).rowcount
+            connection.commit()
+            self._connection = connection
+            logger.info(f"✅ Cache HTTP des plateformes ouvert: {self.path} ({purged} entrées purgées)")
+        return self._connection
+
+    def _query(self, statement: str, parameters: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._connect().execute(statement, parameters).fetchall()
+
+    def _write(self, statement: str, parameters: tuple = ()) -> int:
+        with self._lock:
+            connection = self._connect()
+            count = connection.execute(statement, parameters).rowcount
+            connection.commit()
+            return count
+
+    # ========================================
+    # POLITIQUES ET CLÉS
+    # ========================================
+
+    def policy_for(self, platform: str, method: str, url: str,
+                   params: Optional[Dict[str, Any]] = None) -> Optional[CachePolicy]:
+        if not self.enabled or method != 'GET':
+            return None
+        # Champs demandés contenant un token (ex: /{page-id}?fields=access_token): jamais en cache
+        parts = urlsplit(url)
+        fields = [str((params or {}).get('fields', ''))] + parse_qs(parts.query).get('fields', [])
+        if any('access_token' in value for value in fields):
+            return None
+        path = parts.path
+        for policy in self.policies:
+            if policy.platform == platform and policy.path.match(path):
+                return policy
+        return None
+
+    @staticmethod
+    def make_key(platform: str, url: str, params: Optional[Dict[str, Any]], token: Optional[str],
+                 headers: Optional[Dict[str, str]] = None) -> str:
+        """Clé = URL + paramètres (hors access_token) + empreinte du token + version d'API demandée"""
+        params = {name: value for name, value in (params or {}).items() if name != 'access_token'}
+        payload = json.dumps({
+            'platform': platform,
+            'url': url,
+            'params': sorted((str(name), str(value)) for name, value in params.items()),
+            'token': hashlib.sha256(token.encode()).hexdigest() if token else None,
+            'version': (headers or {}).get('LinkedIn-Version')
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # ========================================
+    # LECTURE / ÉCRITURE
+    # ========================================
+
+    def get(self, key: str) -> Optional[CachedEntry]:
+        try:
+            rows = self._query('SELECT key, policy, status_code, headers, content, etag, last_modified, '
+                               'stored_at, expires_at FROM http_cache WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️  Lecture du cache HTTP impossible: {e}")
+            return None
+        if not rows:
+            return None
+        row = rows[0]
+        return CachedEntry(row[0], row[1], row[2], json.loads(row[3]), row[4], row[5], row[6], row[7], row[8])
+
+    def store(self, key: str, policy: CachePolicy, response: httpx.Response) -> bool:
+        """Stocker une réponse 200 (sauf Cache-Control: no-store ou corps porteur de token)"""
+        if 'no-store' in response.headers.get('Cache-Control', ''):
+            return False
+        if any(marker in response.content for marker in _TOKEN_MARKERS):
+            logger.debug(f"Réponse {policy.name} porteuse de token: non stockée")
+            return False
+        headers = {name: response.headers[name] for name in _STORED_HEADERS if name in response.headers}
+        now = time.time()
+        try:
+            self._write(
+                'INSERT OR REPLACE INTO http_cache (key, policy, status_code, headers, content, etag, '
+                'last_modified, stored_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, policy.name, response.status_code, json.dumps(headers), response.content,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'), now, now + policy.max_age)
+            )
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️  Écriture du cache HTTP impossible: {e}")
+            return False
+        self.stats['stored'] += 1
+        return True
+
+    def refresh(self, entry: CachedEntry, policy: CachePolicy, response: httpx.Response) -> CachedEntry:
+        """304 Not Modified: prolonger l'entrée et reprendre les en-têtes récents (quotas, validateurs)"""
+        for name in _STORED_HEADERS:
+            if name in response.headers:
+                entry.headers[name] = response.headers[name]
+        entry.etag = response.headers.get('ETag', entry.etag)
+        entry.last_modified = response.headers.get('Last-Modified', entry.last_modified)
+        entry.stored_at = time.time()
+        entry.expires_at = entry.stored_at + policy.max_age
+        try:
+            self._write('UPDATE http_cache SET headers = ?, etag = ?, last_modified = ?, stored_at = ?, '
+                          'expires_at = ? WHERE key = ?',
+                          (json.dumps(entry.headers), entry.etag, entry.last_modified, entry.stored_at,
+                           entry.expires_at, entry.key))
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️  Mise à jour du cache HTTP impossible: {e}")
+        return entry
+
+    def purge_expired(self) -> int:
+        """Supprimer les entrées périmées depuis plus de max_stale (les validables restent utiles jusque-là)"""
+        try:
+            return self._write('DELETE FROM http_cache WHERE expires_at < ?', (time.time() - self.max_stale,))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Purge du cache HTTP impossible: {e}")
+            return 0
+
+    def clear(self, policy: Optional[str] = None) -> int:
+        if policy:
+            return self._write('DELETE FROM http_cache WHERE policy = ?', (policy,))
+        return self._write('DELETE FROM http_cache')
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -1,6 +1,8 @@
 from .facebook_metrics import FacebookMetrics
 from .linkedin_metrics import LinkedInMetrics
-from .metrics_manager import MetricsManager
+from .metrics_manager import MetricsManager, metrics_manager
+from .registry import PlatformSchema, SchemaRegistry, get_registry, reload_registry
 
 __version__ = "1.0.0"
-__all__ = ['FacebookMetrics', 'LinkedInMetrics', 'MetricsManager']
\ No newline at end of file
+__all__ = ['FacebookMetrics', 'LinkedInMetrics', 'MetricsManager', 'metrics_manager',
+           'PlatformSchema', 'SchemaRegistry', 'get_registry', 'reload_registry']
@@ -418,6 +418,7 @@ class FacebookMetrics:
     """Gestionnaire des métriques Facebook pour WhatsTheData"""
     
     def __init__(self):
+        self.api_version = 'v21.0'
         self.page_metrics = PAGE_METRICS
         self.post_metrics = POST_METRICS
         self.all_metrics = ALL_FACEBOOK_METRICS
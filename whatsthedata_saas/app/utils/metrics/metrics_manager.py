@@ -3,180 +3,204 @@
 # ========================================
 
 from typing import Dict, List, Any, Optional, Union
-from .facebook_metrics import FacebookMetrics
-from .linkedin_metrics import LinkedInMetrics
-from .version_manager import MetricsVersionManager
+from .registry import get_registry, reload_registry, PlatformSchema
+import copy
 import json
 import logging
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+
+def metrics_equivalent(metric1: Dict[str, Any], metric2: Dict[str, Any]) -> bool:
+    """Détermine si deux métriques sont équivalentes"""
+    # Critères d'équivalence
+    return (
+        metric1['type'] == metric2['type'] and
+        metric1.get('aggregation') == metric2.get('aggregation') and
+        metric1.get('is_calculated', False) == metric2.get('is_calculated', False)
+    )
+
+
+def combine_schemas(schemas: Dict[str, Dict[str, Any]], platforms: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Fusionne des schémas Looker de plateformes (dimensions dédoublonnées, conflits de métriques
+    préfixés par la plateforme). Les schémas passés sont modifiés: fournir des copies.
+    """
+    platforms = list(platforms or schemas.keys())
+    combined_schema = {
+        'platforms': platforms,
+        'dimensions': [],
+        'metrics': [],
+        'metadata': {
+            'generated_at': datetime.now().isoformat(),
+            'total_platforms': len(platforms),
+            'platform_versions': {},
+            'conflicts_resolved': 0,
+            'total_metrics': 0,
+            'total_dimensions': 0
+        }
+    }
+    
+    all_dimensions = {}  # Utiliser dict pour éviter doublons
+    all_metrics = {}
+    conflicts_count = 0
+    
+    for platform, schema in schemas.items():
+        combined_schema['metadata']['platform_versions'][platform] = schema['api_version']
+        
+        # Traiter les dimensions
+        for dim in schema['dimensions']:
+            dim_id = dim['id']
+            if dim_id not in all_dimensions:
+                all_dimensions[dim_id] = dim
+            else:
+                # Dimension existe déjà, garder la plus complète
+                existing = all_dimensions[dim_id]
+                if len(dim.get('description', '')) > len(existing.get('description', '')):
+                    all_dimensions[dim_id] = dim
+        
+        # Traiter les métriques avec résolution intelligente des conflits
+        for metric in schema['metrics']:
+            metric_id = metric['id']
+            original_id = metric_id
+            
+            if metric_id in all_metrics:
+                # Conflit détecté
+                conflicts_count += 1
+                
+                # Stratégies de résolution de conflit
+                if metrics_equivalent(all_metrics[metric_id], metric):
+                    # Métriques équivalentes, on garde la première
+                    continue
+                else:
+                    # Métriques différentes, préfixer par plateforme
+                    metric_id = f"{platform}_{original_id}"
+                    metric['id'] = metric_id
+                    
+                    # Mettre à jour le nom pour clarifier
+                    if not metric['name'].startswith(platform.title()):
+                        metric['name'] = f"{platform.title()} - {metric['name']}"
+                    
+                    metric['original_id'] = original_id
+                    metric['conflict_resolved'] = True
+            
+            all_metrics[metric_id] = metric
+    
+    # Finaliser le schéma
+    combined_schema['dimensions'] = list(all_dimensions.values())
+    combined_schema['metrics'] = list(all_metrics.values())
+    
+    # Mettre à jour les métadonnées
+    combined_schema['metadata'].update({
+        'conflicts_resolved': conflicts_count,
+        'total_metrics': len(all_metrics),
+        'total_dimensions': len(all_dimensions)
+    })
+    
+    # Trier pour une présentation cohérente
+    combined_schema['dimensions'].sort(key=lambda x: x['id'])
+    combined_schema['metrics'].sort(key=lambda x: (x.get('platform', ''), x['id']))
+    
+    return combined_schema
+
+
 class MetricsManager:
-    """Gestionnaire centralisé optimisé pour LinkedIn et Facebook"""
+    """
+    Gestionnaire centralisé optimisé pour LinkedIn et Facebook.
+    Vue légère sur le registre des schémas du processus: l'instancier ne reconstruit rien.
+    """
     
     def __init__(self):
-        self.platforms = {
-            'facebook': FacebookMetrics(),
-            'linkedin': LinkedInMetrics()
-        }
-        self.version_manager = MetricsVersionManager()
-        self._schema_cache = {}
+        self._version_manager = None
         self._validation_cache = {}
     
+    @property
+    def platforms(self) -> Dict[str, Any]:
+        return {name: schema.source for name, schema in get_registry().platforms.items()}
+    
+    @property
+    def version_manager(self):
+        # Créé à la demande: inutile (et coûteux) pour la lecture des schémas
+        if self._version_manager is None:
+            from .version_manager import MetricsVersionManager
+            self._version_manager = MetricsVersionManager()
+        return self._version_manager
+    
     def get_platform_metrics(self, platform: str) -> Optional[object]:
         """Retourne l'objet métriques d'une plateforme avec validation"""
-        platform_key = platform.lower()
-        
-        if platform_key not in self.platforms:
-            logger.warning(f"Plateforme {platform} non supportée. Plateformes disponibles: {list(self.platforms.keys())}")
-            return None
-        
-        return self.platforms[platform_key]
+        schema = self.get_platform_schema(platform)
+        return schema.source if schema else None
+    
+    def get_platform_schema(self, platform: str) -> Optional[PlatformSchema]:
+        """Retourne le schéma compilé (tuples et mappings figés) d'une plateforme"""
+        schema = get_registry().platform(platform)
+        if schema is None:
+            logger.warning(f"Plateforme {platform} non supportée. Plateformes disponibles: {list(get_registry().platforms.keys())}")
+        return schema
     
     def get_all_metrics(self, platform: str) -> List[str]:
         """Retourne toutes les métriques d'une plateforme"""
-        platform_obj = self.get_platform_metrics(platform)
-        return platform_obj.get_all_metrics() if platform_obj else []
+        schema = self.get_platform_schema(platform)
+        return list(schema.all_metrics) if schema else []
     
     def get_metrics_by_category(self, platform: str, category: str) -> List[str]:
         """Retourne les métriques par catégorie"""
-        platform_obj = self.get_platform_metrics(platform)
-        if not platform_obj:
+        schema = self.get_platform_schema(platform)
+        if not schema:
             return []
         
-        return platform_obj.get_metrics_by_category(category)
+        if category in schema.categories:
+            return list(schema.categories[category])
+        return schema.source.get_metrics_by_category(category)
     
     def get_looker_schema(self, platforms: Union[str, List[str]], force_refresh: bool = False) -> Dict[str, Any]:
-        """Génère un schéma Looker combiné optimisé avec cache intelligent"""
+        """Retourne le schéma Looker combiné précompilé (copie modifiable)"""
         
         # Normaliser l'entrée
         if isinstance(platforms, str):
             platforms = [platforms]
         
-        platforms = [p.lower() for p in platforms]
-        cache_key = ','.join(sorted(platforms))
+        registry = reload_registry(force=True) if force_refresh else get_registry()
         
-        # Utiliser le cache si disponible et pas de force refresh
-        if not force_refresh and cache_key in self._schema_cache:
-            cached_schema = self._schema_cache[cache_key]
-            # Vérifier si le cache n'est pas trop ancien (1 heure)
-            cache_age = datetime.now() - datetime.fromisoformat(cached_schema.get('cached_at', '1970-01-01'))
-            if cache_age.total_seconds() < 3600:  # 1 heure
-                logger.debug(f"Utilisation du cache pour {cache_key}")
-                return cached_schema
-        
-        # Construire le schéma
-        combined_schema = self._build_combined_schema(platforms)
+        known = [p.lower() for p in platforms if p.lower() in registry.platforms]
+        for platform in platforms:
+            if platform.lower() not in registry.platforms:
+                logger.warning(f"Plateforme {platform} ignorée")
         
-        # Mettre en cache
-        combined_schema['cached_at'] = datetime.now().isoformat()
-        self._schema_cache[cache_key] = combined_schema
+        if not known:
+            return combine_schemas({}, [])
         
+        combined_schema = json.loads(registry.combined_schema_json(known))
+        combined_schema['cached_at'] = registry.built_at
+        combined_schema['schema_version'] = registry.version
         return combined_schema
     
     def _build_combined_schema(self, platforms: List[str]) -> Dict[str, Any]:
-        """Construit un schéma combiné optimisé"""
-        combined_schema = {
-            'platforms': platforms,
-            'dimensions': [],
-            'metrics': [],
-            'metadata': {
-                'generated_at': datetime.now().isoformat(),
-                'total_platforms': len(platforms),
-                'platform_versions': {},
-                'conflicts_resolved': 0,
-                'total_metrics': 0,
-                'total_dimensions': 0
-            }
-        }
-        
-        all_dimensions = {}  # Utiliser dict pour éviter doublons
-        all_metrics = {}
-        conflicts_count = 0
-        
+        """Construit un schéma combiné à partir des objets plateformes"""
+        schemas = {}
         for platform in platforms:
             platform_obj = self.get_platform_metrics(platform)
             if not platform_obj:
                 logger.warning(f"Plateforme {platform} ignorée")
                 continue
-            
-            schema = platform_obj.get_looker_schema()
-            combined_schema['metadata']['platform_versions'][platform] = schema['api_version']
-            
-            # Traiter les dimensions
-            for dim in schema['dimensions']:
-                dim_id = dim['id']
-                if dim_id not in all_dimensions:
-                    all_dimensions[dim_id] = dim
-                else:
-                    # Dimension existe déjà, garder la plus complète
-                    existing = all_dimensions[dim_id]
-                    if len(dim.get('description', '')) > len(existing.get('description', '')):
-                        all_dimensions[dim_id] = dim
-            
-            # Traiter les métriques avec résolution intelligente des conflits
-            for metric in schema['metrics']:
-                metric_id = metric['id']
-                original_id = metric_id
-                
-                if metric_id in all_metrics:
-                    # Conflit détecté
-                    conflicts_count += 1
-                    
-                    # Stratégies de résolution de conflit
-                    if self._are_metrics_equivalent(all_metrics[metric_id], metric):
-                        # Métriques équivalentes, on garde la première
-                        continue
-                    else:
-                        # Métriques différentes, préfixer par plateforme
-                        metric_id = f"{platform}_{original_id}"
-                        metric['id'] = metric_id
-                        
-                        # Mettre à jour le nom pour clarifier
-                        if not metric['name'].startswith(platform.title()):
-                            metric['name'] = f"{platform.title()} - {metric['name']}"
-                        
-                        metric['original_id'] = original_id
-                        metric['conflict_resolved'] = True
-                
-                all_metrics[metric_id] = metric
-        
-        # Finaliser le schéma
-        combined_schema['dimensions'] = list(all_dimensions.values())
-        combined_schema['metrics'] = list(all_metrics.values())
+            schemas[platform] = copy.deepcopy(platform_obj.get_looker_schema())
         
-        # Mettre à jour les métadonnées
-        combined_schema['metadata'].update({
-            'conflicts_resolved': conflicts_count,
-            'total_metrics': len(all_metrics),
-            'total_dimensions': len(all_dimensions)
-        })
-        
-        # Trier pour une présentation cohérente
-        combined_schema['dimensions'].sort(key=lambda x: x['id'])
-        combined_schema['metrics'].sort(key=lambda x: (x.get('platform', ''), x['id']))
-        
-        return combined_schema
+        return combine_schemas(schemas, platforms)
     
     def _are_metrics_equivalent(self, metric1: Dict[str, Any], metric2: Dict[str, Any]) -> bool:
         """Détermine si deux métriques sont équivalentes"""
-        # Critères d'équivalence
-        return (
-            metric1['type'] == metric2['type'] and
-            metric1.get('aggregation') == metric2.get('aggregation') and
-            metric1.get('is_calculated', False) == metric2.get('is_calculated', False)
-        )
+        return metrics_equivalent(metric1, metric2)
     
     def validate_metrics(self, platform: str, metrics_list: List[str]) -> Dict[str, Any]:
         """Valide une liste de métriques avec cache et analyse détaillée"""
         
-        platform_obj = self.get_platform_metrics(platform)
-        if not platform_obj:
+        schema = self.get_platform_schema(platform)
+        if not schema:
             return {
                 'valid': False,
                 'error': f'Plateforme {platform} non supportée',
-                'supported_platforms': list(self.platforms.keys())
+                'supported_platforms': list(get_registry().platforms.keys())
             }
         
         # Utiliser le cache si disponible
@@ -184,21 +208,18 @@ class MetricsManager:
         if cache_key in self._validation_cache:
             return self._validation_cache[cache_key]
         
-        # Effectuer la validation
-        available_metrics = set(platform_obj.get_all_metrics())
-        deprecated_metrics = set(platform_obj.get_deprecated_metrics())
-        calculated_metrics = set(platform_obj.get_calculated_metrics().keys())
+        # Effectuer la validation (ensembles précompilés du registre)
+        available_metrics = schema.metric_set
         
         valid_metrics = [m for m in metrics_list if m in available_metrics]
         invalid_metrics = [m for m in metrics_list if m not in available_metrics]
-        deprecated_found = [m for m in metrics_list if m in deprecated_metrics]
-        calculated_found = [m for m in metrics_list if m in calculated_metrics]
+        deprecated_found = [m for m in metrics_list if m in schema.deprecated]
+        calculated_found = [m for m in metrics_list if m in schema.calculated]
         
         # Analyse par catégorie
         category_analysis = {}
         for metric in valid_metrics:
-            for category in ['page_views', 'followers', 'engagement', 'reactions', 'buttons']:
-                category_metrics = platform_obj.get_metrics_by_category(category)
+            for category, category_metrics in schema.categories.items():
                 if metric in category_metrics:
                     if category not in category_analysis:
                         category_analysis[category] = []
@@ -292,7 +313,8 @@ class MetricsManager:
             config['metadata'] = {
                 'manager_version': '2.0.0',
                 'supported_platforms': list(self.platforms.keys()),
-                'cache_size': len(self._schema_cache),
+                'schema_version': get_registry().version,
+                'cache_size': len(get_registry().combined),
                 'validation_cache_size': len(self._validation_cache)
             }
         
@@ -344,11 +366,10 @@ class MetricsManager:
     
     def clear_all_caches(self) -> None:
         """Vide tous les caches du manager et des plateformes"""
-        self._schema_cache.clear()
         self._validation_cache.clear()
         
-        for platform_obj in self.platforms.values():
-            platform_obj.clear_cache()
+        # Le registre est immuable: le reconstruire plutôt que vider des caches partagés
+        reload_registry(force=True)
         
         logger.info("Tous les caches ont été vidés")
     
@@ -400,6 +421,10 @@ class MetricsManager:
         return comparison
 
 
+# Instance partagée du processus (les plateformes viennent du registre)
+metrics_manager = MetricsManager()
+
+
 # ========================================
 # EXEMPLE D'UTILISATION OPTIMISÉ
 # ========================================
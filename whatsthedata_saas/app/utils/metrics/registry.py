@@ -0,0 +1,227 @@
+# ========================================
+# app/utils/metrics/registry.py
+# ========================================
+
+"""
+Registre des schémas de métriques, construit une fois par processus.
+Tout est précalculé et immuable (tuples, MappingProxyType, JSON sérialisé):
+les chemins getData n'assemblent plus de schéma à chaque requête. Un rechargement
+construit un nouveau registre puis remplace la référence en une seule affectation.
+"""
+
+import copy
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import combinations
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, Mapping, Optional, Tuple
+
+from .facebook_metrics import FacebookMetrics
+from .linkedin_metrics import LinkedInMetrics
+
+logger = logging.getLogger(__name__)
+
+PLATFORM_CLASSES = {
+    'facebook': FacebookMetrics,
+    'linkedin': LinkedInMetrics,
+}
+
+CATEGORIES = ('page_views', 'followers', 'engagement', 'reactions', 'buttons')
+
+
+def _freeze(value: Any) -> Any:
+    """Copie en lecture seule (dict -> MappingProxyType, list -> tuple)"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class PlatformSchema:
+    """Schéma compilé d'une plateforme"""
+    platform: str
+    api_version: str
+    page_metrics: Tuple[str, ...]
+    post_metrics: Tuple[str, ...]
+    all_metrics: Tuple[str, ...]
+    metric_set: FrozenSet[str]
+    deprecated: FrozenSet[str]
+    calculated: Mapping[str, str]
+    categories: Mapping[str, Tuple[str, ...]]
+    dtypes: Mapping[str, str]              # métrique/dimension -> type Looker
+    aggregations: Mapping[str, str]        # métrique -> agrégation par défaut
+    column_mapping: Mapping[str, str]      # nom canonique -> libellé affiché
+    api_field_mapping: Mapping[str, str]   # nom canonique -> champ API brut
+    raw_to_canonical: Mapping[str, str]    # champ API brut -> nom canonique
+    looker_schema: Mapping[str, Any]
+    looker_schema_json: str
+    source: Any                            # objet BaseMetrics d'origine (lecture seule)
+
+
+@dataclass(frozen=True)
+class SchemaRegistry:
+    """Ensemble immuable des schémas compilés pour une version donnée"""
+    version: str
+    built_at: str
+    platforms: Mapping[str, PlatformSchema]
+    combined: Mapping[str, Mapping[str, Any]]   # "facebook,linkedin" -> schéma combiné
+    combined_json: Mapping[str, str]
+
+    def platform(self, name: str) -> Optional[PlatformSchema]:
+        return self.platforms.get(name.lower())
+
+    @staticmethod
+    def combination_key(platforms: Iterable[str]) -> str:
+        return ','.join(sorted({p.lower() for p in platforms}))
+
+    def combined_schema(self, platforms: Iterable[str]) -> Optional[Mapping[str, Any]]:
+        return self.combined.get(self.combination_key(platforms))
+
+    def combined_schema_json(self, platforms: Iterable[str]) -> Optional[str]:
+        return self.combined_json.get(self.combination_key(platforms))
+
+
+# ========================================
+# CONSTRUCTION
+# ========================================
+
+def compute_version(platform_objects: Optional[Dict[str, Any]] = None) -> str:
+    """Version du schéma: versions d'API des plateformes + dernière entrée de changelog"""
+    platform_objects = platform_objects or {name: cls() for name, cls in PLATFORM_CLASSES.items()}
+    parts = []
+    for name in sorted(platform_objects):
+        parts.append(f"{name}:{getattr(platform_objects[name], 'api_version', '')}")
+
+    try:
+        from .version_manager import MetricsVersionManager
+        version_manager = MetricsVersionManager()
+        for name in sorted(platform_objects):
+            history = version_manager.get_version_history(name, limit=1)
+            if history:
+                parts.append(f"{name}@{history[0].get('version_change', {}).get('to')}")
+    except Exception as e:
+        logger.debug(f"Changelog de métriques indisponible: {e}")
+
+    return '|'.join(parts)
+
+
+def _call(obj: Any, method: str, default: Any) -> Any:
+    """Les classes de plateforme n'exposent pas toutes la même API (FacebookMetrics est minimale)"""
+    func = getattr(obj, method, None)
+    return func() if callable(func) else default
+
+
+def _compile_platform(name: str, metrics_obj: Any) -> Tuple[PlatformSchema, Dict[str, Any]]:
+    schema = copy.deepcopy(metrics_obj.get_looker_schema())
+    api_version = getattr(metrics_obj, 'api_version', None) or schema.get('api_version', '')
+    schema.setdefault('api_version', api_version)
+
+    dtypes = {dim['id']: dim['type'] for dim in schema['dimensions']}
+    dtypes.update({metric['id']: metric['type'] for metric in schema['metrics']})
+    aggregations = {metric['id']: metric.get('aggregation', 'SUM') for metric in schema['metrics']}
+
+    default_aggregation = getattr(metrics_obj, '_get_default_aggregation', None)
+    page_metrics = tuple(metrics_obj.get_page_metrics())
+    post_metrics = tuple(metrics_obj.get_post_metrics())
+    for metric in page_metrics + post_metrics:
+        aggregations.setdefault(metric, default_aggregation(metric) if default_aggregation else 'SUM')
+
+    api_field_mapping = dict(_call(metrics_obj, 'get_api_field_mapping', {}))
+    categories = {}
+    if hasattr(metrics_obj, 'get_metrics_by_category'):
+        categories = {category: tuple(metrics_obj.get_metrics_by_category(category)) for category in CATEGORIES}
+
+    compiled = PlatformSchema(
+        platform=name,
+        api_version=api_version,
+        page_metrics=page_metrics,
+        post_metrics=post_metrics,
+        all_metrics=page_metrics + post_metrics,
+        metric_set=frozenset(page_metrics + post_metrics),
+        deprecated=frozenset(_call(metrics_obj, 'get_deprecated_metrics', ())),
+        calculated=MappingProxyType(dict(_call(metrics_obj, 'get_calculated_metrics', {}))),
+        categories=MappingProxyType(categories),
+        dtypes=MappingProxyType(dtypes),
+        aggregations=MappingProxyType(aggregations),
+        column_mapping=MappingProxyType(dict(metrics_obj.get_column_mapping())),
+        api_field_mapping=MappingProxyType(api_field_mapping),
+        raw_to_canonical=MappingProxyType({raw: canonical for canonical, raw in api_field_mapping.items()}),
+        looker_schema=_freeze(schema),
+        looker_schema_json=json.dumps(schema, ensure_ascii=False, default=str),
+        source=metrics_obj
+    )
+    return compiled, schema
+
+
+def build_registry(version: Optional[str] = None) -> SchemaRegistry:
+    """Construire un registre complet (schémas par plateforme et toutes les combinaisons)"""
+    from .metrics_manager import combine_schemas
+
+    platform_objects = {name: cls() for name, cls in PLATFORM_CLASSES.items()}
+    platforms = {}
+    raw_schemas = {}
+    for name, metrics_obj in platform_objects.items():
+        platforms[name], raw_schemas[name] = _compile_platform(name, metrics_obj)
+
+    combined = {}
+    combined_json = {}
+    names = sorted(platforms)
+    for size in range(1, len(names) + 1):
+        for combo in combinations(names, size):
+            # combine_schemas modifie les métriques en conflit: travailler sur des copies
+            schema = combine_schemas({name: copy.deepcopy(raw_schemas[name]) for name in combo}, list(combo))
+            key = ','.join(combo)
+            combined[key] = _freeze(schema)
+            combined_json[key] = json.dumps(schema, ensure_ascii=False, default=str)
+
+    return SchemaRegistry(
+        version=version or compute_version(platform_objects),
+        built_at=datetime.now().isoformat(),
+        platforms=MappingProxyType(platforms),
+        combined=MappingProxyType(combined),
+        combined_json=MappingProxyType(combined_json)
+    )
+
+
+# ========================================
+# ACCÈS PROCESSUS
+# ========================================
+
+_registry: Optional[SchemaRegistry] = None
+_build_lock = threading.Lock()
+
+
+def get_registry() -> SchemaRegistry:
+    """Registre courant (construit au premier appel, puis simple lecture de référence)"""
+    registry = _registry
+    if registry is not None:
+        return registry
+
+    with _build_lock:
+        if _registry is None:
+            _swap(build_registry())
+        return _registry
+
+
+def reload_registry(force: bool = False) -> SchemaRegistry:
+    """Reconstruire le registre si la version du schéma a changé (ou si force)"""
+    with _build_lock:
+        version = compute_version()
+        if not force and _registry is not None and _registry.version == version:
+            return _registry
+
+        old_version = _registry.version if _registry else None
+        _swap(build_registry(version))
+        logger.info(f"✅ Registre des métriques rechargé: {old_version} → {version}")
+        return _registry
+
+
+def _swap(registry: SchemaRegistry):
+    global _registry
+    # Affectation unique: les lecteurs voient l'ancien ou le nouveau registre, jamais un mélange
+    _registry = registry
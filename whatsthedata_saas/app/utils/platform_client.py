@@ -0,0 +1,522 @@
+"""
+Couche client unifiée des API LinkedIn et Facebook (asyncio + httpx)
+Une boucle asyncio dédiée (thread démon) porte un unique client httpx: les endpoints Looker
+(trafic en ligne, depuis la boucle FastAPI) et les collecteurs du scheduler (trafic batch,
+depuis les threads workers) partagent le même pool de connexions, la même politique de
+retry/backoff, la même normalisation des erreurs, la même vue des quotas et le même cache
+HTTP des métadonnées (http_cache), dont les accès SQLite bloquants passent par un pool de
+threads dédié pour ne jamais figer la boucle.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import httpx
+
+from .config import get_env_int, get_env_var
+from .http_cache import CachedEntry, CachePolicy, HTTPCache
+from .prometheus import platform_api_duration, platform_api_requests, platform_http_cache
+from .tracing import record_http_response
+
+logger = logging.getLogger(__name__)
+
+API_TIMEOUT_SECONDS = get_env_int('PLATFORM_API_TIMEOUT_SECONDS', 30)
+MAX_CONNECTIONS = get_env_int('PLATFORM_API_MAX_CONNECTIONS', 50)
+MAX_KEEPALIVE_CONNECTIONS = get_env_int('PLATFORM_API_MAX_KEEPALIVE', 20)
+QUOTA_MAX_AGE_SECONDS = get_env_int('PLATFORM_QUOTA_MAX_AGE_SECONDS', 300)
+
+LINKEDIN_API_URL = 'https://api.linkedin.com/rest'
+GRAPH_API_URL = f"https://graph.facebook.com/{get_env_var('FB_API_VERSION', 'v21.0')}"
+
+
+# ========================================
+# RETRY ET ERREURS
+# ========================================
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retry avec backoff exponentiel (gigue) et respect de Retry-After"""
+    max_retries: int = 3
+    backoff_factor: float = 2.0
+    backoff_max: float = 120.0
+    retry_statuses: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+    max_retry_after: float = 300.0
+
+    def delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.max_retry_after)
+                except ValueError:
+                    pass
+        backoff = self.backoff_factor * (2 ** attempt)
+        return min(self.backoff_max, backoff * random.uniform(0.5, 1.0))
+
+
+class PlatformAPIError(Exception):
+    """Erreur d'API normalisée (mêmes champs pour LinkedIn et Facebook)"""
+
+    def __init__(self, platform: str, status_code: int, message: str, code: Optional[int] = None,
+                 subcode: Optional[int] = None, retry_after: Optional[float] = None):
+        self.platform = platform
+        self.status_code = status_code
+        self.message = message
+        self.code = code
+        self.subcode = subcode
+        self.retry_after = retry_after
+        super().__init__(f"{platform} {status_code}: {message}")
+
+    @property
+    def is_rate_limited(self) -> bool:
+        # Graph renvoie ses limites en 400/403 avec les codes 4, 17, 32, 613
+        return self.status_code == 429 or self.code in (4, 17, 32, 613)
+
+    @property
+    def is_auth_error(self) -> bool:
+        return self.status_code == 401 or self.code == 190
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'platform': self.platform,
+            'status_code': self.status_code,
+            'message': self.message,
+            'code': self.code,
+            'subcode': self.subcode,
+            'retry_after': self.retry_after
+        }
+
+
+def _parse_error(platform: str, response: httpx.Response) -> PlatformAPIError:
+    try:
+        body = response.json()
+    except Exception:
+        body = {}
+
+    retry_after = response.headers.get('Retry-After')
+    try:
+        retry_after = float(retry_after) if retry_after else None
+    except ValueError:
+        retry_after = None
+
+    if platform == 'facebook':
+        error = body.get('error', {}) if isinstance(body, dict) else {}
+        return PlatformAPIError(platform, response.status_code, error.get('message') or response.text[:200],
+                                error.get('code'), error.get('error_subcode'), retry_after)
+
+    body = body if isinstance(body, dict) else {}
+    return PlatformAPIError(platform, response.status_code, body.get('message') or response.text[:200],
+                            body.get('serviceErrorCode'), None, retry_after)
+
+
+# ========================================
+# VUE PARTAGÉE DES QUOTAS
+# ========================================
+
+@dataclass
+class QuotaSnapshot:
+    """Dernier état de quota connu pour un token (lu dans les en-têtes de réponse)"""
+    platform: str
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: Optional[datetime] = None
+    usage: Dict[str, Any] = field(default_factory=dict)   # X-App-Usage / X-Business-Use-Case-Usage
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+
+    def is_fresh(self, max_age: int = QUOTA_MAX_AGE_SECONDS) -> bool:
+        return (datetime.utcnow() - self.updated_at).total_seconds() < max_age
+
+
+class QuotaView:
+    """Quotas par (plateforme, token), alimentés par toutes les réponses du processus"""
+
+    def __init__(self):
+        self._snapshots: Dict[Tuple[str, str], QuotaSnapshot] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(platform: str, token: str) -> Tuple[str, str]:
+        # Même clé que les caches de quota des collecteurs: jamais le token complet
+        return platform, token[-10:]
+
+    def update(self, platform: str, token: str, headers: httpx.Headers):
+        snapshot = None
+        if platform == 'linkedin':
+            if 'X-RateLimit-Remaining' in headers:
+                reset = headers.get('X-RateLimit-Reset')
+                snapshot = QuotaSnapshot(
+                    platform,
+                    limit=int(headers.get('X-RateLimit-Limit', 0)) or None,
+                    remaining=int(headers['X-RateLimit-Remaining']),
+                    reset_at=datetime.fromtimestamp(int(reset)) if reset and reset.isdigit() else None
+                )
+        else:
+            usage = {}
+            for header in ('X-App-Usage', 'X-Business-Use-Case-Usage'):
+                if header in headers:
+                    try:
+                        usage[header] = json.loads(headers[header])
+                    except ValueError:
+                        pass
+            if usage:
+                snapshot = QuotaSnapshot(platform, usage=usage)
+
+        if snapshot is not None:
+            with self._lock:
+                self._snapshots[self._key(platform, token)] = snapshot
+
+    def get(self, platform: str, token: str, max_age: int = QUOTA_MAX_AGE_SECONDS) -> Optional[QuotaSnapshot]:
+        with self._lock:
+            snapshot = self._snapshots.get(self._key(platform, token))
+        return snapshot if snapshot is not None and snapshot.is_fresh(max_age) else None
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+# ========================================
+# CLIENTS PAR PLATEFORME
+# ========================================
+
+class PlatformClient(ABC):
+    """Appels d'une plateforme: retries, quotas, métriques et erreurs normalisées"""
+
+    platform = 'generic'
+    base_url = ''
+
+    def __init__(self, runtime: 'PlatformRuntime', retry: RetryPolicy = RetryPolicy(),
+                 headers: Optional[Dict[str, str]] = None):
+        self.runtime = runtime
+        self.retry = retry
+        self.headers = dict(headers or {})
+
+    def url(self, path: str) -> str:
+        return path if path.startswith('http') else f"{self.base_url}{path}"
+
+    def _token(self, headers: Dict[str, str], params: Optional[Dict[str, Any]]) -> Optional[str]:
+        authorization = headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            return authorization[7:]
+        return (params or {}).get('access_token')
+
+    async def _send(self, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                    headers: Optional[Dict[str, str]] = None, data: Any = None, json_body: Any = None,
+                    timeout: Optional[float] = None) -> httpx.Response:
+        """Exécuté sur la boucle du runtime: cache HTTP, retries et mise à jour des quotas"""
+        merged_headers = {**self.headers, **(headers or {})}
+        token = self._token(merged_headers, params)
+        client = self.runtime.http
+
+        # Métadonnées peu changeantes: servies fraîches depuis le cache, sinon requête conditionnelle
+        cache = self.runtime.cache
+        policy = cache.policy_for(self.platform, method, self.url(url), params)
+        entry = None
+        if policy is not None:
+            key = cache.make_key(self.platform, self.url(url), params, token, merged_headers)
+            entry = await self.runtime.offload(cache.get, key)
+            if entry is not None and entry.is_fresh:
+                cache.stats['hits'] += 1
+                platform_http_cache.inc(self.platform, 'hit')
+                return entry.to_response(method, self.url(url), 'HIT')
+            if entry is not None and entry.can_revalidate:
+                merged_headers.update(entry.conditional_headers())
+            else:
+                entry = None
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, self.url(url), params=params, headers=merged_headers,
+                                                data=data, json=json_body, timeout=timeout or API_TIMEOUT_SECONDS)
+            except httpx.TransportError as e:
+                platform_api_requests.inc(self.platform, 'error')
+                if attempt >= self.retry.max_retries:
+                    raise
+                delay = self.retry.delay(attempt)
+                logger.warning(f"⚠️  {self.platform}: erreur réseau ({e}), nouvel essai dans {delay:.1f}s")
+            else:
+                platform_api_requests.inc(self.platform, str(response.status_code))
+                platform_api_duration.observe(time.perf_counter() - started, self.platform)
+                if token:
+                    try:
+                        self.runtime.quota.update(self.platform, token, response.headers)
+                    except Exception as e:
+                        logger.debug(f"Quota {self.platform} illisible: {e}")
+
+                if response.status_code not in self.retry.retry_statuses or attempt >= self.retry.max_retries:
+                    if policy is not None:
+                        response = await self._through_cache(policy, key, entry, method, response)
+                    return response
+                delay = self.retry.delay(attempt, response)
+                logger.warning(f"⚠️  {self.platform}: HTTP {response.status_code}, nouvel essai dans {delay:.1f}s")
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _through_cache(self, policy: CachePolicy, key: str, entry: Optional[CachedEntry], method: str,
+                             response: httpx.Response) -> httpx.Response:
+        """304: corps repris du cache (en-têtes récents); 200: réponse stockée"""
+        cache = self.runtime.cache
+        if response.status_code == 304 and entry is not None:
+            cache.stats['revalidated'] += 1
+            platform_http_cache.inc(self.platform, 'revalidated')
+            entry = await self.runtime.offload(cache.refresh, entry, policy, response)
+            revalidated = entry.to_response(method, str(response.request.url), 'REVALIDATED')
+            revalidated.elapsed = response.elapsed
+            return revalidated
+        cache.stats['misses'] += 1
+        platform_http_cache.inc(self.platform, 'miss')
+        if response.status_code == 200:
+            await self.runtime.offload(cache.store, key, policy, response)
+        return response
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Appel depuis n'importe quelle boucle asyncio (la réponse brute, sans lever d'erreur HTTP)"""
+        response = await self.runtime.run(self._send(method, url, **kwargs))
+        # Span enregistré dans le contexte de l'appelant (la trace n'existe pas sur la boucle du runtime)
+        record_http_response(response)
+        return response
+
+    def request_sync(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Appel depuis un thread (workers du scheduler, collecteurs)"""
+        response = self.runtime.call(self._send(method, url, **kwargs))
+        record_http_response(response)
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    def _decode(self, response: httpx.Response) -> Dict[str, Any]:
+        if response.status_code >= 400:
+            raise _parse_error(self.platform, response)
+        if not response.content:
+            return {}
+        try:
+            return response.json()
+        except ValueError:
+            raise PlatformAPIError(self.platform, response.status_code, 'Réponse JSON invalide')
+
+    async def get_json(self, url: str, **kwargs) -> Dict[str, Any]:
+        """GET et JSON décodé; PlatformAPIError sur une réponse en erreur"""
+        return self._decode(await self.request('GET', url, **kwargs))
+
+    def get_json_sync(self, url: str, **kwargs) -> Dict[str, Any]:
+        return self._decode(self.request_sync('GET', url, **kwargs))
+
+    @abstractmethod
+    def pages(self, url: str, params: Optional[Dict[str, Any]] = None, page_size: int = 100,
+              max_items: Optional[int] = None, **kwargs) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Itérer sur les pages d'une collection (les éléments de chaque page)"""
+        pass
+
+    def pages_sync(self, url: str, **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """Version synchrone de pages(): chaque page est demandée à la boucle du runtime"""
+        iterator = self.pages(url, **kwargs).__aiter__()
+        try:
+            while True:
+                try:
+                    yield self.runtime.call(iterator.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.runtime.call(iterator.aclose())
+
+
+class LinkedinPlatformClient(PlatformClient):
+    """API REST LinkedIn (Rest.li 2.0, pagination start/count)"""
+
+    platform = 'linkedin'
+    base_url = LINKEDIN_API_URL
+
+    def __init__(self, runtime: 'PlatformRuntime', **kwargs):
+        super().__init__(runtime, **kwargs)
+        self.headers.setdefault('X-Restli-Protocol-Version', '2.0.0')
+        self.headers.setdefault('LinkedIn-Version', '202408')
+
+    async def pages(self, url: str, params: Optional[Dict[str, Any]] = None, page_size: int = 100,
+                    max_items: Optional[int] = None, **kwargs) -> AsyncIterator[List[Dict[str, Any]]]:
+        start = int((params or {}).get('start', 0))
+        seen = 0
+        while max_items is None or seen < max_items:
+            count = page_size if max_items is None else min(page_size, max_items - seen)
+            data = await self.get_json(url, params={**(params or {}), 'start': start, 'count': count}, **kwargs)
+            elements = data.get('elements', [])
+            if not elements:
+                return
+            yield elements
+            seen += len(elements)
+            total = data.get('paging', {}).get('total')
+            if len(elements) < count or (total is not None and start + len(elements) >= total):
+                return
+            start += len(elements)
+
+
+class FacebookPlatformClient(PlatformClient):
+    """Graph API (pagination par curseur: paging.next)"""
+
+    platform = 'facebook'
+    base_url = GRAPH_API_URL
+
+    async def pages(self, url: str, params: Optional[Dict[str, Any]] = None, page_size: int = 100,
+                    max_items: Optional[int] = None, **kwargs) -> AsyncIterator[List[Dict[str, Any]]]:
+        params = {'limit': page_size, **(params or {})}
+        seen = 0
+        while url and (max_items is None or seen < max_items):
+            data = await self.get_json(url, params=params, **kwargs)
+            elements = data.get('data', [])
+            if not elements:
+                return
+            if max_items is not None:
+                elements = elements[:max_items - seen]
+            yield elements
+            seen += len(elements)
+            # L'URL suivante porte déjà tous les paramètres (token compris)
+            url = data.get('paging', {}).get('next')
+            params = None
+
+
+# ========================================
+# RUNTIME (BOUCLE ET POOL PARTAGÉS)
+# ========================================
+
+class PlatformRuntime:
+    """Boucle asyncio dédiée portant le client httpx partagé et la vue des quotas"""
+
+    def __init__(self, max_connections: int = MAX_CONNECTIONS,
+                 max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self.quota = QuotaView()
+        self.cache = HTTPCache()
+        # Accès au cache HTTP (SQLite, bloquant) hors de la boucle
+        self._cache_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='http-cache')
+        self._transport: Optional[httpx.AsyncBaseTransport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self.linkedin = LinkedinPlatformClient(self)
+        self.facebook = FacebookPlatformClient(self, retry=RetryPolicy(backoff_factor=3.0))  # Plus agressif pour Facebook
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    ready = threading.Event()
+
+                    def run():
+                        asyncio.set_event_loop(loop)
+                        loop.call_soon(ready.set)
+                        loop.run_forever()
+
+                    self._thread = threading.Thread(target=run, name='platform-client-loop', daemon=True)
+                    self._thread.start()
+                    ready.wait()
+                    self._loop = loop
+                    logger.info("✅ Boucle des clients plateforme démarrée")
+        return self._loop
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Client httpx partagé (créé sur la boucle du runtime, seule à l'utiliser)"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(limits=self.limits, timeout=API_TIMEOUT_SECONDS,
+                                           transport=self._transport)
+        return self._http
+
+    def call(self, coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Exécuter une coroutine sur la boucle du runtime depuis un thread et attendre son résultat"""
+        loop = self.loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise RuntimeError("call() bloquerait la boucle du runtime: utiliser await run()")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result(timeout)
+
+    async def run(self, coroutine: Awaitable) -> Any:
+        """Attendre une coroutine exécutée sur la boucle du runtime depuis une autre boucle"""
+        loop = self.loop
+        if asyncio.get_running_loop() is loop:
+            return await coroutine
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+
+    async def offload(self, function, *args) -> Any:
+        """Exécuter un appel bloquant (cache HTTP) dans le pool dédié sans bloquer la boucle"""
+        return await asyncio.get_running_loop().run_in_executor(self._cache_executor, function, *args)
+
+    def session(self, platform: str, headers: Optional[Dict[str, str]] = None) -> 'PlatformSession':
+        return PlatformSession(self.linkedin if platform == 'linkedin' else self.facebook, headers)
+
+    def configure(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """Changer le transport httpx (tests, bancs d'essai): le client est recréé au prochain appel"""
+        self._transport = transport
+        self._reset_client()
+
+    def _reset_client(self):
+        http, self._http = self._http, None
+        if http is not None and self._loop is not None:
+            try:
+                self.call(http.aclose(), timeout=10)
+            except Exception as e:
+                logger.debug(f"Fermeture du client httpx: {e}")
+
+    def stop(self):
+        self._reset_client()
+        self.cache.close()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+
+class PlatformSession:
+    """
+    Façade synchrone façon requests.Session au-dessus d'un client plateforme
+    (les collecteurs gardent leur code d'appel; les en-têtes de session s'ajoutent à chaque requête)
+    """
+
+    def __init__(self, client: PlatformClient, headers: Optional[Dict[str, str]] = None):
+        self.client = client
+        self.headers: Dict[str, str] = dict(headers or {})
+
+    def request(self, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                headers: Optional[Dict[str, str]] = None, data: Any = None, json: Any = None,
+                timeout: Optional[float] = None) -> httpx.Response:
+        return self.client.request_sync(method, url, params=params, headers={**self.headers, **(headers or {})},
+                                        data=data, json_body=json, timeout=timeout)
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request('POST', url, **kwargs)
+
+    def iter_pages(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+                   page_size: int = 100, max_items: Optional[int] = None,
+                   timeout: Optional[float] = None) -> Iterator[List[Dict[str, Any]]]:
+        return self.client.pages_sync(url, params=params, page_size=page_size, max_items=max_items,
+                                      headers={**self.headers, **(headers or {})}, timeout=timeout)
+
+    def quota(self, token: str, max_age: int = QUOTA_MAX_AGE_SECONDS) -> Optional[QuotaSnapshot]:
+        """Dernier quota connu pour ce token, quel que soit le trafic qui l'a observé"""
+        return self.client.runtime.quota.get(self.client.platform, token, max_age)
+
+
+# Instance globale du processus
+platform_runtime = PlatformRuntime()
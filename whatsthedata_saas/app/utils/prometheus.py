@@ -0,0 +1,269 @@
+"""
+Métriques au format d'exposition texte Prometheus (version 0.0.4)
+Compteurs, jauges et histogrammes étiquetés, plus des collecteurs appelés au moment
+de la lecture (/metrics) pour les valeurs qui existent déjà ailleurs (file du scheduler,
+état des circuit breakers, quotas, pool de connexions).
+"""
+
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Buckets par défaut (secondes): requêtes HTTP et appels d'API
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: étiquettes attendues {self.labelnames}, reçues {labels}")
+        return tuple(str(label) for label in labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Lignes d'échantillons de la métrique (format texte Prometheus)"""
+        pass
+
+
+class Counter(_Metric):
+    """Compteur monotone"""
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Valeur instantanée (posée par le code ou par un collecteur à la lecture)"""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Histogramme cumulatif (buckets fixes, somme et nombre d'observations)"""
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}   # [compte par bucket..., somme]
+
+    def observe(self, value: float, *labels: str):
+        key = self._key(labels)
+        index = len(self.buckets) - 1
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 1)
+            series[index] += 1
+            series[-1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées par le processus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Module rechargé: réutiliser la métrique déjà enregistrée
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[_Metric]]):
+        """Ajouter une fonction appelée à chaque lecture, qui retourne des métriques fraîches"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+
+        for collector in list(self._collectors):
+            try:
+                for metric in collector() or ():
+                    lines.extend(metric.render())
+            except Exception as e:
+                logger.warning(f"⚠️  Collecteur de métriques en échec ({getattr(collector, '__qualname__', collector)}): {e}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registre global du processus
+metrics_registry = MetricsRegistry()
+
+# ========================================
+# MÉTRIQUES PARTAGÉES
+# ========================================
+
+http_request_duration = metrics_registry.histogram(
+    'http_request_duration_seconds', 'Durée de traitement des requêtes HTTP', ('method', 'route', 'status')
+)
+platform_api_requests = metrics_registry.counter(
+    'platform_api_requests_total', 'Appels aux API des plateformes', ('platform', 'status')
+)
+platform_api_duration = metrics_registry.histogram(
+    'platform_api_request_duration_seconds', 'Durée des appels aux API des plateformes', ('platform',)
+)
+platform_http_cache = metrics_registry.counter(
+    'platform_http_cache_total', 'Lectures du cache HTTP des plateformes', ('platform', 'result')
+)
+db_pool_checkout_wait = metrics_registry.histogram(
+    'db_pool_checkout_wait_seconds', "Attente pour obtenir une connexion du pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+
+def record_platform_response(platform: str) -> Callable:
+    """Hook de réponse requests (session.hooks['response']) comptant les appels d'une plateforme"""
+
+    def hook(response, *args, **kwargs):
+        try:
+            platform_api_requests.inc(platform, str(response.status_code))
+            platform_api_duration.observe(response.elapsed.total_seconds(), platform)
+        except Exception:
+            pass
+        return response
+
+    return hook
+
+
+def serve_metrics(port: int, host: str = '0.0.0.0',
+                  json_routes: Optional[Dict[str, Callable[[], Any]]] = None) -> ThreadingHTTPServer:
+    """
+    Exposer /metrics depuis un processus sans API (scheduler lancé seul), plus
+    d'éventuelles routes JSON en lecture (protégées par ADMIN_TOKEN si défini)
+    """
+    json_routes = json_routes or {}
+    admin_token = os.getenv('ADMIN_TOKEN')
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/metrics':
+                self._send(metrics_registry.render().encode('utf-8'), CONTENT_TYPE)
+            elif path in json_routes:
+                if admin_token and self.headers.get('Authorization') != f"Bearer {admin_token}":
+                    self.send_error(401)
+                    return
+                body = json.dumps(json_routes[path](), default=str).encode('utf-8')
+                self._send(body, 'application/json')
+            else:
+                self.send_error(404)
+
+        def _send(self, body: bytes, content_type: str):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"✅ Métriques Prometheus exposées sur :{port}/metrics")
+    return server
@@ -0,0 +1,267 @@
+"""
+Rate limiting GCRA (Generic Cell Rate Algorithm) pour WhatsTheData
+Un seul horodatage par clé (TAT, "theoretical arrival time"), décision en O(1),
+stockage en mémoire ou partagé (SQLite/PostgreSQL) pour les déploiements multi-workers
+"""
+
+import hashlib
+import math
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from .config import get_env_var
+
+try:
+    from fastapi import HTTPException, Request
+except ImportError:  # Utilisation hors API (scripts, collecteurs)
+    HTTPException = None
+    Request = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RateLimitDecision:
+    """Résultat d'une vérification de rate limit"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float
+    period: int
+
+    def headers(self) -> Dict[str, str]:
+        """En-têtes standards RateLimit-* (draft IETF httpapi-ratelimit-headers)"""
+        headers = {
+            'RateLimit-Limit': str(self.limit),
+            'RateLimit-Remaining': str(self.remaining),
+            'RateLimit-Reset': str(math.ceil(self.reset_after)),
+            'RateLimit-Policy': f"{self.limit};w={self.period}",
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(math.ceil(self.retry_after))
+        return headers
+
+
+# ========================================
+# STOCKAGE DES TAT
+# ========================================
+
+class MemoryRateLimitBackend:
+    """
+    Stockage en mémoire du processus.
+    Pas de verrou: get/set d'un dict sont atomiques sous le GIL, une course entre
+    threads peut au pire admettre une requête de plus que la limite.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._tats: Dict[str, float] = {}
+
+    def update(self, key: str, now: float, emission_interval: float, tolerance: float) -> Tuple[bool, float]:
+        """Appliquer GCRA et retourner (autorisé, TAT retenu) - TAT inchangé si refus"""
+        tat = self._tats.get(key, now)
+        new_tat = max(tat, now) + emission_interval
+        if new_tat - tolerance > now:
+            return False, tat
+
+        if len(self._tats) >= self.max_keys and key not in self._tats:
+            self._purge(now)
+        self._tats[key] = new_tat
+        return True, new_tat
+
+    def reset(self, key: str):
+        self._tats.pop(key, None)
+
+    def _purge(self, now: float):
+        """Supprimer les clés dont le TAT est passé (elles sont de nouveau à pleine capacité)"""
+        for key in [k for k, tat in list(self._tats.items()) if tat <= now]:
+            self._tats.pop(key, None)
+
+
+class DatabaseRateLimitBackend:
+    """
+    Stockage partagé dans SQLite ou PostgreSQL.
+    La décision est un seul UPSERT conditionnel, atomique côté base.
+    """
+
+    TABLE = 'rate_limit_state'
+
+    def __init__(self, database_url: Optional[str] = None):
+        self.database_url = database_url
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from sqlalchemy import create_engine, text
+
+            if self.database_url:
+                self._engine = create_engine(self.database_url, future=True)
+            else:
+                from ..database.connection import db_manager
+                self._engine = db_manager.engine or db_manager._create_engine()
+
+            with self._engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+                    "key VARCHAR(255) PRIMARY KEY, tat DOUBLE PRECISION NOT NULL)"
+                ))
+        return self._engine
+
+    def update(self, key: str, now: float, emission_interval: float, tolerance: float) -> Tuple[bool, float]:
+        from sqlalchemy import text
+
+        params = {'key': key, 'now': now, 'interval': emission_interval, 'tolerance': tolerance}
+        greatest = f"CASE WHEN {self.TABLE}.tat > :now THEN {self.TABLE}.tat ELSE :now END"
+
+        with self.engine.begin() as conn:
+            row = conn.execute(text(
+                f"INSERT INTO {self.TABLE} (key, tat) VALUES (:key, :now + :interval) "
+                f"ON CONFLICT (key) DO UPDATE SET tat = {greatest} + :interval "
+                f"WHERE {greatest} + :interval - :tolerance <= :now "
+                f"RETURNING tat"
+            ), params).first()
+            if row is not None:
+                return True, float(row[0])
+
+            # Refusé: relire le TAT courant pour calculer Retry-After
+            row = conn.execute(text(f"SELECT tat FROM {self.TABLE} WHERE key = :key"), params).first()
+            return False, (float(row[0]) if row else now)
+
+    def reset(self, key: str):
+        from sqlalchemy import text
+
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {self.TABLE} WHERE key = :key"), {'key': key})
+
+
+def create_backend(name: Optional[str] = None):
+    """Construire le stockage configuré (RATE_LIMIT_BACKEND = memory | database)"""
+    name = (name or get_env_var('RATE_LIMIT_BACKEND', 'memory')).lower()
+    if name in ('database', 'sqlite', 'postgres', 'postgresql'):
+        return DatabaseRateLimitBackend(get_env_var('RATE_LIMIT_DATABASE_URL'))
+    return MemoryRateLimitBackend()
+
+
+# ========================================
+# LIMITEUR GCRA
+# ========================================
+
+class RateLimiter:
+    """Limiteur GCRA: `limit` appels par `period` secondes, rafale de `burst` appels"""
+
+    def __init__(self, limit: int, period: int = 60, burst: Optional[int] = None, backend=None):
+        self.limit = limit
+        self.period = period
+        self.burst = burst or limit
+        self.emission_interval = period / limit
+        self.tolerance = self.emission_interval * self.burst
+        self.backend = backend or default_backend
+
+    def hit(self, key: str) -> RateLimitDecision:
+        """Consommer un appel pour `key` et retourner la décision"""
+        now = time.time()
+
+        try:
+            allowed, tat = self.backend.update(key, now, self.emission_interval, self.tolerance)
+        except Exception as e:
+            # Le stockage partagé ne doit jamais bloquer le service
+            logger.warning(f"⚠️  Rate limiter indisponible ({e}), requête autorisée")
+            return RateLimitDecision(True, self.limit, self.limit, 0, 0, self.period)
+
+        allow_at = max(tat, now) + self.emission_interval - self.tolerance
+        remaining = int((now - (tat - self.tolerance)) / self.emission_interval) if allowed else 0
+
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=self.burst,
+            remaining=max(0, min(self.burst, remaining)),
+            reset_after=max(0.0, tat - now),
+            retry_after=0.0 if allowed else max(0.0, allow_at - now),
+            period=self.period
+        )
+
+    def is_allowed(self, key: str) -> bool:
+        return self.hit(key).allowed
+
+    def wait(self, key: str, max_wait: Optional[float] = None) -> bool:
+        """Bloquer jusqu'à ce que l'appel soit autorisé (code des collecteurs)"""
+        deadline = time.time() + max_wait if max_wait is not None else None
+        while True:
+            decision = self.hit(key)
+            if decision.allowed:
+                return True
+            if deadline is not None and time.time() + decision.retry_after > deadline:
+                return False
+            time.sleep(decision.retry_after)
+
+    def reset(self, key: str):
+        self.backend.reset(key)
+
+
+def default_client_key(request) -> str:
+    """
+    Identifier le client: token Bearer (email Looker) sinon adresse IP.
+    Le jeton n'est jamais utilisé tel quel: son empreinte SHA-256 garde la clé
+    courte (colonne VARCHAR(255) du stockage partagé) et hors du stockage en clair.
+    """
+    auth = request.headers.get('authorization', '')
+    if auth.startswith('Bearer ') and len(auth) > 7:
+        return f"user:{hashlib.sha256(auth[7:].encode('utf-8')).hexdigest()}"
+
+    forwarded_for = request.headers.get('X-Forwarded-For')
+    if forwarded_for:
+        return f"ip:{forwarded_for.split(',')[0].strip()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class RateLimit:
+    """
+    Dépendance FastAPI de rate limiting (Depends(RateLimit(...))).
+    Les en-têtes RateLimit-* sont déposés dans request.state et ajoutés à la réponse
+    par le middleware de l'application; un dépassement lève une HTTPException 429.
+    """
+
+    def __init__(self, limit: int, period: int = 60, burst: Optional[int] = None,
+                 scope: Optional[str] = None, key_func: Optional[Callable] = None, backend=None):
+        self.limiter = RateLimiter(limit, period, burst, backend)
+        self.scope = scope
+        self.key_func = key_func or default_client_key
+
+    async def __call__(self, request: Request):
+        scope = self.scope or request.url.path
+        decision = self.limiter.hit(f"{scope}:{self.key_func(request)}")
+        headers = decision.headers()
+        request.state.rate_limit_headers = headers
+
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail={
+                    "error": "RATE_LIMIT_EXCEEDED",
+                    "message": f"Rate limit dépassé: {self.limiter.limit} appels/{self.limiter.period}s",
+                    "retry_after": math.ceil(decision.retry_after)
+                },
+                headers=headers
+            )
+        return decision
+
+    # Usage hors FastAPI (collecteurs): même limiteur, clé explicite
+    def hit(self, key: str) -> RateLimitDecision:
+        return self.limiter.hit(f"{self.scope}:{key}" if self.scope else key)
+
+
+def rate_limit(limit: int = 60, period: int = 60, burst: Optional[int] = None,
+               scope: Optional[str] = None, key_func: Optional[Callable] = None) -> RateLimit:
+    """Raccourci: dependencies=[Depends(rate_limit(30, scope="combined_metrics"))]"""
+    return RateLimit(limit, period, burst, scope, key_func)
+
+
+# Stockage partagé par tous les limiteurs du processus
+default_backend = create_backend()
+
+# Instance globale de rate limiter
+rate_limiter = RateLimiter(limit=100, period=60)
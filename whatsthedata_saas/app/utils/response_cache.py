@@ -0,0 +1,448 @@
+"""
+Cache des réponses des endpoints Looker Studio
+Clé = utilisateur + comptes + période + champs + agrégation, TTL par type de données,
+déduplication des requêtes identiques en cours et invalidation après collecte.
+Le scheduler tourne dans un autre processus que l'API: chaque invalidation enregistre aussi
+une génération par compte en base (response_cache_generations, numérotation croissante commune
+à tous les comptes); chaque processus relit au plus toutes les LOOKER_CACHE_SYNC_SECONDS secondes
+les seules lignes au-delà de la dernière génération vue pour invalider ses propres réponses.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import get_env_int
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie (secondes) par catégorie de données renvoyée aux connecteurs
+DEFAULT_DATA_TYPE_TTLS: Dict[str, int] = {
+    'page_metrics': get_env_int('LOOKER_CACHE_TTL_PAGE_METRICS', 900),
+    'post_metrics': get_env_int('LOOKER_CACHE_TTL_POST_METRICS', 1800),
+    'follower_metrics': get_env_int('LOOKER_CACHE_TTL_FOLLOWER_METRICS', 3600),
+    'fan_metrics': get_env_int('LOOKER_CACHE_TTL_FAN_METRICS', 3600),
+    'video_metrics': get_env_int('LOOKER_CACHE_TTL_VIDEO_METRICS', 1800),
+    'breakdown_data': get_env_int('LOOKER_CACHE_TTL_BREAKDOWN_DATA', 21600),
+}
+DEFAULT_TTL = get_env_int('LOOKER_CACHE_DEFAULT_TTL', 900)
+# Délai maximal avant qu'une invalidation d'un autre processus soit vue
+SYNC_INTERVAL_SECONDS = get_env_int('LOOKER_CACHE_SYNC_SECONDS', 5)
+# Générations relues sous la dernière vue: publications concurrentes validées en retard
+SYNC_OVERLAP_GENERATIONS = get_env_int('LOOKER_CACHE_SYNC_OVERLAP', 1000)
+# Durée maximale de mémorisation des comptes d'un utilisateur (écritures hors invalidate_user)
+ACCOUNTS_TTL = get_env_int('LOOKER_CACHE_ACCOUNTS_TTL', 300)
+
+# Une étiquette identifie un compte touché par une réponse: (plateforme, id du compte)
+AccountTag = Tuple[str, str]
+
+
+@dataclass
+class CachedResponse:
+    """Réponse mise en cache"""
+    status_code: int
+    content: Dict[str, Any]
+    expires_at: float
+    accounts: Set[AccountTag] = field(default_factory=set)
+    user_id: Optional[int] = None
+
+    @property
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+class SharedInvalidations:
+    """
+    Canal d'invalidation inter-processus: génération par compte en base.
+    publish() donne au compte la génération suivant la plus haute de la table; poll() ne lit
+    que les lignes au-delà de la plus haute génération déjà vue (moins une marge pour les
+    publications concurrentes) et retourne les comptes qui ont changé (au plus un relevé par intervalle).
+    """
+
+    def __init__(self, sync_interval: int = SYNC_INTERVAL_SECONDS, overlap: int = SYNC_OVERLAP_GENERATIONS):
+        self.sync_interval = sync_interval
+        self.overlap = overlap
+        self._seen: Dict[AccountTag, int] = {}
+        self._watermark = 0
+        self._initialized = False
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last_poll >= self.sync_interval
+
+    def publish(self, platform: str, account_id: str) -> Optional[int]:
+        """Passer le compte à la génération suivante de la table; retourne cette génération"""
+        from sqlalchemy import func
+        from sqlalchemy.exc import IntegrityError
+        from ..database.connection import db_manager
+        from ..database.models import ResponseCacheGeneration as Generation
+
+        tag = (platform, str(account_id))
+        try:
+            for _ in range(2):
+                try:
+                    with db_manager.get_session() as session:
+                        generation = (session.query(func.max(Generation.generation)).scalar() or 0) + 1
+                        updated = session.query(Generation).filter(
+                            Generation.platform == tag[0], Generation.account_id == tag[1]
+                        ).update({Generation.generation: generation}, synchronize_session=False)
+                        if not updated:
+                            session.add(Generation(platform=tag[0], account_id=tag[1], generation=generation))
+                            session.flush()
+                    break
+                except IntegrityError:
+                    # Première invalidation du compte publiée en même temps par un autre processus
+                    continue
+            else:
+                return None
+        except Exception as e:
+            logger.warning(f"⚠️  Invalidation partagée impossible pour {platform}:{account_id}: {e}")
+            return None
+
+        with self._lock:
+            # Notre propre publication n'a pas à être ré-appliquée au prochain relevé
+            # (une publication antérieure d'un autre processus est couverte par l'invalidation locale qui suit)
+            self._seen[tag] = max(self._seen.get(tag, 0), generation)
+        return generation
+
+    def poll(self, force: bool = False) -> List[AccountTag]:
+        """Comptes invalidés par un autre processus depuis le dernier relevé"""
+        if not force and not self.due():
+            return []
+        self._last_poll = time.monotonic()
+
+        from sqlalchemy import func
+        from ..database.connection import db_manager
+        from ..database.models import ResponseCacheGeneration as Generation
+
+        try:
+            with db_manager.get_session() as session:
+                floor = self._watermark
+                if not self._initialized:
+                    # Premier relevé: seules les générations récentes servent de référence
+                    floor = session.query(func.max(Generation.generation)).scalar() or 0
+                rows = session.query(Generation.platform, Generation.account_id, Generation.generation).filter(
+                    Generation.generation > floor - self.overlap
+                ).all()
+        except Exception as e:
+            logger.warning(f"⚠️  Lecture des invalidations partagées impossible: {e}")
+            return []
+
+        changed = []
+        with self._lock:
+            for platform, account_id, generation in rows:
+                tag = (platform, account_id)
+                if self._initialized and self._seen.get(tag, 0) < generation:
+                    changed.append(tag)
+                self._seen[tag] = max(self._seen.get(tag, 0), generation)
+                self._watermark = max(self._watermark, generation)
+            self._initialized = True
+        return changed
+
+
+class LookerResponseCache:
+    """
+    Cache des réponses Looker partagé entre les requêtes d'un même processus.
+    Les lectures/écritures sont protégées par un verrou car l'invalidation
+    vient des threads du scheduler; les invalidations des autres processus
+    arrivent par le canal partagé (shared).
+    """
+
+    def __init__(self, max_entries: int = 1000, ttls: Optional[Dict[str, int]] = None,
+                 default_ttl: int = DEFAULT_TTL, shared: Optional[SharedInvalidations] = None):
+        self.max_entries = max_entries
+        self.shared = shared
+        self.ttls = dict(ttls or DEFAULT_DATA_TYPE_TTLS)
+        self.default_ttl = default_ttl
+
+        self._entries: Dict[str, CachedResponse] = {}
+        self._by_account: Dict[AccountTag, Set[str]] = {}
+        self._by_user: Dict[int, Set[str]] = {}
+        # Génération par compte/utilisateur: un calcul démarré avant une invalidation n'est pas stocké
+        self._generations: Dict[Any, int] = {}
+        self._inflight: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        # Comptes de chaque utilisateur (clé des réponses), mémorisés jusqu'à invalidate_user
+        self._user_accounts: Dict[int, Dict[Any, Tuple[float, List[AccountTag]]]] = {}
+        self.accounts_ttl = ACCOUNTS_TTL
+        self._lock = threading.Lock()
+
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'invalidations': 0}
+
+    # ========================================
+    # CLÉS ET TTL
+    # ========================================
+
+    @staticmethod
+    def make_key(endpoint: str, user_id: Any, accounts: Iterable[AccountTag],
+                 start_date: Any, end_date: Any, fields: Optional[Iterable[str]] = None,
+                 aggregation: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> str:
+        """Construire une clé stable à partir des paramètres qui déterminent la réponse"""
+        payload = {
+            'endpoint': endpoint,
+            'user': user_id,
+            'accounts': sorted(f"{platform}:{account_id}" for platform, account_id in accounts),
+            'start': str(start_date),
+            'end': str(end_date),
+            'fields': sorted(fields) if fields else None,
+            'aggregation': aggregation,
+            'params': params or {},
+        }
+        raw = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def ttl_for(self, platform_data: Dict[str, Any]) -> int:
+        """TTL le plus court parmi les catégories non vides de la réponse"""
+        ttls = []
+        for data in platform_data.values():
+            if not isinstance(data, dict):
+                continue
+            for category, rows in data.items():
+                if isinstance(rows, list) and rows:
+                    ttls.append(self.ttls.get(category, self.default_ttl))
+        return min(ttls) if ttls else self.default_ttl
+
+    async def account_tags(self, user_id: int, scope: Any,
+                           resolve: Callable[[], Iterable[AccountTag]]) -> List[AccountTag]:
+        """
+        Comptes de l'utilisateur concernés par une requête (scope: plateformes demandées).
+        resolve() interroge la base au premier appel; le résultat est mémorisé jusqu'à
+        invalidate_user (ajout/désactivation d'un compte) ou au plus accounts_ttl secondes.
+        """
+        await self._sync_if_due()
+
+        with self._lock:
+            memo = self._user_accounts.get(user_id, {}).get(scope)
+            if memo is not None and memo[0] > time.monotonic():
+                return memo[1]
+            generation = self._generations.get(('user', user_id), 0)
+
+        tags = list(resolve())
+        with self._lock:
+            # Utilisateur invalidé pendant la lecture: résultat non mémorisé
+            if self._generations.get(('user', user_id), 0) == generation:
+                if user_id not in self._user_accounts and len(self._user_accounts) >= self.max_entries:
+                    self._user_accounts.clear()
+                self._user_accounts.setdefault(user_id, {})[scope] = (time.monotonic() + self.accounts_ttl, tags)
+        return tags
+
+    # ========================================
+    # LECTURE / ÉCRITURE
+    # ========================================
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.is_expired:
+                self._remove(key)
+                return None
+            return entry
+
+    def set(self, key: str, status_code: int, content: Dict[str, Any], ttl: int,
+            accounts: Iterable[AccountTag] = (), user_id: Optional[int] = None,
+            generation: Optional[Dict[Any, int]] = None) -> bool:
+        """Stocker une réponse (refusé si un compte concerné a été invalidé entre-temps)"""
+        accounts = set(accounts)
+        with self._lock:
+            if generation is not None and generation != self._snapshot(accounts, user_id):
+                return False
+
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict()
+
+            self._remove(key)
+            self._entries[key] = CachedResponse(
+                status_code=status_code,
+                content=content,
+                expires_at=time.monotonic() + ttl,
+                accounts=accounts,
+                user_id=user_id
+            )
+            for tag in accounts:
+                self._by_account.setdefault(tag, set()).add(key)
+            if user_id is not None:
+                self._by_user.setdefault(user_id, set()).add(key)
+            return True
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Tuple[int, Dict[str, Any]]]],
+                             accounts: Iterable[AccountTag] = (), user_id: Optional[int] = None,
+                             cacheable: Optional[Callable[[int, Dict[str, Any]], bool]] = None
+                             ) -> Tuple[int, Dict[str, Any], str]:
+        """
+        Retourner (status_code, contenu, état) où état vaut HIT, COALESCED ou MISS.
+        Les requêtes identiques concurrentes attendent le calcul déjà en cours.
+        """
+        await self._sync_if_due()
+
+        entry = self.get(key)
+        if entry is not None:
+            self.stats['hits'] += 1
+            return entry.status_code, entry.content, 'HIT'
+
+        accounts = set(accounts)
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            if inflight is None or inflight[0] is not loop:
+                future = loop.create_future()
+                self._inflight[key] = (loop, future)
+                generation = self._snapshot(accounts, user_id)
+                owner = True
+            else:
+                future = inflight[1]
+                owner = False
+
+        if not owner:
+            self.stats['coalesced'] += 1
+            status_code, content = await asyncio.shield(future)
+            return status_code, content, 'COALESCED'
+
+        self.stats['misses'] += 1
+        try:
+            status_code, content = await compute()
+        except BaseException as e:
+            future.set_exception(e)
+            # Éviter l'avertissement "exception never retrieved" quand personne n'attend
+            future.exception()
+            raise
+        else:
+            future.set_result((status_code, content))
+            if cacheable is None or cacheable(status_code, content):
+                ttl = self.ttl_for(content.get('data', {}))
+                self.set(key, status_code, content, ttl, accounts, user_id, generation)
+            return status_code, content, 'MISS'
+        finally:
+            with self._lock:
+                if self._inflight.get(key, (None, None))[1] is future:
+                    del self._inflight[key]
+
+    # ========================================
+    # INVALIDATION
+    # ========================================
+
+    async def _sync_if_due(self):
+        if self.shared is not None and self.shared.due():
+            # Relevé des invalidations des autres processus (requête en base, hors de la boucle)
+            await asyncio.get_running_loop().run_in_executor(None, self.sync)
+
+    def sync(self, force: bool = False) -> int:
+        """Appliquer les invalidations publiées par les autres processus"""
+        if self.shared is None:
+            return 0
+        removed = 0
+        for platform, account_id in self.shared.poll(force):
+            if platform == 'user':
+                removed += self.invalidate_user(int(account_id), publish=False)
+            else:
+                removed += self.invalidate_account(platform, account_id, publish=False)
+        return removed
+
+    def invalidate_account(self, platform: str, account_id: str, publish: bool = True) -> int:
+        """Supprimer toutes les réponses qui incluent ce compte (et prévenir les autres processus)"""
+        if publish and self.shared is not None:
+            self.shared.publish(platform, account_id)
+
+        tag = (platform, str(account_id))
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            keys = list(self._by_account.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.stats['invalidations'] += len(keys)
+
+        if keys:
+            logger.debug(f"🧹 Cache Looker: {len(keys)} réponse(s) invalidée(s) pour {platform}:{account_id}")
+        return len(keys)
+
+    def invalidate_user(self, user_id: int, publish: bool = True) -> int:
+        """Supprimer toutes les réponses et les comptes mémorisés d'un utilisateur (et prévenir les autres processus)"""
+        if publish and self.shared is not None:
+            self.shared.publish('user', str(user_id))
+
+        with self._lock:
+            self._generations[('user', user_id)] = self._generations.get(('user', user_id), 0) + 1
+            self._user_accounts.pop(user_id, None)
+            keys = list(self._by_user.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+            self.stats['invalidations'] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_account.clear()
+            self._by_user.clear()
+            self._user_accounts.clear()
+            self._generations.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+            inflight = len(self._inflight)
+        total = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+        return {
+            **self.stats,
+            'size': size,
+            'inflight': inflight,
+            'hit_rate': round((self.stats['hits'] + self.stats['coalesced']) / total, 3) if total else 0.0
+        }
+
+    # ========================================
+    # INTERNES (verrou déjà acquis)
+    # ========================================
+
+    def _snapshot(self, accounts: Set[AccountTag], user_id: Optional[int]) -> Dict[Any, int]:
+        tags: List[Any] = list(accounts)
+        if user_id is not None:
+            tags.append(('user', user_id))
+        return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.accounts:
+            keys = self._by_account.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_account[tag]
+        if entry.user_id is not None:
+            keys = self._by_user.get(entry.user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[entry.user_id]
+
+    def _evict(self):
+        """Libérer de la place: entrées expirées d'abord, sinon la plus proche de l'expiration"""
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        if not expired and self._entries:
+            oldest = min(self._entries, key=lambda k: self._entries[k].expires_at)
+            self._remove(oldest)
+
+
+def stamp_served(content: Dict[str, Any], started_at: float) -> Dict[str, Any]:
+    """Copie de la réponse avec l'horodatage et la durée de la requête servie (pas ceux du calcul mis en cache)"""
+    return {
+        **content,
+        'generated_at': datetime.now().isoformat(),
+        'execution_time': round(time.time() - started_at, 3)
+    }
+
+
+# Instance globale partagée par les endpoints Looker et le scheduler (invalidation inter-processus en base)
+looker_response_cache = LookerResponseCache(shared=SharedInvalidations())
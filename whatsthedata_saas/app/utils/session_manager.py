@@ -1,39 +1,27 @@
 # app/utils/session_manager.py
 import secrets
-import json
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, Dict, Any
-from app.database.connection import get_db_session
-from app.database.models import OAuthSession
+from app.utils.state_store import create_state_store
 
 logger = logging.getLogger(__name__)
 
+# Sessions du parcours de connexion (partagées entre workers par défaut)
+session_store = create_state_store()
+
 class SessionManager:
-    """Gestionnaire de sessions OAuth avec ORM SQLAlchemy"""
+    """Gestionnaire de sessions OAuth (stockage partagé, purge en tâche de fond)"""
     
     @staticmethod
     def create_session(data: Dict[Any, Any], expires_minutes: int = 30) -> str:
         """Créer une nouvelle session OAuth"""
         state = secrets.token_urlsafe(32)
-        expires_at = datetime.now() + timedelta(minutes=expires_minutes)
         
         try:
-            with get_db_session() as db:
-                # Nettoyer d'abord
-                SessionManager._cleanup_expired_sessions(db)
-                
-                # Créer nouvelle session
-                session = OAuthSession(
-                    state=state,
-                    data=json.dumps(data, default=str),
-                    expires_at=expires_at
-                )
-                db.add(session)
-                db.commit()
-                
-                logger.info(f"Session OAuth créée: {state[:8]}...")
-                return state
+            session_store.put(state, data, ttl=expires_minutes * 60)
+            logger.info(f"Session OAuth créée: {state[:8]}...")
+            return state
                 
         except Exception as e:
             logger.error(f"Erreur création session OAuth: {e}")
@@ -46,16 +34,7 @@ class SessionManager:
             return None
             
         try:
-            with get_db_session() as db:
-                session = db.query(OAuthSession).filter(
-                    OAuthSession.state == state,
-                    OAuthSession.expires_at > datetime.now()
-                ).first()
-                
-                if not session:
-                    return None
-                    
-                return json.loads(session.data)
+            return session_store.get(state)
                 
         except Exception as e:
             logger.error(f"Erreur récupération session OAuth: {e}")
@@ -68,17 +47,7 @@ class SessionManager:
             return False
             
         try:
-            with get_db_session() as db:
-                session = db.query(OAuthSession).filter(
-                    OAuthSession.state == state
-                ).first()
-                
-                if not session:
-                    return False
-                    
-                session.data = json.dumps(data, default=str)
-                db.commit()
-                return True
+            return session_store.update(state, data)
                 
         except Exception as e:
             logger.error(f"Erreur update session OAuth: {e}")
@@ -91,31 +60,12 @@ class SessionManager:
             return True
             
         try:
-            with get_db_session() as db:
-                deleted = db.query(OAuthSession).filter(
-                    OAuthSession.state == state
-                ).delete()
-                db.commit()
-                return deleted > 0
+            return session_store.delete(state)
                 
         except Exception as e:
             logger.error(f"Erreur suppression session OAuth: {e}")
             return False
     
-    @staticmethod
-    def _cleanup_expired_sessions(db):
-        """Nettoyer les sessions expirées"""
-        try:
-            deleted = db.query(OAuthSession).filter(
-                OAuthSession.expires_at < datetime.now()
-            ).delete()
-            
-            if deleted > 0:
-                logger.info(f"Sessions expirées nettoyées: {deleted}")
-                
-        except Exception as e:
-            logger.error(f"Erreur nettoyage sessions expirées: {e}")
-    
     @staticmethod
     def emergency_create_user_session(email: str, firstname: str = "", lastname: str = "") -> str:
         """Créer une session d'urgence"""
@@ -0,0 +1,249 @@
+"""
+Stockage des états OAuth et des sessions de connexion avec expiration
+Deux implémentations derrière la même interface:
+- en mémoire: dict + tas (min-heap) des expirations, purge amortie en O(log n)
+- en base (table oauth_sessions): partagé entre workers, purge dans un thread de fond
+Lecture et écriture ne font jamais de nettoyage sur le chemin de la requête.
+"""
+
+import heapq
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import get_env_var, get_env_int
+from ..database.connection import db_manager
+from ..database.models import OAuthSession
+
+logger = logging.getLogger(__name__)
+
+# Intervalle de purge du stockage en base (secondes)
+PURGE_INTERVAL = get_env_int('STATE_STORE_PURGE_INTERVAL', 300)
+
+
+class StateStore(ABC):
+    """Interface commune: valeurs JSON avec durée de vie, consommables une seule fois (pop)"""
+
+    @abstractmethod
+    def put(self, key: str, data: Dict[str, Any], ttl: int) -> bool:
+        """Enregistrer les données pour ttl secondes"""
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Données de la clé (None si absente ou expirée)"""
+        pass
+
+    @abstractmethod
+    def update(self, key: str, data: Dict[str, Any]) -> bool:
+        """Remplacer les données sans changer l'expiration"""
+        pass
+
+    @abstractmethod
+    def pop(self, key: str) -> Optional[Dict[str, Any]]:
+        """Lire et supprimer atomiquement (un état OAuth ne sert qu'une fois)"""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Supprimer la clé"""
+        pass
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Supprimer les entrées expirées; retourne leur nombre"""
+        pass
+
+
+# ========================================
+# EN MÉMOIRE
+# ========================================
+
+class MemoryStateStore(StateStore):
+    """
+    Stockage du processus. Le tas contient (expiration, clé); les entrées supprimées
+    ou remplacées y restent jusqu'à leur sortie et sont ignorées (suppression paresseuse).
+    """
+
+    def __init__(self, namespace: str = ''):
+        self.namespace = namespace
+        self._entries: Dict[str, Tuple[str, float]] = {}  # clé -> (json, expiration)
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def put(self, key: str, data: Dict[str, Any], ttl: int) -> bool:
+        now = time.time()
+        expires_at = now + ttl
+        raw = json.dumps(data, default=str)
+
+        with self._lock:
+            self._purge(now)
+            self._entries[key] = (raw, expires_at)
+            heapq.heappush(self._heap, (expires_at, key))
+
+            # Trop d'entrées mortes dans le tas (suppressions explicites): le reconstruire
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._heap = [(exp, k) for k, (_, exp) in self._entries.items()]
+                heapq.heapify(self._heap)
+        return True
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return json.loads(entry[0])
+
+    def update(self, key: str, data: Dict[str, Any]) -> bool:
+        raw = json.dumps(data, default=str)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                return False
+            self._entries[key] = (raw, entry[1])
+        return True
+
+    def pop(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return json.loads(entry[0])
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge(time.time())
+
+    def _purge(self, now: float) -> int:
+        """Sortir du tas les expirations passées (verrou déjà acquis)"""
+        purged = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # L'entrée a pu être remplacée avec une nouvelle expiration
+            if entry is not None and entry[1] == expires_at:
+                del self._entries[key]
+                purged += 1
+        return purged
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ========================================
+# EN BASE (PARTAGÉ ENTRE WORKERS)
+# ========================================
+
+class DatabaseStateStore(StateStore):
+    """
+    Stockage dans oauth_sessions. La purge (toutes les clés de la table) tourne dans
+    un seul thread par processus, lancé au premier accès de n'importe quelle instance.
+    """
+
+    _purge_thread: Optional[threading.Thread] = None
+    _stop_event = threading.Event()
+    _start_lock = threading.Lock()
+
+    def __init__(self, namespace: str = '', purge_interval: int = PURGE_INTERVAL):
+        self.namespace = namespace
+        self.purge_interval = purge_interval
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    def put(self, key: str, data: Dict[str, Any], ttl: int) -> bool:
+        self._ensure_purger()
+        with db_manager.get_session() as db:
+            db.add(OAuthSession(
+                state=self._key(key),
+                data=json.dumps(data, default=str),
+                expires_at=datetime.now() + timedelta(seconds=ttl)
+            ))
+        return True
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with db_manager.get_session() as db:
+            row = db.query(OAuthSession.data).filter(
+                OAuthSession.state == self._key(key),
+                OAuthSession.expires_at > datetime.now()
+            ).first()
+        return json.loads(row[0]) if row else None
+
+    def update(self, key: str, data: Dict[str, Any]) -> bool:
+        with db_manager.get_session() as db:
+            updated = db.query(OAuthSession).filter(
+                OAuthSession.state == self._key(key)
+            ).update({OAuthSession.data: json.dumps(data, default=str)}, synchronize_session=False)
+        return updated > 0
+
+    def pop(self, key: str) -> Optional[Dict[str, Any]]:
+        with db_manager.get_session() as db:
+            row = db.query(OAuthSession.data, OAuthSession.expires_at).filter(
+                OAuthSession.state == self._key(key)
+            ).first()
+            if row is None:
+                return None
+            # Un seul worker gagne la suppression: les autres voient 0 ligne
+            deleted = db.query(OAuthSession).filter(
+                OAuthSession.state == self._key(key)
+            ).delete(synchronize_session=False)
+
+        if not deleted or row[1] <= datetime.now():
+            return None
+        return json.loads(row[0])
+
+    def delete(self, key: str) -> bool:
+        with db_manager.get_session() as db:
+            deleted = db.query(OAuthSession).filter(
+                OAuthSession.state == self._key(key)
+            ).delete(synchronize_session=False)
+        return deleted > 0
+
+    def purge_expired(self) -> int:
+        with db_manager.get_session() as db:
+            deleted = db.query(OAuthSession).filter(
+                OAuthSession.expires_at < datetime.now()
+            ).delete(synchronize_session=False)
+
+        if deleted:
+            logger.info(f"🧹 {deleted} session(s)/état(s) OAuth expiré(s) supprimé(s)")
+        return deleted
+
+    def _ensure_purger(self):
+        cls = DatabaseStateStore
+        if cls._purge_thread is not None:
+            return
+
+        with cls._start_lock:
+            if cls._purge_thread is not None:
+                return
+
+            def purge_loop():
+                while not cls._stop_event.wait(self.purge_interval):
+                    try:
+                        self.purge_expired()
+                    except Exception as e:
+                        logger.error(f"❌ Erreur de purge des sessions OAuth: {e}")
+
+            cls._purge_thread = threading.Thread(target=purge_loop, daemon=True)
+            cls._purge_thread.start()
+
+    @classmethod
+    def stop_purger(cls):
+        cls._stop_event.set()
+
+
+def create_state_store(namespace: str = '', name: Optional[str] = None) -> StateStore:
+    """Construire le stockage configuré (STATE_STORE_BACKEND = database | memory)"""
+    name = (name or get_env_var('STATE_STORE_BACKEND', 'database')).lower()
+    if name == 'memory':
+        return MemoryStateStore(namespace)
+    return DatabaseStateStore(namespace)
@@ -0,0 +1,258 @@
+"""
+Enregistreur de vol des tâches de collecte
+Chaque tâche du scheduler ouvre une trace; les phases des collecteurs (token, quota,
+appels HTTP, transformation, stockage, attentes) y ajoutent des spans horodatés.
+À la fin, seules les traces des N tâches les plus lentes et des dernières tâches en échec
+sont conservées. Sans trace active (ou traçage désactivé), un span coûte une lecture
+de ContextVar et ne crée aucun objet.
+Une même trace peut être partagée par plusieurs threads (contexte copié pour un pool):
+la profondeur des spans est propre à chaque fil d'exécution et les ajouts sont verrouillés.
+"""
+
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from .config import get_env_var, get_env_int
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = get_env_var('TASK_TRACING_ENABLED', 'true').lower() == 'true'
+MAX_SPANS = get_env_int('TASK_TRACE_MAX_SPANS', 500)
+KEEP_SLOWEST = get_env_int('TASK_TRACE_KEEP_SLOWEST', 20)
+KEEP_FAILED = get_env_int('TASK_TRACE_KEEP_FAILED', 50)
+
+_current_trace: contextvars.ContextVar[Optional['TaskTrace']] = contextvars.ContextVar('task_trace', default=None)
+# Profondeur des spans ouverts dans ce fil d'exécution (thread ou tâche asyncio)
+_current_depth: contextvars.ContextVar[int] = contextvars.ContextVar('task_trace_depth', default=0)
+
+
+class TaskTrace:
+    """Trace d'une tâche: spans bornés + totaux par phase (toujours complets)"""
+    __slots__ = ('task_id', 'metadata', 'started_at', 'start', 'duration', 'status', 'error',
+                 'spans', 'dropped', 'phases', 'max_spans', '_lock')
+
+    def __init__(self, task_id: str, metadata: Dict[str, Any], max_spans: int = MAX_SPANS):
+        self.task_id = task_id
+        self.metadata = metadata
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.status = 'running'
+        self.error = None
+        self.spans: List[tuple] = []   # (phase, début relatif, durée, profondeur, détail, erreur)
+        self.dropped = 0
+        self.phases: Dict[str, List[float]] = {}   # phase -> [nombre, durée totale]
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, start: float, duration: float, depth: int,
+            detail: Optional[str] = None, error: Optional[str] = None):
+        with self._lock:
+            totals = self.phases.get(phase)
+            if totals is None:
+                totals = self.phases[phase] = [0, 0.0]
+            totals[0] += 1
+            totals[1] += duration
+
+            if len(self.spans) < self.max_spans:
+                self.spans.append((phase, start - self.start, duration, depth, detail, error))
+            else:
+                self.dropped += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = {phase: tuple(totals) for phase, totals in self.phases.items()}
+            spans = list(self.spans)
+            dropped = self.dropped
+        return {
+            'task_id': self.task_id,
+            **self.metadata,
+            'started_at': self.started_at.isoformat(),
+            'duration': round(self.duration, 4),
+            'status': self.status,
+            'error': self.error,
+            'phases': {
+                phase: {'count': int(count), 'total': round(total, 4)}
+                for phase, (count, total) in sorted(phases.items(), key=lambda item: -item[1][1])
+            },
+            'spans': [
+                {
+                    'phase': phase, 'offset': round(offset, 4), 'duration': round(duration, 4),
+                    'depth': depth, 'detail': detail, 'error': error
+                }
+                # Enregistrés à la fermeture: remis dans l'ordre de début
+                for phase, offset, duration, depth, detail, error in sorted(spans, key=lambda item: item[1])
+            ],
+            'spans_dropped': dropped
+        }
+
+
+class _Span:
+    """Span actif (créé seulement quand une trace est en cours)"""
+    __slots__ = ('trace', 'phase', 'detail', 'start', 'depth')
+
+    def __init__(self, trace: TaskTrace, phase: str, detail: Optional[str]):
+        self.trace = trace
+        self.phase = phase
+        self.detail = detail
+
+    def __enter__(self):
+        self.depth = _current_depth.get()
+        _current_depth.set(self.depth + 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current_depth.set(self.depth)
+        self.trace.add(self.phase, self.start, duration, self.depth, self.detail,
+                       f"{exc_type.__name__}: {exc}" if exc_type else None)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(phase: str, detail: Optional[str] = None):
+    """Mesurer un bloc: with span('store', 'posts'): ..."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, phase, detail)
+
+
+def traced(phase: str):
+    """Décorateur: la méthode entière est un span de la phase donnée"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            with _Span(trace, phase, func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def traced_sleep(seconds: float, reason: str = 'throttle'):
+    """time.sleep comptabilisé comme attente dans la trace courante"""
+    trace = _current_trace.get()
+    if trace is None:
+        time.sleep(seconds)
+        return
+    with _Span(trace, 'sleep', reason):
+        time.sleep(seconds)
+
+
+def record_http_response(response, *args, **kwargs):
+    """Hook de réponse (requests ou httpx): span 'http' reconstitué à partir de response.elapsed"""
+    trace = _current_trace.get()
+    if trace is not None:
+        try:
+            elapsed = response.elapsed.total_seconds()
+            # Chemin seul: les paramètres peuvent contenir un access_token
+            path = urlsplit(str(response.request.url)).path
+            trace.add('http', time.perf_counter() - elapsed, elapsed, _current_depth.get(),
+                      f"{response.request.method} {path} {response.status_code}")
+        except Exception:
+            pass
+    return response
+
+
+class FlightRecorder:
+    """Conserve les traces des tâches les plus lentes et des tâches en échec"""
+
+    def __init__(self, keep_slowest: int = KEEP_SLOWEST, keep_failed: int = KEEP_FAILED,
+                 enabled: bool = TRACING_ENABLED):
+        self.enabled = enabled
+        self.keep_slowest = keep_slowest
+        self._slowest: List[tuple] = []   # tas min: (durée, séquence, trace)
+        self._failed = deque(maxlen=keep_failed)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {'traced': 0, 'kept_slow': 0, 'kept_failed': 0}
+
+    def begin(self, task_id: str, **metadata) -> Optional[contextvars.Token]:
+        """Ouvrir la trace d'une tâche dans le contexte courant (None si désactivé)"""
+        if not self.enabled:
+            return None
+        return _current_trace.set(TaskTrace(task_id, metadata))
+
+    def end(self, token: Optional[contextvars.Token], status: str, error: Optional[str] = None):
+        """Clore la trace ouverte par begin et la conserver si elle est lente ou en échec"""
+        if token is None:
+            return
+        trace = _current_trace.get()
+        _current_trace.reset(token)
+        if trace is None:
+            return
+
+        trace.duration = time.perf_counter() - trace.start
+        trace.status = status
+        trace.error = error
+
+        with self._lock:
+            self.stats['traced'] += 1
+            if error or status in ('failed', 'timeout'):
+                self._failed.append(trace)
+                self.stats['kept_failed'] += 1
+            elif self.keep_slowest > 0:
+                entry = (trace.duration, next(self._sequence), trace)
+                if len(self._slowest) < self.keep_slowest:
+                    heapq.heappush(self._slowest, entry)
+                    self.stats['kept_slow'] += 1
+                elif trace.duration > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, entry)
+                    self.stats['kept_slow'] += 1
+
+    def current(self) -> Optional[TaskTrace]:
+        return _current_trace.get()
+
+    def snapshot(self, include_spans: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            slowest = [trace for _, _, trace in sorted(self._slowest, reverse=True)]
+            failed = list(reversed(self._failed))
+
+        def render(trace: TaskTrace) -> Dict[str, Any]:
+            data = trace.to_dict()
+            if not include_spans:
+                data.pop('spans')
+            return data
+
+        return {
+            'enabled': self.enabled,
+            'stats': dict(self.stats),
+            'slowest': [render(trace) for trace in slowest],
+            'failed': [render(trace) for trace in failed]
+        }
+
+    def clear(self):
+        with self._lock:
+            self._slowest.clear()
+            self._failed.clear()
+
+
+# Instance globale du processus
+flight_recorder = FlightRecorder()
@@ -0,0 +1,12 @@
+"""
+Benchmark hors ligne: serveur simulé (LinkedIn REST, Facebook Graph, Google Sheets v4)
+et suites qui exécutent le vrai code de l'application contre lui
+"""
+
+from .mock_servers import MockConfig, MockPlatformServer
+from .routing import (
+    MockRoutingAdapter, MockRoutingTransport, route_platform_runtime, route_session, routed_session
+)
+
+__all__ = ['MockConfig', 'MockPlatformServer', 'MockRoutingAdapter', 'MockRoutingTransport',
+           'route_platform_runtime', 'route_session', 'routed_session']
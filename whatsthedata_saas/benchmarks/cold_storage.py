@@ -0,0 +1,188 @@
+"""
+Benchmark du tier froid: lecture d'un historique pluriannuel en base ou en Parquet
+Remplit les jours collectés de page_statistics_rollups (comptes × jours) dans une base
+temporaire, compacte les mois clos avec ColdStorage (non durable: les lignes restent en base),
+puis compare pour chaque compte la lecture de toute la période depuis la base et depuis les
+fichiers Parquet: temps de scan et occupation disque.
+
+Usage (depuis whatsthedata_saas/):
+    python -m benchmarks.cold_storage
+    python -m benchmarks.cold_storage --accounts 50 --days 1095 --json froid.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .run import StatementCounter, prepare_environment, setup_database
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'page_statistics_rollups'
+
+
+def seed_rows(accounts: int, days: int, end_date: date, seed: int = 7) -> int:
+    """Statistiques de page quotidiennes fictives, insérées par lots"""
+    from app.database.connection import db_manager
+    from app.database.models import Base
+
+    table = Base.metadata.tables[TABLE]
+    rng = random.Random(seed)
+    inserted = 0
+    with db_manager.engine.begin() as conn:
+        for account in range(accounts):
+            organization_id = f"bench-org-{account}"
+            batch: List[Dict[str, Any]] = []
+            for offset in range(days):
+                day = end_date - timedelta(days=offset)
+                views = rng.randint(50, 5000)
+                desktop = rng.randint(0, views)
+                batch.append({
+                    'platform': 'linkedin',
+                    'account_id': organization_id,
+                    'granularity': 'day',
+                    'period_start': day,
+                    'day_count': 1,
+                    'total_page_views': views,
+                    'unique_page_views': int(views * 0.6),
+                    'desktop_page_views': desktop,
+                    'mobile_page_views': views - desktop,
+                    'overview_page_views': views // 2,
+                    'careers_page_views': views // 10,
+                    'about_page_views': views // 10,
+                    'people_page_views': views // 20,
+                    'jobs_page_views': views // 20,
+                    'life_at_page_views': views // 50,
+                    'updated_at': datetime.combine(day, datetime.min.time()),
+                })
+            conn.execute(table.insert(), batch)
+            inserted += len(batch)
+    return inserted
+
+
+def row_store_bytes(engine) -> Optional[int]:
+    """Octets occupés par la table et ses index (dbstat SQLite, pg_total_relation_size PostgreSQL)"""
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        try:
+            if engine.dialect.name == 'postgresql':
+                return conn.execute(text("SELECT pg_total_relation_size(:name)"), {'name': TABLE}).scalar()
+            if engine.dialect.name == 'sqlite':
+                return conn.execute(text(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name = :name OR name IN "
+                    "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :name)"
+                ), {'name': TABLE}).scalar()
+        except Exception as e:
+            logger.warning(f"⚠️  Taille de la table indisponible: {e}")
+    return None
+
+
+def run(accounts: int, days: int, repeat: int) -> Dict[str, Any]:
+    from app.database.cold_storage import cold_storage
+    from app.database.connection import db_manager
+
+    if not cold_storage.available:
+        return {'skipped': 'pyarrow absent'}
+    # Comparaison base/Parquet: les lignes compactées doivent rester en base
+    cold_storage.durable = False
+
+    # Période entièrement close: tous les mois sont archivables
+    end_date = cold_storage.horizon() - timedelta(days=1)
+    start_date = end_date - timedelta(days=days - 1)
+    rows = seed_rows(accounts, days, end_date)
+
+    started = time.perf_counter()
+    cold_storage.compact()
+    compact_seconds = time.perf_counter() - started
+
+    organization_ids = [f"bench-org-{account}" for account in range(accounts)]
+
+    def timed(read) -> float:
+        timings = []
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            scanned = sum(len(read(organization_id)) for organization_id in organization_ids)
+            timings.append(time.perf_counter() - started)
+            assert scanned == rows, f"{scanned} lignes lues pour {rows} insérées"
+        return sorted(timings)[len(timings) // 2]
+
+    row_store_seconds = timed(lambda organization_id: cold_storage.read_hot(
+        TABLE, 'linkedin', organization_id, start_date, end_date))
+    parquet_seconds = timed(lambda organization_id: cold_storage.read_archived(
+        TABLE, 'linkedin', organization_id, start_date, end_date))
+
+    footprint = cold_storage.footprint(TABLE)
+    return {
+        'accounts': accounts,
+        'days': days,
+        'rows': rows,
+        'compact_seconds': round(compact_seconds, 3),
+        'row_store_scan_seconds': round(row_store_seconds, 3),
+        'parquet_scan_seconds': round(parquet_seconds, 3),
+        'row_store_bytes': row_store_bytes(db_manager.engine),
+        'parquet_bytes': footprint['bytes'],
+        'parquet_files': footprint['files'],
+    }
+
+
+def print_report(result: Dict[str, Any]):
+    if result.get('skipped'):
+        print(f"tier froid ignoré: {result['skipped']}")
+        return
+
+    def megabytes(value: Optional[int]) -> str:
+        return f"{value / 1024 / 1024:.2f} Mo" if value is not None else 'n/d'
+
+    print(f"{result['rows']} lignes ({result['accounts']} comptes × {result['days']} jours), "
+          f"{result['parquet_files']} fichiers Parquet, compactage {result['compact_seconds']:.2f}s")
+    print(f"{'':<12}{'scan(s)':>10}{'disque':>14}")
+    print(f"{'base':<12}{result['row_store_scan_seconds']:>10.3f}{megabytes(result['row_store_bytes']):>14}")
+    print(f"{'parquet':<12}{result['parquet_scan_seconds']:>10.3f}{megabytes(result['parquet_bytes']):>14}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Tier froid Parquet contre base de lignes")
+    parser.add_argument('--accounts', type=int, default=5)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--repeat', type=int, default=3, help="lectures par stockage (temps médian retenu)")
+    parser.add_argument('--database-url', help="base du benchmark (SQLite temporaire par défaut)")
+    parser.add_argument('--json', dest='json_path', help="écrire les résultats dans un fichier JSON")
+    parser.add_argument('--verbose', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s', force=True)
+
+    workdir = tempfile.mkdtemp(prefix='wtd-cold-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    prepare_environment(database_url, workdir)
+    os.environ.setdefault('COLD_STORAGE_PATH', os.path.join(workdir, 'cold_storage'))
+
+    setup_database(database_url, StatementCounter())
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    result = run(args.accounts, args.days, args.repeat)
+    print_report(result)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as handle:
+            json.dump({'generated_at': datetime.utcnow().isoformat(), 'result': result}, handle,
+                      indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans {args.json_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,717 @@
+"""
+Serveur local imitant les API utilisées par l'application
+- LinkedIn REST (/linkedin/rest/...)
+- Facebook Graph (/graph/v21.0/...)
+- Google Sheets v4 (/sheets/v4/spreadsheets/...)
+Latence, réponses 429, pagination et taille des payloads sont configurables; les GET portent
+un ETag et répondent 304 à If-None-Match. Les réponses sont déterministes (graine fixe) pour
+que deux exécutions du benchmark soient comparables.
+Bibliothèque standard uniquement.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+
+logger = logging.getLogger(__name__)
+
+PLATFORMS = ('linkedin', 'graph', 'sheets')
+
+# Hôtes réels -> préfixe du serveur local
+UPSTREAM_HOSTS = {
+    'https://api.linkedin.com': '/linkedin',
+    'https://graph.facebook.com': '/graph',
+    'https://sheets.googleapis.com': '/sheets',
+}
+
+LINKEDIN_ORG_BASE = 9_000_000
+FACEBOOK_PAGE_BASE = 100_000_000_000_000
+
+COMPANY_SIZES = ['SIZE_1', 'SIZE_2_TO_10', 'SIZE_11_TO_50', 'SIZE_51_TO_200', 'SIZE_201_TO_500',
+                 'SIZE_501_TO_1000', 'SIZE_1001_TO_5000', 'SIZE_5001_TO_10000', 'SIZE_10001_OR_MORE']
+REACTIONS = ['LIKE', 'CELEBRATE', 'LOVE', 'INSIGHTFUL', 'SUPPORT', 'FUNNY']
+
+
+@dataclass
+class MockConfig:
+    """Paramètres du serveur simulé"""
+    accounts: int = 3                  # organisations LinkedIn et pages Facebook
+    posts_per_account: int = 120
+    page_size: int = 100               # éléments max par page (LinkedIn count, Graph limit)
+    text_bytes: int = 600              # taille du texte des posts
+    latency_ms: float = 20.0
+    jitter_ms: float = 5.0
+    rate_limit_every: int = 0          # chaque N-ième requête d'une plateforme reçoit un 429 (0 = jamais)
+    retry_after: int = 0               # valeur de l'en-tête Retry-After des 429
+    app_usage_percent: int = 5         # X-App-Usage renvoyé par Graph
+    functions: int = 26
+    industries: int = 40
+    seniorities: int = 10
+    seed: int = 42
+
+    def organization_ids(self) -> List[str]:
+        return [str(LINKEDIN_ORG_BASE + index) for index in range(self.accounts)]
+
+    def page_ids(self) -> List[str]:
+        return [str(FACEBOOK_PAGE_BASE + index) for index in range(self.accounts)]
+
+
+class MockPlatformServer:
+    """Serveur HTTP local (un thread par connexion, keep-alive HTTP/1.1)"""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or MockConfig()
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.spreadsheets: Dict[str, Dict[str, Any]] = {}
+        self.reset_stats()
+
+    # ========================================
+    # CYCLE DE VIE
+    # ========================================
+
+    def start(self) -> 'MockPlatformServer':
+        handler = _make_handler(self)
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"✅ Serveur simulé démarré sur {self.base_url}")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def url_for(self, upstream: str) -> str:
+        """URL locale équivalente à une URL réelle (https://api.linkedin.com/rest -> http://.../linkedin/rest)"""
+        for host, prefix in UPSTREAM_HOSTS.items():
+            if upstream.startswith(host):
+                return self.base_url + prefix + upstream[len(host):]
+        return upstream
+
+    # ========================================
+    # STATISTIQUES
+    # ========================================
+
+    def reset_stats(self):
+        with self._lock:
+            self._counters = dict.fromkeys(PLATFORMS, 0)
+            self.stats = {
+                platform: {'requests': 0, 'rate_limited': 0, 'not_modified': 0, 'errors': 0, 'bytes_sent': 0}
+                for platform in PLATFORMS
+            }
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {platform: dict(values) for platform, values in self.stats.items()}
+
+    def _admit(self, platform: str) -> bool:
+        """Compter la requête; False si elle doit recevoir un 429"""
+        with self._lock:
+            self._counters[platform] += 1
+            self.stats[platform]['requests'] += 1
+            every = self.config.rate_limit_every
+            limited = every > 0 and self._counters[platform] % every == 0
+            if limited:
+                self.stats[platform]['rate_limited'] += 1
+            return not limited
+
+    def _sent(self, platform: str, size: int, status: int):
+        with self._lock:
+            self.stats[platform]['bytes_sent'] += size
+            if status == 304:
+                self.stats[platform]['not_modified'] += 1
+            if status >= 400 and status != 429:
+                self.stats[platform]['errors'] += 1
+
+    def _delay(self):
+        latency = self.config.latency_ms
+        if self.config.jitter_ms:
+            latency += random.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000.0)
+
+    # ========================================
+    # DONNÉES GÉNÉRÉES
+    # ========================================
+
+    def _rng(self, *key) -> random.Random:
+        """Générateur stable pour une ressource (même réponse à chaque appel)"""
+        return random.Random(f"{self.config.seed}:{':'.join(str(part) for part in key)}")
+
+    def _text(self, rng: random.Random) -> str:
+        words = ('analytics', 'linkedin', 'croissance', 'audience', 'engagement', 'données',
+                 'marketing', 'lancement', 'équipe', 'produit', 'clients', 'webinar')
+        parts, size = [], 0
+        while size < self.config.text_bytes:
+            word = rng.choice(words)
+            parts.append(word)
+            size += len(word) + 1
+        return ' '.join(parts)
+
+    def _post_created_ms(self, index: int) -> int:
+        """Posts espacés de 18h en remontant depuis maintenant"""
+        return int((time.time() - index * 18 * 3600) * 1000)
+
+
+# ========================================
+# LINKEDIN REST
+# ========================================
+
+def _linkedin(server: MockPlatformServer, method: str, path: str, query: Dict[str, str],
+              body: Optional[Dict]) -> Tuple[int, Any, Dict[str, str]]:
+    config = server.config
+    headers = {
+        'X-RateLimit-Limit': '100000',
+        'X-RateLimit-Remaining': '99000',
+        'X-RateLimit-Reset': str(int(time.time()) + 3600),
+    }
+
+    if path == '/rest/me':
+        return 200, {'id': 'mock-member', 'localizedFirstName': 'Bench', 'localizedLastName': 'Mark'}, headers
+
+    if path == '/rest/organizations' or path.startswith('/rest/organizations/'):
+        org_id = _organization_id(query.get('organizationalEntity') or path.rsplit('/', 1)[-1])
+        rng = server._rng('org', org_id)
+        organization = {
+            'id': int(org_id) if org_id.isdigit() else org_id,
+            'name': {'localized': {'en_US': f"Organisation {org_id}"}},
+            'description': {'localized': {'en_US': server._text(rng)}},
+            'website': f"https://example.com/{org_id}",
+            'industry': 'Software Development',
+            'companySize': rng.choice(COMPANY_SIZES),
+            'headquarters': {'localized': {'en_US': 'Paris'}},
+            'founded': 2010,
+            'logoV2': {'original': f"urn:li:digitalmediaAsset:{org_id}"},
+            'followerCount': rng.randint(500, 50000),
+        }
+        if path.startswith('/rest/organizations/'):
+            return 200, organization, headers
+        return 200, {'elements': [organization]}, headers
+
+    if path.startswith('/rest/networkSizes'):
+        org_id = _organization_id(unquote(path.rsplit('/', 1)[-1]))
+        return 200, {'firstDegreeSize': server._rng('org', org_id).randint(500, 50000)}, headers
+
+    if path == '/rest/organizationalEntityFollowerStatistics':
+        org_id = _organization_id(query.get('organizationalEntity', ''))
+        return 200, {'elements': [_follower_statistics(server, org_id)]}, headers
+
+    if path == '/rest/posts':
+        org_id = _organization_id(query.get('author', ''))
+        start = int(query.get('start', 0))
+        count = min(int(query.get('count', 10)), config.page_size)
+        total = config.posts_per_account
+        elements = [_linkedin_post(server, org_id, index) for index in range(start, min(start + count, total))]
+        return 200, {'elements': elements, 'paging': {'start': start, 'count': count, 'total': total}}, headers
+
+    if path == '/rest/dmaInstantReposts':
+        org_id = _organization_id(query.get('author', ''))
+        elements = [
+            {
+                'id': f"urn:li:instantRepost:{org_id}{index:04d}",
+                'createdAt': server._post_created_ms(index * 5 + 2),
+                'originalPost': f"urn:li:share:{org_id}{index:05d}",
+            }
+            for index in range(max(1, config.posts_per_account // 20))
+        ]
+        return 200, {'elements': elements}, headers
+
+    if path == '/rest/organizationalEntityShareStatistics':
+        share = query.get('shares', '')
+        rng = server._rng('share', share)
+        stats = {
+            'impressionCount': rng.randint(200, 20000),
+            'uniqueImpressionCount': rng.randint(100, 15000),
+            'clickCount': rng.randint(0, 800),
+            'shareCount': rng.randint(0, 60),
+            'commentCount': rng.randint(0, 90),
+            'likeCount': rng.randint(0, 500),
+            'engagement': round(rng.uniform(0.005, 0.12), 4),
+        }
+        return 200, {'elements': [{**stats, 'totalShareStatistics': stats,
+                                   'organizationalEntity': query.get('organizationalEntity')}]}, headers
+
+    if path.startswith('/rest/socialActions/'):
+        post_urn = unquote(path[len('/rest/socialActions/'):])
+        rng = server._rng('social', post_urn)
+        likes, comments = rng.randint(0, 500), rng.randint(0, 90)
+        return 200, {
+            'likesSummary': {'totalLikes': likes, 'likedByCurrentUser': False},
+            'commentsSummary': {'totalFirstLevelComments': comments, 'aggregatedTotalComments': comments,
+                                'totalComments': comments},
+            'impressionCount': rng.randint(200, 20000), 'clickCount': rng.randint(0, 800),
+            'shareCount': rng.randint(0, 60), 'commentCount': comments,
+            'likeCount': likes, 'reactionCount': likes + rng.randint(0, 100),
+            'target': post_urn,
+        }, headers
+
+    if path.startswith('/rest/socialMetadata/'):
+        post_urn = unquote(path[len('/rest/socialMetadata/'):])
+        rng = server._rng('metadata', post_urn)
+        return 200, {
+            'reactionSummaries': {reaction: {'reactionType': reaction, 'count': rng.randint(0, 200)}
+                                  for reaction in REACTIONS},
+            'reactions': {reaction.lower(): {'count': rng.randint(0, 200)} for reaction in REACTIONS},
+            'commentsState': 'OPEN',
+            'entity': post_urn,
+        }, headers
+
+    if path == '/rest/organizationPageStatistics':
+        org_id = _organization_id(query.get('organization', ''))
+        # Granularité DAY: un élément par jour de l'intervalle (mêmes valeurs qu'une demande jour par jour)
+        day_ms = 86400 * 1000
+        start = int(query.get('timeIntervals.timeRange.start') or 0)
+        end = int(query.get('timeIntervals.timeRange.end') or start + day_ms)
+        elements = []
+        for day_start in range(start, max(end, start + 1), day_ms):
+            rng = server._rng('pagestats', org_id, str(day_start))
+            views = rng.randint(50, 5000)
+            elements.append({
+                'organization': f"urn:li:organization:{org_id}",
+                'timeRange': {'start': day_start, 'end': day_start + day_ms},
+                'totalPageStatistics': {'views': {
+                    'allPageViews': {'pageViews': views, 'uniquePageViews': int(views * 0.7)},
+                    'desktopPageViews': {'pageViews': int(views * 0.6)},
+                    'mobilePageViews': {'pageViews': int(views * 0.4)},
+                }},
+            })
+        return 200, {'elements': elements}, headers
+
+    return 404, {'status': 404, 'message': f"Ressource simulée inconnue: {path}"}, headers
+
+
+def _organization_id(value: str) -> str:
+    value = unquote(value or '')
+    return value.rsplit(':', 1)[-1] if ':' in value else value
+
+
+def _linkedin_post(server: MockPlatformServer, org_id: str, index: int) -> Dict[str, Any]:
+    rng = server._rng('post', org_id, index)
+    content = rng.choice([{}, {'media': {'id': f"urn:li:image:{org_id}{index}"}},
+                          {'article': {'source': 'https://example.com/article'}}])
+    return {
+        'id': f"urn:li:share:{org_id}{index:05d}",
+        'author': f"urn:li:organization:{org_id}",
+        'commentary': server._text(rng),
+        'content': content,
+        'contentType': 'ARTICLE' if 'article' in content else 'IMAGE' if 'media' in content else 'TEXT',
+        'createdAt': server._post_created_ms(index),
+        'lastModifiedAt': server._post_created_ms(index),
+        'lifecycleState': 'PUBLISHED',
+        'visibility': 'PUBLIC',
+        'distribution': {'feedDistribution': 'MAIN_FEED'},
+    }
+
+
+def _follower_statistics(server: MockPlatformServer, org_id: str) -> Dict[str, Any]:
+    """Élément de organizationalEntityFollowerStatistics (format API et format lu par le collecteur)"""
+    config = server.config
+    rng = server._rng('followers', org_id)
+
+    def counts():
+        organic = rng.randint(0, 2000)
+        return {'organicFollowerCount': organic, 'paidFollowerCount': rng.randint(0, organic // 10 + 1)}
+
+    by_size = [{'staffCountRange': size, 'followerCounts': counts()} for size in COMPANY_SIZES]
+    by_function = [{'function': f"urn:li:function:{index + 1}", 'followerCounts': counts()}
+                   for index in range(config.functions)]
+    by_seniority = [{'seniority': f"urn:li:seniority:{index + 1}", 'followerCounts': counts()}
+                    for index in range(config.seniorities)]
+    by_industry = [{'industry': f"urn:li:industry:{index + 1}", 'followerCounts': counts()}
+                   for index in range(config.industries)]
+
+    def flat(items, key):
+        return [{key: item[next(iter(item))], 'followerCounts': sum(item['followerCounts'].values())}
+                for item in items]
+
+    return {
+        'organizationalEntity': f"urn:li:organization:{org_id}",
+        'followerCountsByStaffCountRange': by_size,
+        'followerCountsByFunction': by_function,
+        'followerCountsBySeniority': by_seniority,
+        'followerCountsByIndustry': by_industry,
+        'followerCounts': {
+            'companySizes': flat(by_size, 'companySize'),
+            'functions': flat(by_function, 'function'),
+            'industries': flat(by_industry, 'industry'),
+            'seniorities': flat(by_seniority, 'seniority'),
+        },
+    }
+
+
+# ========================================
+# FACEBOOK GRAPH
+# ========================================
+
+def _graph(server: MockPlatformServer, method: str, path: str, query: Dict[str, str],
+           body: Optional[Dict]) -> Tuple[int, Any, Dict[str, str]]:
+    config = server.config
+    headers = {
+        'X-App-Usage': json.dumps({'call_count': config.app_usage_percent, 'total_time': 1, 'total_cputime': 1}),
+        'X-Business-Use-Case-Usage': '{}',
+    }
+
+    parts = [part for part in path.split('/') if part]
+    if parts and re.match(r'^v\d+\.\d+$', parts[0]):
+        version, parts = parts[0], parts[1:]
+    else:
+        version = 'v21.0'
+
+    if parts == ['me']:
+        return 200, {'id': 'mock-user', 'name': 'Bench Mark'}, headers
+
+    if parts == ['me', 'accounts']:
+        return 200, {'data': [
+            {'id': page_id, 'name': f"Page {page_id}", 'access_token': f"page-token-{page_id}",
+             'category': 'Software', 'tasks': ['ANALYZE', 'CREATE_CONTENT']}
+            for page_id in config.page_ids()
+        ]}, headers
+
+    if len(parts) == 1:
+        page_id = parts[0]
+        rng = server._rng('page', page_id)
+        return 200, {
+            'id': page_id, 'name': f"Page {page_id}", 'username': f"page{page_id[-4:]}",
+            'category': 'Software', 'about': server._text(rng)[:255], 'description': server._text(rng),
+            'website': f"https://example.com/{page_id}", 'link': f"https://facebook.com/{page_id}",
+            'picture': {'data': {'url': f"https://cdn.example.com/{page_id}.jpg"}},
+            'cover': {'source': f"https://cdn.example.com/{page_id}-cover.jpg"},
+            'talking_about_count': rng.randint(0, 500), 'fan_count': rng.randint(100, 80000),
+            'followers_count': rng.randint(100, 90000),
+        }, headers
+
+    if len(parts) == 2 and parts[1] == 'insights':
+        object_id = parts[0]
+        metrics = [metric for metric in query.get('metric', '').split(',') if metric]
+        period = query.get('period', 'day')
+        if '_' in object_id or period == 'lifetime':
+            days = [None]
+        else:
+            days = _date_range(query.get('since'), query.get('until'))
+        data = []
+        for metric in metrics:
+            values = []
+            for day in days:
+                rng = server._rng('insight', object_id, metric, day)
+                value: Any = rng.randint(0, 5000)
+                if metric.endswith('_by_paid_non_paid_unique'):
+                    value = {'total': value, 'paid': value // 10, 'unpaid': value - value // 10}
+                entry = {'value': value}
+                if day is not None:
+                    entry['end_time'] = f"{day.isoformat()}T07:00:00+0000"
+                values.append(entry)
+            data.append({'name': metric, 'period': period, 'values': values,
+                         'title': metric, 'id': f"{object_id}/insights/{metric}/{period}"})
+        return 200, {'data': data, 'paging': {}}, headers
+
+    if len(parts) == 2 and parts[1] in ('posts', 'feed', 'published_posts'):
+        page_id = parts[0]
+        limit = min(int(query.get('limit', 25)), config.page_size)
+        offset = int(query.get('after', 0) or 0)
+        total = config.posts_per_account
+        posts = [_graph_post(server, page_id, index) for index in range(offset, min(offset + limit, total))]
+        result: Dict[str, Any] = {'data': posts}
+        if offset + limit < total:
+            next_query = {key: value for key, value in query.items() if key != 'after'}
+            next_query['after'] = str(offset + limit)
+            result['paging'] = {
+                'cursors': {'before': str(offset), 'after': str(offset + limit)},
+                # URL publique: le client la suit comme une vraie page suivante
+                'next': f"https://graph.facebook.com/{version}/{page_id}/{parts[1]}?{urlencode(next_query)}",
+            }
+        return 200, result, headers
+
+    return 404, {'error': {'message': f"Unsupported get request: {path}", 'type': 'GraphMethodException',
+                           'code': 100, 'error_subcode': 33}}, headers
+
+
+def _date_range(since: Optional[str], until: Optional[str]) -> List[date]:
+    try:
+        start = datetime.strptime(since, '%Y-%m-%d').date() if since else date.today() - timedelta(days=30)
+        end = datetime.strptime(until, '%Y-%m-%d').date() if until else date.today()
+    except ValueError:
+        start, end = date.today() - timedelta(days=30), date.today()
+    days = []
+    current = start
+    while current <= end and len(days) < 400:
+        days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+def _graph_post(server: MockPlatformServer, page_id: str, index: int) -> Dict[str, Any]:
+    rng = server._rng('fbpost', page_id, index)
+    created = datetime.utcfromtimestamp(server._post_created_ms(index) / 1000)
+    return {
+        'id': f"{page_id}_{index:06d}",
+        'created_time': created.strftime('%Y-%m-%dT%H:%M:%S+0000'),
+        'message': server._text(rng),
+        'status_type': rng.choice(['added_photos', 'shared_story', 'mobile_status_update']),
+        'permalink_url': f"https://facebook.com/{page_id}/posts/{index}",
+        'full_picture': f"https://cdn.example.com/{page_id}/{index}.jpg",
+        'from': {'name': f"Page {page_id}", 'id': page_id},
+        'type': 'photo',
+        'attachments': {'data': [{'type': 'photo', 'media_type': 'photo', 'url': 'https://example.com'}]},
+        'comments': {'data': [], 'summary': {'total_count': rng.randint(0, 80)}},
+        'likes': {'data': [], 'summary': {'total_count': rng.randint(0, 400)}},
+        'shares': {'count': rng.randint(0, 40)},
+    }
+
+
+# ========================================
+# GOOGLE SHEETS V4
+# ========================================
+
+def _sheets(server: MockPlatformServer, method: str, path: str, query: Dict[str, str],
+            body: Optional[Dict]) -> Tuple[int, Any, Dict[str, str]]:
+    match = re.match(r'^/v4/spreadsheets/([^/:]+)(.*)$', path)
+    if not match:
+        return 404, _sheets_error(404, 'Requested entity was not found.'), {}
+
+    spreadsheet_id, rest = match.group(1), match.group(2)
+    with server._lock:
+        spreadsheet = server.spreadsheets.setdefault(spreadsheet_id, _new_spreadsheet(spreadsheet_id))
+
+        if rest == '' and method == 'GET':
+            return 200, _spreadsheet_metadata(spreadsheet), {}
+
+        if rest == ':batchUpdate' and method == 'POST':
+            replies = [_apply_sheet_request(spreadsheet, request) for request in (body or {}).get('requests', [])]
+            return 200, {'spreadsheetId': spreadsheet_id, 'replies': replies}, {}
+
+        if rest.startswith('/values'):
+            return _values(spreadsheet, method, rest[len('/values'):], body)
+
+    return 404, _sheets_error(404, 'Requested entity was not found.'), {}
+
+
+def _sheets_error(code: int, message: str) -> Dict[str, Any]:
+    status = {404: 'NOT_FOUND', 429: 'RESOURCE_EXHAUSTED', 400: 'INVALID_ARGUMENT'}.get(code, 'UNKNOWN')
+    return {'error': {'code': code, 'message': message, 'status': status}}
+
+
+def _new_spreadsheet(spreadsheet_id: str) -> Dict[str, Any]:
+    return {'id': spreadsheet_id, 'title': f"Bench {spreadsheet_id}", 'next_sheet_id': 1,
+            'sheets': [{'sheetId': 0, 'title': 'Sheet1', 'rows': 1000, 'cols': 26}],
+            'values': {}, 'cells_written': 0}
+
+
+def _spreadsheet_metadata(spreadsheet: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'spreadsheetId': spreadsheet['id'],
+        'properties': {'title': spreadsheet['title'], 'locale': 'fr_FR', 'timeZone': 'Europe/Paris'},
+        'sheets': [
+            {'properties': {'sheetId': sheet['sheetId'], 'title': sheet['title'], 'index': index,
+                            'sheetType': 'GRID',
+                            'gridProperties': {'rowCount': sheet['rows'], 'columnCount': sheet['cols']}}}
+            for index, sheet in enumerate(spreadsheet['sheets'])
+        ],
+        'spreadsheetUrl': f"https://docs.google.com/spreadsheets/d/{spreadsheet['id']}/edit",
+    }
+
+
+def _apply_sheet_request(spreadsheet: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+    if 'addSheet' in request:
+        properties = request['addSheet'].get('properties', {})
+        grid = properties.get('gridProperties', {})
+        sheet = {'sheetId': spreadsheet['next_sheet_id'], 'title': properties.get('title', 'Sheet'),
+                 'rows': grid.get('rowCount', 1000), 'cols': grid.get('columnCount', 26)}
+        spreadsheet['next_sheet_id'] += 1
+        spreadsheet['sheets'].append(sheet)
+        return {'addSheet': {'properties': {
+            'sheetId': sheet['sheetId'], 'title': sheet['title'], 'index': len(spreadsheet['sheets']) - 1,
+            'sheetType': 'GRID', 'gridProperties': {'rowCount': sheet['rows'], 'columnCount': sheet['cols']}
+        }}}
+
+    if 'updateSheetProperties' in request:
+        properties = request['updateSheetProperties'].get('properties', {})
+        for sheet in spreadsheet['sheets']:
+            if sheet['sheetId'] == properties.get('sheetId') and 'title' in properties:
+                spreadsheet['values'][properties['title']] = spreadsheet['values'].pop(sheet['title'], [])
+                sheet['title'] = properties['title']
+        return {}
+
+    if 'deleteSheet' in request:
+        sheet_id = request['deleteSheet'].get('sheetId')
+        spreadsheet['sheets'] = [sheet for sheet in spreadsheet['sheets'] if sheet['sheetId'] != sheet_id]
+        return {}
+
+    # repeatCell, updateCells, autoResizeDimensions...: formatage sans effet sur les valeurs
+    return {}
+
+
+def _values(spreadsheet: Dict[str, Any], method: str, rest: str,
+            body: Optional[Dict]) -> Tuple[int, Any, Dict[str, str]]:
+    if rest == ':batchUpdate' and method == 'POST':
+        responses = [_write_range(spreadsheet, item.get('range', ''), item.get('values', []))
+                     for item in (body or {}).get('data', [])]
+        return 200, {'spreadsheetId': spreadsheet['id'], 'responses': responses,
+                     'totalUpdatedCells': sum(r['updatedCells'] for r in responses)}, {}
+
+    if rest == ':batchClear' and method == 'POST':
+        for value_range in (body or {}).get('ranges', []):
+            spreadsheet['values'].pop(_sheet_title(value_range), None)
+        return 200, {'spreadsheetId': spreadsheet['id'], 'clearedRanges': (body or {}).get('ranges', [])}, {}
+
+    range_part, _, action = unquote(rest.lstrip('/')).partition(':')
+    title = _sheet_title(range_part)
+
+    if action == 'clear' and method == 'POST':
+        spreadsheet['values'].pop(title, None)
+        return 200, {'spreadsheetId': spreadsheet['id'], 'clearedRange': range_part}, {}
+
+    if action == 'append' and method == 'POST':
+        rows = (body or {}).get('values', [])
+        spreadsheet['values'].setdefault(title, []).extend(rows)
+        spreadsheet['cells_written'] += sum(len(row) for row in rows)
+        update = {'spreadsheetId': spreadsheet['id'], 'updatedRange': range_part,
+                  'updatedRows': len(rows), 'updatedColumns': max((len(row) for row in rows), default=0),
+                  'updatedCells': sum(len(row) for row in rows)}
+        return 200, {'spreadsheetId': spreadsheet['id'], 'tableRange': range_part, 'updates': update}, {}
+
+    if method == 'PUT':
+        return 200, _write_range(spreadsheet, range_part, (body or {}).get('values', [])), {}
+
+    if method == 'GET':
+        return 200, {'range': range_part, 'majorDimension': 'ROWS',
+                     'values': spreadsheet['values'].get(title, [])}, {}
+
+    return 400, _sheets_error(400, f"Requête non simulée: {method} values{rest}"), {}
+
+
+def _write_range(spreadsheet: Dict[str, Any], value_range: str, rows: List[List[Any]]) -> Dict[str, Any]:
+    spreadsheet['values'][_sheet_title(value_range)] = rows
+    cells = sum(len(row) for row in rows)
+    spreadsheet['cells_written'] += cells
+    return {'spreadsheetId': spreadsheet['id'], 'updatedRange': value_range, 'updatedRows': len(rows),
+            'updatedColumns': max((len(row) for row in rows), default=0), 'updatedCells': cells}
+
+
+def _sheet_title(value_range: str) -> str:
+    title = value_range.split('!', 1)[0] if '!' in value_range else value_range
+    return title.strip("'")
+
+
+# ========================================
+# HANDLER HTTP
+# ========================================
+
+_ROUTES = {'linkedin': _linkedin, 'graph': _graph, 'sheets': _sheets}
+
+
+def _make_handler(server: MockPlatformServer):
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self._dispatch('GET')
+
+        def do_POST(self):
+            self._dispatch('POST')
+
+        def do_PUT(self):
+            self._dispatch('PUT')
+
+        def _dispatch(self, method: str):
+            body = None
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                raw = self.rfile.read(length)
+                try:
+                    body = json.loads(raw)
+                except ValueError:
+                    body = None
+
+            url = urlsplit(self.path)
+            platform, _, path = url.path.lstrip('/').partition('/')
+            route = _ROUTES.get(platform)
+            if route is None:
+                self._send(404, {'error': 'plateforme inconnue'}, {})
+                return
+
+            server._delay()
+
+            if not server._admit(platform):
+                self._rate_limited(platform)
+                return
+
+            query = {key: values[-1] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+            try:
+                status, payload, headers = route(server, method, '/' + path, query, body)
+            except Exception as e:
+                logger.warning(f"⚠️  Erreur du serveur simulé sur {self.path}: {e}")
+                status, payload, headers = 500, {'error': str(e)}, {}
+            if method == 'GET' and status == 200:
+                # Validateur stable (corps identique => même ETag) pour les requêtes conditionnelles
+                etag = '"%s"' % hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+                headers = {**headers, 'ETag': etag}
+                if self.headers.get('If-None-Match') == etag:
+                    self._not_modified(headers)
+                    server._sent(platform, 0, 304)
+                    return
+            size = self._send(status, payload, headers)
+            server._sent(platform, size, status)
+
+        def _rate_limited(self, platform: str):
+            if platform == 'graph':
+                payload = {'error': {'message': '(#4) Application request limit reached', 'code': 4,
+                                     'type': 'OAuthException', 'is_transient': True}}
+            elif platform == 'sheets':
+                payload = _sheets_error(429, 'Quota exceeded for quota metric')
+            else:
+                payload = {'status': 429, 'message': 'Resource level throttle limit reached'}
+            size = self._send(429, payload, {'Retry-After': str(server.config.retry_after)})
+            server._sent(platform, size, 429)
+
+        def _send(self, status: int, payload: Any, headers: Dict[str, str]) -> int:
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+            return len(data)
+
+        def _not_modified(self, headers: Dict[str, str]):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockHandler
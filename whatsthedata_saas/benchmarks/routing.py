@@ -0,0 +1,111 @@
+"""
+Redirection des sessions requests et des clients plateforme vers le serveur simulé
+Les collecteurs appellent les hôtes réels en dur: un adaptateur monté sur ces hôtes
+(requests) ou un transport httpx (couche client partagée) réécrit l'URL vers le serveur
+local, sans toucher au code de l'application (en-têtes, retries, métriques et traces
+restent ceux de l'application).
+"""
+
+import types
+from contextlib import contextmanager
+from typing import Dict
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .mock_servers import UPSTREAM_HOSTS, MockPlatformServer
+
+
+class MockRoutingAdapter(HTTPAdapter):
+    """Adaptateur qui envoie les requêtes d'un hôte réel vers le serveur simulé"""
+
+    def __init__(self, targets: Dict[str, str], **kwargs):
+        self.targets = targets
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        for upstream, local in self.targets.items():
+            if request.url.startswith(upstream):
+                request.url = local + request.url[len(upstream):]
+                break
+        return super().send(request, **kwargs)
+
+
+def route_session(session: requests.Session, server: MockPlatformServer) -> requests.Session:
+    """Monter l'adaptateur de redirection sur une session (en conservant sa politique de retry)"""
+    current = session.get_adapter('https://')
+    targets = {host: server.base_url + prefix for host, prefix in UPSTREAM_HOSTS.items()}
+    adapter = MockRoutingAdapter(targets, max_retries=getattr(current, 'max_retries', 0),
+                                 pool_maxsize=32)
+    for host in targets:
+        session.mount(host, adapter)
+    return session
+
+
+def routed_session(server: MockPlatformServer) -> requests.Session:
+    return route_session(requests.Session(), server)
+
+
+class MockRoutingTransport(httpx.AsyncHTTPTransport):
+    """Transport httpx qui envoie les requêtes d'un hôte réel vers le serveur simulé"""
+
+    def __init__(self, targets: Dict[str, str], **kwargs):
+        self.targets = targets
+        super().__init__(**kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        for upstream, local in self.targets.items():
+            if url.startswith(upstream):
+                request.url = httpx.URL(local + url[len(upstream):])
+                request.headers['Host'] = request.url.netloc.decode('ascii')
+                break
+        return await super().handle_async_request(request)
+
+
+def route_platform_runtime(server: MockPlatformServer, runtime=None):
+    """Faire passer la couche client partagée (collecteurs, endpoints Looker) par le serveur simulé"""
+    if runtime is None:
+        from app.utils.platform_client import platform_runtime as runtime
+    targets = {host: server.base_url + prefix for host, prefix in UPSTREAM_HOSTS.items()}
+    runtime.configure(transport=MockRoutingTransport(targets))
+    return runtime
+
+
+class ModuleShim(types.ModuleType):
+    """
+    Remplaçant d'un module importé par un script (time, requests): les attributs
+    surchargés sont servis par le shim, tout le reste par le module d'origine
+    """
+
+    def __init__(self, module: types.ModuleType, **overrides):
+        super().__init__(module.__name__)
+        self._module = module
+        self.__dict__.update(overrides)
+
+    def __getattr__(self, name: str):
+        return getattr(self._module, name)
+
+
+def requests_shim(session: requests.Session) -> ModuleShim:
+    """Module requests dont les fonctions get/post/... passent par une session redirigée"""
+    return ModuleShim(requests, get=session.get, post=session.post, put=session.put,
+                      delete=session.delete, request=session.request)
+
+
+@contextmanager
+def patched(module: types.ModuleType, **attributes):
+    """Remplacer temporairement des attributs d'un module (noms importés par from ... import)"""
+    missing = object()
+    previous = {name: getattr(module, name, missing) for name in attributes}
+    for name, value in attributes.items():
+        setattr(module, name, value)
+    try:
+        yield module
+    finally:
+        for name, value in previous.items():
+            if value is missing:
+                delattr(module, name)
+            else:
+                setattr(module, name, value)
@@ -0,0 +1,510 @@
+"""
+Benchmark hors ligne des chemins chauds
+Fait tourner le vrai code (LinkedinCollector, FacebookCollector, flux Looker, export Google Sheets
+des scripts de linkedin-stats-automation) contre le serveur simulé local et une base SQLite
+temporaire, puis rapporte par suite: temps total, requêtes/s, pic de RSS et requêtes SQL par compte.
+
+Usage (depuis whatsthedata_saas/):
+    python -m benchmarks.run
+    python -m benchmarks.run --suite linkedin --accounts 10 --latency-ms 50
+    python -m benchmarks.run --rate-limit-every 25 --json resultats.json
+    python -m benchmarks.run --baseline resultats.json --max-regression 0.2
+
+Les pauses de throttling des collecteurs (traced_sleep, time.sleep des scripts Sheets) sont
+comptées mais sautées par défaut (--real-sleeps pour les conserver): le benchmark mesure le
+code, pas les délais de politesse envers les API. Le pic de RSS est celui du processus: lancer
+une seule suite par exécution pour l'isoler.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .mock_servers import MockConfig, MockPlatformServer
+from .routing import ModuleShim, patched, requests_shim, route_platform_runtime, routed_session
+
+logger = logging.getLogger(__name__)
+
+SUITES = ('linkedin', 'facebook', 'looker', 'sheets')
+
+# Métriques comparées à la référence (une hausse au-delà du seuil est une régression)
+REGRESSION_METRICS = ('wall_seconds', 'requests_per_account', 'db_statements_per_account', 'peak_rss_mb')
+
+# Variables exigées par app.utils.config: valeurs factices, aucune n'est utilisée hors ligne
+_BENCHMARK_ENV = (
+    'COMMUNITY_CLIENT_ID', 'COMMUNITY_CLIENT_SECRET', 'PORTABILITY_CLIENT_ID', 'PORTABILITY_CLIENT_SECRET',
+    'SIGNIN_CLIENT_ID', 'SIGNIN_CLIENT_SECRET', 'FB_CLIENT_ID', 'FB_CLIENT_SECRET',
+    'GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET', 'GOOGLE_REDIRECT_URI', 'JWT_SECRET_KEY',
+    'STRIPE_PUBLISHABLE_KEY', 'STRIPE_SECRET_KEY',
+)
+
+BENCH_EMAIL = 'benchmark@whatsthedata.local'
+
+
+@dataclass
+class SuiteResult:
+    """Mesures d'une exécution de suite"""
+    suite: str
+    accounts: int
+    wall_seconds: float = 0.0
+    requests: int = 0
+    rate_limited: int = 0
+    requests_per_sec: float = 0.0
+    requests_per_account: float = 0.0
+    bytes_received: int = 0
+    db_statements: int = 0
+    db_statements_per_account: float = 0.0
+    peak_rss_mb: float = 0.0
+    records: int = 0
+    sleeps_skipped: int = 0
+    sleep_seconds_skipped: float = 0.0
+    skipped: Optional[str] = None
+    errors: List[str] = field(default_factory=list)
+
+
+# ========================================
+# INSTRUMENTATION
+# ========================================
+
+class StatementCounter:
+    """Compte les requêtes SQL envoyées au driver (un executemany compte pour une)"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        from sqlalchemy import event
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+
+
+class SleepRecorder:
+    """Remplaçant de traced_sleep / time.sleep: compte les pauses et ne les fait que si demandé"""
+
+    def __init__(self, real: bool = False):
+        self.real = real
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def sleep(self, seconds: float, reason: str = 'throttle'):
+        with self._lock:
+            self.calls += 1
+            self.seconds += seconds
+        if self.real:
+            time.sleep(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.seconds = 0.0
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss est en kilo-octets sous Linux (octets sous macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+# ========================================
+# ENVIRONNEMENT
+# ========================================
+
+def prepare_environment(database_url: str, workdir: str):
+    """Variables d'environnement minimales, à poser avant d'importer l'application"""
+    for name in _BENCHMARK_ENV:
+        os.environ.setdefault(name, 'benchmark')
+    os.environ.setdefault('DATABASE_URL', database_url)
+    os.environ.setdefault('AUTO_CREATE_TABLES', 'true')
+    # Cache HTTP propre à l'exécution: la première répétition part à froid, les suivantes le réutilisent
+    os.environ.setdefault('PLATFORM_HTTP_CACHE_PATH', os.path.join(workdir, 'http_cache.sqlite3'))
+
+
+def setup_database(database_url: str, counter: StatementCounter):
+    """Brancher db_manager sur la base du benchmark (SQLite par défaut) et créer les tables"""
+    from sqlalchemy import create_engine
+    from app.database.connection import db_manager
+
+    if database_url.startswith('sqlite'):
+        engine = create_engine(database_url, connect_args={'check_same_thread': False},
+                               pool_size=10, max_overflow=20)
+    else:
+        engine = create_engine(database_url, pool_size=10, max_overflow=20, pool_pre_ping=True)
+
+    db_manager.engine = engine
+    db_manager.initialize()
+    counter.attach(engine)
+    return db_manager
+
+
+def seed_database(config: MockConfig) -> int:
+    """Utilisateur, comptes et tokens correspondant aux identifiants du serveur simulé"""
+    from app.database.connection import db_manager
+    from app.database.models import (
+        User, LinkedinAccount, LinkedinTokens, FacebookAccount, SocialAccessToken
+    )
+
+    expires_at = datetime.utcnow() + timedelta(days=30)
+    with db_manager.get_session() as session:
+        user = session.query(User).filter(User.email == BENCH_EMAIL).first()
+        if not user:
+            user = User(email=BENCH_EMAIL, firstname='Bench', lastname='Mark', plan_type='premium')
+            session.add(user)
+            session.flush()
+            session.add(LinkedinTokens(user_id=user.id, application_type='community',
+                                       access_token='bench-linkedin-token', expires_at=expires_at))
+            session.add(SocialAccessToken(user_id=user.id, platform='facebook',
+                                          access_token='bench-facebook-token', expires_at=expires_at))
+
+        existing_orgs = {row[0] for row in session.query(LinkedinAccount.organization_id).filter(
+            LinkedinAccount.user_id == user.id)}
+        for org_id in config.organization_ids():
+            if org_id not in existing_orgs:
+                session.add(LinkedinAccount(user_id=user.id, organization_id=org_id,
+                                            organization_name=f"Organisation {org_id}"))
+
+        existing_pages = {row[0] for row in session.query(FacebookAccount.page_id).filter(
+            FacebookAccount.user_id == user.id)}
+        for page_id in config.page_ids():
+            if page_id not in existing_pages:
+                session.add(FacebookAccount(user_id=user.id, page_id=page_id, page_name=f"Page {page_id}"))
+
+        session.commit()
+        return user.id
+
+
+# ========================================
+# SUITES
+# ========================================
+
+def _run_accounts(accounts: List[str], collect: Callable[[str], Any], concurrency: int) -> List[Any]:
+    if concurrency <= 1:
+        return [collect(account) for account in accounts]
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bench') as pool:
+        return list(pool.map(collect, accounts))
+
+
+def suite_linkedin(context: Dict[str, Any]) -> Dict[str, Any]:
+    from app.collectors import linkedin_collector as module
+
+    collector = module.linkedin_collector
+    route_platform_runtime(context['server'])
+    collector.clear_quota_cache()
+    user_id = context['user_id']
+
+    def collect(org_id: str):
+        return collector.collect_organization_data(user_id, org_id)
+
+    with patched(module, traced_sleep=context['sleeps'].sleep):
+        results = _run_accounts(context['config'].organization_ids(), collect, context['concurrency'])
+
+    records, errors = 0, []
+    for per_type in results:
+        for result in per_type.values():
+            records += result.records_collected
+            errors.extend(result.errors)
+    return {'records': records, 'errors': errors}
+
+
+def suite_facebook(context: Dict[str, Any]) -> Dict[str, Any]:
+    from app.collectors import facebook_collector as module
+
+    collector = module.facebook_collector
+    route_platform_runtime(context['server'])
+    collector.clear_quota_cache()
+    user_id = context['user_id']
+
+    def collect(page_id: str):
+        return collector.collect_page_data(user_id, page_id)
+
+    with patched(module, traced_sleep=context['sleeps'].sleep):
+        results = _run_accounts(context['config'].page_ids(), collect, context['concurrency'])
+
+    records, errors = 0, []
+    for per_type in results:
+        for result in per_type.values():
+            records += result.records_collected
+            errors.extend(result.errors)
+    return {'records': records, 'errors': errors}
+
+
+def suite_looker(context: Dict[str, Any]) -> Dict[str, Any]:
+    from app.api import looker_endpoints as looker
+    from app.database.connection import db_manager
+    from app.database.models import User
+
+    server, config = context['server'], context['config']
+    with db_manager.get_session() as session:
+        user = session.query(User).filter(User.id == context['user_id']).first()
+
+    # Tokens posés dans le cache du module (comme après un premier chargement en base)
+    expires_at = datetime.now() + timedelta(days=30)
+    for org_id in config.organization_ids():
+        looker.token_cache.put((None, 'linkedin', org_id), looker.TokenInfo(
+            access_token='bench-linkedin-token', expires_at=expires_at, platform='linkedin', account_id=org_id))
+    for page_id in config.page_ids():
+        looker.token_cache.put((None, 'facebook', page_id), looker.TokenInfo(
+            access_token='bench-facebook-token', expires_at=expires_at, platform='facebook', account_id=page_id))
+
+    linkedin_client = looker.LinkedInAPIClient()
+    linkedin_client.base_url = server.url_for(linkedin_client.base_url)
+    facebook_client = looker.FacebookAPIClient()
+    facebook_client.base_url = server.url_for(facebook_client.base_url)
+
+    end_date = date.today()
+    start_date = end_date - timedelta(days=context['looker_days'] - 1)
+
+    async def stream() -> int:
+        rows = 0
+        async for _ in looker.iter_real_linkedin_rows(user, linkedin_client, start_date, end_date, 'overview', True):
+            rows += 1
+        async for _ in looker.iter_real_facebook_rows(user, facebook_client, start_date, end_date, 'overview', True):
+            rows += 1
+        return rows
+
+    return {'records': asyncio.run(stream()), 'errors': []}
+
+
+def suite_sheets(context: Dict[str, Any]) -> Dict[str, Any]:
+    project = Path(context['sheets_project']).resolve()
+    if str(project) not in sys.path:
+        sys.path.insert(0, str(project))
+    try:
+        import gspread
+        import follower_statistics
+    except ImportError as e:
+        return {'skipped': f"export Sheets indisponible ({e})"}
+
+    server = context['server']
+    session = routed_session(server)
+    client = _gspread_client(gspread, session)
+    time_shim = ModuleShim(time, sleep=context['sleeps'].sleep)
+    records, errors = 0, []
+
+    with patched(follower_statistics, requests=requests_shim(session), time=time_shim), \
+            contextlib.redirect_stdout(io.StringIO()):
+        for org_id in context['config'].organization_ids():
+            try:
+                tracker = follower_statistics.LinkedInFollowerStatisticsTracker('bench-linkedin-token', org_id)
+                stats = tracker.parse_follower_statistics(tracker.get_follower_statistics())
+
+                exporter = follower_statistics.GoogleSheetsExporter(tracker.sheet_name, 'benchmark-credentials.json')
+                exporter.client = client
+                exporter.spreadsheet = client.open_by_key(f"bench-{org_id}")
+                if exporter.prepare_and_update_summary_sheet(stats) is None:
+                    errors.append(f"résumé non écrit pour {org_id}")
+                exporter.prepare_and_update_detail_sheets(stats)
+            except Exception as e:
+                errors.append(f"{org_id}: {e}")
+
+    with server._lock:
+        records = sum(sheet['cells_written'] for sheet in server.spreadsheets.values())
+    return {'records': records, 'errors': errors}
+
+
+def _gspread_client(gspread, session):
+    """Client gspread sur une session redirigée (API de gspread 5 ou 6)"""
+    http_client = getattr(gspread, 'http_client', None)
+    if http_client is not None and hasattr(http_client, 'HTTPClient'):
+        return gspread.Client(None, http_client=lambda auth: http_client.HTTPClient(auth, session=session))
+    return gspread.Client(None, session=session)
+
+
+SUITE_FUNCTIONS = {
+    'linkedin': suite_linkedin,
+    'facebook': suite_facebook,
+    'looker': suite_looker,
+    'sheets': suite_sheets,
+}
+
+
+# ========================================
+# EXÉCUTION ET RAPPORT
+# ========================================
+
+def run_suite(name: str, context: Dict[str, Any], counter: StatementCounter) -> SuiteResult:
+    server, sleeps = context['server'], context['sleeps']
+    accounts = context['config'].accounts
+    result = SuiteResult(suite=name, accounts=accounts)
+
+    server.reset_stats()
+    sleeps.reset()
+    statements_before = counter.count
+    start = time.perf_counter()
+    try:
+        outcome = SUITE_FUNCTIONS[name](context)
+    except Exception as e:
+        logger.exception(f"❌ Suite {name} en échec")
+        outcome = {'errors': [f"{type(e).__name__}: {e}"]}
+    result.wall_seconds = round(time.perf_counter() - start, 3)
+
+    if outcome.get('skipped'):
+        result.skipped = outcome['skipped']
+        return result
+
+    stats = server.snapshot()
+    result.requests = sum(platform['requests'] for platform in stats.values())
+    result.rate_limited = sum(platform['rate_limited'] for platform in stats.values())
+    result.bytes_received = sum(platform['bytes_sent'] for platform in stats.values())
+    result.requests_per_sec = round(result.requests / result.wall_seconds, 1) if result.wall_seconds else 0.0
+    result.requests_per_account = round(result.requests / accounts, 1) if accounts else 0.0
+    result.db_statements = counter.count - statements_before
+    result.db_statements_per_account = round(result.db_statements / accounts, 1) if accounts else 0.0
+    result.peak_rss_mb = _peak_rss_mb()
+    result.records = outcome.get('records', 0)
+    result.sleeps_skipped = 0 if sleeps.real else sleeps.calls
+    result.sleep_seconds_skipped = 0.0 if sleeps.real else round(sleeps.seconds, 1)
+    result.errors = outcome.get('errors', [])
+    return result
+
+
+def _median_run(runs: List[SuiteResult]) -> SuiteResult:
+    """Exécution de temps médian (les autres mesures sont celles de cette exécution)"""
+    ordered = sorted(runs, key=lambda run: run.wall_seconds)
+    return ordered[len(ordered) // 2]
+
+
+def print_report(results: List[SuiteResult]):
+    header = (f"{'suite':<10}{'comptes':>8}{'temps(s)':>10}{'requêtes':>10}{'req/s':>9}{'429':>6}"
+              f"{'SQL':>8}{'SQL/cpt':>9}{'RSS(Mo)':>9}{'records':>9}{'pauses':>8}")
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        if result.skipped:
+            print(f"{result.suite:<10}  ignorée: {result.skipped}")
+            continue
+        print(f"{result.suite:<10}{result.accounts:>8}{result.wall_seconds:>10.2f}{result.requests:>10}"
+              f"{result.requests_per_sec:>9.1f}{result.rate_limited:>6}{result.db_statements:>8}"
+              f"{result.db_statements_per_account:>9.1f}{result.peak_rss_mb:>9.1f}{result.records:>9}"
+              f"{result.sleeps_skipped:>8}")
+        for error in result.errors[:5]:
+            print(f"{'':<10}⚠️  {error}")
+        if len(result.errors) > 5:
+            print(f"{'':<10}⚠️  ... {len(result.errors) - 5} autres erreurs")
+
+
+def compare_with_baseline(results: List[SuiteResult], baseline_path: str, max_regression: float) -> List[str]:
+    """Lister les métriques en hausse de plus de max_regression par rapport à la référence"""
+    with open(baseline_path, encoding='utf-8') as handle:
+        baseline = {entry['suite']: entry for entry in json.load(handle).get('results', [])}
+
+    regressions = []
+    for result in results:
+        reference = baseline.get(result.suite)
+        if not reference or result.skipped or reference.get('skipped'):
+            continue
+        for metric in REGRESSION_METRICS:
+            before, after = reference.get(metric) or 0, getattr(result, metric) or 0
+            if before > 0 and after > before * (1 + max_regression):
+                regressions.append(f"{result.suite}.{metric}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne contre des API simulées")
+    parser.add_argument('--suite', action='append', choices=SUITES,
+                        help="suite à exécuter (répétable, toutes par défaut)")
+    parser.add_argument('--accounts', type=int, default=3)
+    parser.add_argument('--posts', type=int, default=120, help="posts par compte")
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--text-bytes', type=int, default=600)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--jitter-ms', type=float, default=5.0)
+    parser.add_argument('--rate-limit-every', type=int, default=0)
+    parser.add_argument('--retry-after', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, default=1, help="comptes collectés en parallèle")
+    parser.add_argument('--looker-days', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=1, help="exécutions par suite (temps médian retenu)")
+    parser.add_argument('--real-sleeps', action='store_true', help="conserver les pauses de throttling")
+    parser.add_argument('--database-url', help="base du benchmark (SQLite temporaire par défaut)")
+    parser.add_argument('--sheets-project', default=str(Path(__file__).resolve().parents[2] / 'linkedin-stats-automation'))
+    parser.add_argument('--json', dest='json_path', help="écrire les résultats dans un fichier JSON")
+    parser.add_argument('--baseline', help="résultats JSON de référence")
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    parser.add_argument('--verbose', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s', force=True)
+
+    workdir = tempfile.mkdtemp(prefix='wtd-bench-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    prepare_environment(database_url, workdir)
+
+    config = MockConfig(
+        accounts=args.accounts, posts_per_account=args.posts, page_size=args.page_size,
+        text_bytes=args.text_bytes, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        rate_limit_every=args.rate_limit_every, retry_after=args.retry_after
+    )
+
+    counter = StatementCounter()
+    setup_database(database_url, counter)
+    user_id = seed_database(config)
+    if not args.verbose:
+        # Les collecteurs journalisent chaque étape en INFO: rester lisible
+        logging.getLogger().setLevel(logging.WARNING)
+
+    results: List[SuiteResult] = []
+    with MockPlatformServer(config) as server:
+        context = {
+            'server': server,
+            'config': config,
+            'user_id': user_id,
+            'sleeps': SleepRecorder(real=args.real_sleeps),
+            'concurrency': args.concurrency,
+            'looker_days': args.looker_days,
+            'sheets_project': args.sheets_project,
+        }
+        for name in args.suite or SUITES:
+            runs = [run_suite(name, context, counter) for _ in range(max(1, args.repeat))]
+            results.append(_median_run(runs))
+
+    print_report(results)
+
+    if args.json_path:
+        payload = {
+            'generated_at': datetime.utcnow().isoformat(),
+            'config': asdict(config),
+            'options': {'concurrency': args.concurrency, 'real_sleeps': args.real_sleeps,
+                        'looker_days': args.looker_days, 'repeat': args.repeat},
+            'results': [asdict(result) for result in results],
+        }
+        with open(args.json_path, 'w', encoding='utf-8') as handle:
+            json.dump(payload, handle, indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans {args.json_path}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.max_regression)
+        if regressions:
+            print(f"\n❌ Régressions (> {args.max_regression * 100:.0f}%):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"\n✅ Aucune régression au-delà de {args.max_regression * 100:.0f}%")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# test_auth.py
+# ============
+# 🧪 Tests de l'authentification sans appel aux plateformes: cache local des
+# tokens (rafraîchissement anticipé fusionné entre appelants concurrents).
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Ajouter le dossier app au path pour les imports
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+
+def _token(value: str, expires_in: float):
+    """Token factice expirant dans expires_in secondes"""
+    return SimpleNamespace(access_token=value, expires_at=datetime.utcnow() + timedelta(seconds=expires_in))
+
+
+def test_token_single_flight():
+    """Test 1: Cache de tokens - un seul rafraîchissement pour N appelants"""
+    print("🧪 Test 1: Cache de tokens (single-flight)")
+    print("-" * 50)
+
+    from app.auth.token_cache import RETRY_DELAY, TokenCache
+
+    key = (1, 'linkedin', 'community')
+    loads, refreshes = [], []
+
+    def loader():
+        loads.append(1)
+        return _token('old', 100)   # dans la marge de 300 s: rafraîchissement dû
+
+    def refresher(current):
+        refreshes.append(current.access_token)
+        time.sleep(0.2)
+        return _token('new', 3600)
+
+    # Token encore valide: un seul thread rafraîchit, les autres repartent avec l'ancien
+    cache = TokenCache()
+    cache.put(key, loader())
+    cache._entries[key].recheck_at = 0   # rafraîchissement dû maintenant
+    results = []
+    barrier = threading.Barrier(20)
+
+    def caller():
+        barrier.wait()
+        results.append(cache.get(key, loader, refresher).access_token)
+
+    threads = [threading.Thread(target=caller) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert refreshes == ['old'] and len(results) == 20
+    assert set(results) <= {'old', 'new'} and 'new' in results
+    assert cache.get(key, loader, refresher).access_token == 'new' and len(refreshes) == 1
+    print(f"✅ Token valide: 1 rafraîchissement pour 20 appels ({results.count('old')} servis avec l'ancien)")
+
+    # Cache vide: les appelants attendent le premier, une seule lecture en base
+    loads.clear()
+    refreshes.clear()
+    cache = TokenCache()
+    results = []
+    barrier = threading.Barrier(20)
+    threads = [threading.Thread(target=caller) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['new'] * 20 and len(loads) == 1 and refreshes == ['old']
+    print("✅ Cache vide: 20 appelants servis par 1 lecture et 1 rafraîchissement")
+
+    # Version asynchrone: même fusion sur une boucle
+    async def arefresher(current):
+        refreshes.append(current.access_token)
+        await asyncio.sleep(0.1)
+        return _token('async', 3600)
+
+    async def gather():
+        return await asyncio.gather(*(cache.aget(key, loader, arefresher) for _ in range(20)))
+
+    refreshes.clear()
+    cache = TokenCache()
+    values = asyncio.run(gather())
+    assert refreshes == ['old'] and {value.access_token for value in values} == {'async'}
+    print("✅ aget: 1 rafraîchissement pour 20 coroutines")
+
+    # Échec du rafraîchissement: token courant conservé, nouvel essai sous RETRY_DELAY
+    cache = TokenCache()
+    failed = cache.get(key, lambda: _token('old', 100), lambda current: None)
+    entry = cache._entries[key]
+    assert failed.access_token == 'old' and cache.stats['refresh_failures'] == 1
+    assert entry.recheck_at - entry.loaded_at <= RETRY_DELAY
+
+    # Absence de token mémorisée; invalidation par utilisateur
+    missing = []
+    assert cache.get((2, 'facebook', None), lambda: missing.append(1)) is None
+    assert cache.get((2, 'facebook', None), lambda: missing.append(1)) is None and len(missing) == 1
+    cache.invalidate_user(1)
+    assert key not in cache._entries and (2, 'facebook', None) in cache._entries
+    print("✅ Échec de rafraîchissement, absence mémorisée, invalidation utilisateur")
+
+
+def main():
+    """Exécute tous les tests dans l'ordre"""
+    print("🚀 Tests de l'authentification")
+    print("=" * 60)
+
+    tests = [
+        ("Cache de tokens", test_token_single_flight),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results.append((test_name, True))
+        except Exception as e:
+            print(f"❌ Erreur dans {test_name}: {e!r}")
+            results.append((test_name, False))
+
+    # Résumé final
+    print("\n" + "=" * 60)
+    print("📊 RÉSUMÉ DES TESTS")
+    print("=" * 60)
+
+    passed = 0
+    for test_name, success in results:
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}")
+        if success:
+            passed += 1
+
+    print(f"\n🎯 Résultat: {passed}/{len(tests)} tests réussis")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# test_payments.py
+# ================
+# 🧪 Tests des droits d'abonnement sur une base SQLite jetable, sans appel
+# à Stripe: initialisation concurrente, webhooks, compteurs de comptes tenus
+# dans la transaction, lectures Stripe en échec et réconciliation.
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Ajouter le dossier app au path pour les imports
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+
+def _scratch_database():
+    """Brancher db_manager sur une base SQLite temporaire"""
+    from sqlalchemy import create_engine
+    from app.database.connection import db_manager
+
+    workdir = tempfile.mkdtemp(prefix='wtd_test_')
+    db_manager.engine = create_engine(f"sqlite:///{os.path.join(workdir, 'test.db')}",
+                                      connect_args={'check_same_thread': False})
+    db_manager.initialize()
+    return db_manager
+
+
+def test_entitlements():
+    """Test 1: Droits d'abonnement - cache, webhooks et compteurs transactionnels"""
+    print("🧪 Test 1: Droits d'abonnement")
+    print("-" * 50)
+
+    db_manager = _scratch_database()
+    from app.database.models import FacebookAccount, User, UserEntitlement
+    from app.payments.entitlements import STRIPE_FAILURE_TTL, EntitlementStore, entitlement_store
+
+    entitlement_store.clear()
+    with db_manager.get_session() as session:
+        user = User(email='client@example.com', plan_type='free', is_active=True)
+        session.add(user)
+        session.flush()
+        session.add(FacebookAccount(user_id=user.id, page_id='p1', is_active=True))
+        session.add(FacebookAccount(user_id=user.id, page_id='p2', is_active=False))
+        user_id = user.id
+
+    # Première lecture: ligne initialisée depuis les comptes actifs, puis servie en mémoire
+    entitlement = entitlement_store.get(user_id)
+    assert entitlement.plan_type == 'free' and entitlement.facebook_accounts == 1
+    assert entitlement.max_linkedin_accounts == 1 and entitlement.is_valid
+    loads = entitlement_store.stats['loads']
+    assert entitlement_store.get(user_id) is entitlement and entitlement_store.stats['loads'] == loads
+    assert entitlement_store.get_by_email('client@example.com') is entitlement
+    print("✅ Initialisation depuis les comptes actifs, lectures suivantes en mémoire")
+
+    # Course à l'initialisation: la ligne d'un autre worker est relue, la session reste utilisable
+    with db_manager.get_session() as session:
+        user = session.query(User).filter(User.id == user_id).one()
+        row = EntitlementStore()._bootstrap(session, user)
+        assert row.facebook_accounts == 1
+        assert session.query(UserEntitlement).count() == 1
+    print("✅ Initialisation concurrente: ligne existante relue, pas d'erreur")
+
+    # Compteur ajusté dans la transaction du compte, cache invalidé au commit seulement
+    with db_manager.get_session() as session:
+        session.add(FacebookAccount(user_id=user_id, page_id='p3', is_active=True))
+        session.flush()
+        assert entitlement_store.get(user_id) is entitlement
+    assert entitlement_store.get(user_id).facebook_accounts == 2
+
+    session = db_manager.get_session_direct()
+    try:
+        account = session.query(FacebookAccount).filter(FacebookAccount.page_id == 'p3').one()
+        account.is_active = False
+        session.flush()
+        session.rollback()
+    finally:
+        session.close()
+    assert entitlement_store.get(user_id, refresh=True).facebook_accounts == 2
+
+    with db_manager.get_session() as session:
+        session.query(FacebookAccount).filter(FacebookAccount.page_id == 'p3').one().is_active = False
+    assert entitlement_store.get(user_id).facebook_accounts == 1
+    print("✅ Compteurs: ajout/désactivation commités comptés, rollback ignoré")
+
+    # Webhook: plan et période dans user_entitlements et users, limites recalculées
+    period_end = datetime.now().replace(microsecond=0) + timedelta(days=30)
+    premium = entitlement_store.apply_subscription(user_id, plan_type='premium', status='active',
+                                                   stripe_subscription_id='sub_1', current_period_end=period_end)
+    assert premium.max_facebook_accounts == 10 and premium.data_retention_days == 365 and premium.is_valid
+    assert entitlement_store.get(user_id) is premium
+    with db_manager.get_session() as session:
+        user = session.query(User).filter(User.id == user_id).one()
+        assert user.plan_type == 'premium' and user.subscription_end_date == period_end
+
+    canceled = entitlement_store.apply_stripe_subscription(user_id, {
+        'id': 'sub_1', 'customer': 'cus_1', 'status': 'canceled', 'cancel_at_period_end': False,
+        'current_period_end': int(period_end.timestamp()),
+    })
+    assert canceled.plan_type == 'free' and canceled.max_facebook_accounts == 0 and canceled.is_valid
+    with db_manager.get_session() as session:
+        assert session.query(User).filter(User.id == user_id).one().subscription_end_date is None
+    print("✅ Webhooks: passage premium puis résiliation, users synchronisé")
+
+    # Lecture Stripe en échec: pas de nouvel essai avant STRIPE_FAILURE_TTL
+    store = EntitlementStore()
+    assert not store.stripe_failed_recently('sub_1')
+    store.stripe_lookup_failed('sub_1')
+    assert store.stripe_failed_recently('sub_1') and store.stats['stripe_skipped'] == 1
+    store._stripe_failures['sub_1'] = time.monotonic() - STRIPE_FAILURE_TTL
+    assert not store.stripe_failed_recently('sub_1') and 'sub_1' not in store._stripe_failures
+    store.stripe_lookup_failed('sub_2')
+    store.stripe_lookup_succeeded('sub_2')
+    assert not store.stripe_failed_recently('sub_2')
+    print("✅ Échec Stripe mémorisé STRIPE_FAILURE_TTL secondes, effacé au succès")
+
+    # Réconciliation: compteur faussé hors transaction corrigé et cache invalidé
+    with db_manager.get_session() as session:
+        session.query(UserEntitlement).filter(UserEntitlement.user_id == user_id).update({'facebook_accounts': 7})
+    result = entitlement_store.reconcile(check_stripe=False)
+    assert result['usage_fixed'] == 1 and result['errors'] == 0
+    reconciled = entitlement_store.get(user_id)
+    assert reconciled is not canceled and reconciled.facebook_accounts == 1
+    print("✅ Réconciliation: compteur recompté depuis les comptes actifs")
+
+
+def main():
+    """Exécute tous les tests dans l'ordre"""
+    print("🚀 Tests des paiements")
+    print("=" * 60)
+
+    tests = [
+        ("Droits d'abonnement", test_entitlements),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results.append((test_name, True))
+        except Exception as e:
+            print(f"❌ Erreur dans {test_name}: {e!r}")
+            results.append((test_name, False))
+
+    # Résumé final
+    print("\n" + "=" * 60)
+    print("📊 RÉSUMÉ DES TESTS")
+    print("=" * 60)
+
+    passed = 0
+    for test_name, success in results:
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}")
+        if success:
+            passed += 1
+
+    print(f"\n🎯 Résultat: {passed}/{len(tests)} tests réussis")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# test_scheduler.py
+# =================
+# 🧪 Tests du scheduler sans collecte réelle: agrégats incrémentaux de la file
+# de tâches et circuit breaker (un seul appel d'essai en HALF_OPEN).
+
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Ajouter le dossier app au path pour les imports
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+
+def test_task_queue_aggregates():
+    """Test 1: File de tâches - compteurs tenus à jour sans parcourir la file"""
+    print("🧪 Test 1: Agrégats de la file de tâches")
+    print("-" * 50)
+
+    from app.collectors.scheduler import CollectionTask, CollectorType, Priority
+    from app.collectors.task_queue import TaskQueue
+
+    now = datetime(2024, 6, 1, 12, 0, 0)
+
+    def task(task_id, user_id, collector, priority, due_in_minutes, data_types=('page_statistics',)):
+        return CollectionTask(task_id=task_id, user_id=user_id, collector_type=collector,
+                              target_id=f"target-{task_id}", data_types=data_types, priority=priority,
+                              scheduled_time=now + timedelta(minutes=due_in_minutes),
+                              created_at=now - timedelta(minutes=30))
+
+    queue = TaskQueue(demand=lambda queued: len(queued.data_types))
+    urgent = task('t1', 1, CollectorType.LINKEDIN, Priority.HIGH, -1, ('page_statistics', 'posts'))
+    later = task('t2', 2, CollectorType.FACEBOOK, Priority.LOW, 60)
+    late = task('t3', 1, CollectorType.LINKEDIN, Priority.NORMAL, -5)
+    for queued in (urgent, later, late):
+        queue.put(queued)
+
+    snapshot = queue.snapshot(include_users=True, now=now)
+    assert snapshot['total_size'] == 3
+    assert snapshot['by_priority'] == {'HIGH': 1, 'LOW': 1, 'NORMAL': 1}
+    assert snapshot['by_collector'] == {'linkedin': 2, 'facebook': 1}
+    assert snapshot['by_user'] == {1: 2, 2: 1} and snapshot['users_waiting'] == 2
+    assert (snapshot['overdue_tasks'], snapshot['scheduled_future']) == (2, 1)
+    assert snapshot['earliest_due'] == (now - timedelta(minutes=5)).isoformat()
+    assert snapshot['oldest_waiting_seconds'] == 1800.0
+    assert snapshot['api_quota_queued'] == {'linkedin': 3, 'facebook': 1}
+    print("✅ Composition de la file après 3 ajouts")
+
+    # Retrait par priorité
+    assert queue.get() is urgent
+    snapshot = queue.snapshot(now=now)
+    assert snapshot['by_priority'] == {'LOW': 1, 'NORMAL': 1}
+    assert snapshot['by_collector'] == {'linkedin': 1, 'facebook': 1}
+    assert snapshot['api_quota_queued'] == {'linkedin': 1, 'facebook': 1}
+    print("✅ Retrait de la tâche la plus prioritaire")
+
+    # Remise en file de la même tâche: deux entrées distinctes
+    queue.put(urgent)
+    queue.put(urgent)
+    assert queue.snapshot(now=now)['by_priority'] == {'HIGH': 2, 'LOW': 1, 'NORMAL': 1}
+
+    # Une tâche modifiée pendant son attente sort avec les clés de son entrée
+    late.priority = Priority.CRITICAL
+    late.user_id = 3
+    while not queue.empty():
+        queue.get()
+    snapshot = queue.snapshot(include_users=True, now=now)
+    assert snapshot['total_size'] == 0 and snapshot['overdue_tasks'] == 0
+    assert snapshot['by_priority'] == {} and snapshot['by_collector'] == {} and snapshot['by_user'] == {}
+    assert snapshot['api_quota_queued'] == {} and snapshot['earliest_due'] is None
+    print("✅ File vidée: compteurs revenus à zéro")
+
+
+def test_circuit_breaker():
+    """Test 2: Circuit breaker - ouverture, appel d'essai unique, fermeture"""
+    print("\n🧪 Test 2: Circuit breaker")
+    print("-" * 50)
+
+    from app.collectors.scheduler import CircuitBreaker, SchedulerError
+
+    breaker = CircuitBreaker(failure_threshold=2, timeout_seconds=60)
+
+    def failing():
+        raise ValueError("API indisponible")
+
+    for _ in range(2):
+        try:
+            breaker.call(failing)
+        except ValueError:
+            pass
+    assert breaker.state == 'OPEN' and not breaker.allow()
+    try:
+        breaker.call(lambda: 'ok')
+        raise AssertionError("appel admis circuit ouvert")
+    except SchedulerError as e:
+        assert e.error_code == "CIRCUIT_BREAKER_OPEN"
+    print("✅ Circuit ouvert après le seuil d'échecs")
+
+    def expire():
+        breaker.last_failure_time = datetime.utcnow() - timedelta(seconds=61)
+
+    # Délai écoulé: un seul appel d'essai parmi des appelants concurrents
+    expire()
+    admitted = []
+    barrier = threading.Barrier(20)
+
+    def caller():
+        barrier.wait()
+        admitted.append(breaker.allow())
+
+    threads = [threading.Thread(target=caller) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert admitted.count(True) == 1 and breaker.state == 'HALF_OPEN'
+    print("✅ HALF_OPEN: 1 appel d'essai admis sur 20")
+
+    # Essai en échec: réouverture immédiate
+    breaker.record(False)
+    assert breaker.state == 'OPEN' and not breaker.allow()
+
+    # Essai sans issue au-delà du délai: considéré perdu, un nouvel essai est admis
+    expire()
+    assert breaker.allow() and not breaker.allow()
+    breaker.half_open_since = datetime.utcnow() - timedelta(seconds=61)
+    assert breaker.allow()
+    print("✅ Essai échoué ou perdu: circuit rouvert / nouvel essai")
+
+    # Essai réussi: circuit refermé, appels libres
+    breaker.record(True)
+    assert breaker.state == 'CLOSED' and breaker.failure_count == 0
+    assert all(breaker.allow() for _ in range(5))
+    assert breaker.call(lambda: 'ok') == 'ok'
+    print("✅ Essai réussi: circuit refermé")
+
+
+def main():
+    """Exécute tous les tests dans l'ordre"""
+    print("🚀 Tests du scheduler")
+    print("=" * 60)
+
+    tests = [
+        ("File de tâches", test_task_queue_aggregates),
+        ("Circuit breaker", test_circuit_breaker),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results.append((test_name, True))
+        except Exception as e:
+            print(f"❌ Erreur dans {test_name}: {e!r}")
+            results.append((test_name, False))
+
+    # Résumé final
+    print("\n" + "=" * 60)
+    print("📊 RÉSUMÉ DES TESTS")
+    print("=" * 60)
+
+    passed = 0
+    for test_name, success in results:
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}")
+        if success:
+            passed += 1
+
+    print(f"\n🎯 Résultat: {passed}/{len(tests)} tests réussis")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# test_utils.py
+# =============
+# 🧪 Tests des utilitaires partagés de l'API: rate limiter GCRA (mémoire et
+# stockage SQLite partagé), stockage des états OAuth/sessions et cache HTTP
+# des plateformes (transport httpx simulé, aucun appel réseau).
+
+import json
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Ajouter le dossier app au path pour les imports
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+
+def _scratch_sqlite_url(name: str) -> str:
+    """URL d'une base SQLite jetable"""
+    workdir = tempfile.mkdtemp(prefix='wtd_test_')
+    return f"sqlite:///{os.path.join(workdir, name)}"
+
+
+def _scratch_database():
+    """Brancher db_manager sur une base SQLite temporaire"""
+    from sqlalchemy import create_engine
+    from app.database.connection import db_manager
+
+    db_manager.engine = create_engine(_scratch_sqlite_url('test.db'), connect_args={'check_same_thread': False})
+    db_manager.initialize()
+    return db_manager
+
+
+def test_gcra_rate_limiter():
+    """Test 1: Rate limiter GCRA - rafale, refus, reprise et clé client"""
+    print("🧪 Test 1: Rate limiter GCRA")
+    print("-" * 50)
+
+    from app.utils.rate_limiter import (
+        DatabaseRateLimitBackend, MemoryRateLimitBackend, RateLimiter, default_client_key
+    )
+
+    # 60 appels/minute, rafale de 3: un appel par seconde au-delà de la rafale
+    interval, tolerance = 1.0, 3.0
+    backends = [
+        ("mémoire", MemoryRateLimitBackend()),
+        ("SQLite", DatabaseRateLimitBackend(_scratch_sqlite_url('rate_limit.db'))),
+    ]
+    for label, backend in backends:
+        now = 1000.0
+        decisions = [backend.update('client', now, interval, tolerance) for _ in range(4)]
+        assert [allowed for allowed, _ in decisions] == [True, True, True, False]
+        # Le refus ne consomme rien: le TAT reste celui du dernier appel admis
+        assert decisions[3][1] == decisions[2][1] == now + 3.0
+
+        assert not backend.update('client', now + 0.5, interval, tolerance)[0]
+        assert backend.update('client', now + 1.0, interval, tolerance)[0]
+        assert backend.update('other', now, interval, tolerance)[0]
+
+        backend.reset('client')
+        assert backend.update('client', now + 1.0, interval, tolerance) == (True, now + 2.0)
+        print(f"✅ Stockage {label}: rafale de 3, refus, reprise après l'intervalle")
+
+    limiter = RateLimiter(limit=60, period=60, burst=3, backend=MemoryRateLimitBackend())
+    first = limiter.hit('client')
+    assert first.allowed and first.remaining == 2 and first.limit == 3
+    limiter.hit('client')
+    limiter.hit('client')
+    refused = limiter.hit('client')
+    assert not refused.allowed and refused.remaining == 0
+    assert 0 < refused.retry_after <= 1.0
+    assert refused.headers()['Retry-After'] == '1'
+    print("✅ Décision: restant, Retry-After et en-têtes RateLimit-*")
+
+    # Stockage partagé indisponible: la requête passe
+    class BrokenBackend:
+        def update(self, *args):
+            raise RuntimeError("base indisponible")
+
+    assert RateLimiter(limit=1, backend=BrokenBackend()).hit('client').allowed
+    print("✅ Stockage en panne: requête autorisée")
+
+    # Clé client: empreinte du jeton, jamais le jeton lui-même
+    token = 'looker-' + 'x' * 400
+
+    def request(headers, host='10.0.0.1'):
+        return SimpleNamespace(headers=headers, client=SimpleNamespace(host=host))
+
+    key = default_client_key(request({'authorization': f'Bearer {token}'}))
+    assert key.startswith('user:') and token not in key and len(key) == 5 + 64
+    assert key == default_client_key(request({'authorization': f'Bearer {token}'}, host='10.0.0.2'))
+    assert key != default_client_key(request({'authorization': 'Bearer autre'}))
+    assert default_client_key(request({'X-Forwarded-For': '1.2.3.4, 10.0.0.1'})) == 'ip:1.2.3.4'
+    assert default_client_key(request({})) == 'ip:10.0.0.1'
+
+    shared = DatabaseRateLimitBackend(_scratch_sqlite_url('rate_limit_keys.db'))
+    assert shared.update(f"/looker/metrics:{key}", 1000.0, interval, tolerance)[0]
+    print("✅ Clé client: empreinte SHA-256 du jeton Bearer, stockable en base")
+
+
+def test_state_store():
+    """Test 2: États OAuth - expiration, mise à jour, consommation unique"""
+    print("\n🧪 Test 2: Stockage des états OAuth")
+    print("-" * 50)
+
+    _scratch_database()
+    from app.utils.state_store import DatabaseStateStore, MemoryStateStore, StateStore
+
+    try:
+        StateStore()
+        raise AssertionError("interface instanciée")
+    except TypeError:
+        pass
+
+    for label, store in (("mémoire", MemoryStateStore()), ("base", DatabaseStateStore('test'))):
+        assert store.put('state-1', {'user_id': 1, 'platform': 'linkedin'}, ttl=60)
+        assert store.get('state-1') == {'user_id': 1, 'platform': 'linkedin'}
+        assert store.update('state-1', {'user_id': 1, 'platform': 'facebook'})
+        assert store.get('state-1')['platform'] == 'facebook'
+
+        # Un état OAuth ne sert qu'une fois
+        assert store.pop('state-1') == {'user_id': 1, 'platform': 'facebook'}
+        assert store.pop('state-1') is None and store.get('state-1') is None
+        assert not store.update('state-1', {})
+
+        # Entrée expirée: invisible, non consommable, purgée
+        store.put('expired', {'user_id': 2}, ttl=0)
+        assert store.get('expired') is None and store.pop('expired') is None
+        store.put('expired', {'user_id': 2}, ttl=0)
+        store.put('live', {'user_id': 3}, ttl=60)
+        purged = store.purge_expired()
+        if isinstance(store, MemoryStateStore):
+            # En mémoire, chaque put sort déjà du tas les échéances passées
+            assert len(store) == 1
+        else:
+            assert purged == 1
+        assert store.get('live') == {'user_id': 3}
+        assert store.delete('live') and not store.delete('live')
+        print(f"✅ Stockage {label}: lecture, mise à jour, pop unique, expiration")
+
+    # Tas des expirations: une clé remplacée n'est pas purgée sur son ancienne échéance
+    store = MemoryStateStore()
+    store.put('session', {'v': 1}, ttl=0)
+    store.put('session', {'v': 2}, ttl=60)
+    assert store.purge_expired() == 0 and store.get('session') == {'v': 2}
+    for index in range(200):
+        store.put(f"tmp-{index}", {}, ttl=60)
+        store.delete(f"tmp-{index}")
+    assert len(store) == 1 and len(store._heap) < 100
+    print("✅ Tas des expirations: remplacements ignorés, entrées mortes bornées")
+
+    # Espaces de noms du stockage en base: même clé, valeurs distinctes
+    oauth, sessions = DatabaseStateStore('oauth'), DatabaseStateStore('session')
+    oauth.put('key', {'kind': 'oauth'}, ttl=60)
+    sessions.put('key', {'kind': 'session'}, ttl=60)
+    assert oauth.pop('key') == {'kind': 'oauth'} and sessions.get('key') == {'kind': 'session'}
+    DatabaseStateStore.stop_purger()
+    print("✅ Espaces de noms séparés en base")
+
+
+def test_http_cache():
+    """Test 3: Cache HTTP des plateformes - HIT, revalidation, quotas, tokens"""
+    print("\n🧪 Test 3: Cache HTTP des plateformes")
+    print("-" * 50)
+
+    import httpx
+    from app.utils.http_cache import HTTPCache, served_from_cache
+    from app.utils.platform_client import PlatformRuntime
+
+    calls = []
+
+    def reply(status_code, body=None, headers=None):
+        # Corps en flux, lu par le client comme une réponse réseau (elapsed renseigné)
+        content = json.dumps(body).encode() if body is not None else b''
+        return httpx.Response(status_code, headers={'Content-Type': 'application/json', **(headers or {})},
+                              stream=httpx.ByteStream(content))
+
+    def handler(request):
+        calls.append(request)
+        remaining = str(1000 - len(calls))
+        if request.url.path == '/rest/me':
+            if request.headers.get('If-None-Match') == '"v1"':
+                return reply(304, headers={'ETag': '"v1"', 'X-RateLimit-Remaining': remaining})
+            return reply(200, {'id': 'me'}, {'ETag': '"v1"', 'X-RateLimit-Limit': '1000',
+                                             'X-RateLimit-Remaining': remaining})
+        if request.url.path.endswith('/me'):
+            # Corps porteur de token: jamais stocké
+            return reply(200, {'id': '1', 'access_token': 'secret'})
+        return reply(200, {'elements': []})
+
+    runtime = PlatformRuntime()
+    runtime.cache = HTTPCache(path=os.path.join(tempfile.mkdtemp(prefix='wtd_test_'), 'http_cache.sqlite3'))
+    runtime.configure(httpx.MockTransport(handler))
+    linkedin = runtime.session('linkedin', headers={'LinkedIn-Version': '202408'})
+    auth = {'Authorization': 'Bearer token-a'}
+
+    try:
+        first = linkedin.get('https://api.linkedin.com/rest/me', headers=auth)
+        assert first.status_code == 200 and not served_from_cache(first) and len(calls) == 1
+        assert runtime.quota.get('linkedin', 'token-a').remaining == 999
+
+        # Réponse fraîche: servie sans appel, quota observé inchangé
+        hit = linkedin.get('https://api.linkedin.com/rest/me', headers=auth)
+        assert served_from_cache(hit) and hit.json() == {'id': 'me'} and len(calls) == 1
+        assert runtime.quota.get('linkedin', 'token-a').remaining == 999
+        print("✅ /rest/me: 1 appel réel, puis HIT sans appel ni mise à jour du quota")
+
+        # Entrée isolée par token
+        linkedin.get('https://api.linkedin.com/rest/me', headers={'Authorization': 'Bearer token-b'})
+        assert len(calls) == 2
+
+        # Entrée périmée: requête conditionnelle, le 304 est un appel réel qui relit le quota
+        runtime.cache._write('UPDATE http_cache SET expires_at = 0')
+        revalidated = linkedin.get('https://api.linkedin.com/rest/me', headers=auth)
+        assert calls[-1].headers.get('If-None-Match') == '"v1"' and len(calls) == 3
+        assert revalidated.headers['X-Cache'] == 'REVALIDATED' and not served_from_cache(revalidated)
+        assert revalidated.json() == {'id': 'me'}
+        assert runtime.quota.get('linkedin', 'token-a').remaining == 997
+        print("✅ Entrée périmée: 304 revalidé, corps repris du cache, quota relu")
+
+        # Endpoints hors politique et corps porteurs de token: toujours sur le réseau
+        for _ in range(2):
+            linkedin.get('https://api.linkedin.com/rest/organizationPageStatistics', headers=auth)
+            runtime.session('facebook').get('https://graph.facebook.com/v19.0/me', params={'access_token': 'fb'})
+        assert len(calls) == 7 and runtime.cache.stats['stored'] == 2
+        print("✅ Statistiques et réponses porteuses de token jamais mises en cache")
+    finally:
+        runtime.stop()
+
+
+def main():
+    """Exécute tous les tests dans l'ordre"""
+    print("🚀 Tests des utilitaires de l'API")
+    print("=" * 60)
+
+    tests = [
+        ("Rate limiter GCRA", test_gcra_rate_limiter),
+        ("États OAuth", test_state_store),
+        ("Cache HTTP", test_http_cache),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results.append((test_name, True))
+        except Exception as e:
+            print(f"❌ Erreur dans {test_name}: {e!r}")
+            results.append((test_name, False))
+
+    # Résumé final
+    print("\n" + "=" * 60)
+    print("📊 RÉSUMÉ DES TESTS")
+    print("=" * 60)
+
+    passed = 0
+    for test_name, success in results:
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}")
+        if success:
+            passed += 1
+
+    print(f"\n🎯 Résultat: {passed}/{len(tests)} tests réussis")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)